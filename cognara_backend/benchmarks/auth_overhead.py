@@ -0,0 +1,89 @@
+"""
+Per-request auth overhead: legacy per-view decorators + DRF Session/Token auth
+versus blog.middleware.AppAuthMiddleware with DRF authentication disabled.
+
+    python -m benchmarks.auth_overhead
+"""
+
+from benchmarks.common import measure, report, setup_django
+
+setup_django(ROOT_URLCONF=__name__)
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.test import Client, override_settings
+from django.urls import path
+from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import AllowAny, IsAuthenticatedOrReadOnly
+from rest_framework.response import Response
+
+
+def legacy_require_frontend_token(view_func):
+    # Copy of the decorator that used to live in blog/helper.py.
+    def wrapped_view(request, *args, **kwargs):
+        token = request.headers.get('App-Token')
+        if token != settings.FRONTEND_API_TOKEN:
+            return JsonResponse({'error': 'Unauthorized access'}, status=403)
+        return view_func(request, *args, **kwargs)
+    return wrapped_view
+
+
+@legacy_require_frontend_token
+@api_view(['GET'])
+@authentication_classes([SessionAuthentication, TokenAuthentication])
+@permission_classes([IsAuthenticatedOrReadOnly])
+def legacy_view(request):
+    return Response({'authenticated': 'id' in request.session})
+
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def middleware_view(request):
+    return Response({'authenticated': request.principal.is_authenticated})
+
+
+urlpatterns = [
+    path('legacy', legacy_view),
+    path('middleware', middleware_view),
+]
+
+BASE_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+]
+
+
+def _client(middleware):
+    # The test client builds its middleware chain on the first request.
+    with override_settings(MIDDLEWARE=middleware):
+        client = Client()
+        client.get('/')
+    return client
+
+
+def run(iterations=2000, rounds=5):
+    headers = {"HTTP_APP_TOKEN": settings.FRONTEND_API_TOKEN}
+    bad_headers = {"HTTP_APP_TOKEN": "wrong-token"}
+    before = _client(BASE_MIDDLEWARE)
+    after = _client(BASE_MIDDLEWARE[:1] + ['blog.middleware.AppAuthMiddleware'] + BASE_MIDDLEWARE[1:])
+
+    cases = {
+        "before_accepted": lambda: before.get('/legacy', **headers),
+        "before_rejected": lambda: before.get('/legacy', **bad_headers),
+        "after_accepted": lambda: after.get('/middleware', **headers),
+        "after_rejected": lambda: after.get('/middleware', **bad_headers),
+    }
+    # Interleave rounds and keep each case's best round to damp machine noise.
+    results = {}
+    for _ in range(rounds):
+        for name, case in cases.items():
+            stats = measure(case, iterations)
+            if name not in results or stats["p50_us"] < results[name]["p50_us"]:
+                results[name] = stats
+    return results
+
+
+if __name__ == "__main__":
+    report("auth_overhead", run())
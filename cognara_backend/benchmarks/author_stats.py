@@ -0,0 +1,203 @@
+"""
+Author dashboard stats from the article_stats rollups against counting them on
+request.
+
+Seeds a prolific author (--articles, content included) among --other-articles
+by others, --reads finished read sessions and --comments comments over all of
+them into the Supabase stand-in, whose row triggers keep article_stats like
+the SQL ones. Signed in as that author:
+  on_request   - what the dashboard would need without rollups: userarticles
+                 (every article with content), then every read and comment of
+                 those articles, batched by article id
+  stats_page   - GET userarticles/stats?limit=50 (totals + 50 summaries)
+  stats_all    - every page of userarticles/stats?limit=200
+  log_read     - POST log_read: new session, an in-progress heartbeat, then
+                 the "completed" beacon
+  comment      - POST articles/add-comment
+Reported per call: response bytes, bytes read from Supabase, round trips and
+latency. The writes cost the same round trips as before; the rollup upkeep
+runs inside them, and in-progress heartbeats skip it (heartbeats_skip_stats). on_request's latency is mostly the stand-in filtering its
+Python lists (Postgres would use indexes); its round trips and bytes are what
+carry over.
+
+    python -m benchmarks.author_stats --articles 2000 --reads 300000 --repeat 20
+"""
+
+import argparse
+import random
+import time
+
+from benchmarks.common import percentile, report, setup_app
+
+FINISHED = ("abandoned", "skimmed", "deep_read", "completed", "in_progress")
+
+
+def seed(fake, args, rng):
+    from benchmarks.autosave import WORDS
+
+    users = fake.db.insert_rows("users", [{"username": f"user{n}", "email": f"user{n}@example.com",
+                                           "first_name": "User", "last_name": str(n)} for n in range(1, 201)])
+    author = users[0]["id"]
+
+    def article(author_id, words):
+        return {"title": " ".join(rng.choice(WORDS) for _ in range(6)),
+                "excerpt": " ".join(rng.choice(WORDS) for _ in range(25)),
+                "content": "<p>" + " ".join(rng.choice(WORDS) for _ in range(words)) + "</p>",
+                "author_id": author_id, "status": rng.choice(("published", "published", "draft", "review"))}
+
+    mine = fake.db.insert_rows("articles", [article(author, 800) for _ in range(args.articles)])
+    others = fake.db.insert_rows("articles", [article(rng.choice(users[1:])["id"], 20)
+                                              for _ in range(args.other_articles)])
+    ids = [row["id"] for row in mine + others]
+    fake.db.insert_rows("article_reads", [{
+        "user_id": rng.choice(users)["id"], "article_id": rng.choice(ids), "status": rng.choice(FINISHED),
+        "scroll_depth": rng.uniform(0, 100), "active_time_seconds": rng.randrange(0, 600),
+        "required_time_seconds": 240,
+    } for _ in range(args.reads)])
+    fake.db.insert_rows("comments", [{"user_id": rng.choice(users)["id"], "article_id": rng.choice(ids),
+                                      "content": " ".join(rng.choice(WORDS) for _ in range(20))}
+                                     for _ in range(args.comments)])
+    return author, [row["id"] for row in mine]
+
+
+def measure(fake, wire, repeat, call):
+    timings, calls, received, size = [], 0, 0, 0
+    for _ in range(repeat):
+        before = (fake.db.calls, wire.received)
+        start = time.perf_counter()
+        size = call()
+        timings.append((time.perf_counter() - start) * 1000)
+        calls += fake.db.calls - before[0]
+        received += wire.received - before[1]
+    timings.sort()
+    return {
+        "response_kib": round(size / 1024, 1),
+        "supabase_kib_received": round(received / repeat / 1024, 1),
+        "round_trips": round(calls / repeat, 2),
+        "p50_ms": round(percentile(timings, 0.5), 2),
+    }
+
+
+def counted(fake, author):
+    """Stats per article of `author`, counted from the reads and comments themselves."""
+    from blog.stats import STATS_FIELDS, read_rollup
+
+    stats = {row["id"]: dict.fromkeys(STATS_FIELDS, 0) for row in fake.db.table("articles").rows
+             if row["author_id"] == author}
+    for row in fake.db.table("article_reads").rows:
+        if row["article_id"] in stats:
+            for field, value in read_rollup(row).items():
+                stats[row["article_id"]][field] += value
+    for row in fake.db.table("comments").rows:
+        if row["article_id"] in stats:
+            stats[row["article_id"]]["comments"] += 1
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=2000)
+    parser.add_argument("--other-articles", type=int, default=20000)
+    parser.add_argument("--reads", type=int, default=300000)
+    parser.add_argument("--comments", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=2)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args(argv)
+
+    setup_app(BENCH_LATENCY_MS=args.latency_ms)
+    from django.test import Client, override_settings
+
+    from benchmarks.autosave import Wire
+    from benchmarks.fakes import get_fake_client
+    from blog.stats import STATS_FIELDS
+    from blog.repositories.supabase_backend import _in_batches
+
+    fake = get_fake_client()
+    wire = Wire()
+    author, mine = seed(fake, args, random.Random(args.seed))
+
+    with override_settings(SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies"):
+        client = Client(HTTP_APP_TOKEN="benchmark-app-token")
+        session = client.session
+        session.update({"id": author, "username": f"user{author}", "email": f"user{author}@example.com",
+                        "email_verified": True})
+        session.save()
+        client.cookies["sessionid"] = session.session_key
+
+        def get(path):
+            response = client.get(path)
+            assert response.status_code == 200, (path, response.status_code, response.content[:200])
+            return response
+
+        def post(path, body):
+            response = client.post(path, body, content_type="application/json")
+            assert response.status_code in (200, 201), (path, response.status_code, response.content[:200])
+            return response
+
+        def on_request():
+            articles = get("/userarticles").content
+            reads = _in_batches(lambda: fake.table("article_reads").select("article_id, status, active_time_seconds"),
+                                "article_id", mine)
+            comments = _in_batches(lambda: fake.table("comments").select("article_id"), "article_id", mine)
+            return len(articles) if reads or comments else 0
+
+        def pages(limit):
+            rows, before, size, totals = [], None, 0, None
+            while True:
+                response = get(f"/userarticles/stats?limit={limit}" + (f"&before={before}" if before else ""))
+                size += len(response.content)
+                body = response.json()
+                rows.extend(body["articles"])
+                totals = body["totals"]
+                before = body["next"]
+                if before is None:
+                    return rows, totals, size
+
+        def log_read():
+            started = post("/log_read", {"user_id": author, "article_id": mine[-1], "force_new_session": True}).json()
+            post("/log_read", {"user_id": author, "article_id": mine[-1], "session_id": started["session_id"],
+                               "status": "in_progress", "scroll_depth": 40, "active_time_seconds": 120})
+            done = post("/log_read", {"user_id": author, "article_id": mine[-1], "session_id": started["session_id"],
+                                      "status": "completed", "scroll_depth": 95, "active_time_seconds": 300})
+            return len(done.content)
+
+        results = {
+            "on_request": measure(fake, wire, max(1, args.repeat // 10), on_request),
+            "stats_page": measure(fake, wire, args.repeat, lambda: len(get("/userarticles/stats?limit=50").content)),
+            "stats_all": measure(fake, wire, max(1, args.repeat // 10), lambda: pages(200)[2]),
+        }
+        before = get("/userarticles/stats?limit=1").json()["articles"][0]
+        results["log_read"] = measure(fake, wire, args.repeat, log_read)
+        results["comment"] = measure(fake, wire, args.repeat, lambda: len(post(
+            "/articles/add-comment", {"comment": "Thanks for this.", "article_id": mine[-1]}).content))
+        after = get("/userarticles/stats?limit=1").json()["articles"][0]
+
+        started = post("/log_read", {"user_id": author, "article_id": mine[-1], "force_new_session": True}).json()
+        stats_row = dict(fake.db.article_stats[mine[-1]])
+        post("/log_read", {"user_id": author, "article_id": mine[-1], "session_id": started["session_id"],
+                           "status": "in_progress", "scroll_depth": 60, "active_time_seconds": 90})
+        heartbeats_skip_stats = fake.db.article_stats[mine[-1]] == stats_row
+
+        rows, totals, _ = pages(200)
+        expected = counted(fake, author)
+        checks = {
+            "every_article_listed_once": sorted(row["id"] for row in rows) == sorted(mine),
+            "newest_first": [row["id"] for row in rows] == sorted(mine, reverse=True),
+            "rollups_match_counting": all({field: row[field] for field in STATS_FIELDS} == expected[row["id"]]
+                                          for row in rows),
+            "totals_match_counting": all(totals[field] == sum(stats[field] for stats in expected.values())
+                                         for field in STATS_FIELDS),
+            "writes_show_up": (after["reads"] - before["reads"] == args.repeat
+                               and after["comments"] - before["comments"] == args.repeat),
+            "summaries_have_no_content": all("content" not in row for row in rows),
+            "heartbeats_skip_stats": heartbeats_skip_stats,
+        }
+
+    results["on_request_vs_page_bytes"] = round(results["on_request"]["supabase_kib_received"]
+                                                / max(results["stats_page"]["supabase_kib_received"], 0.1))
+    report("author_stats", {"config": vars(args), "results": results, "checks": checks})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Bytes per draft save on a long article: full-content `submit` vs. patch
+`autosave` (blog.drafts).
+
+One author edits a --words draft for --saves autosaves: each save follows a
+burst of typing (a sentence inserted somewhere, now and then a deleted span or
+an emoji). The client side computes one op per save from the common prefix and
+suffix of its previous and current text, like a simple editor integration.
+  submit   - POST submit with the whole title + content (exists + update,
+             the update returning the full row)
+  autosave - POST autosave with [start, delete_count, insert_text] ops against
+             base_version (one autosave_article RPC)
+Reported per save: request and response body bytes between browser and
+Django, bytes sent to and read back from Supabase, round trips and latency.
+Afterwards both copies of the article must equal the editor's text, and the
+conflict paths are checked.
+
+    python -m benchmarks.autosave --words 20000 --saves 200 --latency-ms 5
+"""
+
+import argparse
+import json
+import random
+import time
+
+from benchmarks.common import percentile, report, setup_app
+
+WORDS = ("the of and to in is that for it as with was on be by this are from or an have which not at "
+         "but they can more one all their has been would there what so if about into when than other "
+         "learning reading attention memory practice cognition evidence students research curiosity").split()
+
+
+def draft_text(rng, words):
+    paragraphs = []
+    while words > 0:
+        count = min(words, rng.randint(60, 140))
+        words -= count
+        paragraphs.append("<p>" + " ".join(rng.choice(WORDS) for _ in range(count)).capitalize() + ".</p>")
+    return "".join(paragraphs)
+
+
+def edit(rng, text):
+    """One burst of typing between two autosaves."""
+    at = rng.randrange(len(text))
+    roll = rng.random()
+    if roll < 0.15:
+        return text[:at] + text[at + rng.randint(5, 80):]
+    sentence = " " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 18))) + "."
+    if roll > 0.95:
+        sentence += " \U0001F9E0"
+    return text[:at] + sentence + text[at:]
+
+
+def ops_between(old, new):
+    """[[start, delete_count, insert_text]] in UTF-16 offsets, from the common prefix/suffix."""
+    from blog.drafts import utf16_length
+
+    prefix = 0
+    limit = min(len(old), len(new))
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    removed = old[prefix:len(old) - suffix]
+    inserted = new[prefix:len(new) - suffix]
+    if not removed and not inserted:
+        return []
+    return [[utf16_length(old[:prefix]), utf16_length(removed), inserted]]
+
+
+class Wire:
+    """Counts JSON bytes to and from the fake Supabase."""
+
+    def __init__(self):
+        from benchmarks import fakes
+
+        self.sent = self.received = 0
+        wire = self
+        for cls, attr in ((fakes.FakeQuery, "payload"), (fakes.FakeRpc, "params")):
+            original = cls.execute
+
+            def execute(self, original=original, attr=attr):
+                response = original(self)
+                wire.sent += len(json.dumps(getattr(self, attr, None), default=str))
+                wire.received += len(json.dumps(response.data, default=str))
+                return response
+
+            cls.execute = execute
+
+
+def run(name, client, wire, fake, texts, send):
+    samples, up, down, sent, received, calls = [], 0, 0, 0, 0, 0
+    for previous, text in zip(texts, texts[1:]):
+        body = json.dumps(send(previous, text))
+        wire_before, calls_before = (wire.sent, wire.received), fake.db.calls
+        start = time.perf_counter()
+        response = client.post("/" + name, body, content_type="application/json")
+        samples.append((time.perf_counter() - start) * 1000)
+        assert response.status_code in (200, 201), (name, response.status_code, response.content[:200])
+        up += len(body)
+        down += len(response.content)
+        sent += wire.sent - wire_before[0]
+        received += wire.received - wire_before[1]
+        calls += fake.db.calls - calls_before
+        yield response.json()
+    saves = len(samples)
+    samples.sort()
+    run.results[name] = {
+        "saves": saves,
+        "request_bytes_per_save": round(up / saves),
+        "response_bytes_per_save": round(down / saves),
+        "supabase_bytes_sent_per_save": round(sent / saves),
+        "supabase_bytes_received_per_save": round(received / saves),
+        "supabase_round_trips_per_save": round(calls / saves, 2),
+        "p50_ms": round(percentile(samples, 0.5), 2),
+        "p99_ms": round(percentile(samples, 0.99), 2),
+    }
+
+
+run.results = {}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, default=20000)
+    parser.add_argument("--saves", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    setup_app(BENCH_LATENCY_MS=args.latency_ms)
+    from django.test import Client, override_settings
+
+    from benchmarks.fakes import get_fake_client
+    from blog import drafts
+
+    fake = get_fake_client()
+    wire = Wire()
+    author = fake.db.insert_rows("users", [{"username": "writer", "email": "writer@example.com",
+                                            "first_name": "Ada", "last_name": "Writer"}])[0]
+    rng = random.Random(args.seed)
+    texts = [draft_text(rng, args.words)]
+    for _ in range(args.saves):
+        texts.append(edit(rng, texts[-1]))
+    title = "A long draft"
+
+    with override_settings(SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies"):
+        client = Client(HTTP_APP_TOKEN="benchmark-app-token")
+        session = client.session
+        session.update({"id": author["id"], "username": "writer", "email": "writer@example.com",
+                        "first_name": "Ada", "last_name": "Writer", "email_verified": True})
+        session.save()
+        client.cookies["sessionid"] = session.session_key
+
+        legacy_id = fake.db.insert_rows("articles", [{"title": title, "content": texts[0],
+                                                      "author_id": author["id"], "status": "draft"}])[0]["id"]
+        for _ in run("submit", client, wire, fake, texts,
+                     lambda previous, text: {"article_id": legacy_id, "title": title, "content": text,
+                                             "status": "draft"}):
+            pass
+
+        created = client.post("/autosave", {"title": title, "content": texts[0]}, content_type="application/json")
+        article_id = created.json()["article_id"]
+        state = {"version": created.json()["version"]}
+
+        def patch(previous, text):
+            return {"article_id": article_id, "base_version": state["version"],
+                    "ops": ops_between(previous, text), "length": drafts.utf16_length(text)}
+
+        for saved in run("autosave", client, wire, fake, texts, patch):
+            state["version"] = saved["version"]
+
+        def stored(article):
+            return next(row for row in fake.db.table("articles").rows if row["id"] == article)
+
+        def autosave(body):
+            response = client.post("/autosave", dict(body, article_id=article_id), content_type="application/json")
+            return response.status_code, response.json().get("version")
+
+        checks = {
+            "submit_copy_matches_editor": stored(legacy_id)["content"] == texts[-1],
+            "autosave_copy_matches_editor": stored(article_id)["content"] == texts[-1],
+            "version": stored(article_id)["version"],
+            "revisions_logged": sum(1 for row in fake.db.table("article_revisions").rows
+                                    if row["article_id"] == article_id),
+            "revision_log_bytes": sum(len(row["data"]) for row in fake.db.table("article_revisions").rows
+                                      if row["article_id"] == article_id),
+        }
+        current = state["version"]
+        checks["stale_base_version"] = autosave({"base_version": current - 1, "ops": [[0, 0, "x"]]})
+        checks["same_base_twice"] = [autosave({"base_version": current, "ops": [[0, 0, "a"]]}),
+                                     autosave({"base_version": current, "ops": [[0, 0, "b"]]})]
+        # submit from another device moves the version under the cached draft.
+        client.post("/submit", {"article_id": article_id, "title": title, "content": "rewritten", "status": "draft"},
+                    content_type="application/json")
+        checks["after_submit_elsewhere"] = autosave({"base_version": current + 1, "ops": [[0, 0, "c"]]})
+        checks["out_of_range_op"] = autosave({"base_version": stored(article_id)["version"], "ops": [[10 ** 6, 0, "d"]]})
+        checks["length_mismatch"] = autosave({"base_version": stored(article_id)["version"],
+                                              "ops": [[0, 0, "e"]], "length": 1})
+
+    results = run.results
+    results["request_bytes_ratio"] = round(results["submit"]["request_bytes_per_save"]
+                                           / results["autosave"]["request_bytes_per_save"], 1)
+    results["supabase_received_bytes_ratio"] = round(results["submit"]["supabase_bytes_received_per_save"]
+                                                     / max(1, results["autosave"]["supabase_bytes_received_per_save"]), 1)
+    report("autosave", {"config": vars(args), "draft_chars": len(texts[0]), "results": results, "checks": checks})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Bulk import vs. one request per row, against the latency-injected Supabase stand-in.
+
+Generates a source directory (users.ndjson, articles.ndjson, Markdown articles
+and image files, some images shared between articles), then times:
+  per_request - what onboarding did before: users.create per user, articles.create
+                per article, and the upload_article_image sequence per image
+                (list + remove + upload + insert), all sequential
+  bulk        - blog.bulk_import.run_import (chunked inserts, pooled uploads)
+  rerun       - run_import again on the same data: nothing inserted or uploaded
+  dry_run     - validation + existence checks only, on a fresh database
+
+    python -m benchmarks.bulk_import --users 50 --articles 500 --latency-ms 10
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.common import report, setup_django
+
+setup_django(
+    INSTALLED_APPS=["django.contrib.auth", "django.contrib.contenttypes", "blog"],
+    AUTH_USER_MODEL="blog.User",
+)
+
+from benchmarks.fakes import FakeSupabase, Latency
+from blog import bulk_import, images
+from blog.repositories import build_repositories
+
+
+def generate(source, users, articles, image_kib, markdown_share=0.2, seed=1):
+    rng = random.Random(seed)
+    os.makedirs(os.path.join(source, "articles"), exist_ok=True)
+    os.makedirs(os.path.join(source, "images"), exist_ok=True)
+    emails = [f"author{i}@example.com" for i in range(users)]
+    with open(os.path.join(source, "users.ndjson"), "w") as handle:
+        for i, email in enumerate(emails):
+            handle.write(json.dumps({"email": email, "username": f"author{i}",
+                                     "first_name": "author", "last_name": str(i)}) + "\n")
+        handle.write('{"email": "not-an-email", "username": "broken"}\n')
+    # A fifth of the images are reused by several articles (logos, banners).
+    image_files = [f"images/{i}.jpg" for i in range(max(1, int(articles * 0.8)))]
+    for image in image_files:
+        with open(os.path.join(source, image), "wb") as handle:
+            handle.write(rng.randbytes(image_kib * 1024))
+    words = "reading attention habit focus learning memory research practice science".split()
+    with open(os.path.join(source, "articles.ndjson"), "w") as handle:
+        for i in range(articles):
+            body = " ".join(rng.choice(words) for _ in range(300))
+            row = {"author_email": rng.choice(emails), "title": f"Imported article {i}",
+                   "content": f"<p>{body}</p>", "status": "published", "images": [rng.choice(image_files)]}
+            if rng.random() < markdown_share:
+                with open(os.path.join(source, "articles", f"{i}.md"), "w") as md:
+                    md.write(f"---\nauthor_email: {row['author_email']}\ntitle: {row['title']}\n"
+                             f"status: published\nimages: {row['images'][0]}\n---\n{body}\n\n{body}\n")
+            else:
+                handle.write(json.dumps(row) + "\n")
+        handle.write('{"author_email": "nobody@example.com", "title": "orphan", "content": "x"}\n')
+
+
+def per_request(source, client):
+    """The old path: one insert per row, the upload_article_image dance per image."""
+    repos = build_repositories("supabase", client=client)
+    bucket = client.storage.from_(images.PHOTO_BUCKET)
+    start = time.perf_counter()
+    uploaded = 0
+    for _, row in bulk_import.read_ndjson(os.path.join(source, "users.ndjson")):
+        if bulk_import.validate_user(row) is None:
+            repos.users.create(row)
+    for _, row in bulk_import.read_articles(source):
+        if bulk_import.validate_article(row, source):
+            continue
+        author_id = repos.users.id_for_email(row["author_email"])
+        article = repos.articles.create({"title": row["title"], "content": row["content"],
+                                         "author_id": author_id, "status": row.get("status")})
+        for image in row.get("images") or []:
+            existing = repos.photos.paths_for_article(article["id"])
+            if existing:
+                bucket.remove(existing)
+                repos.photos.delete_for_article(article["id"])
+            with open(os.path.join(source, image), "rb") as handle:
+                data = handle.read()
+            path = f"{article['id']}/{os.path.basename(image)}"
+            bucket.upload(path=path, file=data, file_options={"content-type": "image/jpeg"})
+            repos.photos.add(article["id"], path)
+            uploaded += len(data)
+    return time.perf_counter() - start, uploaded
+
+
+def bulk(source, client, args, dry_run=False):
+    repos = build_repositories("supabase", client=client)
+    before_calls = client.calls + client.storage.calls
+    start = time.perf_counter()
+    result = bulk_import.run_import(source, dry_run, args.chunk_size, args.workers,
+                                    repos=repos, storage=client.storage)
+    elapsed = time.perf_counter() - start
+    return {
+        "seconds": round(elapsed, 2),
+        "round_trips": client.calls + client.storage.calls - before_calls,
+        "users": result["users"],
+        "articles": result["articles"],
+        "images": result["images"],
+        "errors": len(result["errors"]),
+        "throughput": bulk_import.throughput(result),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--articles", type=int, default=500)
+    parser.add_argument("--image-kib", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=10.0)
+    parser.add_argument("--chunk-size", type=int, default=bulk_import.CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=bulk_import.UPLOAD_WORKERS)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as source:
+        generate(source, args.users, args.articles, args.image_kib)
+        latency = lambda: Latency(args.latency_ms / 1000, args.latency_ms / 10000, seed=1)
+
+        baseline = FakeSupabase(latency())
+        seconds, uploaded = per_request(source, baseline)
+        rows = args.users + args.articles
+        results = {"per_request": {
+            "seconds": round(seconds, 2),
+            "round_trips": baseline.calls + baseline.storage.calls,
+            "rows_per_second": round(rows / seconds),
+            "images_mb_per_second": round(uploaded / 2**20 / seconds, 2),
+        }}
+
+        client = FakeSupabase(latency())
+        results["bulk"] = bulk(source, client, args)
+        results["rerun"] = bulk(source, client, args)
+        results["dry_run"] = bulk(source, FakeSupabase(latency()), args, dry_run=True)
+        results["bulk_speedup"] = round(seconds / results["bulk"]["seconds"], 1)
+    report("bulk_import", {"config": vars(args), "results": results})
+
+
+if __name__ == "__main__":
+    main()
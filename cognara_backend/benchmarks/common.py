@@ -0,0 +1,144 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Run benchmarks from the cognara_backend directory, e.g.
+    python -m benchmarks.auth_overhead
+"""
+
+import json
+import os
+import statistics
+import sys
+import time
+
+
+BENCH_SETTINGS = {
+    "DEBUG": False,
+    "SECRET_KEY": "benchmark-secret-key",
+    "ALLOWED_HOSTS": ["*"],
+    "FRONTEND_API_TOKEN": "benchmark-app-token",
+    "SUPABASE_URL": "http://127.0.0.1:54321",
+    "SUPABASE_KEY": "benchmark-key",
+    "SUPABASE_BUCKET": "article-photos",
+    "GOOGLE_CLIENT_ID": "benchmark-client-id",
+    "EMAIL_HOST": "127.0.0.1",
+    "EMAIL_HOST_USER": "bench@cognara.local",
+    "EMAIL_HOST_PASSWORD": "",
+    "INSTALLED_APPS": [
+        "django.contrib.auth",
+        "django.contrib.contenttypes",
+        "django.contrib.sessions",
+        "rest_framework",
+        "rest_framework.authtoken",
+    ],
+    "DATABASES": {"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}},
+    "SESSION_ENGINE": "django.contrib.sessions.backends.signed_cookies",
+    "USE_TZ": True,
+}
+
+
+def setup_django(**overrides):
+    """Configure a minimal, env-free Django for benchmarking. Safe to call more than once."""
+    import django
+    from django.conf import settings
+
+    if not settings.configured:
+        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        if base_dir not in sys.path:
+            sys.path.insert(0, base_dir)
+        options = dict(BENCH_SETTINGS, BASE_DIR=base_dir)
+        options.update(overrides)
+        settings.configure(**options)
+        django.setup()
+
+
+def bench_databases():
+    """Local Postgres from BENCH_PG_* when BENCH_PG_NAME is set, else in-memory SQLite."""
+    if os.environ.get("BENCH_PG_NAME"):
+        return {"default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ["BENCH_PG_NAME"],
+            "USER": os.environ.get("BENCH_PG_USER", "postgres"),
+            "PASSWORD": os.environ.get("BENCH_PG_PASSWORD", ""),
+            "HOST": os.environ.get("BENCH_PG_HOST", "127.0.0.1"),
+            "PORT": os.environ.get("BENCH_PG_PORT", "5432"),
+        }}
+    return {"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}}
+
+
+def measure(func, iterations=2000, warmup=200):
+    """Call func repeatedly and return latency stats in microseconds."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return {
+        "iterations": iterations,
+        "mean_us": round(statistics.fmean(samples), 2),
+        "p50_us": round(samples[len(samples) // 2], 2),
+        "p95_us": round(samples[int(len(samples) * 0.95) - 1], 2),
+        "p99_us": round(samples[int(len(samples) * 0.99) - 1], 2),
+    }
+
+
+def report(name, results):
+    """Print results as JSON so runs can be diffed between commits."""
+    print(json.dumps({"benchmark": name, "results": results}, indent=2))
+
+
+APP_ENV_DEFAULTS = {
+    "SECRET_KEY": "benchmark-secret-key",
+    "EMAIL_BACKEND": "django.core.mail.backends.locmem.EmailBackend",
+    "EMAIL_HOST": "127.0.0.1",
+    "EMAIL_PORT": "587",
+    "EMAIL_USE_TLS": "True",
+    "EMAIL_HOST_USER": "bench@cognara.local",
+    "EMAIL_HOST_PASSWORD": "",
+    "FRONTEND_API_TOKEN": BENCH_SETTINGS["FRONTEND_API_TOKEN"],
+    "SUPABASE_URL": BENCH_SETTINGS["SUPABASE_URL"],
+    "SUPABASE_KEY": BENCH_SETTINGS["SUPABASE_KEY"],
+    "SUPABASE_BUCKET": BENCH_SETTINGS["SUPABASE_BUCKET"],
+    "GOOGLE_CLIENT_ID": BENCH_SETTINGS["GOOGLE_CLIENT_ID"],
+    "SUPABASE_CLIENT_FACTORY": "benchmarks.fakes.get_fake_client",
+    "LOG_LEVEL": "WARNING",
+}
+
+
+def setup_app(**env):
+    """
+    Load the real project settings against the local stand-ins in benchmarks.fakes.
+    Environment variables already set win over the defaults above.
+    """
+    import django
+
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if base_dir not in sys.path:
+        sys.path.insert(0, base_dir)
+    for key, value in dict(APP_ENV_DEFAULTS, **env).items():
+        os.environ.setdefault(key, str(value))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "cognara_backend.settings")
+    django.setup()
+
+    from benchmarks.fakes import install_fake_smtp
+    install_fake_smtp()
+
+
+def percentile(sorted_samples, fraction):
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, max(0, int(round(fraction * len(sorted_samples))) - 1))
+    return sorted_samples[index]
+
+
+def git_commit():
+    import subprocess
+
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
@@ -0,0 +1,47 @@
+"""
+Compare two load reports written by benchmarks.load.
+
+    python -m benchmarks.compare BASELINE.json CANDIDATE.json
+"""
+
+import json
+import sys
+
+
+METRICS = ["rps", "p50_ms", "p95_ms", "p99_ms", "errors", "upstream_calls_per_request"]
+
+
+def load(path):
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def compare(baseline, candidate):
+    rows = []
+    for name, new in candidate["scenarios"].items():
+        old = baseline["scenarios"].get(name)
+        if old is None:
+            continue
+        for metric in METRICS:
+            if metric not in new or metric not in old:
+                continue
+            before, after = old[metric], new[metric]
+            change = ((after - before) / before * 100) if before else 0.0
+            rows.append((name, metric, before, after, change))
+    return rows
+
+
+def main(argv=None):
+    argv = argv if argv is not None else sys.argv[1:]
+    if len(argv) != 2:
+        print(__doc__)
+        return 2
+    baseline, candidate = load(argv[0]), load(argv[1])
+    print(f"baseline {baseline['commit']}  ->  candidate {candidate['commit']}")
+    for name, metric, before, after, change in compare(baseline, candidate):
+        print(f"{name:20s} {metric:28s} {before:>12} {after:>12} {change:+8.1f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Seeded synthetic data (users, articles, comments, reads) for the fake Supabase.
+The same scale and seed always produce the same rows.
+"""
+
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+
+SCALES = {
+    "small": {"users": 200, "articles": 100, "comments": 1000, "reads": 5000, "words": 800},
+    "medium": {"users": 2000, "articles": 1000, "comments": 20000, "reads": 100000, "words": 1500},
+    "large": {"users": 20000, "articles": 10000, "comments": 200000, "reads": 1000000, "words": 1500},
+}
+
+WORDS = ("cognition memory attention learning neuron signal pattern model theory evidence "
+         "experiment language reasoning habit focus practice feedback insight network brain "
+         "research method result analysis question answer context culture design system").split()
+
+ARTICLE_STATUSES = ["published"] * 7 + ["draft", "review", "rejected"]
+READ_STATUSES = ["started", "in_progress", "completed", "abandoned", "skimmed", "deep_read"]
+
+
+def paragraph(rng, words):
+    return "<p>" + " ".join(rng.choice(WORDS) for _ in range(words)) + ".</p>"
+
+
+def article_html(rng, words):
+    parts, remaining = [], words
+    while remaining > 0:
+        size = min(remaining, rng.randint(40, 120))
+        parts.append(paragraph(rng, size))
+        remaining -= size
+    return "".join(parts)
+
+
+def build(scale="small", seed_value=1, **overrides):
+    """Return {table: [rows]} for the given scale."""
+    sizes = dict(SCALES[scale], **overrides)
+    rng = random.Random(seed_value)
+    epoch = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    def stamp(days):
+        return (epoch + timedelta(days=days, seconds=rng.randint(0, 86400))).isoformat()
+
+    users = [{
+        "id": i,
+        "username": f"user{i}",
+        "email": f"user{i}@example.com",
+        "first_name": rng.choice(["ada", "alan", "grace", "linus", "mina", "yara"]),
+        "last_name": rng.choice(["boktor", "hopper", "turing", "lovelace", "torvalds"]),
+        "password_hash": "pbkdf2_sha256$bench",
+        "bio": "Learner at Cognara",
+        "email_verified": "True",
+        "created_at": stamp(0),
+    } for i in range(1, sizes["users"] + 1)]
+
+    articles = []
+    for i in range(1, sizes["articles"] + 1):
+        created = stamp(rng.randint(0, 365))
+        articles.append({
+            "id": i,
+            "title": f"Article {i}: " + " ".join(rng.choice(WORDS) for _ in range(5)),
+            "content": article_html(rng, max(50, int(rng.gauss(sizes["words"], sizes["words"] / 4)))),
+            "author_id": rng.randint(1, sizes["users"]),
+            "status": rng.choice(ARTICLE_STATUSES),
+            "created_at": created,
+            "updated_at": created,
+        })
+
+    comments = [{
+        "id": i,
+        "article_id": rng.randint(1, sizes["articles"]),
+        "user_id": rng.randint(1, sizes["users"]),
+        "content": " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 60))),
+        "created_at": stamp(rng.randint(0, 365)),
+    } for i in range(1, sizes["comments"] + 1)]
+
+    reads = []
+    for i in range(1, sizes["reads"] + 1):
+        created = stamp(rng.randint(0, 365))
+        reads.append({
+            "id": i,
+            "session_id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "user_id": rng.randint(1, sizes["users"]),
+            "article_id": rng.randint(1, sizes["articles"]),
+            "status": rng.choice(READ_STATUSES),
+            "scroll_depth": round(rng.uniform(0, 100), 1),
+            "active_time_seconds": rng.randint(0, 900),
+            "required_time_seconds": rng.randint(60, 600),
+            "created_at": created,
+            "updated_at": created,
+        })
+
+    return {"users": users, "articles": articles, "comments": comments, "article_reads": reads}
+
+
+def seed(client, scale="small", seed_value=1, **overrides):
+    """Load a synthetic dataset into a benchmarks.fakes.FakeSupabase."""
+    data = build(scale, seed_value, **overrides)
+    for table, rows in data.items():
+        client.db.insert_rows(table, rows)
+        client.db.table(table).sequence = iter(range(len(rows) + 1, 1 << 62))
+    return {table: len(rows) for table, rows in data.items()}
@@ -0,0 +1,69 @@
+"""
+Bytes on the wire and encode CPU per endpoint.
+
+For each endpoint's payload (served from the Supabase stand-in):
+  stdlib_json  - the old JsonResponse (json.dumps, default separators)
+  fast_json    - blog.encoding.dumps (orjson when installed)
+  gzip / br    - what CompressionMiddleware sends for that Accept-Encoding
+
+    python -m benchmarks.encoding --scale small
+"""
+
+import argparse
+import json
+import os
+import time
+
+from benchmarks.common import measure, report, setup_app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", default="small", choices=["small", "medium", "large"])
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("BENCH_SCALE", args.scale)
+    setup_app()
+
+    from django.core.serializers.json import DjangoJSONEncoder
+    from django.test import Client
+
+    from blog import encoding
+    from blog.middleware import brotli, compress_bytes
+
+    client = Client(HTTP_APP_TOKEN="benchmark-app-token")
+    endpoints = {
+        "get_articles": "/articles",
+        "get_article": "/articles/1",
+        "get_comments": "/articles/1/comments",
+        "auth_status": "/auth/status",
+    }
+    results = {}
+    for name, path in endpoints.items():
+        payload = json.loads(client.get(path).content)
+        stdlib = json.dumps(payload, cls=DjangoJSONEncoder).encode("utf-8")
+        fast = encoding.dumps(payload)
+        entry = {
+            "bytes": {"stdlib_json": len(stdlib), "fast_json": len(fast)},
+            "encode_us": {
+                "stdlib_json": measure(lambda: json.dumps(payload, cls=DjangoJSONEncoder), args.iterations, 5)["p50_us"],
+                "fast_json": measure(lambda: encoding.dumps(payload), args.iterations, 5)["p50_us"],
+            },
+        }
+        for coding in ("gzip", "br") if brotli is not None else ("gzip",):
+            response = client.get(path, HTTP_ACCEPT_ENCODING=coding)
+            body = b"".join(response.streaming_content) if response.streaming else response.content
+            entry["bytes"][coding] = len(body)
+            entry["encode_us"][coding] = measure(lambda: compress_bytes(fast, coding), args.iterations, 5)["p50_us"]
+        results[name] = entry
+
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        client.get("/articles", HTTP_ACCEPT_ENCODING="br, gzip")
+    results["get_articles_request_ms"] = round((time.perf_counter() - start) * 1000 / args.iterations, 2)
+    report("encoding", {"config": vars(args), "orjson": encoding.orjson is not None, "endpoints": results})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Check that the hot query shapes use the indexes from supabase/migrations.
+
+Applies every supabase/migrations/*.sql file to a local Postgres, seeds it from
+benchmarks.dataset, runs ANALYZE and prints EXPLAIN for each shape. Everything
+happens in one transaction that is rolled back, but point it at an empty
+database: the migrations use "if not exists" and would reuse existing tables.
+
+    BENCH_PG_NAME=cognara_bench python -m benchmarks.explain_indexes --scale medium
+
+Exits non-zero if a shape does not use its expected index.
+"""
+
+import argparse
+import os
+import random
+import sys
+
+from benchmarks.common import bench_databases, setup_django
+
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "supabase", "migrations")
+
+# (name, sql, params, expected index). The SQL mirrors what PostgREST sends for
+# the calls in blog/repositories/supabase_backend.py.
+SHAPES = [
+    ("articles.list_by_author",
+     "select * from public.articles where author_id = %s", [7], "articles_author_id_idx"),
+    ("articles.published_feed",
+     "select * from public.articles where status = 'published' order by created_at desc limit 20", [],
+     "articles_published_created_idx"),
+    ("articles.moderation_page",
+     "select id, title, excerpt, author_id, status, created_at, updated_at from public.articles "
+     "where status = 'review' and id > %s order by id limit 50", [7], "articles_status_id_idx"),
+    ("comments.list_for_article",
+     "select * from public.comments where article_id = %s", [7], "comments_article_id_idx"),
+    ("reads.get_by_session",
+     "select * from public.article_reads where session_id = %s limit 1", None, "article_reads_session_id_key"),
+    ("reads.latest_open",
+     "select * from public.article_reads where user_id = %s and article_id = %s "
+     "and status in ('started', 'in_progress') order by updated_at desc limit 1", [7, 7], "article_reads_open_idx"),
+    ("reads.latest",
+     "select * from public.article_reads where user_id = %s and article_id = %s "
+     "order by created_at desc limit 1", [7, 7], "article_reads_user_article_idx"),
+    ("users.get_by_email",
+     "select * from public.users where email = %s", ["user7@example.com"], "users_email_idx"),
+    ("users.username_exists",
+     "select username from public.users where username = %s", ["user7"], "users_username_idx"),
+    ("photos.paths_for_article",
+     "select path from public.article_photos where article_id = %s", [7], "article_photos_article_id_idx"),
+]
+
+
+class Rollback(Exception):
+    pass
+
+
+def apply_migrations(cursor):
+    for name in sorted(os.listdir(MIGRATIONS_DIR)):
+        if name.endswith(".sql"):
+            with open(os.path.join(MIGRATIONS_DIR, name)) as handle:
+                cursor.execute(handle.read())
+
+
+def insert(cursor, table, rows):
+    if not rows:
+        return
+    columns = list(rows[0])
+    sql = "insert into public.{} ({}) values ({})".format(table, ", ".join(columns), ", ".join(["%s"] * len(columns)))
+    cursor.executemany(sql, [[row[column] for column in columns] for row in rows])
+
+
+def seed(cursor, data):
+    rng = random.Random(1)
+    photos = [{"article_id": article["id"], "path": f"{article['id']}/{n}.jpg"}
+              for article in data["articles"] for n in range(rng.randint(0, 5))]
+    for table in ("users", "articles", "comments", "article_reads"):
+        insert(cursor, table, data[table])
+    insert(cursor, "article_photos", photos)
+    cursor.execute("analyze")
+
+
+def explain(cursor, sql, params):
+    cursor.execute("explain " + sql, params)
+    return "\n".join(row[0] for row in cursor.fetchall())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", default="medium")
+    args = parser.parse_args(argv)
+
+    databases = bench_databases()
+    if databases["default"]["ENGINE"] != "django.db.backends.postgresql":
+        sys.exit("Set BENCH_PG_NAME (and BENCH_PG_USER/PASSWORD/HOST/PORT) to a local Postgres database.")
+    setup_django(DATABASES=databases)
+
+    from django.db import connection, transaction
+
+    from benchmarks.dataset import build
+
+    data = build(args.scale)
+    session_id = data["article_reads"][0]["session_id"]
+    missing = []
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            apply_migrations(cursor)
+            seed(cursor, data)
+            for name, sql, params, index in SHAPES:
+                plan = explain(cursor, sql, [session_id] if params is None else params)
+                ok = index in plan
+                if not ok:
+                    missing.append(name)
+                print(f"{'ok  ' if ok else 'MISS'} {name} (expects {index})")
+                print("     " + plan.replace("\n", "\n     "))
+            raise Rollback
+    except Rollback:
+        pass
+
+    if missing:
+        sys.exit(f"{len(missing)} shape(s) not using their index: {', '.join(missing)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Constant-memory check for blog.export on a large synthetic article_reads table.
+
+Seeds the Django ORM backend (SQLite file, or Postgres via BENCH_PG_*) with
+--rows reads, then streams NDJSON (optionally gzip) exports of growing prefixes
+into a byte counter. Peak traced memory should stay flat as the row count grows.
+
+    python -m benchmarks.export --rows 1000000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.common import bench_databases, report, setup_django
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "cognara_export_bench.sqlite3")
+databases = bench_databases()
+if databases["default"]["ENGINE"].endswith("sqlite3"):
+    databases["default"]["NAME"] = DB_PATH
+
+setup_django(
+    INSTALLED_APPS=["django.contrib.auth", "django.contrib.contenttypes", "django.contrib.sessions", "blog"],
+    AUTH_USER_MODEL="blog.User",
+    DATABASES=databases,
+)
+
+from django.core.management import call_command
+
+from blog import export
+from blog.models import Article, ArticleRead, User
+from blog.repositories import build_repositories
+
+
+def seed(rows, batch=10000):
+    call_command("migrate", verbosity=0, run_syncdb=True)
+    if ArticleRead.objects.count() >= rows:
+        return
+    ArticleRead.objects.all().delete()
+    users, articles = 1000, 1000
+    User.objects.bulk_create([User(id=i, username=f"user{i}", email=f"user{i}@example.com") for i in range(1, users + 1)],
+                             ignore_conflicts=True)
+    Article.objects.bulk_create([Article(id=i, title=f"Article {i}", author_id=(i % users) + 1, status="published")
+                                 for i in range(1, articles + 1)], ignore_conflicts=True)
+    rng = random.Random(1)
+    epoch = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    for start in range(0, rows, batch):
+        ArticleRead.objects.bulk_create([ArticleRead(
+            session_id=uuid.UUID(int=rng.getrandbits(128), version=4),
+            user_id=rng.randint(1, users), article_id=rng.randint(1, articles),
+            status=rng.choice(["started", "in_progress", "skimmed", "deep_read"]),
+            scroll_depth=round(rng.uniform(0, 100), 1), active_time_seconds=rng.randint(0, 900),
+            required_time_seconds=rng.randint(60, 600),
+        ) for _ in range(min(batch, rows - start))])
+    # auto_now stamps every row with "now"; spread updated_at so --since has something to select.
+    ArticleRead.objects.update(updated_at=epoch)
+    ArticleRead.objects.filter(id__gt=rows // 2).update(updated_at=epoch + timedelta(days=30))
+
+
+def run_export(limit_rows, fmt, compress, since=None):
+    repos = build_repositories("django")
+    written = rows = 0
+
+    def pages():
+        nonlocal rows
+        for page in export.export_pages("article_reads", since, 0, export.PAGE_SIZE, repos=repos):
+            rows += len(page)
+            yield page
+            if rows >= limit_rows:
+                return
+
+    chunks = export.encode_pages(pages(), fmt)
+    if compress:
+        chunks = export.gzip_chunks(chunks)
+    tracemalloc.start()
+    start = time.perf_counter()
+    for chunk in chunks:
+        written += len(chunk)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "rows": rows,
+        "seconds": round(elapsed, 2),
+        "rows_per_second": round(rows / elapsed),
+        "mib_written": round(written / 2**20, 1),
+        "peak_traced_mib": round(peak / 2**20, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--format", default="ndjson", choices=export.FORMATS)
+    parser.add_argument("--gzip", action="store_true")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    seed(args.rows)
+    seed_seconds = time.perf_counter() - start
+
+    sizes = sorted({args.rows // 100, args.rows // 10, args.rows})
+    results = {n: run_export(n, args.format, args.gzip) for n in sizes}
+    incremental = run_export(args.rows, args.format, args.gzip, since=datetime(2026, 1, 15, tzinfo=timezone.utc))
+    report("export", {"config": vars(args), "seed_seconds": round(seed_seconds, 1),
+                      "full": results, "since_2026_01_15": incremental})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,654 @@
+"""
+In-process stand-ins for the Supabase (PostgREST + storage) and SMTP surfaces
+used by blog/, with configurable injected latency and faults.
+
+Point the app at the fake with
+    SUPABASE_CLIENT_FACTORY = 'benchmarks.fakes.get_fake_client'
+and install the SMTP stub with `install_fake_smtp()`.
+"""
+
+import collections
+import copy
+import itertools
+import os
+import random
+import re
+import smtplib
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class Latency:
+    """Sleep `base` seconds +/- uniform `jitter` per simulated round trip."""
+
+    def __init__(self, base=0.0, jitter=0.0, seed=None):
+        self.base = base
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if self.base <= 0 and self.jitter <= 0:
+            return
+        with self._lock:
+            delay = self.base + self._random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class Faults(Latency):
+    """
+    Latency plus injected faults per round trip: `error_rate` of them raise
+    ConnectionError, `hang_rate` of them stall for `hang_seconds`, and while
+    `down` is set every one fails (an outage you can switch on and off).
+    """
+
+    def __init__(self, base=0.0, jitter=0.0, seed=None, error_rate=0.0, hang_rate=0.0, hang_seconds=0.0):
+        super().__init__(base, jitter, seed)
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.down = False
+
+    def wait(self):
+        super().wait()
+        if self.down:
+            raise ConnectionError("injected outage")
+        with self._lock:
+            roll = self._random.random()
+        if roll < self.error_rate:
+            raise ConnectionError("injected connection reset")
+        if roll < self.error_rate + self.hang_rate:
+            time.sleep(self.hang_seconds)
+
+
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+# Columns filled in by the database on insert, per table.
+TABLE_DEFAULTS = {
+    "article_reads": lambda: {"session_id": str(uuid.uuid4()), "created_at": _now(), "updated_at": _now()},
+    "articles": lambda: {"version": 1, "created_at": _now(), "updated_at": _now()},
+    "article_revisions": lambda: {"created_at": _now()},
+    "comments": lambda: {"created_at": _now(), "updated_at": _now()},
+    "users": lambda: {"created_at": _now()},
+}
+
+
+class FakeTable:
+    """Rows of one table plus a primary-key sequence."""
+
+    def __init__(self):
+        self.rows = []
+        self.sequence = itertools.count(1)
+
+
+class FakeDatabase:
+    def __init__(self, latency=None):
+        self.tables = {}
+        self.latency = latency or Latency()
+        self.lock = threading.RLock()
+        self.calls = 0
+        # article_id -> article_stats row, standing in for the table's primary key index.
+        self.article_stats = {}
+
+    def table(self, name):
+        with self.lock:
+            return self.tables.setdefault(name, FakeTable())
+
+    def insert_rows(self, name, rows):
+        """Seed rows directly, without latency; returns the stored copies."""
+        table = self.table(name)
+        stored = []
+        with self.lock:
+            for row in rows:
+                row = dict(TABLE_DEFAULTS.get(name, dict)(), **row)
+                if "id" not in row:
+                    row["id"] = next(table.sequence)
+                table.rows.append(row)
+                stored.append(row)
+                self.fire(name, None, row)
+        return stored
+
+    def fire(self, name, old, new):
+        """Run the row trigger ROW_TRIGGERS has for `name`, if any; old/new are None on insert/delete."""
+        trigger = ROW_TRIGGERS.get(name)
+        if trigger is not None:
+            trigger(self, old, new)
+
+
+_OPERATORS = {
+    "eq": lambda a, b: a == b,
+    "neq": lambda a, b: a != b,
+    "gt": lambda a, b: a is not None and a > b,
+    "gte": lambda a, b: a is not None and a >= b,
+    "lt": lambda a, b: a is not None and a < b,
+    "lte": lambda a, b: a is not None and a <= b,
+    "in": lambda a, b: a in b,
+    "is": lambda a, b: a is b,
+    "ilike": lambda a, b: a is not None and re.fullmatch(b.replace("%", ".*"), str(a), re.I) is not None,
+}
+
+
+def _coerce(value, sample):
+    # PostgREST compares as the column type; ids often arrive as strings from URLs.
+    if isinstance(sample, bool) or sample is None or value is None:
+        return value
+    if isinstance(sample, int) and not isinstance(value, int):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return value
+    if isinstance(sample, float) and not isinstance(value, float):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return value
+    return value
+
+
+class FakeQuery:
+    """Implements the subset of the postgrest query builder used by the views."""
+
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+        self.operation = "select"
+        self.columns = "*"
+        self.payload = None
+        self.on_conflict = None
+        self.count = None
+        self.filters = []
+        self.ordering = []
+        self.limit_to = None
+        self.offset = 0
+        self.single_row = False
+
+    # -- operations -------------------------------------------------------
+    def select(self, columns="*", count=None, **kwargs):
+        if self.operation == "select":
+            self.columns = columns
+        self.count = count
+        return self
+
+    def _write(self, operation, payload, count=None, returning=None):
+        self.operation, self.payload, self.count = operation, payload, count
+        self.minimal = returning is not None and str(getattr(returning, "value", returning)) == "minimal"
+        return self
+
+    def insert(self, payload, count=None, returning=None, **kwargs):
+        return self._write("insert", payload, count, returning)
+
+    def upsert(self, payload, on_conflict=None, ignore_duplicates=False, count=None, returning=None, **kwargs):
+        self.on_conflict = on_conflict or "id"
+        self.ignore_duplicates = ignore_duplicates
+        return self._write("upsert", payload, count, returning)
+
+    def update(self, payload, count=None, returning=None, **kwargs):
+        return self._write("update", payload, count, returning)
+
+    def delete(self, **kwargs):
+        self.operation = "delete"
+        return self
+
+    # -- filters / modifiers ------------------------------------------------
+    def _filter(self, op, column, value):
+        self.filters.append((op, column, value))
+        return self
+
+    def eq(self, column, value):
+        return self._filter("eq", column, value)
+
+    def neq(self, column, value):
+        return self._filter("neq", column, value)
+
+    def gt(self, column, value):
+        return self._filter("gt", column, value)
+
+    def gte(self, column, value):
+        return self._filter("gte", column, value)
+
+    def lt(self, column, value):
+        return self._filter("lt", column, value)
+
+    def lte(self, column, value):
+        return self._filter("lte", column, value)
+
+    def in_(self, column, values):
+        return self._filter("in", column, list(values))
+
+    def is_(self, column, value):
+        return self._filter("is", column, None if value in ("null", None) else value)
+
+    def ilike(self, column, pattern):
+        return self._filter("ilike", column, pattern)
+
+    def order(self, column, desc=False, **kwargs):
+        self.ordering.append((column, desc))
+        return self
+
+    def limit(self, size, **kwargs):
+        self.limit_to = size
+        return self
+
+    def range(self, start, end, **kwargs):
+        self.offset, self.limit_to = start, end - start + 1
+        return self
+
+    def single(self):
+        self.single_row = True
+        return self
+
+    maybe_single = single
+
+    # -- execution ----------------------------------------------------------
+    def _matches(self, row):
+        for op, column, value in self.filters:
+            actual = row.get(column)
+            if op == "in":
+                value = [_coerce(v, actual) for v in value]
+            else:
+                value = _coerce(value, actual)
+            if not _OPERATORS[op](actual, value):
+                return False
+        return True
+
+    def _project(self, row):
+        if self.columns.strip() == "*":
+            return copy.deepcopy(row)
+        names = [column.strip() for column in self.columns.split(",") if column.strip()]
+        return {name: copy.deepcopy(row.get(name)) for name in names}
+
+    def execute(self):
+        self.db.latency.wait()
+        with self.db.lock:
+            self.db.calls += 1
+            table = self.db.table(self.name)
+            rows = getattr(self, "_run_" + self.operation)(table)
+        count = getattr(self, "total_count", len(rows)) if self.count else None
+        if getattr(self, "minimal", False):
+            rows = []
+        if self.single_row:
+            rows = rows[0] if rows else None
+        return FakeResponse(rows, count)
+
+    def _selected(self, table):
+        rows = [row for row in table.rows if self._matches(row)]
+        for column, desc in reversed(self.ordering):
+            rows.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+        return rows
+
+    def _run_select(self, table):
+        if self.name in DERIVED_TABLES:
+            table = DERIVED_TABLES[self.name](self.db)
+        rows = self._selected(table)
+        self.total_count = len(rows)
+        end = None if self.limit_to is None else self.offset + self.limit_to
+        return [self._project(row) for row in rows[self.offset:end]]
+
+    def _run_insert(self, table):
+        payload = self.payload if isinstance(self.payload, list) else [self.payload]
+        return [copy.deepcopy(row) for row in self.db.insert_rows(self.name, payload)]
+
+    def _run_upsert(self, table):
+        payload = self.payload if isinstance(self.payload, list) else [self.payload]
+        keys = [key.strip() for key in self.on_conflict.split(",")]
+        result = []
+        for incoming in payload:
+            existing = next((row for row in table.rows
+                             if all(row.get(key) == incoming.get(key) for key in keys)), None)
+            if existing is None:
+                result.extend(self.db.insert_rows(self.name, [incoming]))
+            elif not self.ignore_duplicates:
+                old = dict(existing) if self.name in ROW_TRIGGERS else None
+                existing.update(incoming)
+                if "updated_at" in existing:
+                    existing["updated_at"] = _now()
+                self.db.fire(self.name, old, existing)
+                result.append(existing)
+        return self._returned(result)
+
+    def _run_update(self, table):
+        rows = self._selected(table)
+        for row in rows:
+            if self.name == "articles":
+                _bump_article_version(row, self.payload)
+            old = dict(row) if self.name in ROW_TRIGGERS else None
+            row.update(copy.deepcopy(self.payload))
+            if "updated_at" in row:
+                row["updated_at"] = _now()
+            self.db.fire(self.name, old, row)
+        return self._returned(rows)
+
+    def _returned(self, rows):
+        # returning=minimal: only the count goes back, so don't pay for copies.
+        return rows if getattr(self, "minimal", False) else [copy.deepcopy(row) for row in rows]
+
+    def _run_delete(self, table):
+        rows = self._selected(table)
+        doomed = {id(row) for row in rows}
+        table.rows[:] = [row for row in table.rows if id(row) not in doomed]
+        for row in rows:
+            self.db.fire(self.name, row, None)
+        return rows
+
+
+def _bump_article_version(row, payload):
+    """The articles_bump_version trigger."""
+    if "version" not in payload and any(key in payload and payload[key] != row.get(key) for key in ("title", "content")):
+        row["version"] = row.get("version", 1) + 1
+
+
+def _article_status_counts(db):
+    """article_status_counts, which the articles_count_status trigger keeps; counted on read here."""
+    table = FakeTable()
+    counts = collections.Counter(row.get("status") for row in db.table("articles").rows)
+    table.rows = [{"status": status, "articles": count} for status, count in counts.items()]
+    return table
+
+
+# Tables Postgres triggers maintain, derived from the source rows when read.
+DERIVED_TABLES = {"article_status_counts": _article_status_counts}
+
+
+def _add_article_stats(db, article_id, changes):
+    """public.article_stats_add: add {field: delta} to the article's article_stats row."""
+    row = db.article_stats.get(article_id)
+    if row is None:
+        row = db.article_stats[article_id] = {"article_id": article_id, "reads": 0, "completed_reads": 0,
+                                              "deep_reads": 0, "finished_reads": 0, "active_seconds": 0,
+                                              "comments": 0}
+        db.table("article_stats").rows.append(row)
+    for field, delta in changes.items():
+        row[field] += delta
+    row["updated_at"] = _now()
+
+
+def _article_reads_rollup(db, old, new):
+    """The article_reads_rollup trigger; like it, updates that change nothing it counts leave the row alone."""
+    from blog.stats import read_rollup, rollup_delta
+
+    if old and new and old["article_id"] == new["article_id"]:
+        changes = {field: delta for field, delta in rollup_delta(old, new).items() if delta}
+        if changes:
+            _add_article_stats(db, new["article_id"], changes)
+        return
+    if old:
+        _add_article_stats(db, old["article_id"], rollup_delta(old, None))
+    if new:
+        _add_article_stats(db, new["article_id"], read_rollup(new))
+
+
+def _comments_rollup(db, old, new):
+    """The comments_rollup trigger."""
+    if old:
+        _add_article_stats(db, old["article_id"], {"comments": -1})
+    if new:
+        _add_article_stats(db, new["article_id"], {"comments": 1})
+
+
+# Row triggers that keep other tables current as these change, run in the same write.
+ROW_TRIGGERS = {"article_reads": _article_reads_rollup, "comments": _comments_rollup}
+
+
+class FakeRpc:
+    """rpc() calls dispatch to Python callables registered with FakeSupabase.register_rpc."""
+
+    def __init__(self, db, func, params):
+        self.db = db
+        self.func = func
+        self.params = params
+
+    def execute(self):
+        self.db.latency.wait()
+        with self.db.lock:
+            self.db.calls += 1
+            return FakeResponse(self.func(self.db, **self.params))
+
+
+def log_read_heartbeat(db, p_session_id, p_status, p_scroll_depth, p_active_time_seconds, p_required_time_seconds=None):
+    """Stand-in for the public.log_read_heartbeat SQL function; runs under the db lock like the row lock."""
+    from blog.helper import apply_heartbeat
+
+    for row in db.table("article_reads").rows:
+        if str(row.get("session_id")) == str(p_session_id):
+            old = dict(row)
+            row.update(apply_heartbeat(row, p_status, p_scroll_depth, p_active_time_seconds, p_required_time_seconds),
+                       updated_at=_now())
+            db.fire("article_reads", old, row)
+            return [dict(row)]
+    return []
+
+
+STATS_COLUMNS = ("reads", "completed_reads", "deep_reads", "finished_reads", "active_seconds", "comments")
+
+
+def author_article_stats(db, p_author_id, p_limit=50, p_before=None):
+    """Stand-in for the public.author_article_stats SQL function."""
+    mine = [row for row in db.table("articles").rows if row.get("author_id") == p_author_id]
+    mine.sort(key=lambda row: (row["created_at"], row["id"]), reverse=True)
+    summaries = []
+    for row in mine:
+        stats = db.article_stats.get(row["id"], {})
+        summaries.append(dict({key: row.get(key) for key in ("id", "title", "status", "created_at", "updated_at")},
+                              **{column: stats.get(column, 0) for column in STATS_COLUMNS}))
+    totals = dict({"articles": len(summaries)},
+                  **{column: sum(summary[column] for summary in summaries) for column in STATS_COLUMNS})
+    if p_before is not None:
+        before = next((summary for summary in summaries if summary["id"] == p_before), None)
+        summaries = [] if before is None else [summary for summary in summaries
+                                               if (summary["created_at"], summary["id"]) < (before["created_at"], before["id"])]
+    return {"totals": totals, "articles": summaries[:p_limit]}
+
+
+def upsert_google_user(db, p_email, p_first_name, p_last_name):
+    """Stand-in for the public.upsert_google_user SQL function."""
+    email = p_email.lower()
+    fields = {"first_name": p_first_name, "last_name": p_last_name, "email_verified": "True", "auth_provider": "Google"}
+    for row in db.table("users").rows:
+        if str(row.get("email", "")).lower() == email:
+            row.update(fields)
+            return [{"id": row["id"], "is_new": False}]
+    row = db.insert_rows("users", [dict(fields, email=email, bio="Learner at Cognara")])[0]
+    return [{"id": row["id"], "is_new": True}]
+
+
+def verify_code_attempt(db, p_user_id, p_code, p_max_attempts):
+    """Stand-in for the public.verify_code_attempt SQL function."""
+    rows = db.table("verification_codes").rows
+    for row in rows:
+        if row["user_id"] == p_user_id and datetime.fromisoformat(row["expires_at"]) > datetime.now(timezone.utc):
+            row["attempts"] += 1
+            if row["attempts"] > p_max_attempts:
+                return "locked"
+            if row["code"] == p_code:
+                rows.remove(row)
+                return "verified"
+            return "mismatch"
+    return "expired"
+
+
+def autosave_article(db, p_article_id, p_author_id, p_base_version, p_title, p_content, p_revision):
+    """Stand-in for the public.autosave_article SQL function."""
+    for row in db.table("articles").rows:
+        if row["id"] == p_article_id:
+            if row.get("author_id") != p_author_id or row.get("version", 1) != p_base_version:
+                return []
+            if p_title is not None:
+                row["title"] = p_title
+            row.update(content=p_content, version=p_base_version + 1, updated_at=_now())
+            db.insert_rows("article_revisions", [dict(p_revision, article_id=p_article_id, version=row["version"])])
+            return [{"id": row["id"], "version": row["version"]}]
+    return []
+
+
+class FakeBucket:
+    def __init__(self, storage, name):
+        self.storage = storage
+        self.name = name
+        self.objects = storage.buckets.setdefault(name, {})
+        self.stamps = storage.stamps.setdefault(name, {})
+
+    def _round_trip(self):
+        self.storage.latency.wait()
+        self.storage.calls += 1
+
+    def upload(self, path, file, file_options=None):
+        self._round_trip()
+        upsert = str((file_options or {}).get("upsert", "false")).lower() == "true"
+        if path in self.objects and not upsert:
+            raise Exception("The resource already exists")
+        data = file.read() if hasattr(file, "read") else bytes(file)
+        self.objects[path] = data
+        self.stamps[path] = _now()
+        self.storage.bytes_uploaded += len(data)
+        return FakeResponse({"Key": f"{self.name}/{path}"})
+
+    def update(self, path, file, file_options=None):
+        return self.upload(path, file, dict(file_options or {}, upsert="true"))
+
+    def download(self, path):
+        self._round_trip()
+        return self.objects[path]
+
+    def remove(self, paths):
+        self._round_trip()
+        removed = [{"name": path} for path in paths if self.objects.pop(path, None) is not None]
+        for path in paths:
+            self.stamps.pop(path, None)
+        return removed
+
+    def list(self, path=None, options=None):
+        self._round_trip()
+        prefix = f"{path}/" if path else ""
+        options = options or {}
+        names = sorted(key[len(prefix):] for key in self.objects if key.startswith(prefix))
+        offset = options.get("offset", 0)
+        names = names[offset:offset + options.get("limit", 100)]
+        return [{"name": name, "updated_at": self.stamps.get(prefix + name),
+                 "metadata": {"size": len(self.objects[prefix + name])}} for name in names]
+
+    def exists(self, path):
+        self._round_trip()
+        return path in self.objects
+
+    def create_signed_url(self, path, expires_in, options=None):
+        self._round_trip()
+        url = f"{self.storage.base_url}/storage/v1/object/sign/{self.name}/{path}?token={uuid.uuid4().hex}"
+        return {"signedURL": url, "signedUrl": url}
+
+    def create_signed_urls(self, paths, expires_in, options=None):
+        self._round_trip()
+        return [{"path": path, "error": None,
+                 "signedURL": f"{self.storage.base_url}/storage/v1/object/sign/{self.name}/{path}"
+                              f"?token={uuid.uuid4().hex}"} for path in paths]
+
+    def get_public_url(self, path, options=None):
+        return f"{self.storage.base_url}/storage/v1/object/public/{self.name}/{path}"
+
+
+class FakeStorage:
+    def __init__(self, base_url, latency=None):
+        self.base_url = base_url
+        self.latency = latency or Latency()
+        self.buckets = {}
+        self.stamps = {}
+        self.calls = 0
+        self.bytes_uploaded = 0
+
+    def from_(self, bucket):
+        return FakeBucket(self, bucket)
+
+
+class FakeSupabase:
+    """Drop-in for supabase.Client as used by blog/."""
+
+    def __init__(self, latency=None, base_url="http://127.0.0.1:54321"):
+        self.latency = latency or Latency()
+        self.db = FakeDatabase(self.latency)
+        self.storage = FakeStorage(base_url, self.latency)
+        self.rpcs = {"log_read_heartbeat": log_read_heartbeat, "upsert_google_user": upsert_google_user,
+                     "autosave_article": autosave_article, "author_article_stats": author_article_stats,
+                     "verify_code_attempt": verify_code_attempt}
+
+    def table(self, name):
+        return FakeQuery(self.db, name)
+
+    from_ = table
+
+    def register_rpc(self, name, func):
+        self.rpcs[name] = func
+
+    def rpc(self, name, params=None, *args, **kwargs):
+        return FakeRpc(self.db, self.rpcs[name], params or {})
+
+    @property
+    def calls(self):
+        return self.db.calls + self.storage.calls
+
+
+class FakeSMTP:
+    """Replaces smtplib.SMTP; counts messages instead of sending them."""
+
+    latency = Latency()
+    sent = []
+
+    def __init__(self, host=None, port=None, *args, **kwargs):
+        self.host, self.port = host, port
+
+    def __enter__(self):
+        self.latency.wait()
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def starttls(self, *args, **kwargs):
+        self.latency.wait()
+
+    def login(self, user, password):
+        self.latency.wait()
+
+    def send_message(self, msg, *args, **kwargs):
+        self.latency.wait()
+        FakeSMTP.sent.append(msg["To"])
+
+    def quit(self):
+        pass
+
+
+def install_fake_smtp(latency=None):
+    FakeSMTP.latency = latency or Latency()
+    FakeSMTP.sent = []
+    smtplib.SMTP = FakeSMTP
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_fake_client():
+    """
+    Process-wide fake used through SUPABASE_CLIENT_FACTORY. Latency and dataset
+    size come from BENCH_LATENCY_MS / BENCH_JITTER_MS / BENCH_SCALE / BENCH_SEED.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            from benchmarks.dataset import seed
+
+            latency = Latency(float(os.environ.get("BENCH_LATENCY_MS", 0)) / 1000,
+                              float(os.environ.get("BENCH_JITTER_MS", 0)) / 1000,
+                              seed=int(os.environ.get("BENCH_SEED", 1)))
+            _client = FakeSupabase(latency)
+            seed(_client, scale=os.environ.get("BENCH_SCALE", "small"), seed_value=int(os.environ.get("BENCH_SEED", 1)))
+        return _client
@@ -0,0 +1,208 @@
+"""
+Feed and sitemap upkeep (blog.feeds) as the catalog grows: a full rebuild
+against keeping the stored documents current one article at a time.
+
+For each --sizes catalog of published articles (seeded into the Supabase
+stand-in, with --latency-ms per round trip):
+  rebuild      - feeds.rebuild(), what `manage.py build_feeds` runs
+  publish      - a new article goes live: feeds.article_changed after submit
+  edit         - an old published article is edited (its sitemap shard and the
+                 index change, the feeds do not)
+  unpublish    - one of the newest articles goes back to review, so the feeds
+                 refill from the articles table
+Reported: time (all of it, and app_* without the time inside the stand-in),
+Supabase round trips and bytes written per change. Afterwards
+every stored document must equal what a fresh rebuild renders. Then the views
+serve the smallest catalog: one feed_documents read on a cold cache, none
+when warm, 304 on a matching ETag.
+
+    python -m benchmarks.feeds --sizes 1000 10000 100000 250000 --changes 30
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.common import percentile, report, setup_app
+
+WORDS = "reading attention memory practice cognition evidence students research curiosity learning".split()
+
+
+def seed(fake, size, rng):
+    authors = fake.db.insert_rows("users", [{"username": f"author{n}", "email": f"author{n}@example.com",
+                                             "first_name": "Author", "last_name": str(n)} for n in range(50)])
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for n in range(size):
+        created = (start + timedelta(minutes=5 * n)).isoformat()
+        rows.append({
+            "title": " ".join(rng.choice(WORDS) for _ in range(6)).capitalize(),
+            "excerpt": " ".join(rng.choice(WORDS) for _ in range(30)),
+            "content": "",
+            "author_id": rng.choice(authors)["id"],
+            "status": "published" if rng.random() < 0.9 else "draft",
+            "created_at": created,
+            "updated_at": created,
+        })
+    fake.db.insert_rows("articles", rows)
+    return [author["id"] for author in authors]
+
+
+class Meter:
+    """
+    Bytes sent to feed_documents by update/upsert, and seconds spent inside the
+    stand-in: its latency plus full scans of Python lists where Postgres would
+    use an index, which at 100k+ rows dwarfs everything else.
+    """
+
+    def __init__(self):
+        from benchmarks import fakes
+
+        self.bytes = 0
+        self.seconds = 0.0
+        meter = self
+        original = fakes.FakeQuery.execute
+
+        def execute(query):
+            if query.name == "feed_documents" and query.operation in ("update", "upsert"):
+                meter.bytes += len(json.dumps(query.payload))
+            start = time.perf_counter()
+            try:
+                return original(query)
+            finally:
+                meter.seconds += time.perf_counter() - start
+
+        fakes.FakeQuery.execute = execute
+
+
+def timed(fake, meter, samples, func):
+    calls, sent, inside = fake.db.calls, meter.bytes, meter.seconds
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    samples.append((elapsed * 1000, (elapsed - (meter.seconds - inside)) * 1000,
+                    fake.db.calls - calls, meter.bytes - sent))
+
+
+def summary(samples):
+    timings = sorted(sample[0] for sample in samples)
+    app = sorted(sample[1] for sample in samples)
+    return {
+        "changes": len(samples),
+        "p50_ms": round(percentile(timings, 0.5), 2),
+        "p99_ms": round(percentile(timings, 0.99), 2),
+        "app_p50_ms": round(percentile(app, 0.5), 2),
+        "round_trips_per_change": round(sum(sample[2] for sample in samples) / len(samples), 2),
+        "kib_written_per_change": round(sum(sample[3] for sample in samples) / len(samples) / 1024, 1),
+    }
+
+
+def stored(fake):
+    return {row["name"]: row["body"] for row in fake.db.table("feed_documents").rows}
+
+
+def run(size, changes, latency_ms, meter, seed_value):
+    from django.core.cache import cache
+
+    from benchmarks.fakes import FakeSupabase, Latency
+    from blog import feeds
+    from blog.repositories import build_repositories
+
+    rng = random.Random(seed_value)
+    fake = FakeSupabase(Latency(latency_ms / 1000))
+    authors = seed(fake, size, rng)
+    repos = build_repositories("supabase", client=fake)
+    cache.clear()
+
+    calls, inside, start = fake.db.calls, meter.seconds, time.perf_counter()
+    sizes = feeds.rebuild(repos)
+    elapsed = time.perf_counter() - start
+    rebuild = {
+        "seconds": round(elapsed, 3),
+        "app_seconds": round(elapsed - (meter.seconds - inside), 3),
+        "round_trips": fake.db.calls - calls,
+        "documents": len(sizes),
+        "sitemap_urls": sum(count for name, count in sizes.items() if name.startswith("sitemap-")),
+        "stored_mib": round(sum(len(body) for body in stored(fake).values()) / 2 ** 20, 2),
+    }
+
+    published = [row["id"] for row in fake.db.table("articles").rows if row["status"] == "published"]
+    samples = {"publish": [], "edit": [], "unpublish": []}
+    for n in range(changes):
+        article = repos.articles.create({"title": f"Fresh article {n}", "content": "<p>New.</p>",
+                                         "author_id": rng.choice(authors), "status": "draft"})
+        article = repos.articles.update(article["id"], {"status": "published"})
+        timed(fake, meter, samples["publish"], lambda: feeds.article_changed(article, repos))
+        published.append(article["id"])
+
+        old = repos.articles.update(rng.choice(published[:len(published) // 2]), {"title": f"Revised {n}"})
+        timed(fake, meter, samples["edit"], lambda: feeds.article_changed(old, repos))
+
+        if n % 3 == 2:
+            newest = published.pop(rng.randrange(len(published) - 10, len(published)))
+            pulled = repos.articles.update(newest, {"status": "review"})
+            timed(fake, meter, samples["unpublish"], lambda: feeds.article_changed(pulled, repos))
+
+    incremental = stored(fake)
+    feeds.rebuild(repos)
+    fresh = stored(fake)
+    return {
+        "rebuild": rebuild,
+        "publish": summary(samples["publish"]),
+        "edit": summary(samples["edit"]),
+        "unpublish": summary(samples["unpublish"]),
+        "incremental_matches_rebuild": incremental == fresh,
+    }
+
+
+def serve_checks(size, seed_value):
+    """GET the stored documents through the views, with the app's own fake seeded and rebuilt."""
+    from django.core.cache import cache
+    from django.test import Client
+
+    from benchmarks.fakes import get_fake_client
+    from blog import feeds
+
+    fake = get_fake_client()
+    seed(fake, size, random.Random(seed_value))
+    feeds.rebuild()
+    cache.clear()
+    client = Client()
+    checks = {}
+    for path in ("/feeds/rss.xml", "/feeds/atom.xml", "/sitemap.xml", "/sitemap-0.xml"):
+        calls = fake.db.calls
+        cold = client.get(path)
+        warm_calls = fake.db.calls
+        warm = client.get(path)
+        conditional = client.get(path, HTTP_IF_NONE_MATCH=warm["ETag"])
+        checks[path] = {
+            "status": cold.status_code,
+            "content_type": cold["Content-Type"],
+            "kib": round(len(cold.content) / 1024, 1),
+            "round_trips_cold": warm_calls - calls,
+            "round_trips_warm": fake.db.calls - warm_calls,
+            "if_none_match": conditional.status_code,
+        }
+    checks["/sitemap-999.xml"] = client.get("/sitemap-999.xml").status_code
+    return checks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 250000])
+    parser.add_argument("--changes", type=int, default=30)
+    parser.add_argument("--latency-ms", type=float, default=1)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    setup_app(BENCH_LATENCY_MS=0)
+    meter = Meter()
+    results = {size: run(size, args.changes, args.latency_ms, meter, args.seed) for size in args.sizes}
+    checks = serve_checks(min(args.sizes), args.seed)
+    report("feeds", {"config": vars(args), "results": results, "serve": checks})
+
+
+if __name__ == "__main__":
+    main()
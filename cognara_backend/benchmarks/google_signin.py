@@ -0,0 +1,186 @@
+"""
+Google sign-in latency: the old google_auth path vs. blog.google_tokens plus
+the single upsert_google_user round trip.
+
+A local JWKS stand-in (http.server on 127.0.0.1) plays Google's certs
+endpoint: it signs nothing, serves the public half of a freshly generated RSA
+key with `Cache-Control: max-age`, and adds --jwks-latency-ms per response.
+Tokens are minted with the private half.
+  legacy - id_token.verify_token with a new google_requests.Request() per
+           sign-in (a certs download every time), then email_exists and
+           create / update_by_email
+  cached - verify_google_token against the cached keys, then one
+           users.upsert_google call
+Half the sign-ins are first-time users. Afterwards the view itself is hit for
+a new user, a returning user, a wrong audience and a rotated key.
+
+    python -m benchmarks.google_signin --signins 200 --jwks-latency-ms 40
+"""
+
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.common import percentile, report, setup_app
+
+
+class JwksServer:
+    def __init__(self, latency, max_age):
+        self.latency = latency
+        self.max_age = max_age
+        self.fetches = 0
+        self.connections = 0
+        self.keys = {}
+        self.rotate()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                server.connections += 1
+
+            def do_GET(self):
+                time.sleep(server.latency)
+                server.fetches += 1
+                body = json.dumps({"keys": [jwk for _, jwk in server.keys.values()]}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Cache-Control", f"public, max-age={server.max_age}, must-revalidate, no-transform")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/oauth2/v3/certs"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def rotate(self):
+        """Add a new signing key (Google publishes the next key before using it)."""
+        import jwt
+        from cryptography.hazmat.primitives.asymmetric import rsa
+
+        private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        kid = uuid.uuid4().hex
+        jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private.public_key()))
+        jwk.update(kid=kid, alg="RS256", use="sig")
+        self.keys[kid] = (private, jwk)
+        self.current = kid
+        return kid
+
+    def token(self, email, audience, kid=None):
+        import jwt
+
+        kid = kid or self.current
+        now = int(time.time())
+        claims = {
+            "iss": "https://accounts.google.com", "aud": audience, "sub": uuid.uuid5(uuid.NAMESPACE_URL, email).hex,
+            "email": email, "email_verified": True, "given_name": "Bench", "family_name": email.split("@")[0],
+            "iat": now, "exp": now + 3600,
+        }
+        return jwt.encode(claims, self.keys[kid][0], algorithm="RS256", headers={"kid": kid})
+
+
+def timed(func, items):
+    samples = []
+    for item in items:
+        start = time.perf_counter()
+        func(item)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "signins": len(samples),
+        "mean_ms": round(sum(samples) / len(samples), 2),
+        "p50_ms": round(percentile(samples, 0.5), 2),
+        "p99_ms": round(percentile(samples, 0.99), 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--signins", type=int, default=200)
+    parser.add_argument("--jwks-latency-ms", type=float, default=40)
+    parser.add_argument("--db-latency-ms", type=float, default=10)
+    parser.add_argument("--max-age", type=int, default=21600)
+    args = parser.parse_args(argv)
+
+    server = JwksServer(args.jwks_latency_ms / 1000, args.max_age)
+    setup_app(GOOGLE_JWKS_URL=server.url, BENCH_LATENCY_MS=args.db_latency_ms)
+
+    from django.conf import settings
+    from django.test import Client
+    from google.auth.transport import requests as google_requests
+    from google.oauth2 import id_token
+
+    from benchmarks.fakes import get_fake_client
+    from blog.google_tokens import google_keys, verify_google_token
+    from blog.repositories import get_repos
+
+    repos = get_repos()
+    fake = get_fake_client()
+    audience = settings.GOOGLE_CLIENT_ID
+
+    def tokens(prefix):
+        # Every other sign-in is a returning user.
+        emails = [f"{prefix}-{i // 2}@example.com" for i in range(args.signins)]
+        return [server.token(email, audience) for email in emails]
+
+    def legacy(token):
+        idinfo = id_token.verify_token(token, google_requests.Request(), audience, certs_url=server.url)
+        email = idinfo["email"]
+        if not repos.users.email_exists(email):
+            repos.users.create({"email": email, "first_name": idinfo.get("given_name", ""),
+                                "last_name": idinfo.get("family_name", ""), "bio": "Learner at Cognara",
+                                "email_verified": "True", "auth_provider": "Google"})
+        else:
+            repos.users.update_by_email(email, {"first_name": idinfo.get("given_name", ""),
+                                                "last_name": idinfo.get("family_name", ""),
+                                                "email_verified": "True", "auth_provider": "Goolge"})
+
+    def cached(token):
+        idinfo = verify_google_token(token)
+        repos.users.upsert_google(idinfo["email"], idinfo.get("given_name", ""), idinfo.get("family_name", ""))
+
+    results = {}
+    for name, func in (("legacy", legacy), ("cached", cached)):
+        items = tokens(name)
+        fetches, connections, calls = server.fetches, server.connections, fake.db.calls
+        results[name] = timed(func, items)
+        results[name]["jwks_fetches"] = server.fetches - fetches
+        results[name]["jwks_connections"] = server.connections - connections
+        results[name]["supabase_round_trips"] = fake.db.calls - calls
+    results["p50_speedup"] = round(results["legacy"]["p50_ms"] / results["cached"]["p50_ms"], 1)
+
+    client = Client(HTTP_APP_TOKEN="benchmark-app-token")
+
+    def sign_in(token):
+        response = client.post("/auth/google", {"credential": token}, content_type="application/json")
+        return response.status_code, response.json().get("is_new", response.json().get("detail"))
+
+    fetches = server.fetches
+    view = {
+        "new_user": sign_in(server.token("view-user@example.com", audience)),
+        "returning_user": sign_in(server.token("view-user@example.com", audience)),
+        "wrong_audience": sign_in(server.token("view-user@example.com", "someone-else")),
+        "tampered": sign_in(server.token("view-user@example.com", audience)[:-4] + "AAAA"),
+    }
+    view["jwks_fetches_for_the_above"] = server.fetches - fetches
+    server.rotate()
+    fetches = server.fetches
+    view["rotated_key"] = sign_in(server.token("view-user@example.com", audience))
+    view["jwks_fetches_on_rotation"] = server.fetches - fetches
+    view["key_set_fetches_total"] = google_keys().fetches
+    server.httpd.shutdown()
+
+    report("google_signin", {"config": vars(args), "results": results, "view": view})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Upload bytes saved by content-addressed image storage on a re-upload workload.
+
+Each article gets a cover image and then a few edits. On every edit the editor
+re-submits the cover: usually the same file, sometimes a new one. A share of
+covers come from a small stock library used across articles, and many files
+are called "image.png" (clipboard pastes), which collide under the old
+"<article_id>/<name>" paths.
+
+  legacy  - bytes the old upload_article_image sent (every upload, in full),
+            plus how often a different file overwrote an existing path
+  blobs   - the same uploads through the view on the stand-in storage, then
+            gc_images, then gc_images again after a third of the articles
+            drop their images
+
+    python -m benchmarks.image_dedup --articles 300 --image-kib 200
+"""
+
+import argparse
+import random
+from datetime import timedelta
+
+from benchmarks.common import report, setup_app
+
+
+def workload(articles, image_kib, edits, same_share, stock_share, seed=1):
+    """[(article_id, filename, bytes)] in upload order."""
+    rng = random.Random(seed)
+    size = image_kib * 1024
+    stock = [(f"stock-{i}.jpg", rng.randbytes(size)) for i in range(40)]
+
+    def new_image():
+        if rng.random() < stock_share:
+            return rng.choice(stock)
+        name = "image.png" if rng.random() < 0.3 else f"cover-{rng.getrandbits(32):08x}.jpg"
+        return name, rng.randbytes(rng.randint(size // 2, size * 3 // 2))
+
+    uploads = []
+    for article_id in range(1, articles + 1):
+        cover = new_image()
+        uploads.append((article_id, *cover))
+        for _ in range(rng.randint(0, edits)):
+            if rng.random() >= same_share:
+                cover = new_image()
+            uploads.append((article_id, *cover))
+    return uploads
+
+
+def legacy(uploads):
+    stored, overwrites = {}, 0
+    for article_id, name, data in uploads:
+        path = f"{article_id}/{name}"
+        if path in stored and stored[path] != data:
+            overwrites += 1
+        # upload_article_image deleted the article's old images first
+        stored = {key: value for key, value in stored.items() if not key.startswith(f"{article_id}/")}
+        stored[path] = data
+    return {
+        "uploads": len(uploads),
+        "bytes_uploaded": sum(len(data) for _, _, data in uploads),
+        "bytes_at_rest": sum(len(data) for data in stored.values()),
+        "objects_at_rest": len(stored),
+        "silent_overwrites": overwrites,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=300)
+    parser.add_argument("--image-kib", type=int, default=200)
+    parser.add_argument("--edits", type=int, default=4, help="Max re-submits per article")
+    parser.add_argument("--same-share", type=float, default=0.7, help="Re-submits that keep the same file")
+    parser.add_argument("--stock-share", type=float, default=0.25, help="Covers taken from the stock library")
+    args = parser.parse_args(argv)
+
+    setup_app()
+
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.test import Client
+
+    from benchmarks.fakes import get_fake_client
+    from blog import images
+    from blog.repositories import get_repos
+
+    uploads = workload(args.articles, args.image_kib, args.edits, args.same_share, args.stock_share)
+    fake = get_fake_client()
+    bucket = fake.storage.from_(images.PHOTO_BUCKET)
+    client = Client(HTTP_APP_TOKEN="benchmark-app-token")
+    before = fake.storage.bytes_uploaded
+    failures = 0
+    for article_id, name, data in uploads:
+        response = client.post(f"/upload-article-image/{article_id}",
+                               {"file": SimpleUploadedFile(name, data, content_type="image/jpeg")})
+        failures += response.status_code != 200
+    uploaded = fake.storage.bytes_uploaded - before
+
+    def at_rest():
+        blobs = {path: data for path, data in bucket.objects.items() if images.is_blob(path)}
+        return len(blobs), sum(len(data) for data in blobs.values())
+
+    objects, size = at_rest()
+    result = {
+        "uploads": len(uploads),
+        "failed": failures,
+        "bytes_uploaded": uploaded,
+        "bytes_at_rest": size,
+        "objects_at_rest": objects,
+    }
+    # Replaced covers become garbage once nothing references them.
+    result["gc"] = images.collect_garbage(grace=timedelta(0))
+    result["objects_after_gc"], result["bytes_after_gc"] = at_rest()
+    # Then a third of the articles drop their images; only blobs nobody else uses go.
+    for article_id in range(1, args.articles + 1, 3):
+        images.unlink_images(article_id)
+    result["gc_after_unlink"] = images.collect_garbage(grace=timedelta(0))
+    result["objects_after_unlink_gc"], result["bytes_after_unlink_gc"] = at_rest()
+    result["dangling_references"] = sum(
+        1 for article_id in range(1, args.articles + 1)
+        for path in get_repos().photos.paths_for_article(article_id) if path not in bucket.objects
+    )
+
+    old = legacy(uploads)
+    report("image_dedup", {
+        "config": vars(args),
+        "legacy": old,
+        "blobs": result,
+        "upload_bytes_saved": old["bytes_uploaded"] - uploaded,
+        "upload_bytes_saved_pct": round(100 * (1 - uploaded / old["bytes_uploaded"]), 1),
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Image bytes a returning reader downloads, old signed URLs vs. blog.images delivery.
+
+Readers open the same articles several times over a day. A simulated browser
+cache keeps each image response under its URL: immutable URLs never expire,
+signed ones last until the URL itself expires.
+  legacy   - a fresh 1-hour signed URL per image per page load (the old
+             get_article_images), so every load downloads every image
+  delivery - images.delivery_urls: stable URLs for published articles,
+             window-bucketed signed URLs for drafts
+
+Also checks the article_image view (200 with immutable caching, 304 on
+If-None-Match, 404 for a draft's blob).
+
+    python -m benchmarks.image_delivery --articles 50 --loads 8
+"""
+
+import argparse
+import random
+import re
+
+from benchmarks.common import report, setup_app
+
+
+def simulate(loads_by_reader, urls_for, sizes):
+    """
+    Bytes downloaded on a reader's first visit to an article vs. revisits, given
+    urls_for(article_id, now) -> [(url, path, expires_at or None)].
+    """
+    first, repeat, requests = 0, 0, 0
+    for loads in loads_by_reader:
+        cache, seen = {}, set()
+        for article_id, now in loads:
+            for url, path, expires_at in urls_for(article_id, now):
+                if url in cache and (cache[url] is None or now < cache[url]):
+                    continue
+                cache[url] = expires_at
+                requests += 1
+                if article_id in seen:
+                    repeat += sizes[path]
+                else:
+                    first += sizes[path]
+            seen.add(article_id)
+    return {"first_visit_bytes": first, "revisit_bytes": repeat, "image_requests": requests}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=50)
+    parser.add_argument("--draft-share", type=float, default=0.2)
+    parser.add_argument("--images-per-article", type=int, default=3)
+    parser.add_argument("--image-kib", type=int, default=150)
+    parser.add_argument("--readers", type=int, default=200)
+    parser.add_argument("--loads", type=int, default=8, help="Page loads per reader over one day")
+    args = parser.parse_args(argv)
+
+    setup_app()
+
+    from datetime import datetime
+
+    from django.test import Client
+
+    from benchmarks.fakes import get_fake_client
+    from blog import images
+    from blog.repositories import get_repos
+
+    rng = random.Random(1)
+    fake = get_fake_client()
+    repos = get_repos()
+    author_id = fake.db.table("users").rows[0]["id"]
+    article_ids, drafts, sizes = [], set(), {}
+    for i in range(args.articles):
+        draft = rng.random() < args.draft_share
+        article = repos.articles.create({"title": f"Delivery {i}", "content": "<p>x</p>", "author_id": author_id,
+                                         "status": "draft" if draft else "published"})
+        article_ids.append(article["id"])
+        if draft:
+            drafts.add(article["id"])
+        for j in range(args.images_per_article):
+            data = rng.randbytes(args.image_kib * 1024)
+            stored = images.store_image(article["id"], data, f"figure-{j}.jpg", "image/jpeg")
+            sizes[stored["path"]] = len(data)
+
+    day = 86400
+    start = datetime(2026, 10, 19).timestamp()
+    loads_by_reader = []
+    for _ in range(args.readers):
+        picks = rng.sample(article_ids, min(3, len(article_ids)))
+        loads_by_reader.append(sorted(((rng.choice(picks), start + rng.uniform(0, day)) for _ in range(args.loads)),
+                                      key=lambda load: load[1]))
+    paths = {article_id: repos.photos.paths_for_article(article_id) for article_id in article_ids}
+
+    bucket = images.photo_bucket()
+
+    def legacy(article_id, now):
+        return [(bucket.create_signed_url(path, 3600)["signedURL"], path, now + 3600) for path in paths[article_id]]
+
+    def delivery(article_id, now):
+        result = []
+        for image in images.delivery_urls(article_id, paths[article_id], now=now):
+            expires_at = None if image["immutable"] else datetime.fromisoformat(image["expires_at"]).timestamp()
+            result.append((image["url"], image["path"], expires_at))
+        return result
+
+    calls = fake.storage.calls
+    results = {"legacy": simulate(loads_by_reader, legacy, sizes)}
+    results["legacy"]["storage_calls"] = fake.storage.calls - calls
+    calls = fake.storage.calls
+    results["delivery"] = simulate(loads_by_reader, delivery, sizes)
+    results["delivery"]["storage_calls"] = fake.storage.calls - calls
+    results["revisit_bytes_saved_pct"] = round(
+        100 * (1 - results["delivery"]["revisit_bytes"] / results["legacy"]["revisit_bytes"]), 1)
+
+    client = Client()
+    published = next(article_id for article_id in article_ids if article_id not in drafts)
+    name = re.sub(r"^.*/", "", paths[published][0])
+    response = client.get(f"/images/{name}")
+    etag = response.get("ETag")
+    checks = {
+        "published_status": response.status_code,
+        "cache_control": response.get("Cache-Control"),
+        "conditional_status": client.get(f"/images/{name}", HTTP_IF_NONE_MATCH=etag).status_code,
+    }
+    if drafts:
+        draft_name = re.sub(r"^.*/", "", paths[next(iter(drafts))][0])
+        checks["draft_status"] = client.get(f"/images/{draft_name}").status_code
+    report("image_delivery", {"config": vars(args), "results": results, "view": checks})
+
+
+if __name__ == "__main__":
+    main()
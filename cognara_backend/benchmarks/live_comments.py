@@ -0,0 +1,201 @@
+"""
+How many idle live-comment subscribers one ASGI worker (one event loop) holds,
+and what a new comment costs to fan out to all of them.
+
+Opens --subscribers SSE connections to articles/<id>/comments/live by calling
+cognara_backend.asgi.application directly (no server, no sockets), records
+resident memory per connection, then publishes comments the way post_comment does (from
+a worker thread) and times how long until every subscriber has the frame.
+Also checks Last-Event-ID replay, the reset event when history is gone, and
+that a subscriber whose buffer overflows is disconnected.
+
+For comparison: polling readers re-fetch the whole list every --poll-seconds.
+
+    python -m benchmarks.live_comments --subscribers 5000
+"""
+
+import argparse
+import asyncio
+import gc
+import os
+import threading
+import time
+
+from benchmarks.common import report, setup_app
+
+
+def rss_mib():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+class Connection:
+    """One SSE client speaking ASGI to the Django application."""
+
+    def __init__(self, application, path, headers=(), slow=False):
+        self.application = application
+        self.path = path
+        self.headers = [(b"host", b"testserver")] + list(headers)
+        self.frames = []
+        self.status = None
+        self.slow = slow
+        self.disconnected = asyncio.Event()
+        self.finished = asyncio.Event()
+        self.arrived = asyncio.Event()
+        self._sent_request = False
+
+    async def receive(self):
+        if not self._sent_request:
+            self._sent_request = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await self.disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.status = message["status"]
+        elif message["type"] == "http.response.body":
+            if message.get("body"):
+                if self.slow:
+                    await asyncio.sleep(3600)  # a reader that stopped reading
+                self.frames.append(message["body"])
+                self.arrived.set()
+            if not message.get("more_body"):
+                self.finished.set()
+
+    def start(self):
+        path, _, query = self.path.partition("?")
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+            "query_string": query.encode(), "headers": self.headers,
+            "client": ("127.0.0.1", 40000), "server": ("testserver", 80),
+        }
+        self.task = asyncio.ensure_future(self.application(scope, self.receive, self.send))
+        return self
+
+    def events(self, kind=b"comment"):
+        return [frame for frame in self.frames if b"event: " + kind in frame]
+
+    async def close(self):
+        self.disconnected.set()
+        try:
+            await asyncio.wait_for(self.task, 5)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            self.task.cancel()
+
+
+async def wait_until(predicate, timeout=30):
+    deadline = time.perf_counter() + timeout
+    while not predicate():
+        if time.perf_counter() > deadline:
+            return False
+        await asyncio.sleep(0.005)
+    return True
+
+
+async def run(args):
+    from cognara_backend.asgi import application
+    from blog import live
+
+    broker = live.get_broker()
+    next_id = iter(range(1_000_000, 2_000_000))
+
+    def post(article_id):
+        # post_comment publishes from a request thread, not the event loop.
+        live.publish_comment({"id": next(next_id), "article_id": article_id, "user_id": 1,
+                              "username": "bench", "content": "New comment " + "x" * 200})
+
+    gc.collect()
+    rss_before = rss_mib()
+    start = time.perf_counter()
+    path = f"/articles/{args.article_id}/comments/live"
+    connections = [Connection(application, path).start() for _ in range(args.subscribers)]
+    await wait_until(lambda: broker.subscriber_count >= args.subscribers, timeout=300)
+    connect_seconds = time.perf_counter() - start
+    gc.collect()
+    rss_after = rss_mib()
+
+    fanout = []
+    for _ in range(args.publishes):
+        expected = len(connections[0].events()) + 1
+        start = time.perf_counter()
+        await asyncio.to_thread(post, args.article_id)
+        await wait_until(lambda: all(len(c.events()) >= expected for c in connections))
+        fanout.append((time.perf_counter() - start) * 1000)
+
+    idle = {
+        "subscribers": broker.subscriber_count,
+        "all_status_200": all(c.status == 200 for c in connections),
+        "connect_seconds": round(connect_seconds, 2),
+        "rss_mib_before": rss_before,
+        "rss_mib_after": rss_after,
+        "rss_kib_per_subscriber": round((rss_after - rss_before) * 1024 / args.subscribers, 1)
+        if rss_before is not None else None,
+        "fanout_ms": [round(ms, 1) for ms in fanout],
+        "delivered_every_comment": all(len(c.events()) == args.publishes for c in connections),
+        "poll_queries_per_minute_avoided": round(args.subscribers * 60 / args.poll_seconds),
+    }
+
+    # Reconnect with Last-Event-ID: only what was missed comes back.
+    first = connections[0]
+    last_id = int(first.events()[-1].split(b"\n", 1)[0].split(b": ")[1])
+    await first.close()
+    for _ in range(3):
+        await asyncio.to_thread(post, args.article_id)
+    again = Connection(application, path, [(b"last-event-id", str(last_id).encode())]).start()
+    await wait_until(lambda: len(again.events()) >= 3, timeout=5)
+    checks = {"replayed_after_reconnect": len(again.events())}
+
+    # History no longer reaches back: the client is told to refetch.
+    for _ in range(args.history + 1):
+        broker.publish(live.comments_topic(0), live.Event(next(next_id), "comment", {}))
+    stale = Connection(application, "/articles/0/comments/live?last_event_id=1").start()
+    await wait_until(lambda: len(stale.frames) >= 2, timeout=5)
+    checks["reset_when_history_gone"] = bool(stale.events(b"reset"))
+    await stale.close()
+
+    # A reader that stops reading is cut off once its buffer is full.
+    slow = Connection(application, "/articles/999/comments/live", slow=True).start()
+    await wait_until(lambda: broker.subscriber_count >= len(connections) + 1, timeout=5)
+    before = broker.subscriber_count
+    for _ in range(args.buffer + 5):
+        await asyncio.to_thread(post, 999)
+    checks["slow_reader_disconnected"] = await wait_until(lambda: broker.subscriber_count < before, timeout=5)
+    slow.task.cancel()
+
+    await again.close()
+    for connection in connections[1:]:
+        connection.disconnected.set()
+    await asyncio.gather(*(c.task for c in connections[1:]), return_exceptions=True)
+    checks["subscribers_after_disconnect"] = broker.subscriber_count
+    return idle, checks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", type=int, default=5000)
+    parser.add_argument("--publishes", type=int, default=5)
+    parser.add_argument("--article-id", type=int, default=1)
+    parser.add_argument("--poll-seconds", type=float, default=10)
+    parser.add_argument("--history", type=int, default=50)
+    parser.add_argument("--buffer", type=int, default=16)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("LIVE_HISTORY", str(args.history))
+    os.environ.setdefault("LIVE_BUFFER_SIZE", str(args.buffer))
+    setup_app()
+
+    idle, checks = asyncio.run(run(args))
+    report("live_comments", {"config": vars(args), "idle": idle, "checks": checks,
+                             "threads_in_process": threading.active_count()})
+
+
+if __name__ == "__main__":
+    main()
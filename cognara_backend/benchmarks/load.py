@@ -0,0 +1,221 @@
+"""
+asyncio load runner for the blog endpoints.
+
+By default requests are served in-process (Django test client) against the
+seeded fake Supabase from benchmarks.fakes, so no network or credentials are
+needed. Pass --base-url to drive a running server instead (start it with
+SUPABASE_CLIENT_FACTORY=benchmarks.fakes.get_fake_client to use the stand-in).
+
+    python -m benchmarks.load --scenarios get_articles,log_read --concurrency 32 --requests 2000 --latency-ms 5
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+
+Reports (p50/p95/p99 latency, RPS, errors, upstream calls) are written as JSON
+to benchmarks/results/<commit>_<timestamp>.json.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from benchmarks.common import APP_ENV_DEFAULTS, git_commit, percentile
+from benchmarks.dataset import SCALES
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+class Scenario:
+    """One endpoint: how to build a request from a random generator."""
+
+    def __init__(self, name, method, build):
+        self.name = name
+        self.method = method
+        self.build = build
+
+
+def _article_id(rng, sizes):
+    return rng.randint(1, sizes["articles"])
+
+
+def _log_read_body(rng, sizes):
+    # Mix of heartbeats on existing sessions and fresh sessions.
+    body = {
+        "user_id": rng.randint(1, sizes["users"]),
+        "article_id": _article_id(rng, sizes),
+        "status": rng.choice(["started", "in_progress", "in_progress", "completed"]),
+        "scroll_depth": round(rng.uniform(0, 100), 1),
+        "active_time_seconds": rng.randint(0, 600),
+        "required_time_seconds": rng.randint(60, 600),
+    }
+    if rng.random() < 0.8:
+        body["session_id"] = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+    return body
+
+
+SCENARIOS = {scenario.name: scenario for scenario in [
+    Scenario("get_articles", "GET", lambda rng, sizes: ("/articles", None)),
+    Scenario("get_article", "GET", lambda rng, sizes: (f"/articles/{_article_id(rng, sizes)}", None)),
+    Scenario("get_comments", "GET", lambda rng, sizes: (f"/articles/{_article_id(rng, sizes)}/comments", None)),
+    Scenario("auth_status", "GET", lambda rng, sizes: ("/auth/status", None)),
+    Scenario("check_email", "POST", lambda rng, sizes: (
+        "/emailcheck", {"email": f"user{rng.randint(1, sizes['users'] * 2)}@example.com"})),
+    Scenario("get_article_images", "POST", lambda rng, sizes: (
+        "/get-article-images", {"article_id": _article_id(rng, sizes)})),
+    Scenario("log_read", "POST", lambda rng, sizes: ("/log_read", _log_read_body(rng, sizes))),
+]}
+
+
+class InProcessTarget:
+    """Serves requests through Django's test client, one client per worker thread."""
+
+    def __init__(self, token):
+        from django.test import Client
+
+        self._client_class = Client
+        self._local = threading.local()
+        self.headers = {"HTTP_APP_TOKEN": token}
+
+    def request(self, method, path, body):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self._client_class()
+        if method == "GET":
+            response = client.get(path, **self.headers)
+        else:
+            response = client.post(path, data=json.dumps(body), content_type="application/json", **self.headers)
+        return response.status_code
+
+    def upstream_calls(self):
+        from benchmarks.fakes import get_fake_client
+        return get_fake_client().calls
+
+
+class HttpTarget:
+    """Drives a running server over HTTP."""
+
+    def __init__(self, base_url, token):
+        self.base_url = base_url.rstrip("/")
+        self.headers = {"App-Token": token, "Content-Type": "application/json"}
+
+    def request(self, method, path, body):
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method, headers=self.headers)
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as error:
+            return error.code
+
+    def upstream_calls(self):
+        return None
+
+
+async def run_scenario(target, scenario, sizes, requests, concurrency, seed):
+    rng = random.Random(seed)
+    plans = [scenario.build(rng, sizes) for _ in range(requests)]
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    def one(path, body):
+        start = time.perf_counter()
+        try:
+            status = target.request(scenario.method, path, body)
+        except Exception:
+            status = 599
+        return time.perf_counter() - start, status
+
+    async def worker(path, body):
+        nonlocal errors
+        async with semaphore:
+            elapsed, status = await loop.run_in_executor(None, one, path, body)
+        latencies.append(elapsed)
+        if status >= 500:
+            errors += 1
+
+    calls_before = target.upstream_calls()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(path, body) for path, body in plans))
+    wall = time.perf_counter() - started
+    calls_after = target.upstream_calls()
+
+    latencies.sort()
+    result = {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "rps": round(requests / wall, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3),
+    }
+    if calls_before is not None:
+        result["upstream_calls_per_request"] = round((calls_after - calls_before) / requests, 2)
+    return result
+
+
+async def run(args):
+    sizes = SCALES[args.scale]
+    token = os.environ.get("FRONTEND_API_TOKEN", APP_ENV_DEFAULTS["FRONTEND_API_TOKEN"])
+    if args.base_url:
+        target = HttpTarget(args.base_url, token)
+    else:
+        from benchmarks.common import setup_app
+        setup_app(BENCH_LATENCY_MS=args.latency_ms, BENCH_JITTER_MS=args.jitter_ms,
+                  BENCH_SCALE=args.scale, BENCH_SEED=args.seed)
+        target = InProcessTarget(token)
+        from benchmarks.fakes import get_fake_client
+        get_fake_client()  # seed before timing starts
+
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=args.concurrency))
+    results = {}
+    for name in args.scenarios.split(","):
+        results[name] = await run_scenario(target, SCENARIOS[name], sizes, args.requests, args.concurrency, args.seed)
+        print(f"{name:20s} rps={results[name]['rps']:>9} p50={results[name]['p50_ms']:>8}ms "
+              f"p95={results[name]['p95_ms']:>8}ms p99={results[name]['p99_ms']:>8}ms errors={results[name]['errors']}")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="injected per-call latency of the stand-in")
+    parser.add_argument("--jitter-ms", type=float, default=1.0)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--base-url", default=None, help="drive a running server instead of the in-process app")
+    parser.add_argument("--out", default=None, help="report path (default benchmarks/results/<commit>_<ts>.json)")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args))
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "created": datetime.now(timezone.utc).isoformat(),
+        "config": {key: value for key, value in vars(args).items() if key != "out"},
+        "scenarios": results,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, f"{commit}_{datetime.now().strftime('%Y%m%d%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"report written to {out}")
+
+
+if __name__ == "__main__":
+    main()
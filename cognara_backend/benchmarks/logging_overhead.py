@@ -0,0 +1,81 @@
+"""
+Cost of the logging done on every log_read heartbeat.
+
+before: print() of the parsed payload to stdout (synchronous write per call)
+after:  blog.reads logger through blog.log (DEBUG disabled, INFO sampled, queued I/O)
+
+    python -m benchmarks.logging_overhead
+"""
+
+import contextlib
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.common import report
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from blog.log import NonBlockingJsonHandler, SampledLogger
+
+
+PAYLOAD = {
+    "user_id": 42,
+    "article_id": 1337,
+    "status": "in_progress",
+    "scroll_depth": 57.5,
+    "active_time_seconds": 93,
+    "required_time_seconds": 240,
+    "session_id": "0b8a4c5e-5b7e-4a55-9d1c-6a0e2b0f7c11",
+}
+
+
+def before(payload):
+    print("Parsed data:", payload)
+
+
+def make_after(read_logger):
+    def after(payload):
+        if read_logger.isEnabledFor(logging.DEBUG):
+            read_logger.debug("log_read payload", extra={"payload": payload})
+        read_logger.info("read heartbeat", extra={"session_id": payload["session_id"],
+                                                  "article_id": payload["article_id"],
+                                                  "read_status": payload["status"]})
+    return after
+
+
+def throughput(func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(PAYLOAD)
+    elapsed = time.perf_counter() - start
+    return {"iterations": iterations, "calls_per_sec": round(iterations / elapsed), "us_per_call": round(elapsed / iterations * 1e6, 3)}
+
+
+def run(iterations=200000, sample_rate=0.01):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "stdout.log"), "w") as sink, contextlib.redirect_stdout(sink):
+            results["before_print"] = throughput(before, iterations)
+
+        with open(os.path.join(tmp, "json.log"), "w") as sink:
+            handler = NonBlockingJsonHandler(stream=sink)
+            base_logger = logging.getLogger("bench.reads")
+            base_logger.propagate = False
+            base_logger.addHandler(handler)
+            base_logger.setLevel(logging.INFO)
+            read_logger = SampledLogger(base_logger, rate=sample_rate)
+            results[f"after_sampled_{sample_rate}"] = throughput(make_after(read_logger), iterations)
+
+            base_logger.setLevel(logging.WARNING)
+            results["after_disabled"] = throughput(make_after(read_logger), iterations)
+            handler.close()
+    return results
+
+
+if __name__ == "__main__":
+    report("logging_overhead", run())
@@ -0,0 +1,145 @@
+"""
+Moderation queue endpoints against the AdminDashboard's old approach of
+downloading every article and filtering by status in the browser.
+
+Seeds --articles articles (--review-share of them waiting in review) into the
+Supabase stand-in and, signed in as an admin:
+  client_side  - what the dashboard had to fetch: every article row, content
+                 included, then filter
+  first_page   - GET moderation/articles?status=review&limit=50
+  deep_page    - the same from after=<an id near the end of the queue>
+  counts       - GET moderation/counts
+  approve      - POST moderation/moderate, 50 ids in one update (then the
+                 feeds, sitemap and pre-rendered files for all 50 at once)
+Reported per call: response bytes, bytes read from Supabase, round trips and
+latency. Pages are keyset (id > after, via articles_status_id_idx on
+Postgres), so a deep page reads what the first does; the stand-in filters its
+Python lists, so its latency still grows with the table.
+
+    python -m benchmarks.moderation --articles 100000 --repeat 20
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import time
+
+from benchmarks.common import percentile, report, setup_app
+
+STATUSES = ("published", "draft", "review", "rejected")
+
+
+def seed(fake, count, review_share, rng):
+    from benchmarks.autosave import WORDS
+
+    authors = fake.db.insert_rows("users", [{"username": f"author{n}", "email": f"author{n}@example.com",
+                                             "first_name": "Author", "last_name": str(n)} for n in range(200)])
+    rest = (1 - review_share) / 3
+    fake.db.insert_rows("articles", [{
+        "title": " ".join(rng.choice(WORDS) for _ in range(6)),
+        "excerpt": " ".join(rng.choice(WORDS) for _ in range(25)),
+        "content": "<p>" + " ".join(rng.choice(WORDS) for _ in range(120)) + "</p>",
+        "author_id": rng.choice(authors)["id"],
+        "status": rng.choices(STATUSES, weights=(rest, rest, review_share, rest))[0],
+    } for _ in range(count)])
+
+
+def measure(fake, wire, repeat, call):
+    timings, calls, received, size = [], 0, 0, 0
+    for _ in range(repeat):
+        before = (fake.db.calls, wire.received)
+        start = time.perf_counter()
+        size = call()
+        timings.append((time.perf_counter() - start) * 1000)
+        calls += fake.db.calls - before[0]
+        received += wire.received - before[1]
+    timings.sort()
+    return {
+        "response_kib": round(size / 1024, 1),
+        "supabase_kib_received": round(received / repeat / 1024, 1),
+        "round_trips": round(calls / repeat, 2),
+        "p50_ms": round(percentile(timings, 0.5), 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=100000)
+    parser.add_argument("--review-share", type=float, default=0.3)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=2)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    setup_app(BENCH_LATENCY_MS=args.latency_ms, ADMIN_USER_IDS=1,
+              PRERENDER_ROOT=tempfile.mkdtemp(prefix="moderation-bench-"))
+    from django.test import Client, override_settings
+
+    from benchmarks.autosave import Wire
+    from benchmarks.fakes import get_fake_client
+
+    fake = get_fake_client()
+    wire = Wire()
+    rng = random.Random(args.seed)
+    seed(fake, args.articles, args.review_share, rng)
+    queue = sorted(row["id"] for row in fake.db.table("articles").rows if row["status"] == "review")
+
+    with override_settings(SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies"):
+        client = Client(HTTP_APP_TOKEN="benchmark-app-token")
+        session = client.session
+        session.update({"id": 1, "username": "user1", "email": "user1@example.com", "email_verified": True})
+        session.save()
+        client.cookies["sessionid"] = session.session_key
+
+        def get(path):
+            response = client.get(path)
+            assert response.status_code == 200, (path, response.status_code, response.content[:200])
+            return response
+
+        def client_side():
+            rows = fake.table("articles").select("*").execute().data
+            waiting = [row for row in rows if row["status"] == "review"][:50]
+            return len(json.dumps(rows, default=str)) if waiting else 0
+
+        results = {
+            "queue_length": len(queue),
+            "client_side": measure(fake, wire, max(1, args.repeat // 10), client_side),
+            "first_page": measure(fake, wire, args.repeat,
+                                  lambda: len(get("/moderation/articles?status=review&limit=50").content)),
+            "deep_page": measure(fake, wire, args.repeat,
+                                 lambda: len(get(f"/moderation/articles?status=review&limit=50&after={queue[-60]}").content)),
+            "counts": measure(fake, wire, args.repeat, lambda: len(get("/moderation/counts").content)),
+        }
+
+        batches = iter([queue[n * 50:(n + 1) * 50] for n in range(args.repeat)])
+
+        def approve():
+            response = client.post("/moderation/moderate", {"action": "approve", "article_ids": next(batches)},
+                                   content_type="application/json")
+            assert response.status_code == 200, response.content[:200]
+            return len(response.content)
+
+        results["approve_50"] = measure(fake, wire, args.repeat, approve)
+
+        first = get("/moderation/articles?status=review&limit=50").json()
+        counts = get("/moderation/counts").json()["counts"]
+        again = client.post("/moderation/moderate", {"action": "reject", "article_ids": queue[:10]},
+                            content_type="application/json").json()
+        checks = {
+            "first_page_is_oldest_waiting": [row["id"] for row in first["articles"]] == queue[50 * args.repeat:][:50],
+            "pages_have_no_content": all("content" not in row for row in first["articles"]),
+            "review_count_after_approvals": counts["review"] == len(queue) - 50 * args.repeat,
+            "counts_match_table": counts == dict({status: 0 for status in counts},
+                                                 **{status: sum(1 for row in fake.db.table("articles").rows
+                                                                if row["status"] == status) for status in STATUSES}),
+            "already_approved_are_skipped": again["updated"] == [] and again["skipped"] == queue[:10],
+        }
+
+    results["client_side_vs_page_bytes"] = round(results["client_side"]["supabase_kib_received"]
+                                                 / max(results["first_page"]["supabase_kib_received"], 0.1))
+    report("moderation", {"config": vars(args), "results": results, "checks": checks})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Serving published articles from pre-rendered files (blog.prerender) against
+the dynamic path (Supabase article row + author lookup).
+
+Seeds --scale into the Supabase stand-in (--latency-ms per round trip), gives
+every published article a content-addressed image, then
+  rebuild  - prerender.rebuild() with 1 and with --workers processes
+  serve    - GET articles/<id> for random published ids through the Django
+             test client at --concurrency: `dynamic` with PRERENDER_ROOT
+             empty, `static` with the files in place
+  checks   - the static JSON is the dynamic payload plus `images`; after an
+             unpublish the files are gone and the article 404s as a page
+
+    python -m benchmarks.prerender --scale medium --requests 4000 --concurrency 16 --latency-ms 5
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import APP_ENV_DEFAULTS, report, setup_app
+
+
+def add_images(fake):
+    published = [row["id"] for row in fake.db.table("articles").rows if row["status"] == "published"]
+    fake.db.insert_rows("article_photos", [
+        {"article_id": article_id, "path": f"blobs/{hashlib.sha256(str(article_id).encode()).hexdigest()}.jpg"}
+        for article_id in published
+    ])
+    return published
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", default="medium")
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=5)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    root = tempfile.mkdtemp(prefix="prerender-bench-")
+    empty = tempfile.mkdtemp(prefix="prerender-empty-")
+    setup_app(BENCH_LATENCY_MS=args.latency_ms, BENCH_JITTER_MS=0, BENCH_SCALE=args.scale,
+              BENCH_SEED=args.seed, PRERENDER_ROOT=root)
+    from django.test import Client, override_settings
+
+    from benchmarks.fakes import get_fake_client
+    from benchmarks.load import InProcessTarget, Scenario, run_scenario
+    from blog import prerender
+
+    fake = get_fake_client()
+    published = add_images(fake)
+
+    rebuild = {}
+    for workers in sorted({1, args.workers}):
+        for name in os.listdir(os.path.join(root, "articles")) if os.path.isdir(os.path.join(root, "articles")) else []:
+            os.unlink(os.path.join(root, "articles", name))
+        start = time.perf_counter()
+        counts = prerender.rebuild(workers=workers)
+        elapsed = time.perf_counter() - start
+        rebuild[f"workers_{workers}"] = dict(counts, seconds=round(elapsed, 3),
+                                             articles_per_second=round(counts["written"] / elapsed, 1))
+
+    token = os.environ.get("FRONTEND_API_TOKEN", APP_ENV_DEFAULTS["FRONTEND_API_TOKEN"])
+    target = InProcessTarget(token)
+    scenario = Scenario("get_article", "GET", lambda rng, sizes: (f"/articles/{rng.choice(published)}", None))
+    serve = {}
+
+    async def run(mode):
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=args.concurrency))
+        return await run_scenario(target, scenario, {}, args.requests, args.concurrency, args.seed)
+
+    for mode, directory in (("dynamic", empty), ("static", root)):
+        with override_settings(PRERENDER_ROOT=directory):
+            serve[mode] = asyncio.run(run(mode))
+    serve["rps_ratio"] = round(serve["static"]["rps"] / serve["dynamic"]["rps"], 1)
+
+    client = Client(HTTP_APP_TOKEN=token)
+    sample = random.Random(args.seed).sample(published, min(50, len(published)))
+    matches = True
+    for article_id in sample:
+        static = b"".join(client.get(f"/articles/{article_id}").streaming_content)
+        with override_settings(PRERENDER_ROOT=empty):
+            dynamic = client.get(f"/articles/{article_id}").content
+        matches = matches and static == dynamic
+    pulled = sample[0]
+    next(row for row in fake.db.table("articles").rows if row["id"] == pulled)["status"] = "review"
+    prerender.article_changed(pulled)
+    after = client.get(f"/articles/{pulled}")
+    checks = {
+        "static_equals_dynamic": bool(matches),
+        "page_status": client.get(f"/articles/{sample[1]}/page").status_code,
+        "unpublished_files_removed": not os.path.exists(prerender.path_for(pulled, "json")),
+        "unpublished_served_dynamically": not after.streaming and after.json()["status"] == "review",
+        "unpublished_page_status": client.get(f"/articles/{pulled}/page").status_code,
+    }
+    report("prerender", {"config": vars(args), "published_articles": len(published), "rebuild": rebuild,
+                         "serve": serve, "checks": checks})
+
+
+if __name__ == "__main__":
+    main()
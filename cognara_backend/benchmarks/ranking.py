@@ -0,0 +1,98 @@
+"""
+Leaderboard recompute time vs event volume, and the cost of serving a board.
+
+  score      - blog.ranking.score_events over N synthetic read/comment events (CPU only)
+  recompute  - full ranking.recompute against the Supabase stand-in (paged fetch,
+               article cards, leaderboard writes) for each dataset scale
+  serve      - ranking.get_leaderboard with a warm cache
+
+    python -m benchmarks.ranking --events 10000,100000,1000000 --scales small,medium
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.common import measure, report, setup_app
+
+setup_app()
+
+from django.core.cache import cache
+
+from benchmarks.dataset import build
+from benchmarks.fakes import FakeSupabase, Latency
+from blog import ranking
+from blog.repositories import build_repositories
+
+
+STATUSES = list(ranking.READ_WEIGHTS)
+
+
+def synthetic_events(count, articles, now, seed_value=1):
+    rng = random.Random(seed_value)
+    reads = [{
+        "article_id": rng.randint(1, articles),
+        "status": rng.choice(STATUSES),
+        "updated_at": (now - timedelta(seconds=rng.randint(0, 30 * 86400))).isoformat(),
+    } for _ in range(count)]
+    comments = [{
+        "article_id": rng.randint(1, articles),
+        "created_at": (now - timedelta(seconds=rng.randint(0, 30 * 86400))).isoformat(),
+    } for _ in range(count // 10)]
+    return reads, comments
+
+
+def bench_score(counts):
+    now = datetime.now(timezone.utc)
+    results = {}
+    for count in counts:
+        reads, comments = synthetic_events(count, max(count // 100, 10), now)
+        start = time.perf_counter()
+        ranking.score_events(reads, comments, now)
+        elapsed = time.perf_counter() - start
+        results[count] = {"seconds": round(elapsed, 3), "events_per_second": round((count + len(comments)) / elapsed)}
+    return results
+
+
+def bench_recompute(scales, latency_ms):
+    results = {}
+    for scale in scales:
+        data = build(scale)
+        fake = FakeSupabase(Latency(latency_ms / 1000))
+        for table, rows in data.items():
+            fake.db.insert_rows(table, rows)
+        repos = build_repositories("supabase", client=fake)
+        # Dataset timestamps are fixed; rank as of the newest event so the window is full.
+        now = max(datetime.fromisoformat(row["updated_at"]) for row in data["article_reads"])
+        calls = fake.calls
+        start = time.perf_counter()
+        sizes = ranking.recompute(now=now, repos=repos)
+        results[scale] = {
+            "read_events": len(data["article_reads"]),
+            "seconds": round(time.perf_counter() - start, 3),
+            "round_trips": fake.calls - calls,
+            "entries": sizes,
+        }
+        last_repos = repos
+    return results, last_repos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", default="10000,100000,1000000")
+    parser.add_argument("--scales", default="small,medium")
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    score = bench_score([int(n) for n in args.events.split(",")])
+    recompute, repos = bench_recompute(args.scales.split(","), args.latency_ms)
+    ranking.get_leaderboard(ranking.TRENDING, repos=repos)
+    serve = measure(lambda: ranking.get_leaderboard(ranking.TRENDING, repos=repos), iterations=5000)
+    cache.clear()
+
+    report("ranking", {"config": vars(args), "score": score, "recompute": recompute, "serve_cached": serve})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+log_read heartbeat write path under concurrent writers to one session.
+
+  legacy - select the row, merge_progress() in Python, update (2 round trips)
+  atomic - reads.record_heartbeat -> log_read_heartbeat RPC (1 round trip)
+
+Writers send heartbeats with random depth/time to the same session, like two
+tabs of one article. A trial "loses progress" when the stored depth or time
+ends below the maximum any writer sent.
+
+    python -m benchmarks.read_heartbeat --writers 4 --latency-ms 5
+"""
+
+import argparse
+import random
+import threading
+import time
+
+from benchmarks.common import report, setup_app
+
+setup_app()
+
+from benchmarks.fakes import FakeSupabase, Latency
+from blog.helper import classify_read, merge_progress
+from blog.repositories import build_repositories
+
+
+def legacy_heartbeat(repos, session_id, status, depth, active):
+    # log_article_read before the atomic path.
+    row = repos.reads.get_by_session(session_id)
+    new_status, new_depth, new_time = merge_progress(row, status, depth, active)
+    upd = {"status": new_status, "scroll_depth": new_depth, "active_time_seconds": new_time,
+           "required_time_seconds": row["required_time_seconds"]}
+    if new_status == "completed":
+        upd["status"] = classify_read(new_depth, new_time, row["required_time_seconds"]) or new_status
+    return repos.reads.update_by_session(session_id, upd)
+
+
+def atomic_heartbeat(repos, session_id, status, depth, active):
+    return repos.reads.record_heartbeat(session_id, status, depth, active)
+
+
+def trial(path, fake, repos, writers, heartbeats, seed_value):
+    session_id = f"00000000-0000-4000-8000-{seed_value:012d}"
+    fake.db.insert_rows("article_reads", [{"session_id": session_id, "user_id": 1, "article_id": 1,
+                                           "status": "started", "scroll_depth": 0.0, "active_time_seconds": 0,
+                                           "required_time_seconds": 300}])
+    rng = random.Random(seed_value)
+    plans = [[(round(rng.uniform(0, 100), 1), rng.randint(0, 600)) for _ in range(heartbeats)] for _ in range(writers)]
+    barrier = threading.Barrier(writers)
+
+    def writer(plan):
+        barrier.wait()
+        for depth, active in plan:
+            path(repos, session_id, "in_progress", depth, active)
+
+    threads = [threading.Thread(target=writer, args=(plan,)) for plan in plans]
+    calls = fake.calls
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    row = repos.reads.get_by_session(session_id)
+    sent = [beat for plan in plans for beat in plan]
+    lost = row["scroll_depth"] < max(d for d, _ in sent) or row["active_time_seconds"] < max(t for _, t in sent)
+    return elapsed, fake.calls - calls - 1, lost
+
+
+def run(path, args):
+    fake = FakeSupabase(Latency(args.latency_ms / 1000, args.jitter_ms / 1000, seed=1))
+    fake.db.insert_rows("articles", [{"id": 1, "title": "bench", "content": "", "author_id": 1, "status": "published"}])
+    repos = build_repositories("supabase", client=fake)
+    elapsed, calls, lost = 0.0, 0, 0
+    for n in range(args.trials):
+        t_elapsed, t_calls, t_lost = trial(path, fake, repos, args.writers, args.heartbeats, n + 1)
+        elapsed += t_elapsed
+        calls += t_calls
+        lost += t_lost
+    total = args.trials * args.writers * args.heartbeats
+    return {
+        "heartbeats": total,
+        "round_trips_per_heartbeat": round(calls / total, 2),
+        "heartbeats_per_second": round(total / elapsed, 1),
+        "trials_losing_progress": f"{lost}/{args.trials}",
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--heartbeats", type=int, default=20, help="per writer per trial")
+    parser.add_argument("--trials", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--jitter-ms", type=float, default=2.0)
+    args = parser.parse_args(argv)
+
+    report("read_heartbeat", {
+        "config": vars(args),
+        "legacy": run(legacy_heartbeat, args),
+        "atomic": run(atomic_heartbeat, args),
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Build time and memory of the "read next" index, and its serving latency.
+
+Articles are synthetic but topical: each draws most words from one of
+--topics topic vocabularies and the rest from a Zipf-distributed background,
+so TF-IDF neighbours are meaningful.
+
+    python -m benchmarks.recommendations --articles 50000 --words 400
+"""
+
+import argparse
+import pickle
+import random
+import time
+import tracemalloc
+
+from benchmarks.common import measure, report, setup_app
+
+setup_app()
+
+from blog.recommendations import RecommendationIndex
+
+
+def synthetic_articles(count, words, topics, seed_value=1):
+    rng = random.Random(seed_value)
+    background = [f"term{i}" for i in range(20000)]
+    weights = [1 / (rank + 1) for rank in range(len(background))]
+    topic_words = [[f"topic{t}word{i}" for i in range(60)] for t in range(topics)]
+    articles = []
+    for i in range(1, count + 1):
+        topic = topic_words[rng.randrange(topics)]
+        body = rng.choices(background, weights, k=words // 2) + rng.choices(topic, k=words - words // 2)
+        rng.shuffle(body)
+        articles.append({
+            "id": i,
+            "title": " ".join(rng.sample(topic, 4)),
+            "content": "<p>" + " ".join(body) + "</p>",
+            "excerpt": "",
+            "author_id": rng.randint(1, 5000),
+            "author_first_name": "bench",
+            "author_last_name": "author",
+            "created_at": "2026-01-01T00:00:00+00:00",
+        })
+    return articles
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=50000)
+    parser.add_argument("--words", type=int, default=400)
+    parser.add_argument("--topics", type=int, default=500)
+    parser.add_argument("--neighbours", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    articles = synthetic_articles(args.articles, args.words, args.topics)
+
+    start = time.perf_counter()
+    index = RecommendationIndex.build(articles, k=args.neighbours)
+    build_seconds = time.perf_counter() - start
+    # Second, traced build for peak memory (tracemalloc slows the build down).
+    tracemalloc.start()
+    RecommendationIndex.build(articles, k=args.neighbours)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rng = random.Random(2)
+    history = [{"article_id": rng.randint(1, args.articles), "status": "deep_read"} for _ in range(30)]
+    new_article = dict(synthetic_articles(1, args.words, args.topics, seed_value=3)[0], id=args.articles + 1)
+
+    start = time.perf_counter()
+    index.with_article(new_article)
+    upsert_ms = (time.perf_counter() - start) * 1000
+
+    report("recommendations", {
+        "config": vars(args),
+        "build_seconds": round(build_seconds, 2),
+        "build_peak_mib": round(peak / 2**20, 1),
+        "index_mib": round(index.nbytes() / 2**20, 1),
+        "pickle_mib": round(len(pickle.dumps(index, protocol=pickle.HIGHEST_PROTOCOL)) / 2**20, 1),
+        "terms": len(index.vocabulary),
+        "nnz": int(index.matrix.nnz),
+        "upsert_ms": round(upsert_ms, 2),
+        "related": measure(lambda: index.related(rng.randint(1, args.articles), 10), iterations=2000),
+        "for_history_30": measure(lambda: index.for_history(history, 10), iterations=500),
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Query counts and latencies of the data-access layer, per backend.
+
+  supabase - benchmarks.fakes stand-in with injected per-call latency
+  django   - ORM over in-memory SQLite, or Postgres when BENCH_PG_NAME is set
+             (BENCH_PG_USER / BENCH_PG_PASSWORD / BENCH_PG_HOST / BENCH_PG_PORT)
+
+    python -m benchmarks.repositories --latency-ms 5
+"""
+
+import argparse
+import random
+import time
+
+from benchmarks.common import bench_databases, report, setup_django
+
+
+setup_django(
+    INSTALLED_APPS=["django.contrib.auth", "django.contrib.contenttypes", "django.contrib.sessions", "blog"],
+    AUTH_USER_MODEL="blog.User",
+    DATABASES=bench_databases(),
+)
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from benchmarks.dataset import build
+from benchmarks.fakes import FakeSupabase, Latency
+from blog.models import Article, ArticleRead, Comment, User
+from blog.repositories import build_repositories
+
+
+def seed_orm(data):
+    call_command("migrate", verbosity=0, run_syncdb=True)
+    User.objects.bulk_create([User(
+        id=row["id"], username=row["username"], email=row["email"], password=row["password_hash"],
+        first_name=row["first_name"], last_name=row["last_name"], bio=row["bio"], email_verified=True,
+    ) for row in data["users"]], batch_size=1000)
+    Article.objects.bulk_create([Article(
+        id=row["id"], title=row["title"], content=row["content"], author_id=row["author_id"], status=row["status"],
+    ) for row in data["articles"]], batch_size=500)
+    Comment.objects.bulk_create([Comment(
+        id=row["id"], article_id=row["article_id"], user_id=row["user_id"], content=row["content"],
+    ) for row in data["comments"]], batch_size=1000)
+    ArticleRead.objects.bulk_create([ArticleRead(
+        id=row["id"], session_id=row["session_id"], user_id=row["user_id"], article_id=row["article_id"],
+        status=row["status"], scroll_depth=row["scroll_depth"], active_time_seconds=row["active_time_seconds"],
+        required_time_seconds=row["required_time_seconds"],
+    ) for row in data["article_reads"]], batch_size=1000)
+
+
+def operations(repos, data, rng):
+    sessions = [row["session_id"] for row in data["article_reads"]]
+    articles = len(data["articles"])
+    users = len(data["users"])
+    return {
+        "articles.list_published": lambda: repos.articles.list_published(),
+        "articles.get": lambda: repos.articles.get(rng.randint(1, articles)),
+        "comments.list_for_article": lambda: repos.comments.list_for_article(rng.randint(1, articles)),
+        "users.email_exists": lambda: repos.users.email_exists(f"user{rng.randint(1, users)}@example.com"),
+        "reads.get_by_session": lambda: repos.reads.get_by_session(rng.choice(sessions)),
+        "reads.latest_open": lambda: repos.reads.latest_open(rng.randint(1, users), rng.randint(1, articles),
+                                                             ["started", "in_progress"]),
+        "reads.update_by_session": lambda: repos.reads.update_by_session(
+            rng.choice(sessions), {"scroll_depth": rng.uniform(0, 100), "status": "in_progress"}),
+    }
+
+
+def measure_backend(repos, data, counter, iterations):
+    rng = random.Random(7)
+    results = {}
+    for name, op in operations(repos, data, rng).items():
+        samples, queries = [], 0
+        for _ in range(iterations):
+            before = counter()
+            start = time.perf_counter()
+            op()
+            samples.append(time.perf_counter() - start)
+            queries += counter() - before
+        samples.sort()
+        results[name] = {
+            "queries_per_call": round(queries / iterations, 2),
+            "p50_ms": round(samples[len(samples) // 2] * 1000, 3),
+            "p95_ms": round(samples[int(len(samples) * 0.95) - 1] * 1000, 3),
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", default="small")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="per-call latency of the Supabase stand-in")
+    args = parser.parse_args(argv)
+
+    data = build(args.scale)
+    results = {}
+
+    fake = FakeSupabase(Latency(args.latency_ms / 1000))
+    for table, rows in build(args.scale).items():
+        fake.db.insert_rows(table, rows)
+    results["supabase"] = measure_backend(build_repositories("supabase", client=fake), data,
+                                          lambda: fake.calls, args.iterations)
+
+    seed_orm(data)
+    with CaptureQueriesContext(connection) as captured:
+        results["django"] = measure_backend(build_repositories("django"), data,
+                                            lambda: len(captured.captured_queries), args.iterations)
+
+    report("repositories", {"config": vars(args), "backends": results})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Fault injection against the local stand-in: the same page views through the
+bare client and through blog.resilience.ResilientClient.
+
+Scenarios (benchmarks.fakes.Faults on every round trip):
+  flaky     - --error-rate of round trips reset the connection
+  slowdown  - --hang-rate of round trips stall for --hang-seconds
+  outage    - Supabase is down for --outage-seconds, then comes back
+For each: share of page views answered (fresh or stale), latency, how long
+view threads were held, how many round trips Supabase served and how many
+answers came from the stale-read copy.
+
+Then through the real views: stale article/comment reads and a 503 with
+Retry-After during an outage, auth/status unaffected, and SMTP failing fast
+once its breaker opens.
+
+    python -m benchmarks.resilience --threads 32 --requests 400
+"""
+
+import argparse
+import threading
+import time
+
+from benchmarks.common import percentile, report, setup_app
+
+
+def page_view(repos, article_id):
+    article = repos.articles.get(article_id)
+    comments = repos.comments.list_for_article(article_id)
+    return article, comments
+
+
+def drive(repos, article_ids, threads, requests, during=None):
+    """Run `requests` page views on `threads` workers; `during(i)` is called before view i."""
+    latencies, outcomes = [], {"ok": 0, "failed": 0}
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def worker():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            if during is not None:
+                during(i)
+            start = time.perf_counter()
+            try:
+                page_view(repos, article_ids[i % len(article_ids)])
+                outcome = "ok"
+            except Exception:
+                outcome = "failed"
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                outcomes[outcome] += 1
+
+    start = time.perf_counter()
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {
+        **outcomes,
+        "answered_pct": round(100 * outcomes["ok"] / requests, 1),
+        "wall_s": round(wall, 2),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "max_ms": round(latencies[-1] * 1000, 1),
+        "thread_seconds_held": round(sum(latencies), 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--latency-ms", type=float, default=5)
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    parser.add_argument("--hang-rate", type=float, default=0.05)
+    parser.add_argument("--hang-seconds", type=float, default=3.0)
+    parser.add_argument("--outage-seconds", type=float, default=0.3)
+    parser.add_argument("--timeout", type=float, default=0.5)
+    args = parser.parse_args(argv)
+
+    setup_app(BREAKER_RESET_SECONDS="0.2", SUPABASE_TIMEOUT_SECONDS=str(args.timeout))
+
+    from django.test import Client
+
+    from benchmarks.dataset import seed
+    from benchmarks.fakes import FakeSupabase, Faults, get_fake_client, install_fake_smtp
+    from blog import helper, resilience
+    from blog.repositories import build_repositories
+
+    def fresh(faults, resilient):
+        fake = FakeSupabase(faults)
+        seed(fake, scale="small")
+        resilience.reset_breakers()
+        client = resilience.ResilientClient(fake, timeout=args.timeout) if resilient else fake
+        return fake, client, build_repositories("supabase", client=client)
+
+    latency = args.latency_ms / 1000
+    scenarios = {
+        "flaky": lambda: Faults(latency, latency / 5, seed=1, error_rate=args.error_rate),
+        "slowdown": lambda: Faults(latency, latency / 5, seed=1, hang_rate=args.hang_rate,
+                                   hang_seconds=args.hang_seconds),
+        "outage": lambda: Faults(latency, latency / 5, seed=1),
+    }
+    results = {}
+    for name, make_faults in scenarios.items():
+        results[name] = {}
+        for mode in ("bare", "resilient"):
+            faults = make_faults()
+            fake, client, repos = fresh(faults, mode == "resilient")
+            article_ids = [str(row["id"]) for row in fake.db.table("articles").rows[:40]]
+            during = None
+            if name == "outage":
+                # Warm up while healthy, then fail for outage-seconds partway through.
+                drive(repos, article_ids, args.threads, len(article_ids))
+                window = {}
+
+                def during(i, faults=faults, window=window):
+                    now = time.monotonic()
+                    if i == args.requests // 4:
+                        window.setdefault("start", now)
+                    start = window.get("start")
+                    faults.down = start is not None and now - start < args.outage_seconds
+            before = fake.db.calls
+            result = drive(repos, article_ids, args.threads, args.requests, during)
+            result["round_trips_served"] = fake.db.calls - before
+            if mode == "resilient":
+                result["breaker"] = resilience.breaker_states().get("supabase")
+                result["stale_reads_served"] = client.stale.served
+            results[name][mode] = result
+
+    # The views, with the app's own resilient client on the shared stand-in.
+    fake = get_fake_client()
+    faults = Faults(latency)
+    fake.db.latency = fake.storage.latency = faults
+    resilience.reset_breakers()
+    client = Client(HTTP_APP_TOKEN="benchmark-app-token")
+    warm = [row["id"] for row in fake.db.table("articles").rows if row.get("status") == "published"][:2]
+    for article_id in warm:
+        client.get(f"/articles/{article_id}")
+        client.get(f"/articles/{article_id}/comments")
+    faults.down = True
+    cold = client.get("/articles/999999")
+    views = {
+        "stale_article_status": client.get(f"/articles/{warm[0]}").status_code,
+        "stale_comments_status": client.get(f"/articles/{warm[0]}/comments").status_code,
+        "cold_article_status": cold.status_code,
+        "cold_article_retry_after": cold.get("Retry-After"),
+    }
+    start = time.perf_counter()
+    views["auth_status"] = client.get("/auth/status").status_code
+    views["auth_status_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    faults.down = False
+
+    smtp_faults = Faults(0.01)
+    smtp_faults.down = True
+    install_fake_smtp(smtp_faults)
+    sends = []
+    for _ in range(10):
+        start = time.perf_counter()
+        helper.send_confirmation("123456", "reader@example.com")
+        sends.append(round((time.perf_counter() - start) * 1000, 1))
+    views["smtp_send_ms_while_down"] = sends
+    views["smtp_breaker"] = resilience.breaker_states().get("smtp")
+
+    report("resilience", {"config": vars(args), "results": results, "views": views})
+
+
+if __name__ == "__main__":
+    main()
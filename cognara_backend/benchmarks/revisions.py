@@ -0,0 +1,130 @@
+"""
+Revision history storage and reconstruction (blog.revisions) for one large
+article saved --revisions times.
+
+Saves go through the same path as submit: repos.articles.update, then
+drafts.record_save. Most saves add or delete a sentence, some rewrite a few
+paragraphs and some change the title, as autosave and submit would.
+Run once per --every (REVISION_SNAPSHOT_EVERY); each run reports:
+  - bytes stored in article_revisions.data, against keeping every version
+    whole (raw, and zlib-compressed one by one)
+  - time and round trips to rebuild versions through revisions.content_at,
+    every rebuilt version compared to what was saved
+
+    python -m benchmarks.revisions --words 20000 --revisions 500 --every 10 25 50 100
+"""
+
+import argparse
+import random
+import time
+import zlib
+
+from benchmarks.autosave import WORDS, draft_text, edit
+from benchmarks.common import percentile, report, setup_app
+
+
+def rewrite(rng, text):
+    """Replace a few consecutive paragraphs."""
+    from blog.revisions import BLOCK_RE
+
+    blocks = [block for block in BLOCK_RE.split(text) if block]
+    at = rng.randrange(len(blocks))
+    count = rng.randint(1, 4)
+    fresh = ["<p>" + " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 120))) + ".</p>" for _ in range(count)]
+    return "".join(blocks[:at] + fresh + blocks[at + count:])
+
+
+def history(rng, words, revisions):
+    versions = [("Draft", draft_text(rng, words))]
+    for n in range(revisions - 1):
+        title, text = versions[-1]
+        roll = rng.random()
+        if roll < 0.1:
+            text = rewrite(rng, text)
+        else:
+            text = edit(rng, text)
+        if roll > 0.97:
+            title = f"Draft, take {n}"
+        versions.append((title, text))
+    return versions
+
+
+def run(versions, every, samples, fake):
+    from django.core.cache import cache
+    from django.test import override_settings
+
+    from blog import drafts, revisions
+    from blog.repositories import get_repos
+
+    repos = get_repos()
+    with override_settings(REVISION_SNAPSHOT_EVERY=every):
+        cache.clear()
+        title, content = versions[0]
+        article = repos.articles.create({"title": title, "content": content, "author_id": 1, "status": "draft"})
+        article_id = article["id"]
+        expected = {}
+        start = time.perf_counter()
+        drafts.record_save(article)
+        expected[article["version"]] = versions[0]
+        for title, content in versions[1:]:
+            article = repos.articles.update(article_id, {"title": title, "content": content})
+            drafts.record_save(article)
+            expected[article["version"]] = (title, content)
+        write_ms = (time.perf_counter() - start) * 1000 / len(versions)
+
+        rows = [row for row in fake.db.table("article_revisions").rows if row["article_id"] == article_id]
+        stored = sum(len(row["data"]) for row in rows)
+        whole = sum(len(content.encode("utf-8")) for _, content in versions)
+        whole_zlib = sum(len(zlib.compress(content.encode("utf-8"))) for _, content in versions)
+
+        rng = random.Random(every)
+        wanted = sorted(expected)
+        wanted = rng.sample(wanted, min(samples, len(wanted))) + [wanted[-1]]
+        timings, calls, correct = [], [], True
+        for version in wanted:
+            before = fake.db.calls
+            started = time.perf_counter()
+            rebuilt = revisions.content_at(article_id, version)
+            timings.append((time.perf_counter() - started) * 1000)
+            calls.append(fake.db.calls - before)
+            correct = correct and (rebuilt["title"], rebuilt["content"]) == expected[version]
+        timings.sort()
+
+    return {
+        "snapshot_every": every,
+        "revisions": len(rows),
+        "snapshots": sum(1 for row in rows if row["kind"] == revisions.SNAPSHOT),
+        "stored_kib": round(stored / 1024, 1),
+        "full_copies_kib": round(whole / 1024, 1),
+        "full_copies_zlib_kib": round(whole_zlib / 1024, 1),
+        "vs_full_copies": f"1/{round(whole / stored)}",
+        "vs_zlib_copies": f"1/{round(whole_zlib / stored, 1)}",
+        "write_ms_per_save": round(write_ms, 2),
+        "rebuild_p50_ms": round(percentile(timings, 0.5), 2),
+        "rebuild_p99_ms": round(percentile(timings, 0.99), 2),
+        "rebuild_max_ms": round(timings[-1], 2),
+        "round_trips_per_rebuild": round(sum(calls) / len(calls), 2),
+        "all_versions_match": correct,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, default=20000)
+    parser.add_argument("--revisions", type=int, default=500)
+    parser.add_argument("--every", type=int, nargs="+", default=[10, 25, 50, 100])
+    parser.add_argument("--samples", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args(argv)
+
+    setup_app(BENCH_LATENCY_MS=0)
+    from benchmarks.fakes import get_fake_client
+
+    versions = history(random.Random(args.seed), args.words, args.revisions)
+    fake = get_fake_client()
+    results = [run(versions, every, args.samples, fake) for every in args.every]
+    report("revisions", {"config": vars(args), "article_chars": len(versions[-1][1]), "results": results})
+
+
+if __name__ == "__main__":
+    main()
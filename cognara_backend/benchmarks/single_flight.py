@@ -0,0 +1,130 @@
+"""
+Upstream Supabase calls during a read burst on one article, with and without
+blog.singleflight.
+
+Each simulated request does what get_article + get_comments do (article with
+author names, comments with usernames) against the latency-injected stand-in.
+Requests arrive spread over --spread-ms in --waves waves, like a link being
+shared. Modes:
+  direct     - plain client, every request runs its own queries
+  coalesced  - SingleFlightClient: concurrent identical reads share a flight
+  swr        - coalesced + a stale-while-revalidate window
+Threads model WSGI workers; the asyncio run awaits the same repository calls
+through asyncio.to_thread, the way Django serves these sync views under ASGI.
+
+    python -m benchmarks.single_flight --requests 200 --latency-ms 30
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import threading
+import time
+
+from benchmarks.common import percentile, report, setup_django
+
+setup_django(INSTALLED_APPS=["django.contrib.auth", "django.contrib.contenttypes", "blog"],
+             AUTH_USER_MODEL="blog.User")
+
+from benchmarks.dataset import seed
+from benchmarks.fakes import FakeSupabase, Latency
+from blog.repositories import build_repositories
+from blog.singleflight import SingleFlight, SingleFlightClient
+
+
+def page_view(repos, article_id):
+    article = repos.articles.get(article_id)
+    comments = repos.comments.list_for_article(article_id)
+    author = repos.users.get_name(article["author_id"])
+    # Views mutate what they get back; each request must see its own copy.
+    article["viewed"] = True
+    return article, comments, author
+
+
+def burst(repos, requests, waves, spread, article_id):
+    latencies, errors = [], []
+    lock = threading.Lock()
+    rng = random.Random(1)
+
+    def one(delay):
+        time.sleep(delay)
+        start = time.perf_counter()
+        try:
+            article, comments, _ = page_view(repos, article_id)
+            assert article["id"] == int(article_id) and "viewed" in article
+        except Exception as e:
+            with lock:
+                errors.append(repr(e))
+            return
+        with lock:
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    for _ in range(waves):
+        threads = [threading.Thread(target=one, args=(rng.uniform(0, spread),)) for _ in range(requests // waves)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "seconds": round(elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.5), 1),
+        "p99_ms": round(percentile(latencies, 0.99), 1),
+        "mean_ms": round(statistics.fmean(latencies), 1) if latencies else None,
+        "errors": len(errors),
+    }
+
+
+def run_mode(mode, args):
+    fake = FakeSupabase(Latency(args.latency_ms / 1000, args.latency_ms / 10000, seed=1))
+    seed(fake, scale="small")
+    client = fake
+    flight = None
+    if mode != "direct":
+        flight = SingleFlight(swr_seconds=args.swr_seconds if mode == "swr" else 0.0)
+        client = SingleFlightClient(fake, flight)
+    repos = build_repositories("supabase", client=client)
+    # URL kwargs arrive as strings; the key normalisation lets "1" and 1 share a flight.
+    before = fake.db.calls
+    result = burst(repos, args.requests, args.waves, args.spread_ms / 1000, "1")
+    result["upstream_calls"] = fake.db.calls - before
+    result["upstream_calls_per_request"] = round(result["upstream_calls"] / args.requests, 3)
+    if flight is not None:
+        result.update(executed=flight.executed, coalesced=flight.coalesced, stale_served=flight.stale_served)
+    return result
+
+
+async def async_runs(args):
+    fake = FakeSupabase(Latency(args.latency_ms / 1000, 0, seed=1))
+    seed(fake, scale="small")
+    repos = build_repositories("supabase", client=SingleFlightClient(fake, SingleFlight()))
+    before = fake.db.calls
+    await asyncio.gather(*(asyncio.to_thread(page_view, repos, "1") for _ in range(args.requests // args.waves)))
+    threaded = fake.db.calls - before
+    return {
+        "to_thread_requests": args.requests // args.waves,
+        "to_thread_upstream_calls": threaded,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--waves", type=int, default=4)
+    parser.add_argument("--spread-ms", type=float, default=100)
+    parser.add_argument("--latency-ms", type=float, default=30)
+    parser.add_argument("--swr-seconds", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    results = {mode: run_mode(mode, args) for mode in ("direct", "coalesced", "swr")}
+    results["asyncio"] = asyncio.run(async_runs(args))
+    results["upstream_reduction"] = round(
+        results["direct"]["upstream_calls"] / max(1, results["coalesced"]["upstream_calls"]), 1)
+    report("single_flight", {"config": vars(args), "results": results})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+"""
+Bulk import of users, articles and article images from a directory.
+
+    <source>/users.ndjson     {"email", "username", "first_name", "last_name", "bio", "password_hash"}
+    <source>/articles.ndjson  {"author_email", "title", "content", "excerpt", "status", "images": [...]}
+    <source>/articles/*.md    "---" front matter (author_email, title, status, excerpt, images) + Markdown body
+
+Image paths are relative to <source>. Every row is validated first; invalid
+rows are reported and skipped. Valid rows go in CHUNK_SIZE at a time with one
+insert per chunk, and images are hashed and uploaded by a bounded thread pool.
+
+Re-running the same source is a no-op: users are matched by email, articles
+by import_hash (SHA-256 of author, title and content), and images are
+content-addressed (blog.images), so bytes already stored are never sent
+again, whichever article they belong to. Passwords are
+never imported in clear; rows without a `password_hash` get an unusable one
+and the author sets it with "forgot password".
+"""
+
+import hashlib
+import html
+import json
+import logging
+import mimetypes
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+
+from .images import BLOB_CACHE_SECONDS, blob_path, photo_bucket
+from .models import Article
+from .repositories import get_repos
+
+try:
+    import markdown
+except ImportError:  # optional; plain paragraphs otherwise
+    markdown = None
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+UPLOAD_WORKERS = 8
+
+ARTICLE_STATUSES = {value for value, _ in Article.STATUS_CHOICES}
+USER_COLUMNS = ("username", "email", "first_name", "last_name", "bio", "password_hash")
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+FRONT_MATTER_RE = re.compile(r"\A---\s*\n(.*?)\n---\s*\n?", re.S)
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def read_ndjson(path):
+    """Yield (where, row); unparsable lines come back as (where, None)."""
+    with open(path, encoding="utf-8") as handle:
+        for number, line in enumerate(handle, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield f"{os.path.basename(path)}:{number}", row if isinstance(row, dict) else None
+
+
+def render_markdown(text):
+    if markdown is not None:
+        return markdown.markdown(text)
+    paragraphs = [block.strip() for block in re.split(r"\n\s*\n", text) if block.strip()]
+    return "".join(f"<p>{html.escape(block)}</p>" for block in paragraphs)
+
+
+def read_markdown(path):
+    """Front matter is `key: value` lines; `images` is comma separated."""
+    with open(path, encoding="utf-8") as handle:
+        text = handle.read()
+    row = {}
+    match = FRONT_MATTER_RE.match(text)
+    if match:
+        for line in match.group(1).splitlines():
+            key, sep, value = line.partition(":")
+            if sep:
+                row[key.strip()] = value.strip()
+        text = text[match.end():]
+    if "images" in row:
+        row["images"] = [image.strip() for image in row["images"].split(",") if image.strip()]
+    row["content"] = render_markdown(text)
+    return row
+
+
+def read_articles(source):
+    path = os.path.join(source, "articles.ndjson")
+    if os.path.exists(path):
+        yield from read_ndjson(path)
+    folder = os.path.join(source, "articles")
+    if os.path.isdir(folder):
+        for name in sorted(os.listdir(folder)):
+            if name.endswith(".md"):
+                yield f"articles/{name}", read_markdown(os.path.join(folder, name))
+
+
+def validate_user(row):
+    if row is None:
+        return "not a JSON object"
+    email = str(row.get("email") or "").strip()
+    if not EMAIL_RE.match(email):
+        return "missing or invalid email"
+    if not str(row.get("username") or "").strip():
+        return "missing username"
+    if "password" in row:
+        return "plain-text password; provide password_hash instead"
+    return None
+
+
+def validate_article(row, source):
+    if row is None:
+        return "not a JSON object"
+    if not EMAIL_RE.match(str(row.get("author_email") or "").strip()):
+        return "missing or invalid author_email"
+    if not str(row.get("title") or "").strip() or not str(row.get("content") or "").strip():
+        return "title and content are required"
+    if row.get("status", "draft") not in ARTICLE_STATUSES:
+        return f"status must be one of {sorted(ARTICLE_STATUSES)}"
+    images = row.get("images") or []
+    if not isinstance(images, list):
+        return "images must be a list"
+    for image in images:
+        if not os.path.isfile(os.path.join(source, image)):
+            return f"image not found: {image}"
+    return None
+
+
+def article_hash(author_email, title, content):
+    payload = json.dumps([author_email, title, content], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _phase():
+    return {"read": 0, "invalid": 0, "existing": 0, "inserted": 0, "seconds": 0.0}
+
+
+def new_report(dry_run):
+    return {
+        "dry_run": dry_run,
+        "users": _phase(),
+        "articles": _phase(),
+        "images": {"read": 0, "existing": 0, "deduplicated": 0, "uploaded": 0, "failed": 0, "bytes": 0,
+                   "seconds": 0.0},
+        "errors": [],
+    }
+
+
+def throughput(report):
+    """rows/sec per table and MB/sec for images, from a finished report."""
+    rates = {}
+    for table in ("users", "articles"):
+        phase = report[table]
+        rates[f"{table}_rows_per_second"] = round(phase["read"] / phase["seconds"]) if phase["seconds"] else None
+    images = report["images"]
+    rates["images_mb_per_second"] = (round(images["bytes"] / 2**20 / images["seconds"], 2)
+                                     if images["seconds"] else None)
+    return rates
+
+
+def import_users(source, report, dry_run=False, chunk_size=CHUNK_SIZE, repos=None):
+    """Insert new users; returns the emails that exist (or would exist) afterwards."""
+    repos = repos or get_repos()
+    phase = report["users"]
+    start = time.perf_counter()
+    path = os.path.join(source, "users.ndjson")
+    rows = {}
+    for where, row in (read_ndjson(path) if os.path.exists(path) else ()):
+        phase["read"] += 1
+        error = validate_user(row)
+        if error:
+            phase["invalid"] += 1
+            report["errors"].append(f"{where}: {error}")
+            continue
+        user = {column: row.get(column) for column in USER_COLUMNS if row.get(column) is not None}
+        user["email"] = user["email"].strip().lower()
+        user["username"] = user["username"].strip().lower()
+        if user["email"] in rows:
+            phase["invalid"] += 1
+            report["errors"].append(f"{where}: duplicate email {user['email']}")
+            continue
+        user.setdefault("password_hash", make_password(None))
+        user.setdefault("bio", "Learner at Cognara")
+        rows[user["email"]] = user
+
+    known = set()
+    for chunk in _chunks(list(rows.values()), chunk_size):
+        existing = repos.users.ids_for_emails([user["email"] for user in chunk])
+        known.update(existing)
+        new = [user for user in chunk if user["email"] not in existing]
+        taken = repos.users.usernames_taken([user["username"] for user in new])
+        for user in [user for user in new if user["username"] in taken]:
+            phase["invalid"] += 1
+            report["errors"].append(f"users: username {user['username']} is taken ({user['email']})")
+        new = [user for user in new if user["username"] not in taken]
+        phase["existing"] += len(existing)
+        if new and not dry_run:
+            try:
+                repos.users.create_many(new)
+            except Exception as e:
+                logger.exception("User chunk insert failed")
+                report["errors"].append(f"users: chunk of {len(new)} failed: {e}")
+                continue
+        phase["inserted"] += len(new)
+        known.update(user["email"] for user in new)
+    phase["seconds"] = time.perf_counter() - start
+    return known
+
+
+def import_articles(source, report, dry_run=False, chunk_size=CHUNK_SIZE, workers=UPLOAD_WORKERS,
+                    repos=None, storage=None, pending_emails=()):
+    repos = repos or get_repos()
+    phase = report["articles"]
+    start = time.perf_counter()
+    rows = []
+    seen = set()
+    for where, row in read_articles(source):
+        phase["read"] += 1
+        error = validate_article(row, source)
+        if error:
+            phase["invalid"] += 1
+            report["errors"].append(f"{where}: {error}")
+            continue
+        author_email = row["author_email"].strip().lower()
+        article = {
+            "title": row["title"].strip(),
+            "content": row["content"],
+            "excerpt": row.get("excerpt") or "",
+            "status": row.get("status", "draft"),
+            "import_hash": article_hash(author_email, row["title"].strip(), row["content"]),
+        }
+        if article["import_hash"] in seen:
+            phase["existing"] += 1
+            continue
+        seen.add(article["import_hash"])
+        rows.append((where, author_email, article, row.get("images") or []))
+
+    authors = {}
+    for chunk in _chunks(sorted({author for _, author, _, _ in rows}), chunk_size):
+        authors.update(repos.users.ids_for_emails(chunk))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for chunk in _chunks(rows, chunk_size):
+            ready = []
+            for where, author_email, article, images in chunk:
+                if author_email in authors:
+                    ready.append((dict(article, author_id=authors[author_email]), images))
+                elif dry_run and author_email in pending_emails:
+                    ready.append((dict(article, author_id=None), images))
+                else:
+                    phase["invalid"] += 1
+                    report["errors"].append(f"{where}: unknown author {author_email}")
+            ids = repos.articles.ids_for_import_hashes([article["import_hash"] for article, _ in ready])
+            new = [article for article, _ in ready if article["import_hash"] not in ids]
+            phase["existing"] += len(ready) - len(new)
+            if new and not dry_run:
+                try:
+                    repos.articles.create_many(new)
+                except Exception as e:
+                    logger.exception("Article chunk insert failed")
+                    report["errors"].append(f"articles: chunk of {len(new)} failed: {e}")
+                    continue
+                ids.update(repos.articles.ids_for_import_hashes([article["import_hash"] for article in new]))
+            phase["inserted"] += len(new)
+
+            # Images of already-imported articles too, so a run that died mid-upload is finished off.
+            # On a dry run new articles have no id yet; a placeholder keeps their images apart.
+            uploads = [(ids.get(article["import_hash"]) or f"new-{article['import_hash'][:12]}", image)
+                       for article, images in ready for image in images]
+            import_images(source, uploads, report, dry_run, repos, storage, pool)
+    phase["seconds"] = time.perf_counter() - start - report["images"]["seconds"]
+
+
+def import_images(source, uploads, report, dry_run=False, repos=None, storage=None, pool=None):
+    """uploads: [(article_id, path relative to source)]; dry-run placeholder ids match no rows."""
+    if not uploads:
+        return
+    repos = repos or get_repos()
+    phase = report["images"]
+    start = time.perf_counter()
+    files = [os.path.join(source, image) for _, image in uploads]
+    digests = list(pool.map(file_sha256, files))
+    targets = list(dict.fromkeys(
+        (article_id, file_path, blob_path(digest, file_path))
+        for (article_id, _), file_path, digest in zip(uploads, files, digests)
+    ))
+    phase["read"] += len(uploads)
+
+    owners = repos.photos.articles_for_paths({path for _, _, path in targets})
+    links, blobs = [], {}
+    for article_id, file_path, path in targets:
+        if article_id in owners.get(path, ()):
+            phase["existing"] += 1
+            continue
+        links.append((article_id, path))
+        if owners.get(path) or path in blobs:
+            phase["deduplicated"] += 1
+        else:
+            blobs[path] = file_path
+    if dry_run:
+        phase["uploaded"] += len(blobs)
+        phase["bytes"] += sum(os.path.getsize(file_path) for file_path in blobs.values())
+        phase["seconds"] += time.perf_counter() - start
+        return
+
+    def upload(item):
+        path, file_path = item
+        with open(file_path, "rb") as handle:
+            data = handle.read()
+        content_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+        # upsert: the blob may be there already from a run that died before recording it.
+        bucket.upload(path=path, file=data, file_options={
+            "content-type": content_type, "cache-control": BLOB_CACHE_SECONDS, "upsert": "true",
+        })
+        return len(data)
+
+    bucket = photo_bucket(storage)
+    failed = set()
+    for (path, file_path), result in zip(blobs.items(), pool.map(_catching(upload), blobs.items())):
+        if isinstance(result, Exception):
+            failed.add(path)
+            report["errors"].append(f"image {file_path}: {result}")
+        else:
+            phase["bytes"] += result
+            phase["uploaded"] += 1
+    done = [{"article_id": article_id, "path": path} for article_id, path in links if path not in failed]
+    phase["failed"] += len(links) - len(done)
+    if done:
+        repos.photos.add_many(done)
+    phase["seconds"] += time.perf_counter() - start
+
+
+def _catching(func):
+    def wrapper(arg):
+        try:
+            return func(arg)
+        except Exception as e:
+            return e
+    return wrapper
+
+
+def run_import(source, dry_run=False, chunk_size=CHUNK_SIZE, workers=UPLOAD_WORKERS, repos=None, storage=None):
+    """Import everything under `source`; returns the report (see new_report)."""
+    repos = repos or get_repos()
+    report = new_report(dry_run)
+    emails = import_users(source, report, dry_run, chunk_size, repos)
+    import_articles(source, report, dry_run, chunk_size, workers, repos, storage, pending_emails=emails)
+    return report
@@ -0,0 +1,130 @@
+import hmac
+from datetime import datetime, timezone, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .helper import supabase
+
+
+CODE_TTL_SECONDS = 10 * 60
+MAX_ATTEMPTS = 5
+
+VERIFIED = "verified"
+MISMATCH = "mismatch"
+EXPIRED = "expired"
+LOCKED = "locked"
+
+
+class CacheCodeStore:
+    """
+    Verification codes kept in the Django cache. The cache TTL is the expiry,
+    so nothing has to be cleaned up and a lookup is a single get_many.
+
+    While a code is live, asking again re-sends it with its attempt count
+    kept, so a locked-out code stays locked until it expires.
+    """
+
+    def _keys(self, user_id):
+        return f"vcode:{user_id}", f"vcode:{user_id}:attempts"
+
+    def issue(self, user_id, code):
+        """
+        Store code unless a live one already exists (set-if-absent); returns the code to send.
+        """
+        code_key, attempts_key = self._keys(user_id)
+        if cache.add(code_key, code, CODE_TTL_SECONDS):
+            cache.set(attempts_key, 0, CODE_TTL_SECONDS)
+            return code
+        existing = cache.get(code_key)
+        if existing is None:
+            # Expired between add() and get(); take the slot again.
+            cache.set(code_key, code, CODE_TTL_SECONDS)
+            cache.set(attempts_key, 0, CODE_TTL_SECONDS)
+            return code
+        return existing
+
+    def verify(self, user_id, code):
+        code_key, attempts_key = self._keys(user_id)
+        stored = cache.get(code_key)
+        if stored is None:
+            return EXPIRED
+        # Count the guess before comparing: incr is atomic, so parallel guesses
+        # each get their own number and only MAX_ATTEMPTS of them are compared.
+        try:
+            attempts = cache.incr(attempts_key)
+        except ValueError:
+            cache.add(attempts_key, 0, CODE_TTL_SECONDS)
+            attempts = cache.incr(attempts_key)
+        if attempts > MAX_ATTEMPTS:
+            return LOCKED
+        if hmac.compare_digest(str(code), str(stored)):
+            cache.delete_many([code_key, attempts_key])
+            return VERIFIED
+        return MISMATCH
+
+
+class SupabaseCodeStore:
+    """
+    Fallback for deployments without a shared cache. Uses the verification_codes
+    table (one row per user, see supabase/migrations); expired rows are filtered
+    out by expires_at in the same query, so no cleanup queries are needed, and
+    a guess is the verify_code_attempt function.
+    Same rules as CacheCodeStore: a live code is re-sent with its attempts kept.
+    """
+
+    table = "verification_codes"
+
+    def __init__(self, client=None):
+        self.client = client or supabase
+
+    def issue(self, user_id, code):
+        now = datetime.now(timezone.utc)
+        # An expired row would block the insert below; clear it first.
+        self.client.table(self.table).delete().eq("user_id", user_id).lte("expires_at", now.isoformat()).execute()
+        row = {
+            "user_id": user_id,
+            "code": code,
+            "attempts": 0,
+            "expires_at": (now + timedelta(seconds=CODE_TTL_SECONDS)).isoformat(),
+        }
+        # Set-if-absent: a live row (and its attempt count) is left as it is.
+        inserted = self.client.table(self.table).upsert(row, on_conflict="user_id", ignore_duplicates=True).execute()
+        if inserted.data:
+            return code
+        existing = (self.client.table(self.table).select("code").eq("user_id", user_id)
+                    .gt("expires_at", now.isoformat()).limit(1).execute())
+        if existing.data:
+            return existing.data[0]["code"]
+        # Expired in between; take the slot.
+        self.client.table(self.table).upsert(row, on_conflict="user_id").execute()
+        return code
+
+    def verify(self, user_id, code):
+        # verify_code_attempt counts the guess and compares in one row update (one round trip).
+        return self.client.rpc("verify_code_attempt", {
+            "p_user_id": user_id,
+            "p_code": str(code),
+            "p_max_attempts": MAX_ATTEMPTS,
+        }).execute().data
+
+
+# Caches that live inside one process: codes issued by one worker would be
+# invisible to the others.
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def get_code_store():
+    """
+    VERIFICATION_CODE_STORE 'cache' or 'db'; 'auto' uses the cache when it is
+    shared between processes and falls back to the database when it is not.
+    """
+    choice = getattr(settings, "VERIFICATION_CODE_STORE", "auto")
+    if choice == "auto":
+        choice = "db" if settings.CACHES["default"]["BACKEND"] in PROCESS_LOCAL_CACHES else "cache"
+    if choice == "db":
+        return SupabaseCodeStore()
+    return CacheCodeStore()
@@ -0,0 +1,128 @@
+"""
+Draft autosave by patch instead of by whole article.
+
+SubmitArticlePage used to POST the full title and content to `submit` on every
+autosave. POST autosave takes only what changed since the version the editor
+last saw:
+
+    {"article_id": 42, "base_version": 7, "ops": [[120, 3, "new text"], ...], "title": "...", "length": 118234}
+
+Each op is [start, delete_count, insert_text] against the base version's
+content. Offsets are UTF-16 code units (JavaScript string indices), ops are
+sorted and do not overlap. `title` is only sent when it changed, `length` is
+the UTF-16 length the client expects afterwards and catches a client whose
+copy has drifted.
+
+Every write to an article's title or content bumps articles.version (a trigger
+on Supabase, DjangoArticlesRepo.update here). A save against any other version
+is a conflict (409 with the current version): the editor refetches and
+rebases. The check is done again by the write itself, which only matches the
+row at base_version, so two tabs or two workers cannot both win.
+
+The content of the version last saved is kept in CACHES['default'] so a save
+does not read the article back; a miss falls back to one select. Each save is
+recorded in the revision history (blog.revisions) by the same write; the cached
+copy is what its delta is taken against.
+"""
+
+import logging
+
+from django.core.cache import cache
+from django.conf import settings
+
+from . import revisions
+from .repositories import get_repos
+from .revisions import PatchError, apply_patch, utf16_length
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = "drafts:{}"
+
+
+class VersionConflict(Exception):
+    def __init__(self, version):
+        super().__init__(f"Article is at version {version}")
+        self.version = version
+
+
+def _remember(draft):
+    cache.set(CACHE_KEY.format(draft["id"]), draft, getattr(settings, "AUTOSAVE_CACHE_SECONDS", 3600))
+
+
+def _draft(article_id, base_version):
+    draft = cache.get(CACHE_KEY.format(article_id))
+    if draft is None or draft["version"] != base_version:
+        draft = get_repos().articles.get_draft(article_id)
+        if draft is not None:
+            _remember(draft)
+    return draft
+
+
+def create_draft(author_id, title, content):
+    article = get_repos().articles.create({
+        "title": title or "",
+        "content": content or "",
+        "author_id": author_id,
+        "status": "draft",
+    })
+    return record_save(article)
+
+
+def record_save(article):
+    """
+    Add a version written outside save_draft (submit, restore, create_draft) to
+    the revision history and cache it. `article` is the row the write returned.
+    Returns the cached draft.
+    """
+    draft = {"id": article["id"], "author_id": article["author_id"], "title": article.get("title") or "",
+             "content": article.get("content") or "", "version": article.get("version") or 1, "depth": None}
+    base = cache.get(CACHE_KEY.format(article["id"]))
+    if base is not None and base["version"] == draft["version"]:
+        return base  # nothing changed, no new version
+    try:
+        revision, draft["depth"] = revisions.build(draft["version"], draft["title"], draft["content"], base)
+        get_repos().revisions.add(article["id"], revision)
+    except Exception:
+        # The next save then starts the chain again from a snapshot.
+        logger.exception("Recording revision %s of article %s failed", draft["version"], article["id"])
+        draft["depth"] = None
+    _remember(draft)
+    return draft
+
+
+def save_draft(article_id, author_id, base_version, ops, title=None, length=None):
+    """
+    Apply `ops` to version `base_version` of the author's article and store it
+    as the next version. Returns the new version. Raises LookupError if the
+    article is missing or not the author's, VersionConflict or PatchError.
+    """
+    max_chars = getattr(settings, "AUTOSAVE_MAX_CONTENT_CHARS", 2_000_000)
+    draft = _draft(article_id, base_version)
+    if draft is None or draft["author_id"] != author_id:
+        raise LookupError(f"No article {article_id} for this author")
+    if draft["version"] != base_version:
+        raise VersionConflict(draft["version"])
+
+    content = apply_patch(draft["content"], ops)
+    if length is not None and utf16_length(content) != length:
+        raise PatchError(f"Patched content has length {utf16_length(content)}, client expected {length}")
+    if len(content) > max_chars:
+        raise PatchError("Article is too long")
+    if title is not None and title == draft["title"]:
+        title = None
+    if not ops and title is None:
+        return base_version
+
+    new_title = draft["title"] if title is None else title
+    revision, depth = revisions.build(base_version + 1, new_title, content, draft, ops)
+    version = get_repos().articles.save_draft(article_id, author_id, base_version, title, content, revision)
+    if version is None:
+        # Someone else saved in between (another tab, another worker, submit).
+        cache.delete(CACHE_KEY.format(article_id))
+        current = get_repos().articles.get_draft(article_id)
+        if current is None:
+            raise LookupError(f"No article {article_id} for this author")
+        raise VersionConflict(current["version"])
+
+    _remember(dict(draft, content=content, title=new_title, version=version, depth=depth))
+    return version
@@ -0,0 +1,64 @@
+"""
+Streaming NDJSON / CSV export of the content tables.
+
+Rows are paged with keyset pagination on id (`id > last_id order by id limit
+N`), so each page is an index range scan and memory stays at one page no
+matter how big the table is. `since` restricts the export to rows whose
+updated_at is at or after it, for incremental exports; a checkpoint is just
+(table, since, last_id), so an interrupted export resumes where it stopped.
+"""
+
+import csv
+import io
+import zlib
+
+from .encoding import dumps
+from .repositories import get_repos
+
+EXPORT_TABLES = ("articles", "comments", "article_reads")
+FORMATS = ("ndjson", "csv")
+PAGE_SIZE = 1000
+
+
+def export_pages(table, since=None, after_id=0, page_size=PAGE_SIZE, repos=None):
+    """Yield lists of rows, in id order, after `after_id`."""
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"table must be one of {EXPORT_TABLES}")
+    repos = repos or get_repos()
+    while True:
+        rows = repos.export.page(table, after_id, since, page_size)
+        if not rows:
+            return
+        yield rows
+        after_id = rows[-1]["id"]
+        if len(rows) < page_size:
+            return
+
+
+def encode_pages(pages, fmt="ndjson", header=True):
+    """Yield one bytes chunk per page."""
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {FORMATS}")
+    columns = None
+    for rows in pages:
+        if fmt == "ndjson":
+            yield b"".join(dumps(row) + b"\n" for row in rows)
+            continue
+        buffer = io.StringIO()
+        first = columns is None
+        columns = columns or list(rows[0])
+        writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+        if first and header:
+            writer.writeheader()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def gzip_chunks(chunks, level=6):
+    """Compress a chunk stream into one gzip member without buffering it."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,310 @@
+"""
+RSS/Atom feeds and sitemap.xml, kept up to date as articles are published.
+
+Each document (rss, atom, the sitemap index and one urlset per shard) is a
+feed_documents row holding its entries and the XML already rendered from them.
+Serving one is a cache get (or one row on a cold cache) plus an ETag check;
+nothing is built on request.
+
+When submit, change_status or a restore touches an article that is or was
+published, article_changed() updates only the documents that article is in:
+the two feeds (the newest FEED_SIZE articles) and the sitemap shard for its id
+(SITEMAP_SHARD_SIZE ids per shard; a sitemap may list at most 50,000 URLs)
+plus the index. Writes are conditional on the etag read, so two publishes at once
+retry instead of losing one another's entry.
+
+`python manage.py build_feeds` builds everything from the articles table, for
+the first deploy or after data was changed behind the app's back.
+"""
+
+import hashlib
+import logging
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape, quoteattr
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .helper import strip_tags
+from .repositories import get_repos
+
+logger = logging.getLogger(__name__)
+
+RSS = "rss"
+ATOM = "atom"
+SITEMAP_INDEX = "sitemap"
+FEEDS = (RSS, ATOM)
+SAVE_ATTEMPTS = 3
+EXCERPT_CHARS = 300
+
+
+def shard_name(shard):
+    return f"sitemap-{shard}"
+
+
+def shard_of(article_id):
+    return int(article_id) // settings.SITEMAP_SHARD_SIZE
+
+
+def _as_datetime(value):
+    # Supabase returns ISO strings, the ORM backend aware datetimes
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _iso(value):
+    return _as_datetime(value).astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def article_url(article_id):
+    return f"{settings.FRONTEND_URL.rstrip('/')}/article/{article_id}"
+
+
+def document_url(name):
+    path = {RSS: "feeds/rss.xml", ATOM: "feeds/atom.xml", SITEMAP_INDEX: "sitemap.xml"}.get(name, f"{name}.xml")
+    return f"{settings.FEEDS_BASE_URL.rstrip('/')}/{path}"
+
+
+def feed_entry(article, author=None):
+    """What the feeds keep of a published article."""
+    excerpt = article.get("excerpt") or ""
+    if not excerpt and article.get("content"):
+        excerpt = " ".join(strip_tags(article["content"]).split())[:EXCERPT_CHARS]
+    author = author or {"first_name": article.get("author_first_name"), "last_name": article.get("author_last_name")}
+    return {
+        "id": article["id"],
+        "title": article.get("title") or "",
+        "excerpt": excerpt,
+        "author": " ".join(part for part in (author.get("first_name"), author.get("last_name")) if part),
+        "published": _iso(article["created_at"]),
+        "updated": _iso(article.get("updated_at") or article["created_at"]),
+    }
+
+
+def render_rss(entries):
+    items = "".join(
+        "<item>"
+        f"<title>{escape(entry['title'])}</title>"
+        f"<link>{escape(article_url(entry['id']))}</link>"
+        f"<guid isPermaLink=\"true\">{escape(article_url(entry['id']))}</guid>"
+        f"<pubDate>{format_datetime(_as_datetime(entry['published']))}</pubDate>"
+        + (f"<dc:creator>{escape(entry['author'])}</dc:creator>" if entry["author"] else "")
+        + f"<description>{escape(entry['excerpt'])}</description>"
+        "</item>"
+        for entry in entries
+    )
+    built = max((entry["updated"] for entry in entries), default=_iso(datetime.now(timezone.utc)))
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom" xmlns:dc="http://purl.org/dc/elements/1.1/">'
+        "<channel>"
+        f"<title>{escape(settings.FEEDS_TITLE)}</title>"
+        f"<link>{escape(settings.FRONTEND_URL)}</link>"
+        f"<description>{escape(settings.FEEDS_DESCRIPTION)}</description>"
+        f"<atom:link href={quoteattr(document_url(RSS))} rel=\"self\" type=\"application/rss+xml\"/>"
+        f"<lastBuildDate>{format_datetime(_as_datetime(built))}</lastBuildDate>"
+        f"{items}</channel></rss>\n"
+    )
+
+
+def render_atom(entries):
+    items = "".join(
+        "<entry>"
+        f"<title>{escape(entry['title'])}</title>"
+        f"<link href={quoteattr(article_url(entry['id']))}/>"
+        f"<id>{escape(article_url(entry['id']))}</id>"
+        f"<published>{entry['published']}</published>"
+        f"<updated>{entry['updated']}</updated>"
+        f"<author><name>{escape(entry['author'] or settings.FEEDS_TITLE)}</name></author>"
+        f"<summary>{escape(entry['excerpt'])}</summary>"
+        "</entry>"
+        for entry in entries
+    )
+    updated = max((entry["updated"] for entry in entries), default=_iso(datetime.now(timezone.utc)))
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<feed xmlns="http://www.w3.org/2005/Atom">'
+        f"<title>{escape(settings.FEEDS_TITLE)}</title>"
+        f"<subtitle>{escape(settings.FEEDS_DESCRIPTION)}</subtitle>"
+        f"<link href={quoteattr(settings.FRONTEND_URL)}/>"
+        f"<link href={quoteattr(document_url(ATOM))} rel=\"self\"/>"
+        f"<id>{escape(settings.FRONTEND_URL)}</id>"
+        f"<updated>{updated}</updated>"
+        f"{items}</feed>\n"
+    )
+
+
+def render_urlset(entries):
+    """entries: {article_id: lastmod}, as a JSON object (string keys)."""
+    urls = "".join(
+        f"<url><loc>{escape(article_url(article_id))}</loc><lastmod>{entries[article_id]}</lastmod></url>"
+        for article_id in sorted(entries, key=int)
+    )
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>\n')
+
+
+def render_index(entries):
+    """entries: {shard: lastmod of its newest URL}."""
+    sitemaps = "".join(
+        f"<sitemap><loc>{escape(document_url(shard_name(shard)))}</loc><lastmod>{entries[shard]}</lastmod></sitemap>"
+        for shard in sorted(entries, key=int)
+    )
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{sitemaps}</sitemapindex>\n')
+
+
+def _render(name, entries):
+    if name == RSS:
+        return render_rss(entries)
+    if name == ATOM:
+        return render_atom(entries)
+    if name == SITEMAP_INDEX:
+        return render_index(entries)
+    return render_urlset(entries)
+
+
+def _etag(body):
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()[:32]
+
+
+def _cache_key(name):
+    return f"feeds:{name}"
+
+
+def _cached(name, body, etag):
+    value = {"body": body, "etag": etag}
+    cache.set(_cache_key(name), value, settings.FEEDS_CACHE_SECONDS)
+    return value
+
+
+def _update(name, change, empty, repos):
+    """
+    Apply change(entries) -> new entries, or None for no change, to a stored
+    document and save it re-rendered. Returns the new entries or None.
+    """
+    for _ in range(SAVE_ATTEMPTS):
+        row = repos.feeds.get(name)
+        entries = change(row["entries"] if row else empty())
+        if entries is None:
+            return None
+        body = _render(name, entries)
+        etag = _etag(body)
+        if repos.feeds.save(name, entries, body, etag, row["etag"] if row else None):
+            _cached(name, body, etag)
+            return entries
+    raise RuntimeError(f"{name} kept changing under concurrent updates")
+
+
+def _change_feed(changes, newest):
+    """changes: {article_id: feed entry, or None to take the article out}."""
+    def change(entries):
+        kept = [existing for existing in entries if existing["id"] not in changes]
+        if len(kept) < len(entries) and len(entries) >= settings.FEED_SIZE \
+                and any(changes[existing["id"]] is None for existing in entries if existing["id"] in changes):
+            # A removed article may have been holding a place the next-newest one now fills.
+            refilled = newest()
+            return None if refilled == entries else refilled
+        kept.extend(entry for entry in changes.values() if entry is not None)
+        kept.sort(key=lambda existing: (existing["published"], existing["id"]), reverse=True)
+        kept = kept[:settings.FEED_SIZE]
+        return None if kept == entries else kept
+    return change
+
+
+def _change_mapping(changes):
+    """Set keys of a sitemap shard or of the index; a None value removes the key."""
+    def change(entries):
+        updated = dict(entries)
+        for key, value in changes.items():
+            if value is None:
+                updated.pop(key, None)
+            else:
+                updated[key] = value
+        return None if updated == entries else updated
+    return change
+
+
+def article_changed(article, repos=None):
+    """
+    Bring the feeds and the sitemap in line with `article` (the row a write
+    returned): in them if it is published, out of them if not.
+    """
+    articles_changed([article], repos)
+
+
+def articles_changed(articles, repos=None):
+    """article_changed for several articles, reading and writing each document once."""
+    repos = repos or get_repos()
+    published = [article for article in articles if article.get("status") == "published"]
+    names = repos.users.names_by_ids({article["author_id"] for article in published if article.get("author_id")}) \
+        if published else {}
+    changes = {article["id"]: None for article in articles}
+    for article in published:
+        changes[article["id"]] = feed_entry(article, names.get(article.get("author_id")))
+    refilled = []
+
+    def newest():
+        # Both feeds refill from the same query; run it once.
+        if not refilled:
+            refilled.append([feed_entry(row) for row in repos.articles.recent_published(settings.FEED_SIZE)])
+        return refilled[0]
+
+    for name in FEEDS:
+        _update(name, _change_feed(changes, newest), list, repos)
+
+    shards = {}
+    for article_id, entry in changes.items():
+        shards.setdefault(shard_of(article_id), {})[str(article_id)] = entry["updated"] if entry else None
+    index = {}
+    for shard, urls in shards.items():
+        urls = _update(shard_name(shard), _change_mapping(urls), dict, repos)
+        if urls is not None:
+            index[str(shard)] = max(urls.values()) if urls else None
+    if index:
+        _update(SITEMAP_INDEX, _change_mapping(index), dict, repos)
+
+
+def rebuild(repos=None):
+    """Build every document from the articles table; returns {document: number of entries}."""
+    repos = repos or get_repos()
+    sizes = {}
+    entries = [feed_entry(article) for article in repos.articles.recent_published(settings.FEED_SIZE)]
+    for name in FEEDS:
+        _save(name, entries, repos)
+        sizes[name] = len(entries)
+
+    shards = {}
+    for row in repos.articles.published_lastmod():
+        shards.setdefault(str(shard_of(row["id"])), {})[str(row["id"])] = _iso(row["updated_at"] or row["created_at"])
+    stale = {row["name"] for row in repos.feeds.names() if row["name"].startswith("sitemap-")}
+    for shard, urls in shards.items():
+        _save(shard_name(shard), urls, repos)
+        stale.discard(shard_name(shard))
+        sizes[shard_name(shard)] = len(urls)
+    for name in stale:
+        repos.feeds.delete(name)
+    index = {shard: max(urls.values()) for shard, urls in shards.items()}
+    _save(SITEMAP_INDEX, index, repos)
+    sizes[SITEMAP_INDEX] = len(index)
+    return sizes
+
+
+def _save(name, entries, repos):
+    body = _render(name, entries)
+    etag = _etag(body)
+    repos.feeds.put(name, entries, body, etag)
+    _cached(name, body, etag)
+
+
+def get_document(name, repos=None):
+    """{'body', 'etag'} of a stored document, or None; cache first, then feed_documents."""
+    cached = cache.get(_cache_key(name))
+    if cached is not None:
+        return cached
+    row = (repos or get_repos()).feeds.get_body(name)
+    if row is None:
+        return None
+    return _cached(name, row["body"], row["etag"])
@@ -0,0 +1,157 @@
+"""
+Google ID-token verification against a cached copy of Google's signing keys.
+
+id_token.verify_oauth2_token(..., google_requests.Request()) downloads Google's
+certificates on every sign-in. GoogleKeys keeps the JWKS (GOOGLE_JWKS_URL) for
+the max-age Google sends in Cache-Control, refreshes it in the background
+shortly before it runs out, fetches through one pooled requests.Session and
+verifies signatures locally with PyJWT (what google-auth itself uses for JWKS).
+
+An unknown `kid` (Google rotated early) forces one refetch, at most every
+REFETCH_INTERVAL seconds so forged kids cannot make us hammer Google. If a
+refresh fails the previous keys stay in use; they are valid for days. With
+no keys to fall back on, a failed fetch raises DependencyUnavailable (503).
+"""
+
+import logging
+import re
+import threading
+import time
+
+import jwt
+import requests
+from django.conf import settings
+
+from .resilience import DependencyUnavailable, guarded
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_JWKS_URL = "https://www.googleapis.com/oauth2/v3/certs"
+GOOGLE_ISSUERS = ["accounts.google.com", "https://accounts.google.com"]
+DEFAULT_MAX_AGE = 3600
+REFRESH_AHEAD = 300       # seconds before expiry a background refresh starts
+RETRY_AFTER_FAILURE = 60  # keep failed-refresh keys this much longer before trying again
+REFETCH_INTERVAL = 30
+FETCH_TIMEOUT = 5.0
+CLOCK_SKEW = 10
+
+
+def max_age(headers):
+    """Seconds the response may be cached for, from Cache-Control max-age minus Age."""
+    match = re.search(r"max-age=(\d+)", headers.get("Cache-Control", ""))
+    if not match:
+        return DEFAULT_MAX_AGE
+    try:
+        age = int(headers.get("Age", 0))
+    except ValueError:
+        age = 0
+    return max(0, int(match.group(1)) - age)
+
+
+class GoogleKeys:
+    """Google's public keys by kid, cached per Cache-Control."""
+
+    def __init__(self, url=GOOGLE_JWKS_URL, session=None, clock=time.time):
+        self.url = url
+        self.session = session or requests.Session()
+        self._clock = clock
+        self._fetch_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._keys = {}
+        self._expires_at = 0.0
+        self._refreshing = False
+        self._last_forced = 0.0
+        self.fetches = 0
+
+    def get(self, kid):
+        now = self._clock()
+        if not self._keys or now >= self._expires_at:
+            self.refresh()
+        elif now >= self._expires_at - REFRESH_AHEAD:
+            self._refresh_in_background()
+        key = self._keys.get(kid)
+        if key is None:
+            with self._state_lock:
+                force = now - self._last_forced >= REFETCH_INTERVAL
+                if force:
+                    self._last_forced = now
+            if force:
+                self.refresh(force=True)
+                key = self._keys.get(kid)
+        if key is None:
+            raise ValueError(f"No Google signing key with kid {kid!r}")
+        return key
+
+    def refresh(self, force=False):
+        with self._fetch_lock:
+            # Another thread may have refreshed while this one waited for the lock.
+            if not force and self._keys and self._clock() < self._expires_at - REFRESH_AHEAD:
+                return
+            try:
+                response = guarded("google", lambda: self.session.get(self.url, timeout=FETCH_TIMEOUT), FETCH_TIMEOUT)
+                response.raise_for_status()
+                keys = {}
+                for jwk in response.json()["keys"]:
+                    if jwk.get("use", "sig") == "sig" and jwk.get("kid"):
+                        keys[jwk["kid"]] = jwt.PyJWK(jwk, algorithm=jwk.get("alg", "RS256"))
+            except Exception as e:
+                if not self._keys:
+                    if isinstance(e, DependencyUnavailable):
+                        raise
+                    # A 5xx, a body that is not a JWKS, a key PyJWT cannot load: Google's side, not the token's.
+                    raise DependencyUnavailable("google", f"{type(e).__name__}: {e}") from e
+                logger.warning("Refreshing Google signing keys failed, keeping the cached ones: %s", e)
+                self._expires_at = self._clock() + RETRY_AFTER_FAILURE
+                return
+            self.fetches += 1
+            self._keys = keys
+            self._expires_at = self._clock() + max_age(response.headers)
+
+    def _refresh_in_background(self):
+        with self._state_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def refresh():
+            try:
+                self.refresh()
+            finally:
+                with self._state_lock:
+                    self._refreshing = False
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+
+_keys = None
+_keys_lock = threading.Lock()
+
+
+def google_keys():
+    global _keys
+    with _keys_lock:
+        if _keys is None:
+            _keys = GoogleKeys(getattr(settings, "GOOGLE_JWKS_URL", GOOGLE_JWKS_URL))
+        return _keys
+
+
+def verify_google_token(credential, audience=None, keys=None):
+    """
+    Claims of a Google ID token signed by Google for `audience` (default
+    GOOGLE_CLIENT_ID). Raises ValueError for anything invalid, like
+    id_token.verify_oauth2_token.
+    """
+    try:
+        header = jwt.get_unverified_header(credential)
+        key = (keys or google_keys()).get(header.get("kid"))
+        return jwt.decode(
+            credential,
+            key.key,
+            algorithms=[key.algorithm_name],
+            audience=audience or settings.GOOGLE_CLIENT_ID,
+            issuer=GOOGLE_ISSUERS,
+            leeway=CLOCK_SKEW,
+            options={"require": ["exp", "iat", "iss", "aud", "sub"]},
+        )
+    except jwt.PyJWTError as e:
+        raise ValueError(f"Invalid Google ID token: {e}") from e
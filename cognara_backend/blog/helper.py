@@ -3,18 +3,23 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from django.conf import settings
 from django.http import JsonResponse
+from django.utils.module_loading import import_string
 import re
 import random
 import os
-from supabase import create_client
-from functools import wraps
+from supabase import ClientOptions, create_client
 from rest_framework.response import Response
 import uuid
 import math
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 import json
+import logging
 from datetime import datetime, timezone, timedelta
+from .instrumentation import traced_client, trace_call
+from .singleflight import coalescing_client
+from .resilience import DependencyUnavailable, guarded, resilient_client
+from .repositories import get_repos
 
 
 
@@ -22,30 +27,59 @@ SUPABASE_URL = settings.SUPABASE_URL
 SUPABASE_KEY = settings.SUPABASE_KEY
 SUPABASE_BUCKET = {'Articles':'article-photos', "Assets": 'assets'}
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+logger = logging.getLogger(__name__)
+
+def create_supabase_client():
+    """
+    SUPABASE_CLIENT_FACTORY (dotted path) swaps in another client, e.g. the
+    local stand-in in benchmarks.fakes.
+    """
+    factory = getattr(settings, 'SUPABASE_CLIENT_FACTORY', None)
+    if factory:
+        return import_string(factory)()
+    # Transport timeouts free the outbound thread too; blog.resilience enforces the overall deadline.
+    options = ClientOptions(postgrest_client_timeout=settings.SUPABASE_TIMEOUT_SECONDS,
+                            storage_client_timeout=settings.SUPABASE_TIMEOUT_SECONDS)
+    return create_client(SUPABASE_URL, SUPABASE_KEY, options=options)
+
+supabase = coalescing_client(resilient_client(traced_client(create_supabase_client())))
+
+
+def unavailable(error):
+    """503 for a view whose dependency is down (breaker open, deadline missed)."""
+    response = JsonResponse({'error': 'Service temporarily unavailable, please retry shortly'}, status=503)
+    response['Retry-After'] = str(max(1, math.ceil(error.retry_after or 1)))
+    return response
+
+
+def _smtp_send(msg, name):
+    """Send through SMTP with a socket timeout, behind the smtp circuit breaker."""
+    def send():
+        with trace_call("smtp", name), smtplib.SMTP(settings.EMAIL_HOST, 587, timeout=settings.SMTP_TIMEOUT_SECONDS) as server:
+            server.starttls()
+            server.login(settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD)
+            server.send_message(msg)
+    # Not retried: a timeout after DATA may already have delivered the mail.
+    guarded("smtp", send, settings.SMTP_TIMEOUT_SECONDS)
+
 
 def send_email(subject, body, to_email):
     from_email = settings.EMAIL_HOST_USER
-    app_password = settings.EMAIL_HOST_PASSWORD
 
     msg = MIMEText(body)
     msg["Subject"] = subject
     msg["From"] = from_email
     msg["To"] = to_email
 
-    with smtplib.SMTP(settings.EMAIL_HOST, 587) as server:
-        server.starttls()
-        server.login(from_email, app_password)
-        server.send_message(msg)
+    _smtp_send(msg, "send_email")
 
-    print("✅ Email sent!")
+    logger.info("Email sent", extra={"subject": subject})
 
 
 def send_confirmation(code, to_email):
     try:
         from_email = settings.EMAIL_HOST_USER
-        app_password = settings.EMAIL_HOST_PASSWORD
-
+    
         msg = MIMEMultipart("alternative")
         msg["Subject"] = subjects["confirmation"]
         msg["From"] = from_email
@@ -61,14 +95,12 @@ def send_confirmation(code, to_email):
         msg.attach(MIMEText(text_part, "plain"))
         msg.attach(MIMEText(html_part, "html"))
 
-        with smtplib.SMTP(settings.EMAIL_HOST, 587) as server:
-            server.starttls()
-            server.login(from_email, app_password)
-            server.send_message(msg)
+        _smtp_send(msg, "send_confirmation")
 
-        print("✅ Email sent!")
+        logger.info("Confirmation email sent")
         return True
-    except:
+    except Exception:
+        logger.exception("Confirmation email failed")
         return False
 
 
@@ -89,32 +121,8 @@ def generate_code():
     return str(random.randint(100000, 999999))
 
 
-def require_frontend_token(view_func):
-    def wrapped_view(request, *args, **kwargs):
-        token = request.headers.get('App-Token')
-        if token != settings.FRONTEND_API_TOKEN:
-            return JsonResponse({'error': 'Unauthorized access'}, status=403)
-        return view_func(request, *args, **kwargs)
-    return wrapped_view
-
-def require_session_login(view_func):
-    """
-    Decorator to check if user is logged in via session
-    """
-    @wraps(view_func)
-    def wrapper(request, *args, **kwargs):
-        if 'id' not in request.session:
-            return Response({'error': 'User not authenticated'}, status=status.HTTP_401_UNAUTHORIZED)
-        return view_func(request, *args, **kwargs)
-    return wrapper
-
-
-
 def get_user(id):
-    user = supabase.table('users').select('first_name, last_name').eq('id', id).execute()
-    if not user.data:
-        return False
-    return user.data[0]
+    return get_repos().users.get_name(id) or False
 
 
 OPEN_STATUSES = ["started", "in_progress"]
@@ -122,23 +130,23 @@ FINAL_STATUSES = ["abandoned", "skimmed", "read", "read_deeply"]
 VALID_STATUSES = OPEN_STATUSES + FINAL_STATUSES
 OPEN_SESSION_WINDOW_MIN = 180
 
+TAG_RE = re.compile(r"<[^>]+>")
+WORD_RE = re.compile(r"\b\w+\b")
+
+def strip_tags(content):
+    return TAG_RE.sub(" ", content or "")
+
 def estimate_required_time_seconds(article_id):
     try:
-        resp = supabase.table("articles") \
-            .select("content") \
-            .eq("id", article_id).limit(1).execute()
-        if resp.data:
-            row = resp.data[0]
-            content = row.get("content") or ""
-
+        content = get_repos().articles.get_content(article_id)
+        if content is not None:
             # strip HTML tags and count words
-            text = re.sub(r"<[^>]+>", " ", content)
-            words = len(re.findall(r"\b\w+\b", text))
+            words = len(WORD_RE.findall(strip_tags(content)))
 
             # assume ~200 wpm reading speed
             return max(30, math.ceil((words / 200) * 60))
     except Exception as e:
-        print("Estimate failed:", e)
+        logger.warning("Estimate failed for article %s: %s", article_id, e)
 
     return 30
 
@@ -160,7 +168,7 @@ def parse_request_data(request):
             if raw:
                 data = json.loads(raw)
         except Exception as e:
-            print("Fallback body parse failed:", e)
+            logger.debug("Fallback body parse failed: %s", e)
     return data or {}
 
 def find_latest_open_session(user_id, article_id):
@@ -168,24 +176,15 @@ def find_latest_open_session(user_id, article_id):
     Find latest session in started/in_progress. We'll check freshness window in Python.
     """
     try:
-        resp = (supabase.table("article_reads")
-                .select("id, session_id, status, scroll_depth, active_time_seconds, required_time_seconds, updated_at, created_at")
-                .eq("user_id", user_id)
-                .eq("article_id", article_id)
-                .in_("status", OPEN_STATUSES)
-                .order("updated_at", desc=True)
-                .limit(1)
-                .execute())
-        if resp.data:
-            return resp.data[0]
+        return get_repos().reads.latest_open(user_id, article_id, OPEN_STATUSES)
     except Exception as e:
-        print("Find latest open session failed:", e)
+        logger.warning("Find latest open session failed: %s", e)
     return None
 
 def is_recent(ts_str, minutes=OPEN_SESSION_WINDOW_MIN):
     try:
-        # Supabase returns ISO timestamps; parse to aware datetime
-        ts = datetime.fromisoformat(ts_str.replace("Z", "+00:00"))
+        # Supabase returns ISO timestamps, the ORM backend aware datetimes
+        ts = ts_str if isinstance(ts_str, datetime) else datetime.fromisoformat(ts_str.replace("Z", "+00:00"))
         return (datetime.now(timezone.utc) - ts) <= timedelta(minutes=minutes)
     except Exception:
         return False
@@ -211,6 +210,28 @@ def classify_read(scroll_depth, active_time, required_time):
         return "deep_read"
     return None
 
+def apply_heartbeat(row, incoming_status, incoming_depth, incoming_time, required_time=None):
+    """
+    Fields to write for one heartbeat on an existing read row. Python twin of the
+    log_read_heartbeat SQL function: keeps max depth/time, never moves a
+    classified session back to in_progress, classifies on "completed".
+    """
+    depth = max(float(row.get("scroll_depth") or 0.0), float(incoming_depth or 0.0))
+    active = max(int(row.get("active_time_seconds") or 0), int(incoming_time or 0))
+    rts = int(row.get("required_time_seconds") or 0)
+    if rts <= 0:
+        rts = required_time if isinstance(required_time, int) and required_time > 0 else estimate_required_time_seconds(row["article_id"])
+
+    current = row.get("status") or "started"
+    if incoming_status == "completed":
+        status = classify_read(depth, active, rts) or "completed"
+    elif current in OPEN_STATUSES:
+        status = "in_progress" if depth > 0 or active > 0 else current
+    else:
+        status = current
+    return {"status": status, "scroll_depth": depth, "active_time_seconds": active, "required_time_seconds": rts}
+
+
 subjects = {"confirmation": "Your Cognara Confirmation Code"
 
              }
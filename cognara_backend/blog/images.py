@@ -0,0 +1,229 @@
+"""
+Content-addressed storage for article images.
+
+An image is stored once at blobs/<sha256 of the bytes><ext> in the
+article-photos bucket, whichever article or file name it came from. Each
+article_photos row is a reference to a blob, so the reference count of a blob
+is the number of rows with its path. Uploading bytes that are already
+referenced skips the transfer; unlinking an image only drops the row, and
+`manage.py gc_images` later removes blobs nothing references any more.
+
+Paths from before this scheme ("<article_id>/<name>") belong to one article
+and are still removed from storage directly when unlinked.
+
+Delivery: a blob of a published article is served at a stable URL
+(/images/<sha256><ext>, or IMAGE_PUBLIC_BASE_URL/... behind a CDN) with
+`Cache-Control: immutable`, since the bytes behind a content hash never
+change. Everything else (drafts, legacy paths) gets signed URLs, signed per
+SIGNED_URL_WINDOW_SECONDS bucket and cached, so every request within a
+window sees the same URL and browsers can reuse what they downloaded.
+"""
+
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+
+from .repositories import get_repos
+
+logger = logging.getLogger(__name__)
+
+PHOTO_BUCKET = "article-photos"
+BLOB_PREFIX = "blobs"
+LIST_PAGE = 1000
+REMOVE_BATCH = 100
+BLOB_NAME_RE = re.compile(r"^[0-9a-f]{64}(\.[a-z0-9]{1,8})?$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Sent as the object's Cache-Control by Supabase Storage; the bytes of a blob never change.
+BLOB_CACHE_SECONDS = "31536000"
+
+
+def photo_bucket(storage=None):
+    """The article-photos bucket of `storage` (default: the shared Supabase client)."""
+    if storage is None:
+        from .helper import supabase
+        storage = supabase.storage
+    return storage.from_(PHOTO_BUCKET)
+
+
+def blob_path(digest, filename=""):
+    extension = os.path.splitext(filename or "")[1].lower()
+    return f"{BLOB_PREFIX}/{digest}{extension}"
+
+
+def is_blob(path):
+    return path.startswith(f"{BLOB_PREFIX}/")
+
+
+def store_image(article_id, data, filename, content_type=None, repos=None, storage=None):
+    """
+    Attach the image bytes to the article. Returns {'path', 'uploaded', 'linked'}:
+    `uploaded` is False when the blob was already stored, `linked` False when the
+    article already referenced it.
+    """
+    repos = repos or get_repos()
+    bucket = photo_bucket(storage)
+    path = blob_path(hashlib.sha256(data).hexdigest(), filename)
+    owners = repos.photos.articles_for_paths([path]).get(path, set())
+
+    def upload():
+        # upsert: an unreferenced copy may still be waiting for gc_images; the bytes are the same.
+        bucket.upload(path=path, file=data, file_options={
+            "content-type": content_type or mimetypes.guess_type(filename or "")[0] or "application/octet-stream",
+            "cache-control": BLOB_CACHE_SECONDS, "upsert": "true",
+        })
+
+    uploaded = False
+    if not owners:
+        upload()
+        uploaded = True
+    linked = article_id not in owners
+    if linked:
+        repos.photos.add(article_id, path)
+        # The owners seen above may have unlinked it since, and gc_images removed the
+        # blob before our row existed; with the row in place it is safe from now on.
+        if not uploaded and not bucket.exists(path):
+            upload()
+            uploaded = True
+    return {"path": path, "uploaded": uploaded, "linked": linked}
+
+
+def unlink_images(article_id, keep=(), repos=None, storage=None):
+    """Drop the article's image references except `keep`; returns the paths that were unlinked."""
+    repos = repos or get_repos()
+    paths = [path for path in repos.photos.paths_for_article(article_id) if path not in keep]
+    if not paths:
+        return []
+    if keep:
+        repos.photos.delete_paths(article_id, paths)
+    else:
+        repos.photos.delete_for_article(article_id)
+    legacy = [path for path in paths if not is_blob(path)]
+    if legacy:
+        try:
+            photo_bucket(storage).remove(legacy)
+        except Exception as e:
+            logger.warning("Failed to delete legacy images %s: %s", legacy, e)
+    return paths
+
+
+def _listed_at(item):
+    # updated_at moves when an upload upserts over an old orphan.
+    stamp = item.get("updated_at") or item.get("created_at")
+    if not stamp:
+        return None
+    return datetime.fromisoformat(stamp.replace("Z", "+00:00"))
+
+
+def list_blobs(storage=None):
+    """Yield (path, created_at or None) for every blob in the bucket."""
+    bucket = photo_bucket(storage)
+    offset = 0
+    while True:
+        page = bucket.list(BLOB_PREFIX, {"limit": LIST_PAGE, "offset": offset,
+                                         "sortBy": {"column": "name", "order": "asc"}})
+        for item in page:
+            yield f"{BLOB_PREFIX}/{item['name']}", _listed_at(item)
+        if len(page) < LIST_PAGE:
+            return
+        offset += LIST_PAGE
+
+
+def collect_garbage(grace=timedelta(hours=24), dry_run=False, repos=None, storage=None):
+    """
+    Remove blobs with no article_photos reference that are older than `grace`
+    (younger ones may belong to an upload whose row is not written yet).
+    Returns {'scanned', 'unreferenced', 'removed'}.
+    """
+    repos = repos or get_repos()
+    cutoff = datetime.now(timezone.utc) - grace
+    stats = {"scanned": 0, "unreferenced": 0, "removed": 0}
+    doomed = []
+    for path, created_at in list_blobs(storage):
+        stats["scanned"] += 1
+        if created_at is not None and created_at > cutoff:
+            continue
+        doomed.append(path)
+
+    for start in range(0, len(doomed), REMOVE_BATCH):
+        batch = doomed[start:start + REMOVE_BATCH]
+        # Looked up right before removing, so a blob re-linked during the scan survives.
+        referenced = repos.photos.articles_for_paths(batch)
+        orphans = [path for path in batch if not referenced.get(path)]
+        stats["unreferenced"] += len(orphans)
+        if orphans and not dry_run:
+            photo_bucket(storage).remove(orphans)
+            stats["removed"] += len(orphans)
+    return stats
+
+
+def is_published_blob(path, repos=None):
+    """True when a published article references the blob (cached briefly)."""
+    key = f"published-blob:{path}"
+    published = cache.get(key)
+    if published is None:
+        repos = repos or get_repos()
+        owners = repos.photos.articles_for_paths([path]).get(path, set())
+        published = bool(owners) and bool(repos.articles.published_by_ids(owners))
+        cache.set(key, published, 300)
+    return published
+
+
+def public_url(path, request=None):
+    """Stable URL of a blob, served by the article_image view (or the CDN in front of it)."""
+    location = reverse("article_image", args=[path[len(BLOB_PREFIX) + 1:]])
+    base = getattr(settings, "IMAGE_PUBLIC_BASE_URL", "")
+    if base:
+        return base.rstrip("/") + location
+    return request.build_absolute_uri(location) if request is not None else location
+
+
+def signed_urls(paths, now=None, storage=None):
+    """
+    {path: (url, expires_at)}. URLs are signed once per window and cached for the
+    rest of it, each valid for a full window past its end, so a URL handed out
+    late in a window still works for a while.
+    """
+    window = settings.SIGNED_URL_WINDOW_SECONDS
+    now = time.time() if now is None else now
+    bucket_start = int(now // window) * window
+    expires_at = bucket_start + 2 * window
+    keys = {path: f"signed-url:{bucket_start}:{path}" for path in paths}
+    cached = cache.get_many(list(keys.values()))
+    result = {path: (cached[key], expires_at) for path, key in keys.items() if key in cached}
+    missing = [path for path in paths if path not in result]
+    if missing:
+        expires_in = int(expires_at - now)
+        signed = photo_bucket(storage).create_signed_urls(missing, expires_in)
+        fresh = {}
+        for item in signed:
+            url = item.get("signedURL") or item.get("signedUrl")
+            if url and item.get("path") in keys:
+                result[item["path"]] = (url, expires_at)
+                fresh[keys[item["path"]]] = url
+        cache.set_many(fresh, max(1, int(bucket_start + window - now)))
+    return result
+
+
+def delivery_urls(article_id, paths, request=None, now=None, repos=None, storage=None):
+    """[{'path', 'url', 'immutable', 'expires_at'}] for the article's images, in `paths` order."""
+    repos = repos or get_repos()
+    published = bool(repos.articles.published_by_ids([article_id]))
+    stable = [path for path in paths if published and is_blob(path)]
+    signed = signed_urls([path for path in paths if path not in stable], now, storage)
+    images = []
+    for path in paths:
+        if path in stable:
+            images.append({"path": path, "url": public_url(path, request), "immutable": True, "expires_at": None})
+        elif path in signed:
+            url, expires_at = signed[path]
+            images.append({"path": path, "url": url, "immutable": False,
+                           "expires_at": datetime.fromtimestamp(expires_at, timezone.utc).isoformat()})
+    return images
@@ -0,0 +1,277 @@
+"""
+Per-request tracing of outbound calls (Supabase queries, storage, SMTP) and
+Prometheus-style metrics, fed by blog.middleware.RequestTracingMiddleware.
+"""
+
+import json
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+
+_current_trace = ContextVar("cognara_request_trace", default=None)
+
+DB_OPERATIONS = {"select", "insert", "update", "upsert", "delete"}
+
+
+class RequestTrace:
+    """Outbound calls made while serving one request."""
+
+    def __init__(self):
+        self.calls = []
+
+    def add(self, kind, name, duration, size):
+        self.calls.append((kind, name, duration, size))
+
+    def summary(self):
+        """Totals per dependency kind: {kind: {"count", "duration", "bytes"}}."""
+        totals = {}
+        for kind, _, duration, size in self.calls:
+            entry = totals.setdefault(kind, {"count": 0, "duration": 0.0, "bytes": 0})
+            entry["count"] += 1
+            entry["duration"] += duration
+            entry["bytes"] += size
+        return totals
+
+
+def start_trace():
+    return _current_trace.set(RequestTrace())
+
+
+def end_trace(token):
+    trace = _current_trace.get()
+    _current_trace.reset(token)
+    return trace
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def _payload_size(value):
+    """
+    Bytes of a payload. Raw bytes are measured for free; decoded query results
+    no longer have their wire size, so they are only estimated (by
+    re-serialising them) when REQUEST_TRACING_PAYLOAD_SIZES is on.
+    """
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if not getattr(settings, "REQUEST_TRACING_PAYLOAD_SIZES", False):
+        return 0
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    data = getattr(value, "data", value)
+    try:
+        return len(json.dumps(data, default=str, separators=(",", ":")))
+    except (TypeError, ValueError):
+        return 0
+
+
+@contextmanager
+def trace_call(kind, name, sent=None):
+    """
+    Time an outbound call and attribute it to the current request (if any).
+    Yields a dict; set result["value"] to have the response size recorded.
+    """
+    result = {}
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        duration = time.perf_counter() - start
+        size = _payload_size(sent) + _payload_size(result.get("value"))
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(kind, name, duration, size)
+        DEPENDENCY_SECONDS.observe(duration, kind=kind, name=name)
+
+
+class _TracedQuery:
+    """Proxy over a postgrest builder chain; times the terminal execute()."""
+
+    __slots__ = ("_target", "_table", "_operation")
+
+    def __init__(self, target, table, operation="select"):
+        self._target = target
+        self._table = table
+        self._operation = operation
+
+    def __getattr__(self, attr):
+        value = getattr(self._target, attr)
+        if not callable(value):
+            return _TracedQuery(value, self._table, self._operation) if hasattr(value, "execute") else value
+
+        if attr == "execute":
+            def execute(*args, **kwargs):
+                with trace_call("supabase", f"{self._table}.{self._operation}") as result:
+                    result["value"] = value(*args, **kwargs)
+                return result["value"]
+            return execute
+
+        operation = attr if attr in DB_OPERATIONS else self._operation
+
+        def chain(*args, **kwargs):
+            returned = value(*args, **kwargs)
+            if hasattr(returned, "execute"):
+                return _TracedQuery(returned, self._table, operation)
+            return returned
+        return chain
+
+
+class _TracedBucket:
+    """Proxy over a storage bucket; every method call is an HTTP round trip."""
+
+    __slots__ = ("_target", "_bucket")
+
+    def __init__(self, target, bucket):
+        self._target = target
+        self._bucket = bucket
+
+    def __getattr__(self, attr):
+        value = getattr(self._target, attr)
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            sent = kwargs.get("file")
+            if sent is None:
+                sent = next((arg for arg in args if isinstance(arg, (bytes, bytearray))), None)
+            with trace_call("storage", f"{self._bucket}.{attr}", sent=sent) as result:
+                returned = value(*args, **kwargs)
+                if isinstance(returned, (bytes, bytearray)):
+                    result["value"] = returned
+            return returned
+        return call
+
+
+class _TracedStorage:
+    __slots__ = ("_target",)
+
+    def __init__(self, target):
+        self._target = target
+
+    def from_(self, bucket):
+        return _TracedBucket(self._target.from_(bucket), bucket)
+
+    def __getattr__(self, attr):
+        return getattr(self._target, attr)
+
+
+class TracedClient:
+    """
+    Wraps a supabase Client so every query/storage call is timed and counted.
+    Everything else is passed through unchanged.
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self.storage = _TracedStorage(client.storage)
+
+    def table(self, name):
+        return _TracedQuery(self._client.table(name), name)
+
+    from_ = table
+
+    def rpc(self, fn, params=None, *args, **kwargs):
+        return _TracedQuery(self._client.rpc(fn, params or {}, *args, **kwargs), f"rpc:{fn}", "rpc")
+
+    def __getattr__(self, attr):
+        return getattr(self._client, attr)
+
+
+def traced_client(client):
+    if not getattr(settings, "REQUEST_TRACING", True):
+        return client
+    return TracedClient(client)
+
+
+# ---------------------------------------------------------------------------
+# Prometheus-style metrics
+# ---------------------------------------------------------------------------
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_value(value):
+    """Escape a label value for the text exposition format."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """Minimal thread-safe labelled histogram rendered in the Prometheus text format."""
+
+    def __init__(self, name, help_text, label_names, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = defaultdict(lambda: [[0] * (len(self.buckets) + 1), 0.0, 0])
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(label, "")) for label in self.label_names)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series[key]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        for key, (counts, total, count) in sorted(snapshot.items()):
+            labels = ",".join(f'{name}="{_label_value(value)}"' for name, value in zip(self.label_names, key))
+            prefix = labels + "," if labels else ""
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return "\n".join(lines)
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+REQUEST_SECONDS = Histogram(
+    "cognara_request_duration_seconds", "Time spent serving a request.", ["view", "method", "status"])
+REQUEST_DEPENDENCY_CALLS = Histogram(
+    "cognara_request_dependency_calls", "Outbound calls made per request.", ["view", "kind"],
+    buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100))
+REQUEST_DEPENDENCY_SECONDS = Histogram(
+    "cognara_request_dependency_seconds", "Time per request spent waiting on a dependency.", ["view", "kind"])
+DEPENDENCY_SECONDS = Histogram(
+    "cognara_dependency_call_seconds", "Latency of individual outbound calls.", ["kind", "name"])
+
+REGISTRY = [REQUEST_SECONDS, REQUEST_DEPENDENCY_CALLS, REQUEST_DEPENDENCY_SECONDS, DEPENDENCY_SECONDS]
+
+
+def observe_request(view, method, status, duration, trace):
+    REQUEST_SECONDS.observe(duration, view=view, method=method, status=status)
+    for kind, totals in trace.summary().items():
+        REQUEST_DEPENDENCY_CALLS.observe(totals["count"], view=view, kind=kind)
+        REQUEST_DEPENDENCY_SECONDS.observe(totals["duration"], view=view, kind=kind)
+
+
+def render_metrics():
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+def server_timing(trace, total):
+    """Build a Server-Timing header value from a finished trace."""
+    parts = []
+    for kind, totals in sorted(trace.summary().items()):
+        parts.append(f'{kind};dur={totals["duration"] * 1000:.1f};desc="{totals["count"]} calls, {totals["bytes"]} B"')
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
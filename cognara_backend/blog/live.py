@@ -0,0 +1,239 @@
+"""
+Live comments over Server-Sent Events.
+
+post_comment publishes each new comment to the article's topic and
+comment_stream (GET articles/<id>/comments/live) pushes it to every open
+ArticlePage, so readers stop polling get_comments for the whole list.
+
+The broker is pluggable: LIVE_BROKER is a dotted path to a zero-argument
+factory. InMemoryBroker (the default) fans out inside this process; with more
+than one worker process use a shared broker (e.g. Redis pub/sub) implementing
+publish/subscribe/unsubscribe.
+
+Event ids are comment ids. A reconnecting EventSource sends Last-Event-ID and
+is replayed what it missed from the topic's recent history; if that history
+does not reach back far enough (events evicted, or the topic was forgotten or
+the process restarted since) it gets a `reset` event and refetches the list.
+Each connection buffers at most LIVE_BUFFER_SIZE events; a reader that falls
+further behind is disconnected and catches up the same way on reconnect.
+
+Idle streams hold no thread when served through asgi.py (e.g. uvicorn); under
+WSGI every open stream occupies a worker thread.
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+from collections import OrderedDict, deque
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .encoding import dumps
+
+logger = logging.getLogger(__name__)
+
+RETRY_FRAME = b"retry: 3000\n\n"
+KEEPALIVE_FRAME = b": keepalive\n\n"
+RESET_FRAME = b"event: reset\ndata: {}\n\n"
+
+
+class Event:
+    __slots__ = ("id", "frame")
+
+    def __init__(self, event_id, event_type, data):
+        self.id = event_id
+        # Encoded once per publish, whatever the number of subscribers.
+        self.frame = b"id: %d\nevent: %s\ndata: %s\n\n" % (event_id, event_type.encode(), dumps(data))
+
+
+class _Topic:
+    __slots__ = ("history", "subscribers", "replay_floor")
+
+    def __init__(self, history):
+        self.history = deque(maxlen=history)
+        self.subscribers = set()
+        # Lowest Last-Event-ID that can be replayed: everything published after it is
+        # in history. None until the first publish; before that nothing is known.
+        self.replay_floor = None
+
+
+class InMemoryBroker:
+    """Per-process pub/sub with a bounded replay history per topic."""
+
+    def __init__(self, history=None, max_topics=None):
+        self.history = history or getattr(settings, "LIVE_HISTORY", 200)
+        self.max_topics = max_topics or getattr(settings, "LIVE_MAX_TOPICS", 10000)
+        self._lock = threading.Lock()
+        self._topics = OrderedDict()
+        self.subscriber_count = 0
+
+    def _topic(self, name):
+        topic = self._topics.get(name)
+        if topic is None:
+            topic = self._topics[name] = _Topic(self.history)
+            if len(self._topics) > self.max_topics:
+                # Forget the least recently used idle topics; a late reconnect to one just gets a reset.
+                for stale in list(self._topics)[:len(self._topics) - self.max_topics]:
+                    if not self._topics[stale].subscribers:
+                        del self._topics[stale]
+        self._topics.move_to_end(name)
+        return topic
+
+    def publish(self, topic_name, event):
+        with self._lock:
+            topic = self._topic(topic_name)
+            if topic.replay_floor is None:
+                # Whatever came before this topic existed (another process, a forgotten topic) is unknown.
+                topic.replay_floor = event.id
+            elif len(topic.history) == topic.history.maxlen:
+                topic.replay_floor = topic.history[0].id
+            topic.history.append(event)
+            subscribers = list(topic.subscribers)
+        for subscriber in subscribers:
+            subscriber.deliver(event)
+        # A subscriber whose buffer overflowed (a reader that stopped reading) gets
+        # nothing more; its stream ends when it next drains its buffer.
+        for subscriber in subscribers:
+            if subscriber.overflowed:
+                self.unsubscribe(topic_name, subscriber)
+
+    def subscribe(self, topic_name, subscriber, last_event_id=None):
+        """
+        Register `subscriber`; returns the events after `last_event_id` to replay
+        first, or None when some of them are gone (the client must refetch).
+        """
+        with self._lock:
+            topic = self._topic(topic_name)
+            topic.subscribers.add(subscriber)
+            self.subscriber_count += 1
+            if last_event_id is None:
+                return []
+            if topic.replay_floor is None or last_event_id < topic.replay_floor:
+                return None
+            return [event for event in topic.history if event.id > last_event_id]
+
+    def unsubscribe(self, topic_name, subscriber):
+        with self._lock:
+            topic = self._topics.get(topic_name)
+            if topic is not None and subscriber in topic.subscribers:
+                topic.subscribers.discard(subscriber)
+                self.subscriber_count -= 1
+
+
+class AsyncSubscriber:
+    """Bounded buffer drained by a coroutine; deliver() may be called from any thread."""
+
+    def __init__(self, size, loop):
+        self.queue = asyncio.Queue(maxsize=size)
+        self.loop = loop
+        self.overflowed = False
+
+    def deliver(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:  # loop closed: the connection is gone
+            pass
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class ThreadSubscriber:
+    """Bounded buffer drained by a blocking WSGI response iterator."""
+
+    def __init__(self, size):
+        self.queue = queue.Queue(maxsize=size)
+        self.overflowed = False
+
+    def deliver(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            factory = getattr(settings, "LIVE_BROKER", "")
+            _broker = import_string(factory)() if factory else InMemoryBroker()
+        return _broker
+
+
+def comments_topic(article_id):
+    return f"comments:{article_id}"
+
+
+def publish_comment(comment):
+    """Push a newly created comment (with `username`) to the article's readers."""
+    event = Event(int(comment["id"]), "comment", comment)
+    get_broker().publish(comments_topic(comment["article_id"]), event)
+
+
+def parse_last_event_id(value):
+    try:
+        return int(value) if value not in (None, "") else None
+    except ValueError:
+        return None
+
+
+def _opening(replay):
+    frames = [RETRY_FRAME]
+    if replay is None:
+        frames.append(RESET_FRAME)
+    else:
+        frames.extend(event.frame for event in replay)
+    return frames
+
+
+async def stream_async(topic, last_event_id=None, broker=None):
+    """SSE frames for an ASGI response: replay, then live events and keepalives."""
+    broker = broker or get_broker()
+    keepalive = getattr(settings, "LIVE_KEEPALIVE_SECONDS", 15)
+    subscriber = AsyncSubscriber(getattr(settings, "LIVE_BUFFER_SIZE", 64), asyncio.get_running_loop())
+    replay = broker.subscribe(topic, subscriber, last_event_id)
+    try:
+        for frame in _opening(replay):
+            yield frame
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield KEEPALIVE_FRAME
+                continue
+            yield event.frame
+            if subscriber.overflowed and subscriber.queue.empty():
+                return  # fell behind; the client reconnects with Last-Event-ID
+    finally:
+        broker.unsubscribe(topic, subscriber)
+
+
+def stream_sync(topic, last_event_id=None, broker=None):
+    """Same frames for a WSGI response (one blocked thread per open stream)."""
+    broker = broker or get_broker()
+    keepalive = getattr(settings, "LIVE_KEEPALIVE_SECONDS", 15)
+    subscriber = ThreadSubscriber(getattr(settings, "LIVE_BUFFER_SIZE", 64))
+    replay = broker.subscribe(topic, subscriber, last_event_id)
+    try:
+        yield from _opening(replay)
+        while True:
+            try:
+                event = subscriber.queue.get(timeout=keepalive)
+            except queue.Empty:
+                yield KEEPALIVE_FRAME
+                continue
+            yield event.frame
+            if subscriber.overflowed and subscriber.queue.empty():
+                return
+    finally:
+        broker.unsubscribe(topic, subscriber)
@@ -0,0 +1,103 @@
+"""
+Logging pieces used from settings.LOGGING: a JSON formatter and a QueueHandler
+whose QueueListener does the actual I/O off the request thread, plus a sampled
+logger for high-frequency events.
+"""
+
+import json
+import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+
+# Attributes every LogRecord has; anything else came in through `extra=`.
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any `extra=` fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, separators=(",", ":"))
+
+
+class SampledLogger(logging.LoggerAdapter):
+    """
+    Logger for high-frequency events: only a `rate` fraction of records below
+    WARNING is emitted. The level check and then the coin flip happen before a
+    LogRecord is built, so dropped calls stay cheap (and records below the
+    logger's level cost no random draw); warnings and errors are never dropped.
+    """
+
+    def __init__(self, logger, rate=1.0):
+        super().__init__(logger, {})
+        self.rate = float(rate)
+
+    def log(self, level, msg, *args, **kwargs):
+        if not self.isEnabledFor(level):
+            return
+        if level < logging.WARNING and self.rate < 1.0 and random.random() >= self.rate:
+            return
+        super().log(level, msg, *args, **kwargs)
+
+    def process(self, msg, kwargs):
+        return msg, kwargs
+
+
+class NonBlockingJsonHandler(QueueHandler):
+    """
+    Enqueues records on the request thread and lets a background QueueListener
+    format and write them as JSON. Used from LOGGING via '()'.
+    """
+
+    def __init__(self, stream="ext://sys.stderr", maxsize=10000):
+        self.log_queue = queue.Queue(maxsize=maxsize)
+        super().__init__(self.log_queue)
+        if stream == "ext://sys.stdout":
+            stream = sys.stdout
+        elif stream == "ext://sys.stderr":
+            stream = sys.stderr
+        target = logging.StreamHandler(stream)
+        target.setFormatter(JsonFormatter())
+        self.listener = QueueListener(self.log_queue, target, respect_handler_level=True)
+        self.listener.start()
+
+    def close(self):
+        # Called by logging.shutdown() at exit; drains the queue before returning.
+        if self.listener._thread is not None:
+            self.listener.stop()
+        super().close()
+
+    def prepare(self, record):
+        # Keep `extra=` fields and exc_info for the JSON formatter; only
+        # resolve the message so args can be dropped safely.
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.log_queue.put_nowait(record)
+        except queue.Full:
+            # Drop rather than block the request when the writer falls behind.
+            pass
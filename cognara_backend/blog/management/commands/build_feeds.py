@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog import feeds
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the RSS/Atom feeds and every sitemap shard from the articles table (first deploy, or after bulk edits)'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        sizes = feeds.rebuild()
+        elapsed = time.perf_counter() - start
+        for name, count in sizes.items():
+            self.stdout.write(f'{name}: {count} entries')
+        self.stdout.write(self.style.SUCCESS(f'Feeds rebuilt in {elapsed:.2f}s'))
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.conf import settings
+
+from blog import recommendations
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the "read next" similarity index from all published articles'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        index = recommendations.rebuild()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'{len(index.ids)} articles, {len(index.vocabulary)} terms, '
+            f'{index.nbytes() / 2**20:.1f} MiB -> {settings.RECOMMENDATIONS_INDEX_PATH}'
+        )
+        self.stdout.write(self.style.SUCCESS(f'Index built in {elapsed:.2f}s'))
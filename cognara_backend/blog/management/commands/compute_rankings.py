@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog import ranking
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the trending / most-read leaderboards (run periodically, e.g. every 10 minutes)'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        sizes = ranking.recompute()
+        elapsed = time.perf_counter() - start
+        for board, count in sizes.items():
+            self.stdout.write(f'{board}: {count} articles')
+        self.stdout.write(self.style.SUCCESS(f'Leaderboards rebuilt in {elapsed:.2f}s'))
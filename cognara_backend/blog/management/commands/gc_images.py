@@ -0,0 +1,25 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from blog import images
+
+
+class Command(BaseCommand):
+    help = 'Delete image blobs no article references any more (run daily, e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help='Keep unreferenced blobs younger than this (uploads in flight)')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be deleted')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        stats = images.collect_garbage(timedelta(hours=options['grace_hours']), options['dry_run'])
+        elapsed = time.perf_counter() - start
+        verb = 'would delete' if options['dry_run'] else 'deleted'
+        self.stdout.write(f"{stats['scanned']} blobs scanned, {stats['unreferenced']} unreferenced")
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['removed'] if not options['dry_run'] else stats['unreferenced']} blobs {verb} in {elapsed:.2f}s"
+        ))
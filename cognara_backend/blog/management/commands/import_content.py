@@ -0,0 +1,51 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog import bulk_import
+
+
+class Command(BaseCommand):
+    help = 'Bulk import users, articles (NDJSON/Markdown) and their images from a directory (safe to re-run)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='Directory with users.ndjson, articles.ndjson and/or articles/*.md')
+        parser.add_argument('--dry-run', action='store_true', help='Validate and report what would be written')
+        parser.add_argument('--chunk-size', type=int, default=bulk_import.CHUNK_SIZE)
+        parser.add_argument('--workers', type=int, default=bulk_import.UPLOAD_WORKERS,
+                            help='Concurrent image hash/upload threads')
+        parser.add_argument('--json', action='store_true', help='Print the full report as JSON')
+
+    def handle(self, *args, **options):
+        if not os.path.isdir(options['source']):
+            raise CommandError(f"{options['source']} is not a directory")
+        report = bulk_import.run_import(options['source'], options['dry_run'],
+                                        options['chunk_size'], options['workers'])
+        rates = bulk_import.throughput(report)
+        if options['json']:
+            self.stdout.write(json.dumps(dict(report, throughput=rates), indent=2))
+            return
+
+        for error in report['errors']:
+            self.stderr.write(self.style.WARNING(error))
+        verb = 'would insert' if options['dry_run'] else 'inserted'
+        for table in ('users', 'articles'):
+            phase = report[table]
+            self.stdout.write(
+                f"{table}: {phase['read']} read, {phase['invalid']} invalid, {phase['existing']} already present, "
+                f"{phase['inserted']} {verb} "
+                f"({rates[f'{table}_rows_per_second'] or 0} rows/s)"
+            )
+        images = report['images']
+        self.stdout.write(
+            f"images: {images['read']} referenced, {images['existing']} already present, "
+            f"{images['deduplicated']} reusing a stored blob, "
+            f"{images['uploaded']} {'would upload' if options['dry_run'] else 'uploaded'}, {images['failed']} failed, "
+            f"{images['bytes'] / 2**20:.1f} MB ({rates['images_mb_per_second'] or 0} MB/s)"
+        )
+        if not options['dry_run'] and report['articles']['inserted']:
+            self.stdout.write('Run build_recommendations and compute_rankings to pick up the new articles.')
+        style = self.style.WARNING if report['errors'] else self.style.SUCCESS
+        self.stdout.write(style(f"{'Dry run' if options['dry_run'] else 'Import'} finished "
+                                f"with {len(report['errors'])} errors"))
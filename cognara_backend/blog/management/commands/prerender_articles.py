@@ -0,0 +1,22 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from blog import prerender
+
+
+class Command(BaseCommand):
+    help = 'Re-render every published article to PRERENDER_ROOT and drop files of unpublished ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.PRERENDER_WORKERS,
+                            help='Render processes (default: PRERENDER_WORKERS, else one per CPU)')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        counts = prerender.rebuild(workers=options['workers'])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"{counts['written']} written, {counts['removed']} removed, "
+                          f"{counts['legacy_images']} left dynamic (legacy image paths)")
+        self.stdout.write(self.style.SUCCESS(f'Articles pre-rendered in {elapsed:.2f}s'))
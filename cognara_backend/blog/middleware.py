@@ -0,0 +1,350 @@
+import cProfile
+import gzip
+import hmac
+import logging
+import os
+import random
+import re
+import time
+import zlib
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.utils.cache import patch_vary_headers
+
+from . import instrumentation
+from .encoding import JsonResponse
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only without it
+    brotli = None
+
+
+logger = logging.getLogger("cognara.requests")
+
+
+CSRF_SAFE_METHODS = ("GET", "HEAD", "OPTIONS", "TRACE")
+SESSION_PRINCIPAL_KEYS = ("id", "email", "username", "first_name", "last_name", "bio", "email_verified")
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    Identity of the caller, resolved once per request from the session written by `login`.
+    """
+    id: int = None
+    email: str = None
+    username: str = None
+    first_name: str = None
+    last_name: str = None
+    bio: str = None
+    email_verified: str = None
+
+    @property
+    def is_authenticated(self):
+        return self.id is not None
+
+    @property
+    def is_admin(self):
+        return self.is_authenticated and self.id in settings.ADMIN_USER_IDS
+
+    @classmethod
+    def from_session(cls, session):
+        if "id" not in session:
+            return ANONYMOUS
+        return cls(**{key: session.get(key) for key in SESSION_PRINCIPAL_KEYS})
+
+
+ANONYMOUS = Principal()
+
+
+def frontend_token_exempt(view_func):
+    """
+    Mark a view as reachable without the App-Token header (e.g. the CSRF cookie endpoint).
+    """
+    view_func.frontend_token_exempt = True
+    return view_func
+
+
+def session_login_required(view_func):
+    """
+    Mark a view as requiring a logged-in session. Enforced by AppAuthMiddleware before the view runs.
+    """
+    view_func.session_login_required = True
+    return view_func
+
+
+def admin_required(view_func):
+    """
+    Mark a view as restricted to settings.ADMIN_USER_IDS. Enforced by AppAuthMiddleware.
+    """
+    view_func.session_login_required = True
+    view_func.admin_required = True
+    return view_func
+
+
+def compression_exempt(view_func):
+    """
+    Never compress this view's responses, e.g. ones carrying a secret next to
+    request-controlled data (BREACH).
+    """
+    view_func.compression_exempt = True
+    return view_func
+
+
+class _CSRFCheck(CsrfViewMiddleware):
+    def _reject(self, request, reason):
+        # Hand the reason back instead of rendering Django's 403 page.
+        return reason
+
+
+def csrf_failure(request):
+    """Why the request fails Django's CSRF check, or None if it passes."""
+    check = _CSRFCheck(lambda request: None)
+    check.process_request(request)
+    return check.process_view(request, None, (), {})
+
+
+class AppAuthMiddleware:
+    """
+    Single auth pass for the API: checks the App-Token header in constant time,
+    resolves the session principal once and rejects requests before DRF parses them.
+    Must sit after SessionMiddleware.
+
+    api_view makes every view csrf_exempt, so the CSRF check DRF's
+    SessionAuthentication used to make happens here instead: unsafe methods
+    from a signed-in session need the CSRF token.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Encode once; compare_digest needs bytes (or ASCII str) of the same type.
+        self.expected_token = settings.FRONTEND_API_TOKEN.encode("utf-8")
+        self.exempt_prefixes = tuple(getattr(settings, "APP_TOKEN_EXEMPT_PATHS", ("/admin/",)))
+
+    def __call__(self, request):
+        request.principal = Principal.from_session(request.session)
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not getattr(view_func, "frontend_token_exempt", False) and not request.path.startswith(self.exempt_prefixes):
+            token = request.headers.get("App-Token", "").encode("utf-8")
+            if not hmac.compare_digest(token, self.expected_token):
+                return JsonResponse({"error": "Unauthorized access"}, status=403)
+
+        if request.principal.is_authenticated and request.method not in CSRF_SAFE_METHODS:
+            reason = csrf_failure(request)
+            if reason:
+                return JsonResponse({"error": f"CSRF Failed: {reason}"}, status=403)
+
+        if getattr(view_func, "session_login_required", False) and not request.principal.is_authenticated:
+            return JsonResponse({"error": "User not authenticated"}, status=401)
+
+        if getattr(view_func, "admin_required", False) and not request.principal.is_admin:
+            return JsonResponse({"error": "Forbidden"}, status=403)
+
+        return None
+
+
+class RequestTracingMiddleware:
+    """
+    Records outbound Supabase/storage/SMTP calls made while serving a request and
+    reports them as a Server-Timing header, a structured log line and per-view histograms.
+
+    With REQUEST_PROFILING enabled, a request carrying `X-Profile: 1` (or picked by
+    REQUEST_PROFILING_SAMPLE_RATE) is run under a profiler and the report is written
+    to REQUEST_PROFILING_DIR.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.profiling = getattr(settings, "REQUEST_PROFILING", False)
+        self.sample_rate = getattr(settings, "REQUEST_PROFILING_SAMPLE_RATE", 0.0)
+        self.profiler = getattr(settings, "REQUEST_PROFILER", "cprofile")
+        self.profile_dir = getattr(settings, "REQUEST_PROFILING_DIR", os.path.join(settings.BASE_DIR, "profiles"))
+
+    def __call__(self, request):
+        token = instrumentation.start_trace()
+        start = time.perf_counter()
+        try:
+            if self.profiling and self._wants_profile(request):
+                response = self._profiled(request)
+            else:
+                response = self.get_response(request)
+        finally:
+            trace = instrumentation.end_trace(token)
+        total = time.perf_counter() - start
+
+        match = getattr(request, "resolver_match", None)
+        view = match.url_name if match and match.url_name else "unresolved"
+        instrumentation.observe_request(view, request.method, response.status_code, total, trace)
+        response["Server-Timing"] = instrumentation.server_timing(trace, total)
+        logger.info(
+            "request view=%s status=%s duration_ms=%.1f calls=%s",
+            view, response.status_code, total * 1000, len(trace.calls),
+            extra={"view": view, "method": request.method, "status": response.status_code,
+                   "duration_ms": round(total * 1000, 2), "dependencies": trace.summary()},
+        )
+        return response
+
+    def _wants_profile(self, request):
+        if request.headers.get("X-Profile") == "1":
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _profiled(self, request):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        stamp = f"{int(time.time() * 1000)}_{request.path.strip('/').replace('/', '_') or 'root'}"
+
+        if self.profiler == "pyinstrument":
+            from pyinstrument import Profiler
+
+            profiler = Profiler()
+            profiler.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.stop()
+            output = os.path.join(self.profile_dir, f"{stamp}.html")
+            with open(output, "w", encoding="utf-8") as file:
+                file.write(profiler.output_html())
+        else:
+            profiler = cProfile.Profile()
+            try:
+                response = profiler.runcall(self.get_response, request)
+            finally:
+                output = os.path.join(self.profile_dir, f"{stamp}.prof")
+                profiler.dump_stats(output)
+
+        response["X-Profile-Output"] = os.path.basename(output)
+        return response
+
+
+_ACCEPT_ENCODING_RE = re.compile(r"\s*([\w*]+)\s*(?:;\s*q\s*=\s*([\d.]+))?\s*")
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml",
+                      "application/rss+xml", "application/x-ndjson", "image/svg+xml")
+# Streams whose every chunk must reach the client at once (flushed per chunk);
+# other streams let the compressor buffer across chunks for a better ratio.
+LOW_LATENCY_TYPES = ("text/event-stream",)
+
+
+def negotiate_encoding(accept_encoding, brotli_available=True):
+    """Pick 'br', 'gzip' or None from an Accept-Encoding header, honouring q-values."""
+    offered = {}
+    for part in accept_encoding.split(","):
+        match = _ACCEPT_ENCODING_RE.fullmatch(part)
+        if match:
+            try:
+                offered[match.group(1).lower()] = float(match.group(2) or 1)
+            except ValueError:
+                continue
+    wildcard = offered.get("*", 0)
+    candidates = (("br", "gzip") if brotli_available else ("gzip",))
+    best, best_q = None, 0
+    for name in candidates:
+        q = offered.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+class _Compressor:
+    def __init__(self, encoding):
+        if encoding == "br":
+            self._impl = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+            self.compress, self.flush = self._impl.process, self._impl.flush
+            self.finish = self._impl.finish
+        else:
+            # wbits=31: gzip container
+            self._impl = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+            self.compress = self._impl.compress
+            self.flush = lambda: self._impl.flush(zlib.Z_SYNC_FLUSH)
+            self.finish = self._impl.flush
+
+    def stream(self, chunks, flush_each=False):
+        for chunk in chunks:
+            data = self.compress(chunk)
+            if flush_each:
+                data += self.flush()
+            if data:
+                yield data
+        yield self.finish()
+
+
+def compress_bytes(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    br/gzip response compression negotiated from Accept-Encoding.
+
+    Bodies under COMPRESSION_MIN_SIZE go out as-is; bodies over
+    COMPRESSION_STREAM_SIZE and streaming responses are compressed chunk by
+    chunk so the first bytes leave before the whole body is compressed; only
+    LOW_LATENCY_TYPES (event streams) flush after every chunk. Views marked
+    @compression_exempt are skipped.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = settings.COMPRESSION_MIN_SIZE
+        self.stream_size = settings.COMPRESSION_STREAM_SIZE
+        self.chunk_size = 64 * 1024
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self._compressible(request, response):
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = negotiate_encoding(request.headers.get("Accept-Encoding", ""), brotli is not None)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            flush_each = response.get("Content-Type", "").startswith(LOW_LATENCY_TYPES)
+            response.streaming_content = _Compressor(encoding).stream(response.streaming_content, flush_each)
+            del response["Content-Length"]
+        elif len(response.content) < self.min_size:
+            return response
+        elif len(response.content) >= self.stream_size:
+            content = response.content
+            chunks = (content[i:i + self.chunk_size] for i in range(0, len(content), self.chunk_size))
+            streamed = StreamingHttpResponse(_Compressor(encoding).stream(chunks), status=response.status_code)
+            for header, value in response.items():
+                if header.lower() != "content-length":
+                    streamed[header] = value
+            streamed.cookies = response.cookies
+            response = streamed
+        else:
+            compressed = compress_bytes(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response["Content-Length"] = str(len(compressed))
+
+        # The representation changed, so a strong validator no longer matches.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = encoding
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if getattr(view_func, "compression_exempt", False):
+            request.compression_exempt = True
+        return None
+
+    def _compressible(self, request, response):
+        if getattr(request, "compression_exempt", False) or response.has_header("Content-Encoding"):
+            return False
+        if request.method == "HEAD" or response.status_code in (204, 304):
+            return False
+        if "no-transform" in response.get("Cache-Control", ""):
+            return False
+        return response.get("Content-Type", "").startswith(COMPRESSIBLE_TYPES)
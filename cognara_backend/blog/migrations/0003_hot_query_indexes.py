@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:19
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('blog', '0002_content_models'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(condition=models.Q(('status', 'published')), fields=['-created_at'], name='articles_published_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['author', '-created_at'], name='articles_author_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='articleread',
+            index=models.Index(condition=models.Q(('status__in', ['started', 'in_progress'])), fields=['user', 'article', '-updated_at'], name='article_reads_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='articleread',
+            index=models.Index(fields=['user', 'article', '-created_at'], name='article_reads_user_article_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['article', 'created_at'], name='comments_article_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['email'], name='users_email_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), condition=models.Q(('email', ''), _negated=True), name='users_email_lower_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('username'), name='users_username_lower_key'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Leaderboard',
+            fields=[
+                ('board', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('entries', models.JSONField(default=list)),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'leaderboards',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='articleread',
+            index=models.Index(fields=['updated_at'], name='article_reads_updated_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['created_at'], name='comments_created_at_idx'),
+        ),
+    ]
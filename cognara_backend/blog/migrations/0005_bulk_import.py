@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_leaderboards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='import_hash',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='articlephoto',
+            index=models.Index(fields=['path'], name='article_photos_path_idx'),
+        ),
+    ]
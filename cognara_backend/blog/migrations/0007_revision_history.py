@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_article_autosave'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField()),
+                ('base_version', models.PositiveIntegerField(blank=True, null=True)),
+                ('kind', models.CharField(choices=[('snapshot', 'Snapshot'), ('delta', 'Delta')], max_length=10)),
+                ('data', models.TextField()),
+                ('title', models.CharField(blank=True, default='', max_length=255)),
+                ('length', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='blog.article')),
+            ],
+            options={
+                'db_table': 'article_revisions',
+                'constraints': [models.UniqueConstraint(fields=('article', 'version'), name='article_revisions_article_version_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def count_existing(apps, schema_editor):
+    # Same classification as blog.stats.read_rollup, fixed here as of this migration.
+    open_statuses = ["started", "in_progress"]
+    completed = ["completed", "skimmed", "deep_read", "read", "read_deeply"]
+    deep = ["deep_read", "read_deeply"]
+    ArticleStats = apps.get_model('blog', 'ArticleStats')
+    stats = {}
+    for row in apps.get_model('blog', 'ArticleRead').objects.order_by().values('article_id').annotate(
+            reads=Count('id'), completed_reads=Count('id', filter=Q(status__in=completed)),
+            deep_reads=Count('id', filter=Q(status__in=deep)),
+            active_seconds=Sum('active_time_seconds', filter=~Q(status__in=open_statuses))):
+        row['active_seconds'] = row['active_seconds'] or 0
+        stats[row.pop('article_id')] = row
+    for row in apps.get_model('blog', 'Comment').objects.order_by().values('article_id').annotate(comments=Count('id')):
+        stats.setdefault(row['article_id'], {})['comments'] = row['comments']
+    ArticleStats.objects.bulk_create([ArticleStats(article_id=article_id, **fields) for article_id, fields in stats.items()],
+                                     batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_articles_status_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleStats',
+            fields=[
+                ('article', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='blog.article')),
+                ('reads', models.IntegerField(default=0)),
+                ('completed_reads', models.IntegerField(default=0)),
+                ('deep_reads', models.IntegerField(default=0)),
+                ('active_seconds', models.BigIntegerField(default=0)),
+                ('comments', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'article_stats',
+            },
+        ),
+        migrations.RunPython(count_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_article_stats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='article',
+            name='status',
+            field=models.CharField(choices=[('draft', 'Draft'), ('review', 'In review'), ('pending_review', 'Pending review'), ('published', 'Published'), ('rejected', 'Rejected')], default='draft', max_length=20),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:42
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def count_finished(apps, schema_editor):
+    # Sessions out of the open statuses, as blog.stats.read_rollup counts them as of this migration.
+    open_statuses = ["started", "in_progress"]
+    ArticleStats = apps.get_model('blog', 'ArticleStats')
+    finished = apps.get_model('blog', 'ArticleRead').objects.order_by().values('article_id').annotate(
+        finished_reads=Count('id', filter=Q(status__isnull=False) & ~Q(status__in=open_statuses)))
+    for row in finished.iterator():
+        ArticleStats.objects.filter(article_id=row['article_id']).update(finished_reads=row['finished_reads'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_article_pending_review'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='articlestats',
+            name='finished_reads',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(count_finished, migrations.RunPython.noop),
+    ]
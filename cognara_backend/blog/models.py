@@ -1,7 +1,214 @@
 # blog/models.py
+import uuid
+
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Lower
+
 
 class User(AbstractUser):
-    # Optional: Add any custom fields here
-    pass
+    bio = models.TextField(blank=True, default="Learner at Cognara")
+    email_verified = models.BooleanField(default=False)
+    auth_provider = models.CharField(max_length=32, blank=True, default="")
+
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            models.UniqueConstraint(Lower("email"), condition=~Q(email=""), name="users_email_lower_key"),
+            models.UniqueConstraint(Lower("username"), name="users_username_lower_key"),
+        ]
+        indexes = [models.Index(fields=["email"], name="users_email_idx")]
+
+
+# The models below mirror the Supabase tables (same table and column names) so
+# DATA_BACKEND = 'django' can serve the same rows from a local database.
+
+class Article(models.Model):
+    STATUS_CHOICES = [
+        ("draft", "Draft"),
+        ("review", "In review"),
+        ("pending_review", "Pending review"),
+        ("published", "Published"),
+        ("rejected", "Rejected"),
+    ]
+
+    title = models.CharField(max_length=255, blank=True, default="")
+    content = models.TextField(blank=True, default="")
+    excerpt = models.TextField(blank=True, default="")
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="articles")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="draft")
+    # SHA-256 of (author email, title, content) for rows created by blog.bulk_import.
+    import_hash = models.CharField(max_length=64, null=True, blank=True, unique=True)
+    # Bumped by every title/content write; autosaves are accepted against the current one only.
+    version = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "articles"
+        indexes = [
+            models.Index(fields=["-created_at"], condition=Q(status="published"), name="articles_published_created_idx"),
+            models.Index(fields=["author", "-created_at"], name="articles_author_id_idx"),
+            models.Index(fields=["status", "id"], name="articles_status_id_idx"),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    @property
+    def is_published(self):
+        return self.status == "published"
+
+    # Publishing is the moderation approval step.
+    is_approved = is_published
+
+    @property
+    def slug(self):
+        # The frontend routes articles by id (/article/:id).
+        return str(self.id)
+
+
+class ArticleRevision(models.Model):
+    """
+    One saved version of an article (blog.revisions): a zlib+base64 snapshot of
+    the content, or a compressed delta from base_version.
+    """
+    KIND_CHOICES = [
+        ("snapshot", "Snapshot"),
+        ("delta", "Delta"),
+    ]
+
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name="revisions")
+    version = models.PositiveIntegerField()
+    base_version = models.PositiveIntegerField(null=True, blank=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    data = models.TextField()
+    title = models.CharField(max_length=255, blank=True, default="")
+    # UTF-16 length of the content at this version.
+    length = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "article_revisions"
+        constraints = [
+            models.UniqueConstraint(fields=["article", "version"], name="article_revisions_article_version_key"),
+        ]
+
+
+class Comment(models.Model):
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name="comments")
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="comments")
+    parent = models.ForeignKey("self", on_delete=models.CASCADE, null=True, blank=True, related_name="replies")
+    content = models.TextField()
+    is_approved = models.BooleanField(default=True)
+    like_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "comments"
+        indexes = [
+            models.Index(fields=["article", "created_at"], name="comments_article_id_idx"),
+            models.Index(fields=["created_at"], name="comments_created_at_idx"),
+        ]
+
+
+class ArticleRead(models.Model):
+    session_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="reads")
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name="reads")
+    status = models.CharField(max_length=20, default="started")
+    scroll_depth = models.FloatField(default=0.0)
+    active_time_seconds = models.IntegerField(default=0)
+    required_time_seconds = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "article_reads"
+        indexes = [
+            # Same shapes as supabase/migrations/20261019000002_hot_query_indexes.sql.
+            models.Index(fields=["user", "article", "-updated_at"],
+                         condition=Q(status__in=["started", "in_progress"]), name="article_reads_open_idx"),
+            models.Index(fields=["user", "article", "-created_at"], name="article_reads_user_article_idx"),
+            models.Index(fields=["updated_at"], name="article_reads_updated_at_idx"),
+        ]
+
+
+class ArticleStats(models.Model):
+    """
+    Read and comment totals of one article for the author dashboard, kept
+    current as reads and comments are written (triggers on Supabase, the
+    repositories here) instead of counted on request.
+    """
+
+    article = models.OneToOneField(Article, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    reads = models.IntegerField(default=0)
+    completed_reads = models.IntegerField(default=0)
+    deep_reads = models.IntegerField(default=0)
+    finished_reads = models.IntegerField(default=0)
+    active_seconds = models.BigIntegerField(default=0)
+    comments = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "article_stats"
+
+
+class ArticlePhoto(models.Model):
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name="photos")
+    path = models.CharField(max_length=512)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "article_photos"
+        indexes = [models.Index(fields=["path"], name="article_photos_path_idx")]
+
+
+class NewsletterSubscriber(models.Model):
+    email = models.EmailField(unique=True)
+    is_active = models.BooleanField(default=True)
+    confirmed = models.BooleanField(default=False)
+    source = models.CharField(max_length=32, blank=True, default="website")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "newsletter_subscribers"
+
+    def __str__(self):
+        return self.email
+
+
+class Leaderboard(models.Model):
+    """Precomputed top-N list per ranking board (see blog.ranking)."""
+
+    board = models.CharField(max_length=32, primary_key=True)
+    entries = models.JSONField(default=list)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        db_table = "leaderboards"
+
+
+class FeedDocument(models.Model):
+    """A pre-rendered RSS/Atom feed or sitemap file (see blog.feeds)."""
+
+    name = models.CharField(max_length=32, primary_key=True)
+    entries = models.JSONField(default=list)
+    body = models.TextField()
+    etag = models.CharField(max_length=64)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "feed_documents"
+
+
+class EmailLog(models.Model):
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name="email_logs")
+    subscriber = models.ForeignKey(NewsletterSubscriber, on_delete=models.CASCADE, related_name="email_logs")
+    success = models.BooleanField(default=False)
+    error_message = models.TextField(blank=True, default="")
+    sent_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "email_logs"
@@ -0,0 +1,205 @@
+"""
+Published articles pre-rendered to files, so reading one needs neither
+Supabase nor the user lookup.
+
+For each published article PRERENDER_ROOT/articles/ holds
+  <id>.json  - what GET articles/<id> returns (author names included),
+               byte for byte: both are render_json of the same row
+  <id>.html  - a standalone page (title, byline, content, Open Graph tags)
+               for crawlers and link previews; the content goes through
+               blog.sanitize, since this page is served from the API origin
+Files are written to a temporary name and renamed over the old ones, so a
+reader sees the old file or the new one, never half of either.
+
+get_article answers from <id>.json when it exists and only asks Supabase
+otherwise; a front proxy can skip Django entirely, e.g. with nginx:
+
+    location ~ ^/articles/(\\d+)$ {
+        root /srv/cognara/prerendered;
+        default_type application/json;
+        try_files /articles/$1.json @django;
+    }
+
+article_changed() rewrites or removes an article's files after submit,
+change_status, a restore, an autosave of a live article or an image change.
+Articles whose images still sit at legacy paths need signed URLs that expire,
+so they are served dynamically instead. Changes made behind the app's back
+(an author renaming themselves, edits in the Supabase dashboard) are picked
+up by `python manage.py prerender_articles`, which rebuilds every file on a
+process pool. With several web servers PRERENDER_ROOT must be shared storage.
+"""
+
+import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape, quoteattr
+
+from django.conf import settings
+
+from . import images, sanitize
+from .encoding import dumps
+from .repositories import get_repos
+
+logger = logging.getLogger(__name__)
+
+BATCH = 200
+EXTENSIONS = ("json", "html")
+
+
+def _directory(root=None):
+    return os.path.join(root or settings.PRERENDER_ROOT, "articles")
+
+
+def path_for(article_id, extension, root=None):
+    return os.path.join(_directory(root), f"{int(article_id)}.{extension}")
+
+
+def open_file(article_id, extension):
+    """The pre-rendered file opened for reading, or None."""
+    try:
+        return open(path_for(article_id, extension), "rb")
+    except (OSError, ValueError):
+        return None
+
+
+def exists(article_id):
+    return os.path.exists(path_for(article_id, "json"))
+
+
+def image_urls(paths):
+    """Stable URLs for `paths`, or None when one of them can only be served signed."""
+    if not all(images.is_blob(path) for path in paths):
+        return None
+    urls = [images.public_url(path) for path in paths]
+    base = settings.FEEDS_BASE_URL.rstrip("/")
+    return [url if "://" in url else base + url for url in urls]
+
+
+def render_json(article):
+    """The GET articles/<id> body; get_article renders the dynamic answer with it too."""
+    return dumps(article)
+
+
+def render_html(article, urls, frontend_url):
+    title = article.get("title") or ""
+    author = " ".join(part for part in (article.get("author_first_name"), article.get("author_last_name")) if part)
+    excerpt = article.get("excerpt") or ""
+    canonical = f"{frontend_url.rstrip('/')}/article/{article['id']}"
+    meta = [
+        f'<link rel="canonical" href={quoteattr(canonical)}>',
+        '<meta property="og:type" content="article">',
+        f'<meta property="og:title" content={quoteattr(title)}>',
+        f'<meta property="og:url" content={quoteattr(canonical)}>',
+    ]
+    if excerpt:
+        meta.append(f'<meta name="description" content={quoteattr(excerpt)}>')
+        meta.append(f'<meta property="og:description" content={quoteattr(excerpt)}>')
+    if urls:
+        meta.append(f'<meta property="og:image" content={quoteattr(urls[0])}>')
+    byline = escape(author) if author else ""
+    if article.get("created_at"):
+        byline += f' <time datetime={quoteattr(str(article["created_at"]))}>{escape(str(article["created_at"])[:10])}</time>'
+    return (
+        "<!doctype html>\n"
+        '<html lang="en"><head><meta charset="utf-8">'
+        f"<title>{escape(title)}</title>{''.join(meta)}</head>"
+        f"<body><article><h1>{escape(title)}</h1>"
+        f'<p class="byline">{byline}</p>'
+        f"{sanitize.clean_html(article.get('content'))}</article></body></html>\n"
+    ).encode("utf-8")
+
+
+def _replace(path, data):
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+        os.chmod(temporary, 0o644)  # mkstemp's 0600 would hide it from the proxy
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def write(article, urls, root=None, frontend_url=None):
+    os.makedirs(_directory(root), exist_ok=True)
+    # The JSON last: once it is there get_article serves the article from disk.
+    _replace(path_for(article["id"], "html", root), render_html(article, urls, frontend_url or settings.FRONTEND_URL))
+    _replace(path_for(article["id"], "json", root), render_json(article))
+
+
+def remove(article_id, root=None):
+    # The JSON first: get_article checks it.
+    for extension in EXTENSIONS:
+        try:
+            os.unlink(path_for(article_id, extension, root))
+        except FileNotFoundError:
+            pass
+
+
+def article_changed(article_id, repos=None):
+    """Write the article's files if it is published (and its images have stable URLs), else remove them."""
+    return articles_changed([article_id], repos) == 1
+
+
+def articles_changed(article_ids, repos=None):
+    """article_changed for several articles with one fetch; returns how many were written."""
+    repos = repos or get_repos()
+    article_ids = list(article_ids)
+    published = repos.articles.published_by_ids(article_ids)
+    paths = repos.photos.paths_for_articles([article["id"] for article in published]) if published else {}
+    written = set()
+    for article in published:
+        urls = image_urls(paths.get(article["id"], []))
+        if urls is not None:
+            write(article, urls)
+            written.add(article["id"])
+    for article_id in article_ids:
+        if int(article_id) not in written:
+            remove(article_id)
+    return len(written)
+
+
+def _write_batch(root, frontend_url, batch):
+    for article, urls in batch:
+        write(article, urls, root, frontend_url)
+    return len(batch)
+
+
+def rebuild(workers=None, repos=None):
+    """
+    Render every published article and drop files of articles that are no
+    longer published. Fetching stays in this process, a batch at a time;
+    rendering and writing run on `workers` processes. Returns counts.
+    """
+    repos = repos or get_repos()
+    root, frontend_url = settings.PRERENDER_ROOT, settings.FRONTEND_URL
+    os.makedirs(_directory(root), exist_ok=True)
+    ids = [row["id"] for row in repos.articles.published_lastmod()]
+    written = legacy = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for start in range(0, len(ids), BATCH):
+            chunk = ids[start:start + BATCH]
+            paths = repos.photos.paths_for_articles(chunk)
+            batch = []
+            for article in repos.articles.published_by_ids(chunk):
+                urls = image_urls(paths.get(article["id"], []))
+                if urls is None:
+                    legacy += 1
+                    remove(article["id"], root)
+                else:
+                    batch.append((article, urls))
+            pending.append(pool.submit(_write_batch, root, frontend_url, batch))
+        for future in pending:
+            written += future.result()
+
+    published = {str(article_id) for article_id in ids}
+    removed = 0
+    for name in os.listdir(_directory(root)):
+        stem, _, extension = name.partition(".")
+        if extension in EXTENSIONS and stem not in published:
+            os.unlink(os.path.join(_directory(root), name))
+            removed += extension == "json"
+    return {"written": written, "legacy_images": legacy, "removed": removed}
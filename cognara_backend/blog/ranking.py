@@ -0,0 +1,131 @@
+"""
+Trending / popular article leaderboards.
+
+Scores are rebuilt in batch from recent read sessions and comments
+(`python manage.py compute_rankings`, run from cron). Each board's top-N is
+stored with the article cards already attached, so serving a board is one
+cache get (or one leaderboards row on a cold cache).
+"""
+
+import math
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .repositories import get_repos
+
+
+# Weight of one read session by its final status; deep reads count most.
+READ_WEIGHTS = {
+    "deep_read": 4.0,
+    "read_deeply": 4.0,
+    "read": 2.0,
+    "completed": 2.0,
+    "in_progress": 1.0,
+    "skimmed": 0.5,
+    "started": 0.25,
+    "abandoned": 0.1,
+}
+COMMENT_WEIGHT = 1.5
+
+TRENDING = "trending"
+MOST_READ_WEEK = "most_read_week"
+DEEPLY_READ = "deeply_read"
+BOARDS = (TRENDING, MOST_READ_WEEK, DEEPLY_READ)
+
+CARD_FIELDS = ("id", "title", "excerpt", "author_id", "author_first_name", "author_last_name", "created_at")
+
+
+def _as_datetime(value):
+    # Supabase returns ISO strings, the ORM backend aware datetimes
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _decay(age_seconds, half_life_seconds):
+    return math.pow(0.5, max(age_seconds, 0.0) / half_life_seconds)
+
+
+def score_events(reads, comments, now, half_life_hours=None):
+    """
+    {board: {article_id: score}} from read sessions and comments.
+
+    trending       - time-decayed read weights plus comments
+    most_read_week - sessions (not abandoned) in the last 7 days
+    deeply_read    - time-decayed deep reads only
+    """
+    half_life = (half_life_hours or settings.RANKING_HALF_LIFE_HOURS) * 3600.0
+    week_ago = now - timedelta(days=7)
+    boards = {board: {} for board in BOARDS}
+    trending, week, deep = boards[TRENDING], boards[MOST_READ_WEEK], boards[DEEPLY_READ]
+
+    for read in reads:
+        article_id = read["article_id"]
+        at = _as_datetime(read["updated_at"])
+        status = read.get("status")
+        decay = _decay((now - at).total_seconds(), half_life)
+        trending[article_id] = trending.get(article_id, 0.0) + READ_WEIGHTS.get(status, 0.0) * decay
+        if status in ("deep_read", "read_deeply"):
+            deep[article_id] = deep.get(article_id, 0.0) + decay
+        if at >= week_ago and status != "abandoned":
+            week[article_id] = week.get(article_id, 0) + 1
+
+    for comment in comments:
+        article_id = comment["article_id"]
+        decay = _decay((now - _as_datetime(comment["created_at"])).total_seconds(), half_life)
+        trending[article_id] = trending.get(article_id, 0.0) + COMMENT_WEIGHT * decay
+
+    return boards
+
+
+def top_n(scores, n):
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:n]
+
+
+def _cache_key(board):
+    return f"leaderboard:{board}"
+
+
+def recompute(now=None, repos=None):
+    """Rebuild and store every board; returns {board: number of entries}."""
+    repos = repos or get_repos()
+    now = now or datetime.now(timezone.utc)
+    since = now - timedelta(days=settings.RANKING_WINDOW_DAYS)
+    boards = score_events(repos.reads.events_since(since), repos.comments.events_since(since), now)
+
+    # Over-fetch so drafts/rejected articles dropping out still leave N entries.
+    limit = settings.RANKING_TOP_N
+    ranked = {board: top_n(scores, limit * 2) for board, scores in boards.items()}
+    ids = {article_id for entries in ranked.values() for article_id, _ in entries}
+    cards = {article["id"]: article for article in repos.articles.published_by_ids(ids)}
+
+    sizes = {}
+    for board, entries in ranked.items():
+        rows = [dict({field: cards[article_id].get(field) for field in CARD_FIELDS}, score=round(score, 4))
+                for article_id, score in entries if article_id in cards][:limit]
+        repos.leaderboards.save(board, rows, now)
+        cache.set(_cache_key(board), {"board": board, "entries": rows, "computed_at": now.isoformat()},
+                  settings.RANKING_CACHE_SECONDS)
+        sizes[board] = len(rows)
+    return sizes
+
+
+def get_leaderboard(board, repos=None):
+    """Stored board as {'board', 'entries', 'computed_at'}; cache first, then the leaderboards table."""
+    key = _cache_key(board)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    row = (repos or get_repos()).leaderboards.get(board)
+    if row is None:
+        return {"board": board, "entries": [], "computed_at": None}
+    computed_at = row["computed_at"]
+    value = {
+        "board": board,
+        "entries": row["entries"],
+        "computed_at": computed_at.isoformat() if isinstance(computed_at, datetime) else computed_at,
+    }
+    cache.set(key, value, settings.RANKING_CACHE_SECONDS)
+    return value
@@ -0,0 +1,320 @@
+"""
+"Read next" recommendations from a precomputed item-item similarity index.
+
+Articles are TF-IDF vectors over their text (tags stripped as in
+estimate_required_time_seconds); each article keeps its K most similar
+articles. `manage.py build_recommendations` builds the index offline and
+saves it to RECOMMENDATIONS_INDEX_PATH; workers load it lazily and reload
+when the file changes. Publishing through `submit` folds the article into
+a copy of the loaded index (vocabulary and IDF stay those of the last full
+build), swaps the copy in and saves it in the background. A loaded index is
+never modified, so requests read it without taking the lock.
+
+Serving never touches the database for related articles; per-user lists
+need one read-history query and then merge the neighbour lists.
+"""
+
+import logging
+import os
+import pickle
+import threading
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+from scipy import sparse
+
+from .helper import WORD_RE, strip_tags
+from .ranking import CARD_FIELDS, READ_WEIGHTS
+
+logger = logging.getLogger(__name__)
+
+STOPWORDS = frozenset(
+    "the and for are but not you all any can had her was one our out has him his how its may new now old see "
+    "two who did get let put say she too use with that this from they will would there their what about which "
+    "when make like time just know take into year your some could them than then look only come over also back "
+    "after work first well even want because these give most".split()
+)
+TERMS_PER_DOC = 64
+CHUNK_ROWS = 256
+
+
+def tokenize(text):
+    return [token for token in WORD_RE.findall(strip_tags(text).lower())
+            if len(token) > 2 and token not in STOPWORDS and not token.isdigit()]
+
+
+def _card(article):
+    return {field: article.get(field) for field in CARD_FIELDS}
+
+
+class RecommendationIndex:
+    def __init__(self, ids, vocabulary, idf, matrix, neighbours, scores, cards):
+        self.ids = ids                  # row -> article id
+        self.row_of = {article_id: row for row, article_id in enumerate(ids.tolist())}
+        self.vocabulary = vocabulary    # term -> column
+        self.idf = idf                  # float32[terms]
+        self.matrix = matrix            # csr float32[articles, terms], rows L2-normalised
+        self.neighbours = neighbours    # int32[articles, K] rows, -1 = empty slot
+        self.scores = scores            # float32[articles, K] cosine similarity
+        self.cards = cards              # article id -> card for the response
+
+    @property
+    def k(self):
+        return self.neighbours.shape[1]
+
+    def nbytes(self):
+        m = self.matrix
+        return m.data.nbytes + m.indices.nbytes + m.indptr.nbytes + self.neighbours.nbytes + self.scores.nbytes
+
+    # -- building ---------------------------------------------------------
+
+    @classmethod
+    def build(cls, articles, k=None, min_df=2, max_df=0.5):
+        """Full rebuild from published articles (rows with id, title, content and the card fields)."""
+        k = k or settings.RECOMMENDATIONS_NEIGHBOURS
+        # Terms get provisional ids as they are seen, and each document is kept
+        # as two small arrays instead of a Counter.
+        terms, documents = {}, []
+        for article in articles:
+            counts = Counter(tokenize(f"{article.get('title') or ''} {article.get('content') or ''}"))
+            documents.append((
+                np.fromiter((terms.setdefault(term, len(terms)) for term in counts), np.int32, len(counts)),
+                np.fromiter(counts.values(), np.float32, len(counts)),
+            ))
+        n = len(documents)
+        if n < 20:
+            # Too few documents for document-frequency pruning to mean anything.
+            min_df, max_df = 1, 1.0
+        df = np.bincount(np.concatenate([ids for ids, _ in documents]), minlength=len(terms)) \
+            if documents else np.zeros(0, dtype=np.int64)
+        keep = (df >= min_df) & (df <= max_df * n)
+        column_of = np.full(len(terms), -1, dtype=np.int32)
+        column_of[keep] = np.arange(int(keep.sum()), dtype=np.int32)
+        vocabulary = {term: int(column_of[i]) for term, i in terms.items() if keep[i]}
+        idf = (np.log((1 + n) / (1 + df[keep])) + 1).astype(np.float32)
+
+        index = cls(
+            ids=np.array([article["id"] for article in articles], dtype=np.int64),
+            vocabulary=vocabulary,
+            idf=idf,
+            matrix=cls._vectors([(column_of[ids], tf) for ids, tf in documents], idf),
+            neighbours=np.full((n, k), -1, dtype=np.int32),
+            scores=np.zeros((n, k), dtype=np.float32),
+            cards={article["id"]: _card(article) for article in articles},
+        )
+        index._compute_neighbours()
+        return index
+
+    @staticmethod
+    def _vectors(documents, idf):
+        """
+        csr rows of sublinear tf * idf from (columns, term counts) pairs, where
+        column -1 is a pruned term. Each row keeps its TERMS_PER_DOC strongest
+        terms and is L2-normalised; the cut drops the low-idf words every
+        article shares, which is what keeps X @ X.T sparse.
+        """
+        indptr, indices, data = [0], [], []
+        for columns, tf in documents:
+            known = columns >= 0
+            columns = columns[known]
+            weights = (1 + np.log(tf[known])) * idf[columns]
+            if len(columns) > TERMS_PER_DOC:
+                keep = np.argpartition(-weights, TERMS_PER_DOC - 1)[:TERMS_PER_DOC]
+                columns, weights = columns[keep], weights[keep]
+            norm = np.linalg.norm(weights)
+            if norm:
+                weights /= norm
+            indices.append(columns)
+            data.append(weights)
+            indptr.append(indptr[-1] + len(columns))
+        return sparse.csr_matrix(
+            (np.concatenate(data) if data else np.empty(0, dtype=np.float32),
+             np.concatenate(indices) if indices else np.empty(0, dtype=np.int32),
+             np.array(indptr, dtype=np.int64)),
+            shape=(len(documents), len(idf)), dtype=np.float32,
+        )
+
+    def _top_k(self, similarities, exclude):
+        similarities[exclude] = 0
+        k = min(self.k, similarities.shape[0])
+        if k == 0:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        top = top[similarities[top] > 0]
+        return top.astype(np.int32), similarities[top]
+
+    def _compute_neighbours(self):
+        # Row blocks of X @ X.T keep the dense similarity slab at CHUNK_ROWS x n.
+        transposed = self.matrix.T.tocsc()
+        for start in range(0, self.matrix.shape[0], CHUNK_ROWS):
+            block = (self.matrix[start:start + CHUNK_ROWS] @ transposed).toarray()
+            for offset, similarities in enumerate(block):
+                row = start + offset
+                top, values = self._top_k(similarities, row)
+                self.neighbours[row, :len(top)] = top
+                self.scores[row, :len(top)] = values
+
+    # -- incremental updates ----------------------------------------------
+
+    def with_article(self, article):
+        """A copy with one published article added or refreshed, without a full rebuild."""
+        counts = Counter(tokenize(f"{article.get('title') or ''} {article.get('content') or ''}"))
+        columns = np.fromiter((self.vocabulary.get(term, -1) for term in counts), np.int32, len(counts))
+        vector = self._vectors([(columns, np.fromiter(counts.values(), np.float32, len(counts)))], self.idf)
+        ids, row = self.ids, self.row_of.get(article["id"])
+        if row is None:
+            row = self.matrix.shape[0]
+            matrix = sparse.vstack([self.matrix, vector], format="csr")
+            ids = np.append(ids, article["id"])
+            neighbours = np.vstack([self.neighbours, np.full((1, self.k), -1, dtype=np.int32)])
+            scores = np.vstack([self.scores, np.zeros((1, self.k), dtype=np.float32)])
+        else:
+            matrix = sparse.vstack([self.matrix[:row], vector, self.matrix[row + 1:]], format="csr")
+            neighbours, scores = self.neighbours.copy(), self.scores.copy()
+
+        top, values = self._top_k((matrix @ vector.T).toarray().ravel(), row)
+        neighbours[row] = -1
+        scores[row] = 0
+        neighbours[row, :len(top)] = top
+        scores[row, :len(top)] = values
+        # Offer the article to its neighbours' lists (similarity is symmetric).
+        for other, score in zip(top.tolist(), values.tolist()):
+            slots = neighbours[other]
+            existing = np.flatnonzero(slots == row)
+            slot = existing[0] if existing.size else int(np.argmin(scores[other]))
+            if existing.size or score > scores[other, slot]:
+                neighbours[other, slot] = row
+                scores[other, slot] = score
+                order = np.argsort(-scores[other])
+                neighbours[other] = neighbours[other][order]
+                scores[other] = scores[other][order]
+        return RecommendationIndex(ids, self.vocabulary, self.idf, matrix, neighbours, scores,
+                                   {**self.cards, article["id"]: _card(article)})
+
+    def without_article(self, article_id):
+        """A copy that stops recommending an article (unpublished); its row stays until the next rebuild."""
+        cards = dict(self.cards)
+        cards.pop(article_id, None)
+        return RecommendationIndex(self.ids, self.vocabulary, self.idf, self.matrix, self.neighbours,
+                                   self.scores, cards)
+
+    # -- serving ----------------------------------------------------------
+
+    def related(self, article_id, limit=10):
+        row = self.row_of.get(article_id)
+        if row is None:
+            return []
+        results = []
+        for other, score in zip(self.neighbours[row].tolist(), self.scores[row].tolist()):
+            card = self.cards.get(int(self.ids[other])) if other >= 0 else None
+            if card is not None:
+                results.append(dict(card, score=round(score, 4)))
+                if len(results) == limit:
+                    break
+        return results
+
+    def for_history(self, history, limit=10):
+        """
+        Merge the neighbour lists of articles in `history` ([{'article_id', 'status'}],
+        newest first), weighted by read depth and recency; already-read articles are skipped.
+        """
+        read = {entry["article_id"] for entry in history}
+        totals = {}
+        for position, entry in enumerate(history):
+            row = self.row_of.get(entry["article_id"])
+            if row is None:
+                continue
+            weight = READ_WEIGHTS.get(entry.get("status"), 0.5) * (0.9 ** position)
+            for other, score in zip(self.neighbours[row].tolist(), self.scores[row].tolist()):
+                if other >= 0:
+                    totals[other] = totals.get(other, 0.0) + weight * score
+        results = []
+        for other, score in sorted(totals.items(), key=lambda item: -item[1]):
+            article_id = int(self.ids[other])
+            card = self.cards.get(article_id)
+            if card is not None and article_id not in read:
+                results.append(dict(card, score=round(score, 4)))
+                if len(results) == limit:
+                    break
+        return results
+
+
+# -- process-wide index ------------------------------------------------------
+
+_lock = threading.Lock()
+_index = None
+_index_mtime = None
+
+
+def save_index(index, path=None):
+    path = str(path or settings.RECOMMENDATIONS_INDEX_PATH)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as handle:
+        pickle.dump(index, handle, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def get_index():
+    """The loaded index, reloaded when the file on disk changes; None if none has been built."""
+    global _index, _index_mtime
+    path = str(settings.RECOMMENDATIONS_INDEX_PATH)
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        return _index
+    if mtime != _index_mtime:
+        with _lock:
+            if mtime != _index_mtime:
+                with open(path, "rb") as handle:
+                    _index = pickle.load(handle)
+                _index_mtime = mtime
+    return _index
+
+
+def rebuild(repos=None):
+    from .repositories import get_repos
+
+    global _index, _index_mtime
+    index = RecommendationIndex.build((repos or get_repos()).articles.list_published())
+    save_index(index)
+    with _lock:
+        _index = index
+        _index_mtime = os.stat(str(settings.RECOMMENDATIONS_INDEX_PATH)).st_mtime
+    return index
+
+
+def _save_in_background():
+    def run():
+        global _index_mtime
+        try:
+            with _lock:
+                # Whatever is current by now, so a slow save never writes an older copy last.
+                save_index(_index)
+                _index_mtime = os.stat(str(settings.RECOMMENDATIONS_INDEX_PATH)).st_mtime
+        except Exception:
+            logger.exception("Saving recommendation index failed")
+
+    threading.Thread(target=run, name="recommendations-save", daemon=True).start()
+
+
+def article_changed(article):
+    """Keep the index in step with an article write (called from submit)."""
+    from .repositories import get_repos
+
+    global _index
+    if get_index() is None:
+        return
+    if article.get("status") == "published":
+        # The written row has no author names; the card needs them.
+        article = get_repos().articles.get(article["id"]) or article
+    with _lock:
+        # Built from whatever is current under the lock so concurrent publishes don't drop each other.
+        if article.get("status") == "published":
+            _index = _index.with_article(article)
+        elif article["id"] in _index.cards:
+            _index = _index.without_article(article["id"])
+        else:
+            return
+    _save_in_background()
@@ -0,0 +1,72 @@
+"""
+Data-access layer for the blog views.
+
+settings.DATA_BACKEND picks the implementation:
+  'supabase' - the shared Supabase client from blog.helper (default)
+  'django'   - the Django ORM over blog.models (local Postgres/SQLite)
+"""
+
+from django.conf import settings
+
+
+class Repositories:
+    def __init__(self, articles, users, comments, reads, photos, subscribers, leaderboards, export, revisions, feeds):
+        self.articles = articles
+        self.users = users
+        self.comments = comments
+        self.reads = reads
+        self.photos = photos
+        self.subscribers = subscribers
+        self.leaderboards = leaderboards
+        self.export = export
+        self.revisions = revisions
+        self.feeds = feeds
+
+
+def build_repositories(backend, client=None):
+    if backend == "django":
+        from . import django_backend as impl
+
+        return Repositories(
+            articles=impl.DjangoArticlesRepo(),
+            users=impl.DjangoUsersRepo(),
+            comments=impl.DjangoCommentsRepo(),
+            reads=impl.DjangoReadsRepo(),
+            photos=impl.DjangoPhotosRepo(),
+            subscribers=impl.DjangoSubscribersRepo(),
+            leaderboards=impl.DjangoLeaderboardsRepo(),
+            export=impl.DjangoExportRepo(),
+            revisions=impl.DjangoRevisionsRepo(),
+            feeds=impl.DjangoFeedsRepo(),
+        )
+
+    if backend == "supabase":
+        from . import supabase_backend as impl
+
+        if client is None:
+            from ..helper import supabase as client
+        users = impl.SupabaseUsersRepo(client)
+        return Repositories(
+            articles=impl.SupabaseArticlesRepo(client, users),
+            users=users,
+            comments=impl.SupabaseCommentsRepo(client, users),
+            reads=impl.SupabaseReadsRepo(client),
+            photos=impl.SupabasePhotosRepo(client),
+            subscribers=impl.SupabaseSubscribersRepo(client),
+            leaderboards=impl.SupabaseLeaderboardsRepo(client),
+            export=impl.SupabaseExportRepo(client),
+            revisions=impl.SupabaseRevisionsRepo(client),
+            feeds=impl.SupabaseFeedsRepo(client),
+        )
+
+    raise ValueError(f"Unknown DATA_BACKEND {backend!r}")
+
+
+_repositories = None
+
+
+def get_repos():
+    global _repositories
+    if _repositories is None:
+        _repositories = build_repositories(getattr(settings, "DATA_BACKEND", "supabase"))
+    return _repositories
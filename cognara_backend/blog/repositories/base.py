@@ -0,0 +1,363 @@
+"""
+Data-access contracts used by the views. Rows are plain dicts keyed by the
+Supabase column names (author_id, user_id, ...) whichever backend serves them.
+A backend missing one of the abstract methods fails when it is built rather
+than on the first request that needs it.
+"""
+
+from abc import ABC, abstractmethod
+
+
+class ArticlesRepo(ABC):
+    @abstractmethod
+    def list_published(self):
+        """Published articles with author_first_name/author_last_name attached."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_by_author(self, author_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, article_id):
+        """One article with author names, or None."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_author_id(self, article_id):
+        """author_id of the article, or None if it does not exist."""
+        raise NotImplementedError
+
+    def exists(self, article_id):
+        return self.get_author_id(article_id) is not None
+
+    @abstractmethod
+    def get_meta(self, article_id):
+        """{'id', 'author_id', 'status'} or None."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_content(self, article_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def recent_published(self, limit):
+        """Newest `limit` published articles (by created_at), with author names."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def published_lastmod(self):
+        """id, created_at and updated_at of every published article."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def published_by_ids(self, article_ids):
+        """Published articles among `article_ids`, with author names, in no particular order."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def create(self, data):
+        raise NotImplementedError
+
+    @abstractmethod
+    def create_many(self, rows):
+        """Insert rows in one batch (see blog.bulk_import)."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def ids_for_import_hashes(self, hashes):
+        """{import_hash: id} for articles already imported."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def update(self, article_id, data):
+        """Returns the updated row, or None if nothing matched."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def moderation_page(self, status, after_id=0, limit=50):
+        """
+        Up to `limit` articles with `status` and id > after_id, in id order, as
+        summaries (no content) with author names.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def status_counts(self):
+        """{status: number of articles}."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_status_many(self, article_ids, from_statuses, status):
+        """
+        Set `status` on those of `article_ids` currently in `from_statuses`, in
+        one write. Returns the updated rows.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def author_stats(self, author_id, limit=50, before_id=None):
+        """
+        {'totals', 'articles'} for the author dashboard, from the article_stats
+        rollups. `totals` covers all of the author's articles; `articles` holds
+        up to `limit` summaries (no content) newest first, older than
+        `before_id` when given. Both carry reads, completed_reads, deep_reads,
+        finished_reads, active_seconds and comments.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_draft(self, article_id):
+        """{'id', 'author_id', 'title', 'content', 'version'} or None (see blog.drafts)."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_draft(self, article_id, author_id, base_version, title, content, revision):
+        """
+        Store `content` (and `title` unless None) as version base_version + 1 and
+        add `revision` (see blog.revisions.build) to article_revisions, only if the
+        article is the author's and still at `base_version`. Returns the new
+        version, or None if it was not.
+        """
+        raise NotImplementedError
+
+
+class UsersRepo(ABC):
+    @abstractmethod
+    def get_name(self, user_id):
+        """{'first_name', 'last_name'} or None."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def names_by_ids(self, user_ids):
+        """{id: {'first_name', 'last_name'}} in one query."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def usernames_by_ids(self, user_ids):
+        raise NotImplementedError
+
+    @abstractmethod
+    def username_exists(self, username):
+        raise NotImplementedError
+
+    @abstractmethod
+    def email_exists(self, email):
+        raise NotImplementedError
+
+    @abstractmethod
+    def id_for_email(self, email):
+        raise NotImplementedError
+
+    @abstractmethod
+    def ids_for_emails(self, emails):
+        """{email: id} for the (lower-cased) emails that exist."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def usernames_taken(self, usernames):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_by_email(self, email):
+        raise NotImplementedError
+
+    @abstractmethod
+    def create(self, data):
+        raise NotImplementedError
+
+    @abstractmethod
+    def create_many(self, rows):
+        raise NotImplementedError
+
+    @abstractmethod
+    def update(self, user_id, data):
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_by_email(self, email, data):
+        """Returns the updated rows."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def upsert_google(self, email, first_name, last_name):
+        """Create or refresh a Google sign-in's account in one call: {'id', 'is_new'}."""
+        raise NotImplementedError
+
+
+class CommentsRepo(ABC):
+    @abstractmethod
+    def list_for_article(self, article_id):
+        """Comments of an article, each with the commenter's `username`."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def events_since(self, since):
+        """[{'article_id', 'created_at'}] for comments created after `since`."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def create(self, data):
+        raise NotImplementedError
+
+
+class ReadsRepo(ABC):
+    @abstractmethod
+    def get_by_session(self, session_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def latest(self, user_id, article_id):
+        """Most recently created session for the pair, any status."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def latest_open(self, user_id, article_id, statuses):
+        """Most recently updated session whose status is in `statuses`."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_by_session(self, session_id, data):
+        raise NotImplementedError
+
+    @abstractmethod
+    def events_since(self, since):
+        """[{'article_id', 'status', 'updated_at'}] for sessions touched after `since`."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def history_for_user(self, user_id, limit):
+        """[{'article_id', 'status', 'updated_at'}] of the user's latest sessions, newest first."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def record_heartbeat(self, session_id, status, scroll_depth, active_time_seconds, required_time_seconds=None):
+        """
+        Merge one heartbeat into the session atomically (see helper.apply_heartbeat).
+        Returns the updated row, or None if the session does not exist.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def create(self, data):
+        raise NotImplementedError
+
+
+class PhotosRepo(ABC):
+    @abstractmethod
+    def paths_for_article(self, article_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def paths_for_articles(self, article_ids):
+        """{article_id: [path, ...]} for the articles that have images."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def add(self, article_id, path):
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_many(self, rows):
+        """rows: [{'article_id', 'path'}]."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def articles_for_paths(self, paths):
+        """{path: {article_id, ...}} for the paths that have rows; a path's reference count is len() of its set."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_for_article(self, article_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_paths(self, article_id, paths):
+        raise NotImplementedError
+
+
+class LeaderboardsRepo(ABC):
+    @abstractmethod
+    def get(self, board):
+        """{'board', 'entries', 'computed_at'} or None."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def save(self, board, entries, computed_at):
+        raise NotImplementedError
+
+
+class RevisionsRepo(ABC):
+    @abstractmethod
+    def add(self, article_id, revision):
+        raise NotImplementedError
+
+    @abstractmethod
+    def list(self, article_id, before=None, limit=50):
+        """Newest first, without data: version, base_version, kind, title, length, created_at."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def latest_snapshot(self, article_id, version):
+        """Highest snapshot version <= `version`, or None."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def between(self, article_id, low, high):
+        """Full rows with low <= version <= high."""
+        raise NotImplementedError
+
+
+class FeedsRepo(ABC):
+    """Pre-rendered feed and sitemap documents (see blog.feeds)."""
+
+    @abstractmethod
+    def get(self, name):
+        """{'name', 'entries', 'etag'} or None."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_body(self, name):
+        """{'name', 'body', 'etag'} or None."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def save(self, name, entries, body, etag, previous_etag):
+        """
+        Store the document only if it is still at `previous_etag` (None: only
+        if there is no such document yet). Returns whether it was stored.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def put(self, name, entries, body, etag):
+        raise NotImplementedError
+
+    @abstractmethod
+    def names(self):
+        """[{'name'}] of every stored document."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, name):
+        raise NotImplementedError
+
+
+class ExportRepo(ABC):
+    @abstractmethod
+    def page(self, table, after_id, since, limit):
+        """
+        Up to `limit` full rows of `table` with id > after_id (and updated_at >= since
+        when given), ordered by id.
+        """
+        raise NotImplementedError
+
+
+class SubscribersRepo(ABC):
+    @abstractmethod
+    def exists(self, email):
+        raise NotImplementedError
+
+    @abstractmethod
+    def create(self, data):
+        raise NotImplementedError
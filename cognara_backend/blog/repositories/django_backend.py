@@ -0,0 +1,415 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ..models import Article, ArticlePhoto, ArticleRead, ArticleRevision, ArticleStats, Comment, FeedDocument, Leaderboard, NewsletterSubscriber, User
+from ..stats import STATS_FIELDS, read_rollup, rollup_delta
+from . import base
+
+
+def _bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() == "true"
+    return bool(value)
+
+
+ARTICLE_FIELDS = ("id", "title", "content", "excerpt", "author_id", "status", "version", "created_at", "updated_at")
+MODERATION_FIELDS = ("id", "title", "excerpt", "author_id", "status", "created_at", "updated_at")
+STATS_ARTICLE_FIELDS = ("id", "title", "status", "created_at", "updated_at")
+
+
+def _add_stats(article_id, changes):
+    """Add `changes` ({field: delta}) to the article's ArticleStats row, creating it on first use."""
+    changes = {field: delta for field, delta in changes.items() if delta}
+    if not changes:
+        return
+    ArticleStats.objects.get_or_create(article_id=article_id)
+    ArticleStats.objects.filter(article_id=article_id).update(
+        updated_at=timezone.now(), **{field: F(field) + delta for field, delta in changes.items()})
+
+
+class DjangoArticlesRepo(base.ArticlesRepo):
+    def _with_authors(self, queryset):
+        # One JOIN instead of a users lookup per article.
+        return queryset.annotate(
+            author_first_name=F("author__first_name"),
+            author_last_name=F("author__last_name"),
+        ).values(*ARTICLE_FIELDS, "author_first_name", "author_last_name")
+
+    def list_published(self):
+        return list(self._with_authors(Article.objects.filter(status="published")))
+
+    def list_by_author(self, author_id):
+        return list(self._with_authors(Article.objects.filter(author_id=author_id)))
+
+    def get(self, article_id):
+        return self._with_authors(Article.objects.filter(id=article_id)).first()
+
+    def get_author_id(self, article_id):
+        return Article.objects.filter(id=article_id).values_list("author_id", flat=True).first()
+
+    def exists(self, article_id):
+        return Article.objects.filter(id=article_id).exists()
+
+    def get_meta(self, article_id):
+        return Article.objects.filter(id=article_id).values("id", "author_id", "status").first()
+
+    def get_content(self, article_id):
+        content = Article.objects.filter(id=article_id).values_list("content", flat=True).first()
+        return content if content is None else content or ""
+
+    def recent_published(self, limit):
+        return list(self._with_authors(Article.objects.filter(status="published").order_by("-created_at"))[:limit])
+
+    def published_lastmod(self):
+        return list(Article.objects.filter(status="published").order_by("id").values("id", "created_at", "updated_at"))
+
+    def published_by_ids(self, article_ids):
+        return list(self._with_authors(Article.objects.filter(status="published", id__in=list(article_ids))))
+
+    def create(self, data):
+        article = Article.objects.create(**{key: value for key, value in data.items() if value is not None})
+        return Article.objects.filter(id=article.id).values(*ARTICLE_FIELDS).first()
+
+    def create_many(self, rows):
+        Article.objects.bulk_create([Article(**row) for row in rows])
+
+    def ids_for_import_hashes(self, hashes):
+        return dict(Article.objects.filter(import_hash__in=list(hashes)).values_list("import_hash", "id"))
+
+    def update(self, article_id, data):
+        data = dict(data)
+        if ("title" in data or "content" in data) and "version" not in data:
+            # What the articles_bump_version trigger does on Supabase.
+            data["version"] = F("version") + 1
+        if not Article.objects.filter(id=article_id).update(updated_at=timezone.now(), **data):
+            return None
+        return Article.objects.filter(id=article_id).values(*ARTICLE_FIELDS).first()
+
+    def moderation_page(self, status, after_id=0, limit=50):
+        return list(Article.objects.filter(status=status, id__gt=after_id).order_by("id").annotate(
+            author_first_name=F("author__first_name"),
+            author_last_name=F("author__last_name"),
+        ).values(*MODERATION_FIELDS, "author_first_name", "author_last_name")[:limit])
+
+    def status_counts(self):
+        return dict(Article.objects.order_by().values("status").annotate(articles=Count("id"))
+                    .values_list("status", "articles"))
+
+    def set_status_many(self, article_ids, from_statuses, status):
+        with transaction.atomic():
+            articles = Article.objects.select_for_update().filter(id__in=list(article_ids), status__in=list(from_statuses))
+            ids = list(articles.values_list("id", flat=True))
+            Article.objects.filter(id__in=ids).update(status=status, updated_at=timezone.now())
+        return list(Article.objects.filter(id__in=ids).values(*ARTICLE_FIELDS))
+
+    def author_stats(self, author_id, limit=50, before_id=None):
+        # "reads" and "comments" are reverse relations on Article, so the annotations get a prefix.
+        articles = Article.objects.filter(author_id=author_id)
+        totals = articles.aggregate(articles=Count("id"), **{
+            f"total_{field}": Coalesce(Sum(f"stats__{field}"), 0) for field in STATS_FIELDS})
+        page = articles.order_by("-created_at", "-id")
+        if before_id is not None:
+            before = Article.objects.filter(id=before_id, author_id=author_id).values("created_at").first()
+            if before is None:
+                page = page.none()
+            else:
+                page = page.filter(Q(created_at__lt=before["created_at"])
+                                   | Q(created_at=before["created_at"], id__lt=before_id))
+        rows = page.annotate(**{f"stat_{field}": Coalesce(F(f"stats__{field}"), 0) for field in STATS_FIELDS}) \
+            .values(*STATS_ARTICLE_FIELDS, *(f"stat_{field}" for field in STATS_FIELDS))[:limit]
+        return {
+            "totals": dict({"articles": totals["articles"]},
+                           **{field: totals[f"total_{field}"] for field in STATS_FIELDS}),
+            "articles": [dict({field: row[field] for field in STATS_ARTICLE_FIELDS},
+                              **{field: row[f"stat_{field}"] for field in STATS_FIELDS}) for row in rows],
+        }
+
+    def get_draft(self, article_id):
+        return Article.objects.filter(id=article_id).values("id", "author_id", "title", "content", "version").first()
+
+    def save_draft(self, article_id, author_id, base_version, title, content, revision):
+        fields = {"content": content, "version": base_version + 1, "updated_at": timezone.now()}
+        if title is not None:
+            fields["title"] = title
+        with transaction.atomic():
+            if not Article.objects.filter(id=article_id, author_id=author_id, version=base_version).update(**fields):
+                return None
+            ArticleRevision.objects.create(article_id=article_id, **revision)
+        return base_version + 1
+
+
+USER_FIELDS = ("id", "username", "email", "first_name", "last_name", "bio", "email_verified", "auth_provider")
+
+
+def _user_fields(data):
+    """Translate Supabase users columns to User model fields."""
+    fields = dict(data)
+    if "password_hash" in fields:
+        fields["password"] = fields.pop("password_hash")
+    if "email_verified" in fields:
+        fields["email_verified"] = _bool(fields["email_verified"])
+    return fields
+
+
+class DjangoUsersRepo(base.UsersRepo):
+    def _rows(self, queryset):
+        return queryset.annotate(password_hash=F("password"), created_at=F("date_joined")) \
+            .values(*USER_FIELDS, "password_hash", "created_at")
+
+    def get_name(self, user_id):
+        return User.objects.filter(id=user_id).values("first_name", "last_name").first()
+
+    def names_by_ids(self, user_ids):
+        rows = User.objects.filter(id__in=list(user_ids)).values("id", "first_name", "last_name")
+        return {row["id"]: {"first_name": row["first_name"], "last_name": row["last_name"]} for row in rows}
+
+    def usernames_by_ids(self, user_ids):
+        return dict(User.objects.filter(id__in=list(user_ids)).values_list("id", "username"))
+
+    def username_exists(self, username):
+        return User.objects.filter(username=username.lower()).exists()
+
+    def email_exists(self, email):
+        return User.objects.filter(email=email.lower()).exists()
+
+    def id_for_email(self, email):
+        return User.objects.filter(email=email.lower()).values_list("id", flat=True).first()
+
+    def ids_for_emails(self, emails):
+        return dict(User.objects.filter(email__in=[email.lower() for email in emails]).values_list("email", "id"))
+
+    def usernames_taken(self, usernames):
+        return set(User.objects.filter(username__in=[username.lower() for username in usernames])
+                   .values_list("username", flat=True))
+
+    def get_by_email(self, email):
+        return self._rows(User.objects.filter(email=email.lower())).first()
+
+    def create(self, data):
+        fields = _user_fields(data)
+        # Google sign-ups have no username; the model requires a unique one.
+        fields.setdefault("username", fields.get("email"))
+        user = User.objects.create(**fields)
+        return self._rows(User.objects.filter(id=user.id)).first()
+
+    def create_many(self, rows):
+        User.objects.bulk_create([User(**_user_fields(row)) for row in rows])
+
+    def update(self, user_id, data):
+        if not User.objects.filter(id=user_id).update(**_user_fields(data)):
+            return None
+        return self._rows(User.objects.filter(id=user_id)).first()
+
+    def update_by_email(self, email, data):
+        queryset = User.objects.filter(email=email.lower())
+        if not queryset.update(**_user_fields(data)):
+            return []
+        return list(self._rows(queryset))
+
+    def upsert_google(self, email, first_name, last_name):
+        email = email.lower()
+        fields = {"first_name": first_name, "last_name": last_name, "email_verified": True, "auth_provider": "Google"}
+        with transaction.atomic():
+            user, created = User.objects.select_for_update().get_or_create(
+                email=email, defaults=dict(fields, username=email, bio="Learner at Cognara"))
+            if not created:
+                User.objects.filter(id=user.id).update(**fields)
+        return {"id": user.id, "is_new": created}
+
+
+COMMENT_FIELDS = ("id", "article_id", "user_id", "parent_id", "content", "is_approved", "like_count", "created_at", "updated_at")
+
+
+class DjangoCommentsRepo(base.CommentsRepo):
+    def list_for_article(self, article_id):
+        return list(Comment.objects.filter(article_id=article_id)
+                    .annotate(username=F("user__username"))
+                    .values(*COMMENT_FIELDS, "username"))
+
+    def events_since(self, since):
+        return list(Comment.objects.filter(created_at__gte=since).values("article_id", "created_at").iterator())
+
+    def create(self, data):
+        with transaction.atomic():
+            comment = Comment.objects.create(**data)
+            _add_stats(comment.article_id, {"comments": 1})
+        return Comment.objects.filter(id=comment.id).values(*COMMENT_FIELDS).first()
+
+
+READ_FIELDS = ("id", "session_id", "user_id", "article_id", "status", "scroll_depth",
+               "active_time_seconds", "required_time_seconds", "created_at", "updated_at")
+
+
+def _read_row(row):
+    if row is not None:
+        row["session_id"] = str(row["session_id"])
+    return row
+
+
+class DjangoReadsRepo(base.ReadsRepo):
+    def get_by_session(self, session_id):
+        return _read_row(ArticleRead.objects.filter(session_id=session_id).values(*READ_FIELDS).first())
+
+    def latest(self, user_id, article_id):
+        return _read_row(ArticleRead.objects.filter(user_id=user_id, article_id=article_id)
+                         .order_by("-created_at").values(*READ_FIELDS).first())
+
+    def latest_open(self, user_id, article_id, statuses):
+        return _read_row(ArticleRead.objects.filter(user_id=user_id, article_id=article_id, status__in=list(statuses))
+                         .order_by("-updated_at").values(*READ_FIELDS).first())
+
+    def update_by_session(self, session_id, data):
+        with transaction.atomic():
+            row = ArticleRead.objects.select_for_update().filter(session_id=session_id).values(*READ_FIELDS).first()
+            if row is None:
+                return None
+            ArticleRead.objects.filter(id=row["id"]).update(updated_at=timezone.now(), **data)
+            _add_stats(row["article_id"], rollup_delta(row, dict(row, **data)))
+        return self.get_by_session(session_id)
+
+    def history_for_user(self, user_id, limit):
+        return list(ArticleRead.objects.filter(user_id=user_id).order_by("-updated_at")
+                    .values("article_id", "status", "updated_at")[:limit])
+
+    def events_since(self, since):
+        return list(ArticleRead.objects.filter(updated_at__gte=since)
+                    .values("article_id", "status", "updated_at").iterator())
+
+    def record_heartbeat(self, session_id, status, scroll_depth, active_time_seconds, required_time_seconds=None):
+        from ..helper import apply_heartbeat
+
+        with transaction.atomic():
+            row = ArticleRead.objects.select_for_update().filter(session_id=session_id).values(*READ_FIELDS).first()
+            if row is None:
+                return None
+            fields = dict(apply_heartbeat(row, status, scroll_depth, active_time_seconds, required_time_seconds),
+                          updated_at=timezone.now())
+            ArticleRead.objects.filter(id=row["id"]).update(**fields)
+            _add_stats(row["article_id"], rollup_delta(row, dict(row, **fields)))
+        row.update(fields)
+        return _read_row(row)
+
+    def create(self, data):
+        with transaction.atomic():
+            read = ArticleRead.objects.create(**data)
+            _add_stats(read.article_id, read_rollup({"status": read.status, "active_time_seconds": read.active_time_seconds}))
+        return _read_row(ArticleRead.objects.filter(id=read.id).values(*READ_FIELDS).first())
+
+
+class DjangoPhotosRepo(base.PhotosRepo):
+    def paths_for_article(self, article_id):
+        return list(ArticlePhoto.objects.filter(article_id=article_id).values_list("path", flat=True))
+
+    def paths_for_articles(self, article_ids):
+        paths = {}
+        for article_id, path in ArticlePhoto.objects.filter(article_id__in=list(article_ids)).values_list("article_id", "path"):
+            paths.setdefault(article_id, []).append(path)
+        return paths
+
+    def add(self, article_id, path):
+        photo = ArticlePhoto.objects.create(article_id=article_id, path=path)
+        return {"id": photo.id, "article_id": article_id, "path": path}
+
+    def add_many(self, rows):
+        ArticlePhoto.objects.bulk_create([ArticlePhoto(article_id=row["article_id"], path=row["path"]) for row in rows])
+
+    def articles_for_paths(self, paths):
+        owners = {}
+        for path, article_id in ArticlePhoto.objects.filter(path__in=list(paths)).values_list("path", "article_id"):
+            owners.setdefault(path, set()).add(article_id)
+        return owners
+
+    def delete_for_article(self, article_id):
+        deleted, _ = ArticlePhoto.objects.filter(article_id=article_id).delete()
+        return deleted
+
+    def delete_paths(self, article_id, paths):
+        deleted, _ = ArticlePhoto.objects.filter(article_id=article_id, path__in=list(paths)).delete()
+        return deleted
+
+
+class DjangoRevisionsRepo(base.RevisionsRepo):
+    def add(self, article_id, revision):
+        ArticleRevision.objects.create(article_id=article_id, **revision)
+
+    def list(self, article_id, before=None, limit=50):
+        revisions = ArticleRevision.objects.filter(article_id=article_id)
+        if before is not None:
+            revisions = revisions.filter(version__lt=before)
+        return list(revisions.order_by("-version")
+                    .values("version", "base_version", "kind", "title", "length", "created_at")[:limit])
+
+    def latest_snapshot(self, article_id, version):
+        return ArticleRevision.objects.filter(article_id=article_id, kind="snapshot", version__lte=version) \
+            .order_by("-version").values_list("version", flat=True).first()
+
+    def between(self, article_id, low, high):
+        return list(ArticleRevision.objects.filter(article_id=article_id, version__gte=low, version__lte=high)
+                    .values("version", "base_version", "kind", "title", "length", "data", "created_at"))
+
+
+class DjangoLeaderboardsRepo(base.LeaderboardsRepo):
+    def get(self, board):
+        return Leaderboard.objects.filter(board=board).values("board", "entries", "computed_at").first()
+
+    def save(self, board, entries, computed_at):
+        Leaderboard.objects.update_or_create(board=board, defaults={"entries": entries, "computed_at": computed_at})
+
+
+class DjangoFeedsRepo(base.FeedsRepo):
+    def get(self, name):
+        return FeedDocument.objects.filter(name=name).values("name", "entries", "etag").first()
+
+    def get_body(self, name):
+        return FeedDocument.objects.filter(name=name).values("name", "body", "etag").first()
+
+    def save(self, name, entries, body, etag, previous_etag):
+        fields = {"entries": entries, "body": body, "etag": etag}
+        if previous_etag is not None:
+            return bool(FeedDocument.objects.filter(name=name, etag=previous_etag).update(updated_at=timezone.now(), **fields))
+        try:
+            with transaction.atomic():
+                FeedDocument.objects.create(name=name, **fields)
+        except IntegrityError:
+            return False
+        return True
+
+    def put(self, name, entries, body, etag):
+        FeedDocument.objects.update_or_create(name=name, defaults={"entries": entries, "body": body, "etag": etag})
+
+    def names(self):
+        return list(FeedDocument.objects.values("name"))
+
+    def delete(self, name):
+        FeedDocument.objects.filter(name=name).delete()
+
+
+EXPORT_MODELS = {"articles": Article, "comments": Comment, "article_reads": ArticleRead}
+
+
+class DjangoExportRepo(base.ExportRepo):
+    def page(self, table, after_id, since, limit):
+        queryset = EXPORT_MODELS[table].objects.filter(id__gt=after_id)
+        if since is not None:
+            queryset = queryset.filter(updated_at__gte=since)
+        rows = list(queryset.order_by("id").values()[:limit])
+        for row in rows:
+            # Supabase column names: author_id, article_id, ... are already what .values() uses.
+            if "session_id" in row:
+                row["session_id"] = str(row["session_id"])
+        return rows
+
+
+class DjangoSubscribersRepo(base.SubscribersRepo):
+    def exists(self, email):
+        return NewsletterSubscriber.objects.filter(email=email.lower()).exists()
+
+    def create(self, data):
+        subscriber = NewsletterSubscriber.objects.create(
+            email=data["email"].lower(),
+            is_active=_bool(data.get("is_active", True)),
+            source=data.get("source", "website"),
+        )
+        return {"id": subscriber.id, "email": subscriber.email, "is_active": subscriber.is_active}
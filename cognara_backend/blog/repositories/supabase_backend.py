@@ -0,0 +1,437 @@
+from postgrest.types import CountMethod, ReturnMethod
+
+from ..resilience import DependencyUnavailable
+from . import base
+
+
+def _first(response):
+    return response.data[0] if response.data else None
+
+
+def _paged(query, page_size=1000):
+    """All rows of a select, fetched `page_size` at a time (PostgREST caps each response)."""
+    rows, start = [], 0
+    while True:
+        page = query.range(start, start + page_size - 1).execute().data
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        start += page_size
+
+
+def _keyset(query_for, page_size=1000):
+    """
+    All rows of a select, in keyset pages (id > last seen id). `query_for()`
+    returns a fresh filtered select that includes id; unlike OFFSET paging no
+    page rescans the rows before it.
+    """
+    rows, after = [], 0
+    while True:
+        page = query_for().gt("id", after).order("id").limit(page_size).execute().data
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        after = page[-1]["id"]
+
+
+def _in_batches(query_for, column, values, size=100):
+    """Rows matching `column in values`, a batch at a time so the query string stays short."""
+    values, rows = list(values), []
+    for start in range(0, len(values), size):
+        rows.extend(query_for().in_(column, values[start:start + size]).execute().data)
+    return rows
+
+
+def _lookup(fetch, ids, stale):
+    """
+    fetch(ids), except that rows served from the stale copy (users is never
+    kept) go without names while Supabase is down rather than failing.
+    """
+    try:
+        return fetch(ids)
+    except DependencyUnavailable:
+        if stale:
+            return {}
+        raise
+
+
+def attach_author_names(articles, users, stale=False):
+    """Add author_first_name/author_last_name using one users lookup for all rows."""
+    names = _lookup(users.names_by_ids, {article["author_id"] for article in articles if article.get("author_id")},
+                    stale)
+    for article in articles:
+        name = names.get(article.get("author_id")) or {}
+        article["author_first_name"] = name.get("first_name")
+        article["author_last_name"] = name.get("last_name")
+    return articles
+
+
+MODERATION_COLUMNS = "id, title, excerpt, author_id, status, created_at, updated_at"
+
+
+class SupabaseArticlesRepo(base.ArticlesRepo):
+    def __init__(self, client, users):
+        self.client = client
+        self.users = users
+
+    def list_published(self):
+        response = self.client.table("articles").select("*").eq("status", "published").execute()
+        return attach_author_names(response.data, self.users, getattr(response, "stale", False))
+
+    def list_by_author(self, author_id):
+        response = self.client.table("articles").select("*").eq("author_id", author_id).execute()
+        return attach_author_names(response.data, self.users, getattr(response, "stale", False))
+
+    def get(self, article_id):
+        response = self.client.table("articles").select("*").eq("id", article_id).execute()
+        article = _first(response)
+        if article is None:
+            return None
+        return attach_author_names([article], self.users, getattr(response, "stale", False))[0]
+
+    def get_author_id(self, article_id):
+        row = _first(self.client.table("articles").select("author_id").eq("id", article_id).limit(1).execute())
+        return row["author_id"] if row else None
+
+    def exists(self, article_id):
+        return _first(self.client.table("articles").select("id").eq("id", article_id).limit(1).execute()) is not None
+
+    def get_meta(self, article_id):
+        return _first(self.client.table("articles").select("id, author_id, status").eq("id", article_id)
+                      .limit(1).execute())
+
+    def get_content(self, article_id):
+        row = _first(self.client.table("articles").select("content").eq("id", article_id).limit(1).execute())
+        return (row.get("content") or "") if row else None
+
+    def recent_published(self, limit):
+        response = self.client.table("articles").select("id, title, excerpt, content, author_id, created_at, updated_at") \
+            .eq("status", "published").order("created_at", desc=True).limit(limit).execute()
+        return attach_author_names(response.data, self.users, getattr(response, "stale", False))
+
+    def published_lastmod(self, page_size=1000):
+        return _keyset(lambda: self.client.table("articles").select("id, created_at, updated_at")
+                       .eq("status", "published"), page_size)
+
+    def published_by_ids(self, article_ids):
+        article_ids = list(article_ids)
+        if not article_ids:
+            return []
+        response = self.client.table("articles").select("*").eq("status", "published").in_("id", article_ids).execute()
+        return attach_author_names(response.data, self.users, getattr(response, "stale", False))
+
+    def create(self, data):
+        return _first(self.client.table("articles").insert(data).execute())
+
+    def create_many(self, rows):
+        return self.client.table("articles").insert(list(rows)).execute().data
+
+    def ids_for_import_hashes(self, hashes):
+        rows = _in_batches(lambda: self.client.table("articles").select("id, import_hash"), "import_hash", hashes)
+        return {row["import_hash"]: row["id"] for row in rows}
+
+    def update(self, article_id, data):
+        return _first(self.client.table("articles").update(data).eq("id", article_id).execute())
+
+    def moderation_page(self, status, after_id=0, limit=50):
+        response = self.client.table("articles").select(MODERATION_COLUMNS).eq("status", status) \
+            .gt("id", after_id).order("id").limit(limit).execute()
+        return attach_author_names(response.data, self.users, getattr(response, "stale", False))
+
+    def status_counts(self):
+        # Kept by the articles_count_status trigger; one tiny read instead of a count over articles.
+        rows = self.client.table("article_status_counts").select("status, articles").execute().data
+        return {row["status"]: row["articles"] for row in rows if row["articles"]}
+
+    def set_status_many(self, article_ids, from_statuses, status):
+        return self.client.table("articles").update({"status": status}) \
+            .in_("id", list(article_ids)).in_("status", list(from_statuses)).execute().data
+
+    def author_stats(self, author_id, limit=50, before_id=None):
+        # Totals and the page come back as one jsonb value from a single call.
+        return self.client.rpc("author_article_stats", {
+            "p_author_id": author_id,
+            "p_limit": limit,
+            "p_before": before_id,
+        }).execute().data
+
+    def get_draft(self, article_id):
+        return _first(self.client.table("articles").select("id, author_id, title, content, version")
+                      .eq("id", article_id).limit(1).execute())
+
+    def save_draft(self, article_id, author_id, base_version, title, content, revision):
+        row = _first(self.client.rpc("autosave_article", {
+            "p_article_id": article_id,
+            "p_author_id": author_id,
+            "p_base_version": base_version,
+            "p_title": title,
+            "p_content": content,
+            "p_revision": revision,
+        }).execute())
+        return row["version"] if row else None
+
+
+class SupabaseUsersRepo(base.UsersRepo):
+    def __init__(self, client):
+        self.client = client
+
+    def get_name(self, user_id):
+        return _first(self.client.table("users").select("first_name, last_name").eq("id", user_id).execute())
+
+    def names_by_ids(self, user_ids):
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        response = self.client.table("users").select("id, first_name, last_name").in_("id", user_ids).execute()
+        return {row["id"]: {"first_name": row["first_name"], "last_name": row["last_name"]} for row in response.data}
+
+    def usernames_by_ids(self, user_ids):
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        response = self.client.table("users").select("id,username").in_("id", user_ids).execute()
+        return {row["id"]: row["username"] for row in response.data}
+
+    def username_exists(self, username):
+        return bool(self.client.table("users").select("username").eq("username", username.lower()).execute().data)
+
+    def email_exists(self, email):
+        return bool(self.client.table("users").select("username").eq("email", email.lower()).execute().data)
+
+    def id_for_email(self, email):
+        row = _first(self.client.table("users").select("id").eq("email", email.lower()).execute())
+        return row["id"] if row else None
+
+    def ids_for_emails(self, emails):
+        rows = _in_batches(lambda: self.client.table("users").select("id, email"), "email",
+                           [email.lower() for email in emails])
+        return {row["email"]: row["id"] for row in rows}
+
+    def usernames_taken(self, usernames):
+        rows = _in_batches(lambda: self.client.table("users").select("username"), "username",
+                           [username.lower() for username in usernames])
+        return {row["username"] for row in rows}
+
+    def get_by_email(self, email):
+        return _first(self.client.table("users").select("*").eq("email", email.lower()).execute())
+
+    def create(self, data):
+        return _first(self.client.table("users").insert(data).execute())
+
+    def create_many(self, rows):
+        return self.client.table("users").insert(list(rows)).execute().data
+
+    def update(self, user_id, data):
+        return _first(self.client.table("users").update(data).eq("id", user_id).execute())
+
+    def update_by_email(self, email, data):
+        return self.client.table("users").update(data).eq("email", email.lower()).execute().data
+
+    def upsert_google(self, email, first_name, last_name):
+        return _first(self.client.rpc("upsert_google_user", {
+            "p_email": email,
+            "p_first_name": first_name,
+            "p_last_name": last_name,
+        }).execute())
+
+
+class SupabaseCommentsRepo(base.CommentsRepo):
+    def __init__(self, client, users):
+        self.client = client
+        self.users = users
+
+    def list_for_article(self, article_id):
+        response = self.client.table("comments").select("*").eq("article_id", article_id).execute()
+        comments = response.data
+        usernames = _lookup(self.users.usernames_by_ids, {comment["user_id"] for comment in comments if comment["user_id"]},
+                            getattr(response, "stale", False))
+        for comment in comments:
+            comment["username"] = usernames.get(comment["user_id"]) if comment["user_id"] else None
+        return comments
+
+    def events_since(self, since):
+        return _keyset(lambda: self.client.table("comments").select("id, article_id, created_at")
+                       .gte("created_at", since.isoformat()))
+
+    def create(self, data):
+        return _first(self.client.table("comments").insert(data).execute())
+
+
+READ_COLUMNS = "id, session_id, user_id, article_id, status, scroll_depth, active_time_seconds, required_time_seconds, created_at, updated_at"
+
+
+class SupabaseReadsRepo(base.ReadsRepo):
+    def __init__(self, client):
+        self.client = client
+
+    def get_by_session(self, session_id):
+        return _first(self.client.table("article_reads").select(READ_COLUMNS)
+                      .eq("session_id", session_id).limit(1).execute())
+
+    def latest(self, user_id, article_id):
+        return _first(self.client.table("article_reads").select(READ_COLUMNS)
+                      .eq("user_id", user_id).eq("article_id", article_id)
+                      .order("created_at", desc=True).limit(1).execute())
+
+    def latest_open(self, user_id, article_id, statuses):
+        return _first(self.client.table("article_reads").select(READ_COLUMNS)
+                      .eq("user_id", user_id).eq("article_id", article_id)
+                      .in_("status", list(statuses))
+                      .order("updated_at", desc=True).limit(1).execute())
+
+    def update_by_session(self, session_id, data):
+        return _first(self.client.table("article_reads").update(data).eq("session_id", session_id).execute())
+
+    def record_heartbeat(self, session_id, status, scroll_depth, active_time_seconds, required_time_seconds=None):
+        return _first(self.client.rpc("log_read_heartbeat", {
+            "p_session_id": session_id,
+            "p_status": status,
+            "p_scroll_depth": scroll_depth,
+            "p_active_time_seconds": active_time_seconds,
+            "p_required_time_seconds": required_time_seconds,
+        }).execute())
+
+    def history_for_user(self, user_id, limit):
+        return self.client.table("article_reads").select("article_id, status, updated_at") \
+            .eq("user_id", user_id).order("updated_at", desc=True).limit(limit).execute().data
+
+    def events_since(self, since):
+        return _keyset(lambda: self.client.table("article_reads").select("id, article_id, status, updated_at")
+                       .gte("updated_at", since.isoformat()))
+
+    def create(self, data):
+        return _first(self.client.table("article_reads").insert(data).execute())
+
+
+class SupabasePhotosRepo(base.PhotosRepo):
+    def __init__(self, client):
+        self.client = client
+
+    def paths_for_article(self, article_id):
+        response = self.client.table("article_photos").select("path").eq("article_id", article_id).execute()
+        return [row["path"] for row in response.data]
+
+    def paths_for_articles(self, article_ids):
+        paths = {}
+        for row in _in_batches(lambda: self.client.table("article_photos").select("article_id, path"),
+                               "article_id", article_ids):
+            paths.setdefault(row["article_id"], []).append(row["path"])
+        return paths
+
+    def add(self, article_id, path):
+        return _first(self.client.table("article_photos").insert({"article_id": article_id, "path": path}).execute())
+
+    def add_many(self, rows):
+        return self.client.table("article_photos").insert(list(rows)).execute().data
+
+    def articles_for_paths(self, paths):
+        owners = {}
+        for row in _in_batches(lambda: self.client.table("article_photos").select("path, article_id"), "path", paths):
+            owners.setdefault(row["path"], set()).add(row["article_id"])
+        return owners
+
+    def delete_for_article(self, article_id):
+        return len(self.client.table("article_photos").delete().eq("article_id", article_id).execute().data)
+
+    def delete_paths(self, article_id, paths):
+        return len(self.client.table("article_photos").delete().eq("article_id", article_id)
+                   .in_("path", list(paths)).execute().data)
+
+
+REVISION_LIST_COLUMNS = "version, base_version, kind, title, length, created_at"
+
+
+class SupabaseRevisionsRepo(base.RevisionsRepo):
+    def __init__(self, client):
+        self.client = client
+
+    def add(self, article_id, revision):
+        self.client.table("article_revisions").insert(dict(revision, article_id=article_id)).execute()
+
+    def list(self, article_id, before=None, limit=50):
+        query = self.client.table("article_revisions").select(REVISION_LIST_COLUMNS).eq("article_id", article_id)
+        if before is not None:
+            query = query.lt("version", before)
+        return query.order("version", desc=True).limit(limit).execute().data
+
+    def latest_snapshot(self, article_id, version):
+        row = _first(self.client.table("article_revisions").select("version").eq("article_id", article_id)
+                     .eq("kind", "snapshot").lte("version", version).order("version", desc=True).limit(1).execute())
+        return row["version"] if row else None
+
+    def between(self, article_id, low, high):
+        return self.client.table("article_revisions").select("*").eq("article_id", article_id) \
+            .gte("version", low).lte("version", high).execute().data
+
+
+class SupabaseFeedsRepo(base.FeedsRepo):
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, name):
+        return _first(self.client.table("feed_documents").select("name, entries, etag").eq("name", name)
+                      .limit(1).execute())
+
+    def get_body(self, name):
+        return _first(self.client.table("feed_documents").select("name, body, etag").eq("name", name)
+                      .limit(1).execute())
+
+    def save(self, name, entries, body, etag, previous_etag):
+        row = {"name": name, "entries": entries, "body": body, "etag": etag}
+        # A shard is megabytes; have PostgREST send back the row count, not the row.
+        table = self.client.table("feed_documents")
+        if previous_etag is None:
+            query = table.upsert(row, on_conflict="name", ignore_duplicates=True,
+                                 count=CountMethod.exact, returning=ReturnMethod.minimal)
+        else:
+            query = table.update(row, count=CountMethod.exact, returning=ReturnMethod.minimal) \
+                .eq("name", name).eq("etag", previous_etag)
+        return bool(query.execute().count)
+
+    def put(self, name, entries, body, etag):
+        self.client.table("feed_documents").upsert(
+            {"name": name, "entries": entries, "body": body, "etag": etag},
+            on_conflict="name", returning=ReturnMethod.minimal,
+        ).execute()
+
+    def names(self):
+        return _paged(self.client.table("feed_documents").select("name").order("name"))
+
+    def delete(self, name):
+        self.client.table("feed_documents").delete().eq("name", name).execute()
+
+
+class SupabaseLeaderboardsRepo(base.LeaderboardsRepo):
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, board):
+        return _first(self.client.table("leaderboards").select("*").eq("board", board).limit(1).execute())
+
+    def save(self, board, entries, computed_at):
+        self.client.table("leaderboards").upsert(
+            {"board": board, "entries": entries, "computed_at": computed_at.isoformat()},
+            on_conflict="board",
+        ).execute()
+
+
+class SupabaseExportRepo(base.ExportRepo):
+    def __init__(self, client):
+        self.client = client
+
+    def page(self, table, after_id, since, limit):
+        query = self.client.table(table).select("*").gt("id", after_id)
+        if since is not None:
+            query = query.gte("updated_at", since.isoformat())
+        return query.order("id").limit(limit).execute().data
+
+
+class SupabaseSubscribersRepo(base.SubscribersRepo):
+    def __init__(self, client):
+        self.client = client
+
+    def exists(self, email):
+        return bool(self.client.table("newsletter_subscribers").select("id").eq("email", email.lower()).execute().data)
+
+    def create(self, data):
+        return _first(self.client.table("newsletter_subscribers").insert(data).execute())
@@ -0,0 +1,433 @@
+"""
+Deadlines, retries and circuit breakers for outbound calls (Supabase queries,
+storage, SMTP).
+
+ResilientClient wraps the shared Supabase client:
+  - every execute()/storage call gets one deadline (SUPABASE_TIMEOUT_SECONDS)
+    covering all its attempts; the call runs on a bounded pool so a hung
+    connection holds a pool thread, not the view thread;
+  - idempotent reads (selects, downloads, listings, signed URLs) are retried
+    on transient errors with exponential backoff and full jitter, as long as
+    the deadline leaves room;
+  - each dependency has a circuit breaker: after BREAKER_FAILURE_THRESHOLD
+    consecutive calls fail transiently (retries included) it opens and calls fail fast with
+    CircuitOpenError for BREAKER_RESET_SECONDS, then one trial call decides
+    whether it closes again;
+  - the last good result of public catalog reads (published articles and
+    comments, STALE_READ_TABLES) is kept in an LRU bounded by bytes; while
+    the breaker is open or such a read fails, that copy is served instead and
+    the request trace records a "stale" entry. Other tables (users above all)
+    and paged scans (range() or id keyset pages) are never kept.
+
+Answers from the server (a unique violation, a bad filter) are not transient:
+they are neither retried nor counted against the breaker either way.
+"""
+
+import contextvars
+import json
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from django.conf import settings
+
+from .encoding import dumps
+from .instrumentation import DB_OPERATIONS, current_trace
+from .singleflight import STALE_READ_TABLES, query_key, stale_cacheable
+
+try:
+    import httpx
+except ImportError:  # only needed to recognise transport errors of the real client
+    httpx = None
+
+try:
+    import requests
+except ImportError:  # used by the Google key fetch (blog.google_tokens)
+    requests = None
+
+logger = logging.getLogger(__name__)
+
+# PostgREST answers with these when it cannot reach Postgres or the gateway times out.
+TRANSIENT_API_CODES = {"502", "503", "504", "520", "PGRST000", "PGRST001", "PGRST002"}
+# Storage calls that can be repeated safely.
+IDEMPOTENT_STORAGE = {"download", "list", "exists", "info", "create_signed_url", "create_signed_urls"}
+
+
+class DependencyUnavailable(Exception):
+    """A dependency could not be used for this call (deadline missed, breaker open, kept failing)."""
+
+    def __init__(self, dependency, message, retry_after=None):
+        super().__init__(f"{dependency} unavailable: {message}")
+        self.dependency = dependency
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(DependencyUnavailable, TimeoutError):
+    pass
+
+
+class CircuitOpenError(DependencyUnavailable):
+    pass
+
+
+def is_transient(error):
+    if isinstance(error, (DependencyUnavailable, TimeoutError, ConnectionError)):
+        return True
+    if httpx is not None and isinstance(error, (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)):
+        return True
+    if requests is not None and isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    code = getattr(error, "code", None)
+    return code is not None and str(code) in TRANSIENT_API_CODES
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `threshold` consecutive failures; open -> half-open
+    after `reset_seconds`, letting one trial call through; its outcome closes
+    or re-opens the breaker.
+    """
+
+    def __init__(self, name, threshold=5, reset_seconds=30.0, clock=time.monotonic):
+        self.name = name
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and self._clock() - self.opened_at >= self.reset_seconds:
+                self.state = "half_open"
+                return True
+            self.rejected += 1
+            return False
+
+    def retry_after(self):
+        return max(0.0, self.reset_seconds - (self._clock() - self.opened_at))
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logger.warning("Circuit %s closed", self.name)
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.threshold):
+                if self.state == "closed":
+                    logger.warning("Circuit %s opened after %d failures", self.name, self.failures)
+                self.state = "open"
+                self.opened_at = self._clock()
+
+    def release(self):
+        """The trial call ended without saying anything about health; let the next call try."""
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+
+    def check(self):
+        if not self.allow():
+            raise CircuitOpenError(self.name, "circuit open", retry_after=self.retry_after())
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker(name):
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(
+                name,
+                threshold=getattr(settings, "BREAKER_FAILURE_THRESHOLD", 5),
+                reset_seconds=getattr(settings, "BREAKER_RESET_SECONDS", 30.0),
+            )
+        return _breakers[name]
+
+
+def breaker_states():
+    with _breakers_lock:
+        return {name: item.state for name, item in _breakers.items()}
+
+
+def reset_breakers():
+    with _breakers_lock:
+        _breakers.clear()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _outbound_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=getattr(settings, "OUTBOUND_MAX_IN_FLIGHT", 64),
+                                       thread_name_prefix="outbound")
+        return _pool
+
+
+def call_with_deadline(dependency, fn, timeout):
+    """Run fn() on the outbound pool and stop waiting after `timeout` seconds."""
+    if timeout is None:
+        return fn()
+    if timeout <= 0:
+        raise DeadlineExceeded(dependency, "no time left")
+    # The request trace lives in a contextvar; run fn in a copy so its calls are still attributed.
+    future = _outbound_pool().submit(contextvars.copy_context().run, fn)
+    try:
+        return future.result(timeout)
+    except FutureTimeout:
+        future.cancel()
+        raise DeadlineExceeded(dependency, f"no answer within {timeout:.2f}s") from None
+
+
+def backoff(attempt, base, cap):
+    """Full jitter: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def guarded(dependency, fn, timeout, attempts=1, base_delay=0.05, max_delay=1.0):
+    """
+    Call fn() behind `dependency`'s breaker with one deadline for all attempts.
+    Only transient failures are retried and counted against the breaker, once
+    per call when its retries are used up (a half-open trial is not retried).
+    """
+    circuit = breaker(dependency)
+    deadline = None if timeout is None else time.monotonic() + timeout
+    attempt = 0
+    while True:
+        circuit.check()
+        remaining = None if deadline is None else deadline - time.monotonic()
+        try:
+            result = call_with_deadline(dependency, fn, remaining)
+        except Exception as e:
+            if not is_transient(e):
+                circuit.release()
+                raise
+            attempt += 1
+            delay = backoff(attempt, base_delay, max_delay)
+            if (attempt >= attempts or circuit.state != "closed"
+                    or (deadline is not None and time.monotonic() + delay >= deadline)):
+                circuit.record_failure()
+                if isinstance(e, DependencyUnavailable):
+                    raise
+                retry_after = circuit.retry_after() if circuit.state == "open" else None
+                raise DependencyUnavailable(dependency, f"{type(e).__name__}: {e}", retry_after) from e
+            logger.info("Retrying %s after %s (attempt %d)", dependency, type(e).__name__, attempt + 1)
+            time.sleep(delay)
+            continue
+        circuit.record_success()
+        return result
+
+
+class StaleResponse:
+    """Stands in for a postgrest response when the last good copy is served."""
+
+    stale = True
+
+    def __init__(self, data, count):
+        self.data = data
+        self.count = count
+
+
+class StaleReads:
+    """
+    LRU of the last good result per normalised select, stored as JSON and
+    bounded by `max_bytes`. A kept copy is refreshed at most every
+    `refresh_seconds`, so a hot read is not re-serialised on every request.
+    """
+
+    def __init__(self, max_bytes=8 * 2**20, refresh_seconds=5.0, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.refresh_seconds = refresh_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (json, count, stored_at)
+        self.nbytes = 0
+        self.served = 0
+
+    def put(self, key, response):
+        if self.max_bytes <= 0:
+            return
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[2] < self.refresh_seconds:
+                self._entries.move_to_end(key)
+                return
+        try:
+            data = dumps(response.data)
+        except TypeError:
+            return
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (data, getattr(response, "count", None), now)
+            self.nbytes += len(data)
+            while self.nbytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.nbytes -= len(entry[0])
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self.served += 1
+        data, count, _ = entry
+        return StaleResponse(json.loads(data), count)
+
+    def forget(self, table):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == table]:
+                self._drop(key)
+
+
+class _ResilientQuery:
+    """Proxy over a postgrest builder chain; guards the terminal execute()."""
+
+    __slots__ = ("_target", "_table", "_operation", "_calls", "_client")
+
+    def __init__(self, target, table, client, operation="select", calls=()):
+        self._target = target
+        self._table = table
+        self._client = client
+        self._operation = operation
+        self._calls = calls
+
+    def __getattr__(self, attr):
+        value = getattr(self._target, attr)
+        if not callable(value):
+            return value
+
+        if attr == "execute":
+            def execute(*args, **kwargs):
+                return self._client._execute(self._table, self._operation, self._calls,
+                                             lambda: value(*args, **kwargs))
+            return execute
+
+        operation = attr if attr in DB_OPERATIONS else self._operation
+
+        def chain(*args, **kwargs):
+            returned = value(*args, **kwargs)
+            if hasattr(returned, "execute"):
+                return _ResilientQuery(returned, self._table, self._client, operation,
+                                       self._calls + ((attr, args, kwargs),))
+            return returned
+        return chain
+
+
+class _ResilientBucket:
+    __slots__ = ("_target", "_client")
+
+    def __init__(self, target, client):
+        self._target = target
+        self._client = client
+
+    def __getattr__(self, attr):
+        value = getattr(self._target, attr)
+        if not callable(value) or attr == "get_public_url":  # built locally, no round trip
+            return value
+
+        def call(*args, **kwargs):
+            attempts = self._client.read_attempts if attr in IDEMPOTENT_STORAGE else 1
+            return self._client._guard("storage", lambda: value(*args, **kwargs), attempts)
+        return call
+
+
+class _ResilientStorage:
+    __slots__ = ("_target", "_client")
+
+    def __init__(self, target, client):
+        self._target = target
+        self._client = client
+
+    def from_(self, bucket):
+        return _ResilientBucket(self._target.from_(bucket), self._client)
+
+    def __getattr__(self, attr):
+        return getattr(self._target, attr)
+
+
+class ResilientClient:
+    """Wraps a supabase Client with deadlines, read retries, breakers and stale-read fallback."""
+
+    def __init__(self, client, timeout=None, read_attempts=None, stale_bytes=None):
+        self._client = client
+        self.timeout = timeout if timeout is not None else getattr(settings, "SUPABASE_TIMEOUT_SECONDS", 5.0)
+        self.read_attempts = read_attempts or getattr(settings, "SUPABASE_READ_ATTEMPTS", 3)
+        self.retry_base = getattr(settings, "RETRY_BASE_SECONDS", 0.05)
+        self.retry_cap = getattr(settings, "RETRY_MAX_SECONDS", 1.0)
+        self.stale = StaleReads(stale_bytes if stale_bytes is not None
+                                else getattr(settings, "STALE_READS_MAX_BYTES", 8 * 2**20),
+                                getattr(settings, "STALE_READS_REFRESH_SECONDS", 5.0))
+        self.storage = _ResilientStorage(client.storage, self)
+
+    def _guard(self, dependency, fn, attempts):
+        return guarded(dependency, fn, self.timeout, attempts, self.retry_base, self.retry_cap)
+
+    def _execute(self, table, operation, calls, fn):
+        if operation != "select":
+            try:
+                return self._guard("supabase", fn, 1)
+            finally:
+                self.stale.forget(table)
+
+        keep = table in STALE_READ_TABLES
+        key = query_key(table, calls) if keep else None
+        try:
+            response = self._guard("supabase", fn, self.read_attempts)
+        except DependencyUnavailable as e:
+            if not keep:
+                raise
+            return self._fallback(key, table, e)
+        if keep and stale_cacheable(table, calls, response.data):
+            self.stale.put(key, response)
+        return response
+
+    def _fallback(self, key, table, error):
+        stale = self.stale.get(key)
+        if stale is None:
+            raise error
+        logger.info("Serving stale %s read: %s", table, error)
+        trace = current_trace()
+        if trace is not None:
+            trace.add("stale", table, 0.0, 0)
+        return stale
+
+    def table(self, name):
+        return _ResilientQuery(self._client.table(name), name, self)
+
+    from_ = table
+
+    def rpc(self, fn, params=None, *args, **kwargs):
+        # rpc functions may write (log_read_heartbeat), so they are never retried.
+        return _ResilientQuery(self._client.rpc(fn, params or {}, *args, **kwargs), f"rpc:{fn}", self, "rpc")
+
+    def __getattr__(self, attr):
+        return getattr(self._client, attr)
+
+
+def resilient_client(client):
+    if not getattr(settings, "RESILIENCE", True):
+        return client
+    return ResilientClient(client)
@@ -0,0 +1,187 @@
+"""
+Article revision history.
+
+Every saved version of an article (submit, autosave, restore) gets a row in
+article_revisions. Most rows are deltas: the [start, delete_count, insert_text]
+ops (UTF-16 offsets, as in blog.drafts) that turn `base_version` into
+`version`, zlib-compressed. Every REVISION_SNAPSHOT_EVERY-th row on a chain is
+a compressed copy of the whole content instead, so rebuilding any version
+applies at most that many deltas to the nearest snapshot below it.
+
+A delta needs the content of its base version; the writer only has that in
+the blog.drafts cache. When it does not (cache miss, first save after deploy)
+it writes a snapshot, so the chain never depends on a version that was not
+recorded.
+"""
+
+import base64
+import difflib
+import json
+import re
+import zlib
+
+from django.conf import settings
+
+from .repositories import get_repos
+
+SNAPSHOT = "snapshot"
+DELTA = "delta"
+
+# Tiptap saves HTML with few newlines; diff paragraph by paragraph.
+BLOCK_RE = re.compile(r"(?<=</p>)|(?<=</h[1-6]>)|(?<=</li>)|(?<=</blockquote>)|(?<=</pre>)|(?<=\n)")
+
+
+class PatchError(ValueError):
+    """The ops do not apply to the base content."""
+
+
+def utf16_length(text):
+    return len(text.encode("utf-16-le")) // 2
+
+
+def apply_patch(text, ops):
+    """Apply [start, delete_count, insert_text] ops to `text`."""
+    try:
+        return _splice(text.encode("utf-16-le"), ops).decode("utf-16-le")
+    except PatchError:
+        raise
+    except (TypeError, ValueError) as e:
+        # A wrong-length op, or an offset that splits a surrogate pair.
+        raise PatchError(f"Invalid ops: {e}") from e
+
+
+def _splice(units, ops):
+    """apply_patch on UTF-16-LE bytes, so a chain of deltas is decoded once."""
+    if not isinstance(ops, list):
+        raise PatchError("ops must be a list")
+    size = len(units) // 2
+    parts = []
+    cursor = 0
+    for op in ops:
+        start, delete, insert = op
+        if not (isinstance(start, int) and isinstance(delete, int) and isinstance(insert, str)):
+            raise PatchError(f"Malformed op {op!r}")
+        if start < cursor or delete < 0 or start + delete > size:
+            raise PatchError(f"Op {op!r} is out of order or out of range")
+        parts.append(units[2 * cursor:2 * start])
+        parts.append(insert.encode("utf-16-le"))
+        cursor = start + delete
+    parts.append(units[2 * cursor:])
+    return b"".join(parts)
+
+
+def encode(value):
+    """zlib + base64, so the row stays a plain text column on both backends."""
+    raw = value.encode("utf-8") if isinstance(value, str) else json.dumps(value, separators=(",", ":")).encode("utf-8")
+    return base64.b64encode(zlib.compress(raw)).decode("ascii")
+
+
+def decode(data, kind):
+    raw = zlib.decompress(base64.b64decode(data)).decode("utf-8")
+    return raw if kind == SNAPSHOT else json.loads(raw)
+
+
+def diff(old, new):
+    """
+    Ops turning `old` into `new`: the common prefix and suffix are skipped, what
+    is left is compared block by block and each changed run trimmed again.
+    """
+    prefix = _common_prefix_length(old, new)
+    suffix = _common_suffix_length(old, new, min(len(old), len(new)) - prefix)
+    return _diff_blocks(old[prefix:len(old) - suffix], new[prefix:len(new) - suffix], utf16_length(old[:prefix]))
+
+
+def _diff_blocks(old, new, offset):
+    if not old or not new:
+        return [[offset, utf16_length(old), new]] if old or new else []
+    old_blocks = [block for block in BLOCK_RE.split(old) if block]
+    new_blocks = [block for block in BLOCK_RE.split(new) if block]
+    if len(old_blocks) == 1 or len(new_blocks) == 1:
+        return [[offset, utf16_length(old), new]]
+    ops = []
+    position = 0
+    matcher = difflib.SequenceMatcher(None, old_blocks, new_blocks, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        while position < i1:
+            offset += utf16_length(old_blocks[position])
+            position += 1
+        if tag == "equal":
+            continue
+        removed = "".join(old_blocks[i1:i2])
+        inserted = "".join(new_blocks[j1:j2])
+        prefix = _common_prefix_length(removed, inserted)
+        suffix = _common_suffix_length(removed, inserted, min(len(removed), len(inserted)) - prefix)
+        ops.append([
+            offset + utf16_length(removed[:prefix]),
+            utf16_length(removed[prefix:len(removed) - suffix]),
+            inserted[prefix:len(inserted) - suffix],
+        ])
+    return ops
+
+
+def _common_prefix_length(a, b):
+    # Binary search over slice comparisons: C-speed memcmp instead of a per-character loop.
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[:middle] == b[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _common_suffix_length(a, b, limit):
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[len(a) - middle:] == b[len(b) - middle:]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def build(version, title, content, base=None, ops=None):
+    """
+    The article_revisions row for `version` and its depth (deltas since the
+    last snapshot). `base` is {'version', 'content', 'depth'} of a version that
+    is on record, or None; `ops` are the ops from it when the caller has them.
+    """
+    row = {"version": version, "title": title, "length": utf16_length(content)}
+    every = getattr(settings, "REVISION_SNAPSHOT_EVERY", 50)
+    if base is None or base.get("depth") is None or base["depth"] + 1 >= every:
+        return dict(row, kind=SNAPSHOT, base_version=None, data=encode(content)), 0
+    if ops is None:
+        ops = diff(base["content"], content)
+    return dict(row, kind=DELTA, base_version=base["version"], data=encode(ops)), base["depth"] + 1
+
+
+def content_at(article_id, version):
+    """{'version', 'title', 'content', 'created_at'} of a recorded version, or None."""
+    revisions = get_repos().revisions
+    rows = {}
+    chain = []
+    wanted = version
+    while True:
+        row = rows.get(wanted)
+        if row is None:
+            # Fetch from the nearest snapshot at or below the version still missing.
+            snapshot = revisions.latest_snapshot(article_id, wanted)
+            if snapshot is None:
+                return None
+            rows.update((row["version"], row) for row in revisions.between(article_id, snapshot, wanted))
+            row = rows.get(wanted)
+            if row is None:
+                return None
+        chain.append(row)
+        if row["kind"] == SNAPSHOT:
+            break
+        wanted = row["base_version"]
+
+    units = decode(chain[-1]["data"], SNAPSHOT).encode("utf-16-le")
+    for row in reversed(chain[:-1]):
+        units = _splice(units, decode(row["data"], DELTA))
+    target = chain[0]
+    return {"version": target["version"], "title": target["title"], "content": units.decode("utf-16-le"),
+            "created_at": target.get("created_at")}
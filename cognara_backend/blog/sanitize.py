@@ -0,0 +1,105 @@
+"""
+Server-side allow-list cleaning of article HTML, for pages this API serves as
+text/html itself (blog.prerender). The frontend runs DOMPurify over the same
+content before showing it; a page served from the API origin gets no such
+pass, so anything not on the lists below is dropped here: tags outside
+ALLOWED_TAGS lose their markup (script, style and the like their content too),
+attributes outside ALLOWED_ATTRIBUTES go, and links or sources with a scheme
+other than http(s)/mailto are removed.
+"""
+
+import re
+from html import escape
+from html.parser import HTMLParser
+
+ALLOWED_TAGS = {
+    "a", "abbr", "b", "blockquote", "br", "caption", "code", "del", "div", "em", "figcaption", "figure",
+    "h1", "h2", "h3", "h4", "h5", "h6", "hr", "i", "img", "ins", "kbd", "li", "mark", "ol", "p", "pre", "q",
+    "s", "small", "span", "strong", "sub", "sup", "table", "tbody", "td", "tfoot", "th", "thead", "tr", "u", "ul",
+}
+VOID_TAGS = {"br", "hr", "img"}
+# Dropped with everything inside them.
+DROPPED_TAGS = {"script", "style", "template", "iframe", "object", "embed", "noscript", "textarea", "title",
+                "svg", "math", "select", "frame", "frameset", "noembed", "noframes", "xmp"}
+ALLOWED_ATTRIBUTES = {
+    "*": {"class", "title"},
+    "a": {"href"},
+    "img": {"src", "alt", "width", "height"},
+    "td": {"colspan", "rowspan"},
+    "th": {"colspan", "rowspan"},
+    "ol": {"start"},
+}
+URL_ATTRIBUTES = {"href", "src"}
+ALLOWED_SCHEMES = {"http", "https", "mailto"}
+
+_IGNORED_URL_CHARS_RE = re.compile(r"[\x00-\x20\x7f]")
+_SCHEME_RE = re.compile(r"^([a-z][a-z0-9+.-]*):")
+
+
+def safe_url(value):
+    """True for relative URLs and ALLOWED_SCHEMES; browsers ignore the stripped characters too."""
+    match = _SCHEME_RE.match(_IGNORED_URL_CHARS_RE.sub("", value).lower())
+    return match is None or match.group(1) in ALLOWED_SCHEMES
+
+
+class _Cleaner(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out = []
+        self.open = []
+        self.dropping = None
+        self.depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if self.dropping:
+            self.depth += tag == self.dropping
+            return
+        if tag in DROPPED_TAGS:
+            self.dropping, self.depth = tag, 1
+            return
+        if tag not in ALLOWED_TAGS:
+            return
+        allowed = ALLOWED_ATTRIBUTES["*"] | ALLOWED_ATTRIBUTES.get(tag, set())
+        kept = [(name, value) for name, value in attrs
+                if name in allowed and value is not None and (name not in URL_ATTRIBUTES or safe_url(value))]
+        if tag == "a" and any(name == "href" for name, _ in kept):
+            kept.append(("rel", "nofollow noopener"))
+        self.out.append(f"<{tag}" + "".join(f' {name}="{escape(value, quote=True)}"' for name, value in kept) + ">")
+        if tag not in VOID_TAGS:
+            self.open.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag in self.open and tag not in VOID_TAGS and self.open[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if self.dropping:
+            if tag == self.dropping:
+                self.depth -= 1
+                if not self.depth:
+                    self.dropping = None
+            return
+        if tag in self.open:
+            while self.open:
+                closing = self.open.pop()
+                self.out.append(f"</{closing}>")
+                if closing == tag:
+                    break
+
+    def handle_data(self, data):
+        if not self.dropping:
+            self.out.append(escape(data, quote=False))
+
+    def close(self):
+        super().close()
+        self.out.extend(f"</{tag}>" for tag in reversed(self.open))
+        self.open = []
+        return "".join(self.out)
+
+
+def clean_html(content):
+    """`content` with only allow-listed tags, attributes and URL schemes left."""
+    cleaner = _Cleaner()
+    cleaner.feed(content or "")
+    return cleaner.close()
@@ -0,0 +1,266 @@
+"""
+Single-flight coalescing of identical concurrent Supabase reads.
+
+When many requests ask for the same rows at once (a viral article's
+get_article / get_comments / get_user), only the first runs the query; the
+others wait for it and get their own copy of its response. The key is the
+normalised query: table, selected columns, filters in any order, ordering and
+paging, with values compared the way PostgREST sees them (as strings), so
+eq("id", "5") and eq("id", 5) share a flight.
+
+Only select queries are coalesced; inserts/updates/rpc calls always run. A
+read never joins a flight that started before a write to its table finished,
+so a request reads its own writes.
+With SINGLE_FLIGHT_SWR_SECONDS > 0 a finished read of the public catalog
+(STALE_READ_TABLES, the same allow-list blog.resilience keeps stale copies
+of) is also kept that long and served immediately while one background
+refresh runs (stale-while-revalidate); any write through the client drops
+the kept reads of that table.
+
+SingleFlight is keyed across threads: WSGI workers, and under asgi.py the
+thread pool that Django runs these sync views and Supabase calls in.
+"""
+
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .instrumentation import DB_OPERATIONS
+
+logger = logging.getLogger(__name__)
+
+# Filters commute, so their order is not part of the key.
+FILTERS = {"eq", "neq", "gt", "gte", "lt", "lte", "in_", "is_", "like", "ilike", "contains", "contained_by",
+           "filter", "match", "not_", "or_"}
+
+
+def _normal(value):
+    if isinstance(value, dict):
+        return tuple(sorted((str(key), _normal(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(_normal(item) for item in value)
+    if isinstance(value, bool):
+        return str(value).lower()
+    return None if value is None else str(value)
+
+
+def query_key(table, calls):
+    """Hashable key for a select chain: [(method, args, kwargs), ...]."""
+    filters, rest = [], []
+    for name, args, kwargs in calls:
+        entry = (name, _normal(args), _normal(kwargs))
+        (filters if name in FILTERS else rest).append(entry)
+    return (table, tuple(rest), tuple(sorted(filters)))
+
+
+def _published(calls, rows):
+    return (any(name == "eq" and tuple(args[:2]) == ("status", "published") for name, args, _ in calls)
+            or (bool(rows) and all(isinstance(row, dict) and row.get("status") == "published" for row in rows)))
+
+
+# Tables whose reads may be kept and served stale, with the test a result has to pass.
+STALE_READ_TABLES = {
+    "articles": _published,
+    "comments": lambda calls, rows: True,
+}
+RANGE_FILTERS = {"gt", "gte", "lt", "lte"}
+
+
+def stale_cacheable(table, calls, rows):
+    """Public catalog reads only; no paged scans (export, ranking, sitemaps)."""
+    accept = STALE_READ_TABLES.get(table)
+    if accept is None:
+        return False
+    for name, args, _ in calls:
+        if name == "range" or (name in RANGE_FILTERS and args and args[0] == "id"):
+            return False
+    return accept(calls, rows)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters", "snapshot")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+        self.snapshot = None
+
+
+class SingleFlight:
+    """
+    do(key, fn): run fn once per key at a time; concurrent callers with the same
+    key block until it finishes and receive a deep copy of its result (or its
+    exception). Keys are query_key() tuples; forget(table) after a write makes
+    later reads of that table start a flight of their own.
+    """
+
+    def __init__(self, swr_seconds=0.0, max_entries=1024):
+        self.swr_seconds = swr_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._kept = OrderedDict()   # key -> (snapshot, stored_at)
+        self._refreshing = set()
+        self._writes = {}            # table -> writes finished so far
+        self.executed = 0
+        self.coalesced = 0
+        self.stale_served = 0
+
+    def do(self, key, fn):
+        if self.swr_seconds > 0:
+            kept = self._fresh_enough(key)
+            if kept is not None:
+                self._refresh_in_background(key, fn)
+                return copy.deepcopy(kept)
+        return self._run(key, fn)
+
+    def _run(self, key, fn):
+        with self._lock:
+            # A flight that started before the latest write to the table may return what it overwrote.
+            generation = self._writes.get(key[0], 0)
+            flight = (key, generation)
+            call = self._calls.get(flight)
+            leader = call is None
+            if leader:
+                call = self._calls[flight] = _Call()
+                self.executed += 1
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.snapshot)
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[flight]
+                keep = (call.error is None and self.swr_seconds > 0
+                        and self._writes.get(key[0], 0) == generation
+                        and stale_cacheable(key[0], key[1] + key[2], getattr(call.result, "data", None)))
+                # Copied once, before the leader hands its result to a view that may mutate it.
+                if call.error is None and (call.waiters or keep):
+                    call.snapshot = copy.deepcopy(call.result)
+                    if keep:
+                        self._keep(key, call.snapshot)
+            call.done.set()
+        return call.result
+
+    def _fresh_enough(self, key):
+        with self._lock:
+            entry = self._kept.get(key)
+            if entry is None:
+                return None
+            snapshot, stored_at = entry
+            if time.monotonic() - stored_at > self.swr_seconds:
+                del self._kept[key]
+                return None
+            self._kept.move_to_end(key)
+            self.stale_served += 1
+            return snapshot
+
+    def _keep(self, key, snapshot):
+        self._kept[key] = (snapshot, time.monotonic())
+        self._kept.move_to_end(key)
+        while len(self._kept) > self.max_entries:
+            self._kept.popitem(last=False)
+
+    def _refresh_in_background(self, key, fn):
+        with self._lock:
+            if key in self._refreshing or (key, self._writes.get(key[0], 0)) in self._calls:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._run(key, fn)
+            except Exception as e:
+                logger.warning("Background refresh failed for %s: %s", key[0], e)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def forget(self, table):
+        """A write to `table` finished: drop its kept reads; later reads start new flights."""
+        with self._lock:
+            self._writes[table] = self._writes.get(table, 0) + 1
+            for key in [key for key in self._kept if key[0] == table]:
+                del self._kept[key]
+
+
+class _CoalescingQuery:
+    """Proxy over a postgrest builder chain that records the calls making up the query."""
+
+    __slots__ = ("_target", "_table", "_operation", "_calls", "_flight")
+
+    def __init__(self, target, table, flight, operation="select", calls=()):
+        self._target = target
+        self._table = table
+        self._flight = flight
+        self._operation = operation
+        self._calls = calls
+
+    def __getattr__(self, attr):
+        value = getattr(self._target, attr)
+        if not callable(value):
+            return value
+
+        if attr == "execute":
+            if self._operation != "select":
+                def execute(*args, **kwargs):
+                    try:
+                        return value(*args, **kwargs)
+                    finally:
+                        self._flight.forget(self._table)
+                return execute
+
+            def execute(*args, **kwargs):
+                return self._flight.do(query_key(self._table, self._calls), lambda: value(*args, **kwargs))
+            return execute
+
+        operation = attr if attr in DB_OPERATIONS else self._operation
+
+        def chain(*args, **kwargs):
+            returned = value(*args, **kwargs)
+            if hasattr(returned, "execute"):
+                return _CoalescingQuery(returned, self._table, self._flight, operation,
+                                        self._calls + ((attr, args, kwargs),))
+            return returned
+        return chain
+
+
+class SingleFlightClient:
+    """Wraps a supabase Client so identical concurrent table reads share one request."""
+
+    def __init__(self, client, flight=None):
+        self._client = client
+        self.flight = flight or SingleFlight(getattr(settings, "SINGLE_FLIGHT_SWR_SECONDS", 0.0))
+
+    def table(self, name):
+        return _CoalescingQuery(self._client.table(name), name, self.flight)
+
+    from_ = table
+
+    def __getattr__(self, attr):
+        return getattr(self._client, attr)
+
+
+def coalescing_client(client):
+    if not getattr(settings, "SINGLE_FLIGHT", True):
+        return client
+    return SingleFlightClient(client)
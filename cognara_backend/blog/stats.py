@@ -0,0 +1,52 @@
+"""
+Per-article read and comment rollups (the article_stats table) behind the
+author dashboard. Supabase keeps them with triggers
+(supabase/migrations/20261019000011_author_stats.sql), the ORM backend in
+its repositories; both classify a read session the way read_rollup does.
+
+A session's active time is counted once it is finished (left the open
+statuses), so the heartbeats of open sessions never touch the shared
+per-article row: it moves when a session starts, finishes or changes status.
+The average active time is over finished sessions (finished_reads) for the
+same reason: open ones have no active time counted yet.
+"""
+
+# blog.helper.OPEN_STATUSES: sessions still sending heartbeats.
+OPEN_READ_STATUSES = ["started", "in_progress"]
+
+# Sessions that reached the end of the article (the "completed" beacon), however they were classified.
+COMPLETED_READ_STATUSES = ["completed", "skimmed", "deep_read", "read", "read_deeply"]
+DEEP_READ_STATUSES = ["deep_read", "read_deeply"]
+STATS_FIELDS = ("reads", "completed_reads", "deep_reads", "finished_reads", "active_seconds", "comments")
+
+
+def read_rollup(row):
+    """What one article_reads row contributes to its article's article_stats row."""
+    status = row.get("status")
+    finished = status is not None and status not in OPEN_READ_STATUSES
+    return {
+        "reads": 1,
+        "completed_reads": int(status in COMPLETED_READ_STATUSES),
+        "deep_reads": int(status in DEEP_READ_STATUSES),
+        "finished_reads": int(finished),
+        "active_seconds": int(row.get("active_time_seconds") or 0) if finished else 0,
+    }
+
+
+def rollup_delta(old, new):
+    """article_stats change for a read row going from `old` to `new` (either may be None)."""
+    before = read_rollup(old) if old else {}
+    after = read_rollup(new) if new else {}
+    return {field: after.get(field, 0) - before.get(field, 0) for field in STATS_FIELDS[:-1]}
+
+
+def summary(row):
+    """A stats row with the rates the dashboard shows; None while nothing has been read."""
+    reads = row.get("reads") or 0
+    finished = row.get("finished_reads") or 0
+    return dict(
+        row,
+        completion_rate=round(row["completed_reads"] / reads, 3) if reads else None,
+        deep_read_rate=round(row["deep_reads"] / reads, 3) if reads else None,
+        avg_active_seconds=round(row["active_seconds"] / finished, 1) if finished else None,
+    )
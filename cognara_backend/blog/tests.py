@@ -1,3 +1,1063 @@
-from django.test import TestCase
+"""
+Run from cognara_backend with `python manage.py test blog`. Views run against
+the ORM backend over the test database (ORMTestCase); Supabase-only paths use
+the in-process stand-ins in benchmarks.fakes.
+"""
 
-# Create your tests here.
+import gzip
+import json
+import logging
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest import mock
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from benchmarks.fakes import FakeStorage, FakeSupabase, Faults
+
+from . import bulk_import, codes, feeds, google_tokens, images, instrumentation, live, log, middleware, prerender, recommendations, resilience, singleflight, stats
+from .models import Article, ArticlePhoto, ArticleStats, User
+from .repositories import base, build_repositories
+
+
+class ORMTestCase(TestCase):
+    """
+    Swaps the repositories the views and helpers use for the ORM backend, and
+    pre-renders into a temporary PRERENDER_ROOT.
+    """
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        override = override_settings(PRERENDER_ROOT=root.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.repos = build_repositories("django")
+        for target in ("blog.views.repos", "blog.repositories._repositories"):
+            patcher = mock.patch(target, self.repos)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = Client(HTTP_APP_TOKEN=settings.FRONTEND_API_TOKEN)
+
+    def make_user(self, username="author", **fields):
+        return User.objects.create(username=username, email=f"{username}@example.com", **fields)
+
+    def make_article(self, author, **fields):
+        return Article.objects.create(author=author, **dict({"title": "Title", "content": "<p>Body</p>"}, **fields))
+
+    def sign_in(self, user, client=None):
+        session = (client or self.client).session
+        session.update({"id": user.id, "username": user.username, "email": user.email, "email_verified": True})
+        session.save()
+
+
+class AppAuthMiddlewareTests(ORMTestCase):
+    def test_app_token_required(self):
+        self.assertEqual(Client().get("/articles").status_code, 403)
+        self.assertEqual(Client(HTTP_APP_TOKEN="wrong").get("/articles").status_code, 403)
+        self.assertEqual(self.client.get("/articles").status_code, 200)
+
+    def test_token_exempt_view(self):
+        self.assertEqual(Client().get("/get_csrf_token").status_code, 200)
+
+    def test_session_required(self):
+        self.assertEqual(self.client.get("/userarticles").status_code, 401)
+        self.sign_in(self.make_user())
+        self.assertEqual(self.client.get("/userarticles").status_code, 200)
+
+    def test_admin_required(self):
+        user = self.make_user()
+        self.sign_in(user)
+        self.assertEqual(self.client.get("/moderation/counts").status_code, 403)
+        with override_settings(ADMIN_USER_IDS=[user.id]):
+            self.assertEqual(self.client.get("/moderation/counts").status_code, 200)
+
+    def test_signed_in_post_needs_csrf_token(self):
+        client = Client(enforce_csrf_checks=True, HTTP_APP_TOKEN=settings.FRONTEND_API_TOKEN)
+        self.sign_in(self.make_user(), client)
+        response = client.post("/logout")
+        self.assertEqual(response.status_code, 403)
+        self.assertIn("CSRF", response.json()["error"])
+
+        client.get("/get_csrf_token")
+        response = client.post("/logout", HTTP_X_CSRFTOKEN=client.cookies[settings.CSRF_COOKIE_NAME].value)
+        self.assertEqual(response.status_code, 200)
+
+    def test_anonymous_post_skips_csrf(self):
+        client = Client(enforce_csrf_checks=True, HTTP_APP_TOKEN=settings.FRONTEND_API_TOKEN)
+        response = client.post("/usercheck", {"username": "nobody"}, content_type="application/json")
+        self.assertNotEqual(response.status_code, 403)
+
+
+class CodeStoreRules:
+    """Shared by both stores: they must treat re-requests and lockout alike."""
+
+    def test_verify_once(self):
+        code = self.store.issue(7, "123456")
+        self.assertEqual(self.store.verify(7, "000000"), codes.MISMATCH)
+        self.assertEqual(self.store.verify(7, code), codes.VERIFIED)
+        self.assertEqual(self.store.verify(7, code), codes.EXPIRED)
+
+    def test_reissue_resends_live_code(self):
+        self.assertEqual(self.store.issue(7, "123456"), "123456")
+        self.assertEqual(self.store.issue(7, "654321"), "123456")
+
+    def test_lockout_survives_reissue(self):
+        code = self.store.issue(7, "123456")
+        for _ in range(codes.MAX_ATTEMPTS):
+            self.assertEqual(self.store.verify(7, "000000"), codes.MISMATCH)
+        self.assertEqual(self.store.verify(7, code), codes.LOCKED)
+        self.assertEqual(self.store.issue(7, "654321"), code)
+        self.assertEqual(self.store.verify(7, code), codes.LOCKED)
+
+    def test_parallel_guesses_share_the_lockout(self):
+        self.store.issue(7, "123456")
+        results = []
+        guesses = [threading.Thread(target=lambda: results.append(self.store.verify(7, "000000")))
+                   for _ in range(4 * codes.MAX_ATTEMPTS)]
+        for guess in guesses:
+            guess.start()
+        for guess in guesses:
+            guess.join()
+        self.assertEqual(results.count(codes.MISMATCH), codes.MAX_ATTEMPTS)
+        self.assertEqual(results.count(codes.LOCKED), 3 * codes.MAX_ATTEMPTS)
+
+    def test_expired_code_is_replaced(self):
+        self.store.issue(7, "123456")
+        self.expire(7)
+        self.assertEqual(self.store.verify(7, "123456"), codes.EXPIRED)
+        self.assertEqual(self.store.issue(7, "654321"), "654321")
+        self.assertEqual(self.store.verify(7, "654321"), codes.VERIFIED)
+
+
+class CacheCodeStoreTests(CodeStoreRules, SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.store = codes.CacheCodeStore()
+
+    def expire(self, user_id):
+        cache.delete_many(self.store._keys(user_id))
+
+
+class SupabaseCodeStoreTests(CodeStoreRules, SimpleTestCase):
+    def setUp(self):
+        self.fake = FakeSupabase()
+        self.store = codes.SupabaseCodeStore(self.fake)
+
+    def expire(self, user_id):
+        past = (datetime.now(timezone.utc) - timedelta(seconds=1)).isoformat()
+        self.fake.table("verification_codes").update({"expires_at": past}).eq("user_id", user_id).execute()
+
+
+class CodeStoreChoiceTests(SimpleTestCase):
+    def test_auto_falls_back_to_db_without_shared_cache(self):
+        locmem = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+        shared = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache",
+                              "LOCATION": "redis://127.0.0.1:6379"}}
+        with override_settings(VERIFICATION_CODE_STORE="auto", CACHES=locmem):
+            self.assertIsInstance(codes.get_code_store(), codes.SupabaseCodeStore)
+        with override_settings(VERIFICATION_CODE_STORE="auto", CACHES=shared):
+            self.assertIsInstance(codes.get_code_store(), codes.CacheCodeStore)
+        with override_settings(VERIFICATION_CODE_STORE="cache", CACHES=locmem):
+            self.assertIsInstance(codes.get_code_store(), codes.CacheCodeStore)
+
+
+@override_settings(VERIFICATION_CODE_STORE="cache")
+class VerifyCodeViewTests(ORMTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = self.make_user()
+
+    def verify(self, code):
+        return self.client.post("/verifycode", {"email": self.user.email, "code": code},
+                                content_type="application/json")
+
+    def test_locked_code_says_to_wait(self):
+        codes.CacheCodeStore().issue(self.user.id, "123456")
+        for _ in range(codes.MAX_ATTEMPTS):
+            self.assertEqual(self.verify("000000").json(), {"status": "0"})
+        response = self.verify("123456")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], str(codes.CODE_TTL_SECONDS))
+        self.assertNotIn("new code", response.json()["error"])
+
+    def test_correct_code_verifies_email(self):
+        codes.CacheCodeStore().issue(self.user.id, "123456")
+        self.assertEqual(self.verify("123456").json(), {"status": "1"})
+
+
+class MetricsTests(SimpleTestCase):
+    def test_label_values_are_escaped(self):
+        histogram = instrumentation.Histogram("test_seconds", "Test.", ["name"])
+        histogram.observe(0.1, name='a"b\\c\nd')
+        self.assertIn('name="a\\"b\\\\c\\nd"', histogram.render())
+
+    def test_decoded_results_not_sized_by_default(self):
+        self.assertEqual(instrumentation._payload_size(b"abc"), 3)
+        self.assertEqual(instrumentation._payload_size(mock.Mock(data=[{"id": 1}])), 0)
+        with override_settings(REQUEST_TRACING_PAYLOAD_SIZES=True):
+            self.assertEqual(instrumentation._payload_size(mock.Mock(data=[{"id": 1}])), len('[{"id":1}]'))
+
+
+class SampledLoggerTests(SimpleTestCase):
+    def test_disabled_level_skips_the_coin_flip(self):
+        logger = log.SampledLogger(logging.getLogger("blog.tests.sampled"), rate=0.5)
+        logger.logger.setLevel(logging.WARNING)
+        self.addCleanup(logger.logger.setLevel, logging.NOTSET)
+        with mock.patch("blog.log.random.random") as coin:
+            logger.info("heartbeat")
+        coin.assert_not_called()
+
+    def test_warnings_are_never_sampled(self):
+        logger = log.SampledLogger(logging.getLogger("blog.tests.sampled"), rate=0.0)
+        with self.assertLogs("blog.tests.sampled", logging.INFO) as logs:
+            logger.info("dropped")
+            logger.warning("kept")
+        self.assertEqual([record.getMessage() for record in logs.records], ["kept"])
+
+
+class KeysetPagingTests(SimpleTestCase):
+    def test_events_since_reads_every_page(self):
+        from .repositories import supabase_backend
+
+        fake = FakeSupabase()
+        fake.db.insert_rows("comments", [{"article_id": n % 3 + 1, "user_id": 1, "content": "hi"} for n in range(7)])
+        query = lambda: fake.table("comments").select("id, article_id")
+        self.assertEqual([row["id"] for row in supabase_backend._keyset(query, page_size=2)], list(range(1, 8)))
+
+        repos = build_repositories("supabase", client=fake)
+        since = datetime.now(timezone.utc) - timedelta(hours=1)
+        self.assertEqual(len(repos.comments.events_since(since)), 7)
+        self.assertEqual(repos.comments.events_since(datetime.now(timezone.utc) + timedelta(hours=1)), [])
+
+
+class RecommendationIndexTests(ORMTestCase):
+    def articles(self):
+        topics = ["garden soil compost seeds", "python django views tests", "garden seeds watering compost"]
+        return [{"id": n, "title": f"Article {n}", "content": topics[n % 3]} for n in range(1, 10)]
+
+    def test_with_article_leaves_the_loaded_index_alone(self):
+        index = recommendations.RecommendationIndex.build(self.articles(), k=10)
+        before = index.related(3)
+        new = {"id": 10, "title": "More garden", "content": "garden soil compost seeds watering"}
+        updated = index.with_article(new)
+        self.assertEqual(index.related(3), before)
+        self.assertNotIn(10, index.row_of)
+        self.assertIn(10, [card["id"] for card in updated.related(3)])
+        self.assertNotIn(10, [card["id"] for card in updated.without_article(10).related(3)])
+        self.assertIn(10, [card["id"] for card in updated.related(3)])
+
+    def test_related_survives_an_unreadable_index(self):
+        with mock.patch("blog.recommendations.get_index", side_effect=EOFError("truncated")):
+            response = self.client.get("/articles/1/related")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"articles": []})
+
+
+class ResilienceTests(ORMTestCase):
+    def setUp(self):
+        super().setUp()
+        resilience.reset_breakers()
+        self.addCleanup(resilience.reset_breakers)
+        self.faults = Faults()
+        self.fake = FakeSupabase(self.faults)
+        self.fake.db.insert_rows("users", [{"username": "writer", "email": "writer@example.com",
+                                            "first_name": "Ada", "last_name": "L", "password_hash": "x"}])
+        self.fake.db.insert_rows("articles", [{"title": "Live", "content": "<p>a</p>", "author_id": 1,
+                                               "status": "published"},
+                                              {"title": "Draft", "content": "<p>b</p>", "author_id": 1,
+                                               "status": "draft"}])
+        self.supabase = resilience.ResilientClient(self.fake, timeout=1.0, read_attempts=2)
+
+    def read(self, table, **filters):
+        query = self.supabase.table(table).select("*")
+        for column, value in filters.items():
+            query = query.eq(column, value)
+        return query.execute()
+
+    @override_settings(BREAKER_FAILURE_THRESHOLD=2, BREAKER_RESET_SECONDS=60)
+    def test_breaker_opens_after_transient_failures(self):
+        calls = []
+
+        def down():
+            calls.append(1)
+            raise ConnectionError("reset")
+
+        for _ in range(2):
+            with self.assertRaises(resilience.DependencyUnavailable):
+                resilience.guarded("test", down, 1.0)
+        with self.assertRaises(resilience.CircuitOpenError) as raised:
+            resilience.guarded("test", down, 1.0)
+        self.assertEqual(len(calls), 2)
+        self.assertGreater(raised.exception.retry_after, 0)
+
+    @override_settings(BREAKER_FAILURE_THRESHOLD=2, BREAKER_RESET_SECONDS=60)
+    def test_retries_of_one_call_count_once(self):
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            raise ConnectionError("reset")
+
+        with self.assertRaises(resilience.DependencyUnavailable):
+            resilience.guarded("flaky", flaky, 5.0, attempts=3, base_delay=0.001)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual((resilience.breaker("flaky").state, resilience.breaker("flaky").failures), ("closed", 1))
+        with self.assertRaises(resilience.DependencyUnavailable):
+            resilience.guarded("flaky", flaky, 5.0, attempts=3, base_delay=0.001)
+        self.assertEqual(resilience.breaker("flaky").state, "open")
+
+    @override_settings(BREAKER_FAILURE_THRESHOLD=2)
+    def test_server_answers_leave_the_breaker_alone(self):
+        circuit = resilience.breaker("test")
+        circuit.record_failure()
+
+        def bad_filter():
+            raise ValueError("bad filter")
+
+        with self.assertRaises(ValueError):
+            resilience.guarded("test", bad_filter, 1.0)
+        self.assertEqual(circuit.failures, 1)
+
+    def test_retries_stop_at_the_deadline(self):
+        calls = []
+
+        def down():
+            calls.append(1)
+            raise ConnectionError("reset")
+
+        start = time.monotonic()
+        with self.assertRaises(resilience.DependencyUnavailable):
+            resilience.guarded("test", down, 0.3, attempts=1000, base_delay=0.05, max_delay=0.05)
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertLess(len(calls), 1000)
+        with self.assertRaises(resilience.DeadlineExceeded):
+            resilience.guarded("hung", lambda: time.sleep(1), 0.05)
+
+    def test_stale_copy_of_published_article(self):
+        fresh = self.read("articles", id=1).data
+        self.faults.down = True
+        stale = self.read("articles", id=1)
+        self.assertTrue(stale.stale)
+        self.assertEqual(stale.data, fresh)
+
+        repos = build_repositories("supabase", client=self.supabase)
+        article = repos.articles.get(1)
+        self.assertEqual((article["title"], article["author_first_name"]), ("Live", None))
+
+    def test_only_public_catalog_reads_are_kept(self):
+        self.read("articles", id=2)
+        self.read("users", id=1)
+        self.supabase.table("articles").select("*").eq("status", "published").range(0, 9).execute()
+        self.supabase.table("comments").select("*").gt("id", 0).order("id").limit(10).execute()
+        self.assertEqual(self.supabase.stale.nbytes, 0)
+        self.faults.down = True
+        for table, row_id in (("articles", 2), ("users", 1)):
+            with self.assertRaises(resilience.DependencyUnavailable):
+                self.read(table, id=row_id)
+
+    def test_stale_copies_are_bounded_by_bytes(self):
+        stale = resilience.StaleReads(max_bytes=100, refresh_seconds=0)
+        for n in range(10):
+            stale.put(("comments", n), mock.Mock(data=[{"content": "x" * 20}], count=None))
+        self.assertLessEqual(stale.nbytes, 100)
+        self.assertIsNone(stale.get(("comments", 0)))
+        self.assertIsNotNone(stale.get(("comments", 9)))
+
+    def test_write_clears_the_stale_copy(self):
+        self.read("articles", id=1)
+        self.supabase.table("articles").update({"title": "Edited"}).eq("id", 1).execute()
+        self.faults.down = True
+        with self.assertRaises(resilience.DependencyUnavailable):
+            self.read("articles", id=1)
+
+    def test_view_answers_503_with_retry_after(self):
+        self.faults.down = True
+        with mock.patch("blog.views.repos", build_repositories("supabase", client=self.supabase)), \
+                mock.patch("blog.prerender.open_file", return_value=None):
+            response = self.client.get("/articles/1")
+        self.assertEqual(response.status_code, 503)
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+
+
+class JWKSStandIn:
+    """Serves a JWKS on 127.0.0.1 like Google's certs endpoint; `status` != 200 plays an outage."""
+
+    def __init__(self):
+        self.private_keys = {}
+        self.status = 200
+        self.requests = 0
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stand_in.requests += 1
+                body = json.dumps({"keys": [stand_in.jwk(kid) for kid in stand_in.private_keys]}).encode()
+                self.send_response(stand_in.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Cache-Control", "public, max-age=3600")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/oauth2/v3/certs"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def add_key(self, kid):
+        self.private_keys[kid] = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    def jwk(self, kid):
+        jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(self.private_keys[kid].public_key()))
+        return dict(jwk, kid=kid, use="sig", alg="RS256")
+
+    def token(self, kid="k1", **claims):
+        now = int(time.time())
+        claims = dict({"iss": "https://accounts.google.com", "aud": settings.GOOGLE_CLIENT_ID, "sub": "42",
+                       "email": "reader@example.com", "given_name": "Ada", "family_name": "L",
+                       "iat": now, "exp": now + 3600}, **claims)
+        return jwt.encode(claims, self.private_keys[kid], algorithm="RS256", headers={"kid": kid})
+
+
+class GoogleTokenTests(ORMTestCase):
+    def setUp(self):
+        super().setUp()
+        resilience.reset_breakers()
+        self.addCleanup(resilience.reset_breakers)
+        self.google = JWKSStandIn()
+        self.addCleanup(self.google.close)
+        self.google.add_key("k1")
+        self.keys = google_tokens.GoogleKeys(self.google.url)
+        patcher = mock.patch("blog.google_tokens._keys", self.keys)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def sign_in(self, credential):
+        return self.client.post("/auth/google", {"credential": credential}, content_type="application/json")
+
+    def test_valid_token_signs_in(self):
+        response = self.sign_in(self.google.token())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["is_new"], "1")
+        self.assertTrue(User.objects.get(email="reader@example.com").email_verified)
+        self.assertEqual(self.sign_in(self.google.token()).json()["is_new"], "0")
+        self.assertEqual(self.google.requests, 1)
+
+    def test_wrong_audience_or_issuer(self):
+        self.assertEqual(self.sign_in(self.google.token(aud="someone-else")).status_code, 400)
+        self.assertEqual(self.sign_in(self.google.token(iss="https://evil.example.com")).status_code, 400)
+        with self.assertRaises(ValueError):
+            google_tokens.verify_google_token(self.google.token(aud="someone-else"), keys=self.keys)
+
+    def test_expired_token(self):
+        past = int(time.time()) - 7200
+        expired = self.google.token(iat=past, exp=past + 3600)
+        self.assertEqual(self.sign_in(expired).status_code, 400)
+        with self.assertRaisesRegex(ValueError, "expired"):
+            google_tokens.verify_google_token(expired, keys=self.keys)
+
+    def test_unknown_kid_refreshes_once(self):
+        self.assertEqual(self.sign_in(self.google.token()).status_code, 200)
+        self.google.add_key("k2")
+        self.assertEqual(self.sign_in(self.google.token("k2")).status_code, 200)
+        self.assertEqual(self.google.requests, 2)
+        # A second unknown kid within REFETCH_INTERVAL does not refetch.
+        self.google.add_key("k3")
+        self.assertEqual(self.sign_in(self.google.token("k3")).status_code, 400)
+        self.assertEqual(self.google.requests, 2)
+
+    def test_jwks_endpoint_down(self):
+        self.google.status = 503
+        response = self.sign_in(self.google.token())
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("Retry-After", response)
+
+        self.google.close()
+        with self.assertRaises(resilience.DependencyUnavailable):
+            google_tokens.GoogleKeys(self.google.url).get("k1")
+
+    def test_cached_keys_outlive_an_outage(self):
+        self.assertEqual(self.sign_in(self.google.token()).status_code, 200)
+        self.google.status = 503
+        self.keys.refresh(force=True)
+        self.assertEqual(self.sign_in(self.google.token()).status_code, 200)
+
+
+class LiveBrokerTests(SimpleTestCase):
+    def publish(self, broker, topic, *ids):
+        for event_id in ids:
+            broker.publish(topic, live.Event(event_id, "comment", {"id": event_id}))
+
+    def replay(self, broker, topic, last_event_id):
+        replay = broker.subscribe(topic, live.ThreadSubscriber(8), last_event_id)
+        return None if replay is None else [event.id for event in replay]
+
+    def test_replays_what_was_missed(self):
+        broker = live.InMemoryBroker(history=10)
+        self.publish(broker, "a", 3, 5, 8)
+        self.assertEqual(self.replay(broker, "a", 3), [5, 8])
+        self.assertEqual(self.replay(broker, "a", 8), [])
+        self.assertEqual(self.replay(broker, "a", None), [])
+
+    def test_reset_once_history_is_evicted(self):
+        broker = live.InMemoryBroker(history=2)
+        self.publish(broker, "a", 1, 2, 3, 4)
+        self.assertIsNone(self.replay(broker, "a", 1))
+        self.assertEqual(self.replay(broker, "a", 2), [3, 4])
+
+    def test_reset_for_a_topic_without_history(self):
+        # A restart, or a topic created after the client last saw it.
+        broker = live.InMemoryBroker()
+        self.assertIsNone(self.replay(broker, "a", 7))
+        self.publish(broker, "a", 9)
+        self.assertIsNone(self.replay(broker, "a", 7))
+        self.assertEqual(self.replay(broker, "a", 9), [])
+
+    def test_reset_after_the_topic_was_forgotten(self):
+        broker = live.InMemoryBroker(max_topics=1)
+        self.publish(broker, "a", 1)
+        self.publish(broker, "b", 2)
+        self.assertIsNone(self.replay(broker, "a", 1))
+
+
+class AutosaveTests(ORMTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.author = self.make_user()
+        self.sign_in(self.author)
+        created = self.post({"title": "Draft", "content": "<p>Hello world</p>"})
+        self.assertEqual(created.status_code, 201)
+        self.article_id = created.json()["article_id"]
+
+    def post(self, body):
+        return self.client.post("/autosave", body, content_type="application/json")
+
+    def save(self, base_version, ops, **fields):
+        return self.post(dict({"article_id": self.article_id, "base_version": base_version, "ops": ops}, **fields))
+
+    def test_patches_apply_in_turn(self):
+        self.assertEqual(self.save(1, [[9, 5, "there"]]).json()["version"], 2)
+        self.assertEqual(self.save(2, [[3, 0, "<b>"], [14, 0, "</b>"]], title="Greeting").json()["version"], 3)
+        article = Article.objects.get(id=self.article_id)
+        self.assertEqual((article.title, article.content, article.version),
+                         ("Greeting", "<p><b>Hello there</b></p>", 3))
+
+    def test_stale_base_version_conflicts(self):
+        self.assertEqual(self.save(1, [[9, 5, "there"]]).status_code, 200)
+        # A second tab still on version 1.
+        response = self.save(1, [[0, 0, "x"]])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["version"], 2)
+
+    def test_write_elsewhere_conflicts(self):
+        self.repos.articles.update(self.article_id, {"content": "<p>Edited in submit</p>"})
+        response = self.save(1, [[9, 5, "there"]])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["version"], 2)
+        self.assertEqual(Article.objects.get(id=self.article_id).content, "<p>Edited in submit</p>")
+
+    def test_bad_ops_are_rejected(self):
+        for ops in ([[100, 1, "x"]], [[5, 0, "a"], [2, 0, "b"]], [[0, "1", "x"]], "not a list", [[0, 0]]):
+            response = self.save(1, ops)
+            self.assertEqual(response.status_code, 400, ops)
+        self.assertEqual(self.save(1, [[0, 0, "x"]], length=3).status_code, 400)
+        self.assertEqual(Article.objects.get(id=self.article_id).version, 1)
+
+    def test_other_authors_article(self):
+        self.sign_in(self.make_user("intruder"))
+        self.assertEqual(self.save(1, [[0, 0, "x"]]).status_code, 404)
+
+    def test_every_version_is_kept(self):
+        self.save(1, [[9, 5, "there"]])
+        self.save(2, [[3, 5, "Goodbye"]])
+        listed = self.client.get(f"/articles/{self.article_id}/revisions").json()["revisions"]
+        self.assertEqual([row["version"] for row in listed], [3, 2, 1])
+        old = self.client.get(f"/articles/{self.article_id}/revisions/2").json()
+        self.assertEqual(old["content"], "<p>Hello there</p>")
+
+        restored = self.client.post(f"/articles/{self.article_id}/revisions/1/restore").json()
+        self.assertEqual(restored["version"], 4)
+        self.assertEqual(Article.objects.get(id=self.article_id).content, "<p>Hello world</p>")
+        self.assertEqual(self.save(4, [[3, 0, "!"]]).json()["version"], 5)
+
+
+class PrerenderTests(ORMTestCase):
+    def test_file_and_database_answers_match(self):
+        article = self.make_article(self.make_user(first_name="Ada", last_name="L"), status="published")
+        dynamic = self.client.get(f"/articles/{article.id}")
+        self.assertTrue(prerender.article_changed(article.id))
+        static = self.client.get(f"/articles/{article.id}")
+        self.assertTrue(static.streaming)
+        self.assertEqual(b"".join(static.streaming_content), dynamic.content)
+        self.assertEqual(static["Content-Type"], dynamic["Content-Type"])
+        self.assertEqual(dynamic.json()["author_first_name"], "Ada")
+
+    def test_page_content_is_sanitized(self):
+        content = ('<p onclick="steal()">Hi <script>alert(document.cookie)</script><b>there</b></p>'
+                   '<img src="x" onerror="alert(1)"><a href=" javascript:alert(1)">link</a>'
+                   '<a href="https://example.com/a?b=1&c=2">ok</a><iframe src="https://evil.test"></iframe>'
+                   '<style>body{}</style><svg><script>alert(2)</script></svg><em>unclosed')
+        article = self.make_article(self.make_user(), status="published", content=content)
+        self.assertTrue(prerender.article_changed(article.id))
+        response = self.client.get(f"/articles/{article.id}/page")
+        page = b"".join(response.streaming_content).decode()
+        body = page[page.index("<article>"):]
+        for needle in ("<script", "alert", "onclick", "onerror", "javascript:", "<iframe", "<style", "<svg"):
+            self.assertNotIn(needle, body)
+        self.assertIn('<p>Hi <b>there</b></p><img src="x"><a>link</a>', body)
+        self.assertIn('<a href="https://example.com/a?b=1&amp;c=2" rel="nofollow noopener">ok</a>', body)
+        self.assertIn("<em>unclosed</em></article>", body)
+        self.assertIn("sandbox", response["Content-Security-Policy"])
+
+    def test_unpublished_article_is_not_written(self):
+        article = self.make_article(self.make_user(), status="draft")
+        self.assertFalse(prerender.article_changed(article.id))
+        self.assertFalse(prerender.exists(article.id))
+
+
+class ModerationTests(ORMTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = self.make_user("admin")
+        self.sign_in(self.admin)
+        override = override_settings(ADMIN_USER_IDS=[self.admin.id])
+        override.enable()
+        self.addCleanup(override.disable)
+        author = self.make_user()
+        self.queued = [self.make_article(author, status=status).id
+                       for status in ("review", "pending_review", "review")]
+        self.draft = self.make_article(author, status="draft").id
+
+    def moderate(self, action, article_ids):
+        return self.client.post("/moderation/moderate", {"action": action, "article_ids": article_ids},
+                                content_type="application/json")
+
+    def test_bulk_approve_skips_what_is_not_queued(self):
+        response = self.moderate("approve", self.queued + [self.draft, 999999])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["updated"], self.queued)
+        self.assertEqual(response.json()["skipped"], [self.draft, 999999])
+        self.assertEqual(set(Article.objects.filter(id__in=self.queued).values_list("status", flat=True)),
+                         {"published"})
+        self.assertEqual(Article.objects.get(id=self.draft).status, "draft")
+        self.assertTrue(all(prerender.exists(article_id) for article_id in self.queued))
+
+        # Another admin got there first: nothing left to move.
+        again = self.moderate("reject", self.queued).json()
+        self.assertEqual((again["updated"], again["skipped"]), ([], self.queued))
+
+    def test_bulk_reject_and_counts(self):
+        self.assertEqual(self.moderate("reject", self.queued[:2]).json()["status"], "rejected")
+        counts = self.client.get("/moderation/counts").json()["counts"]
+        self.assertEqual((counts["review"], counts["pending_review"], counts["rejected"], counts["draft"]),
+                         (1, 0, 2, 1))
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.moderate("publish", self.queued).status_code, 400)
+        self.assertEqual(self.moderate("approve", []).status_code, 400)
+        self.assertEqual(self.moderate("approve", ["one"]).status_code, 400)
+        self.assertEqual(self.moderate("approve", list(range(1, 202))).status_code, 400)
+        self.assertEqual(Article.objects.filter(status="published").count(), 0)
+
+    def test_queue_pages_by_id(self):
+        first = self.client.get("/moderation/articles?status=review&limit=1").json()
+        self.assertEqual([row["id"] for row in first["articles"]], [self.queued[0]])
+        rest = self.client.get(f"/moderation/articles?status=review&limit=1&after={first['next']}").json()
+        self.assertEqual([row["id"] for row in rest["articles"]], [self.queued[2]])
+        self.assertEqual(self.client.get(f"/moderation/articles?status=review&after={self.queued[2]}")
+                         .json()["articles"], [])
+
+    def test_supabase_backend_moves_the_counters(self):
+        fake = FakeSupabase()
+        fake.db.insert_rows("users", [{"username": "author", "email": "author@example.com"}])
+        ids = [row["id"] for row in fake.db.insert_rows("articles", [
+            {"title": "a", "content": "", "author_id": 1, "status": status}
+            for status in ("review", "review", "draft")])]
+        repos = build_repositories("supabase", client=fake)
+        self.assertEqual(repos.articles.status_counts(), {"review": 2, "draft": 1})
+        updated = repos.articles.set_status_many(ids, ["review", "pending_review"], "published")
+        self.assertEqual(sorted(row["id"] for row in updated), ids[:2])
+        self.assertEqual(repos.articles.status_counts(), {"published": 2, "draft": 1})
+
+
+class StatsRollupTests(ORMTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = self.make_user()
+        self.sign_in(self.author)
+        self.article = self.make_article(self.author, status="published").id
+
+    def log_read(self, **fields):
+        body = dict({"user_id": self.author.id, "article_id": self.article, "required_time_seconds": 100}, **fields)
+        response = self.client.post("/log_read", body, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        return response.json()["session_id"]
+
+    def stats_row(self):
+        return ArticleStats.objects.filter(article_id=self.article).values(*stats.STATS_FIELDS, "updated_at").first()
+
+    def test_heartbeats_leave_the_row_until_the_session_finishes(self):
+        session = self.log_read(force_new_session=True)
+        started = self.stats_row()
+        self.assertEqual((started["reads"], started["active_seconds"]), (1, 0))
+        for seconds in (30, 60):
+            self.log_read(session_id=session, status="in_progress", scroll_depth=50, active_time_seconds=seconds)
+        self.assertEqual(self.stats_row(), started)
+
+        self.log_read(session_id=session, status="completed", scroll_depth=95, active_time_seconds=90)
+        finished = self.stats_row()
+        self.assertEqual({field: finished[field] for field in stats.STATS_FIELDS},
+                         {"reads": 1, "completed_reads": 1, "deep_reads": 1, "finished_reads": 1, "active_seconds": 90,
+                          "comments": 0})
+
+    def test_dashboard_totals(self):
+        skim = self.log_read(force_new_session=True)
+        self.log_read(session_id=skim, status="completed", scroll_depth=60, active_time_seconds=10)
+        self.log_read(force_new_session=True, scroll_depth=20, active_time_seconds=40)  # still open
+        response = self.client.post("/articles/add-comment", {"comment": "Nice", "article_id": self.article},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+
+        body = self.client.get("/userarticles/stats").json()
+        self.assertEqual([row["id"] for row in body["articles"]], [self.article])
+        totals = body["totals"]
+        self.assertEqual({field: totals[field] for field in stats.STATS_FIELDS},
+                         {"reads": 2, "completed_reads": 1, "deep_reads": 0, "finished_reads": 1, "active_seconds": 10,
+                          "comments": 1})
+        # The open session has no active time counted yet, so it stays out of the average too.
+        self.assertEqual((totals["completion_rate"], totals["avg_active_seconds"]), (0.5, 10.0))
+
+    def test_supabase_triggers_count_the_same(self):
+        fake = FakeSupabase()
+        author = fake.db.insert_rows("users", [{"username": "author", "email": "author@example.com"}])[0]["id"]
+        article = fake.db.insert_rows("articles", [{"title": "a", "content": "", "author_id": author}])[0]["id"]
+        reads = build_repositories("supabase", client=fake).reads
+        session = reads.create({"user_id": author, "article_id": article, "status": "started",
+                                "scroll_depth": 0.0, "active_time_seconds": 0, "required_time_seconds": 100})["session_id"]
+        started = dict(fake.db.article_stats[article])
+        reads.record_heartbeat(session, "in_progress", 50, 60)
+        self.assertEqual(fake.db.article_stats[article], started)
+
+        reads.record_heartbeat(session, "completed", 95, 90)
+        reads.record_heartbeat(session, "in_progress", 95, 120)  # a late beacon of the finished session
+        row = fake.db.article_stats[article]
+        self.assertEqual({field: row[field] for field in stats.STATS_FIELDS},
+                         {"reads": 1, "completed_reads": 1, "deep_reads": 1, "finished_reads": 1, "active_seconds": 120,
+                          "comments": 0})
+
+
+class RepositoryContractTests(SimpleTestCase):
+    def test_backends_implement_every_method(self):
+        build_repositories("django")
+        build_repositories("supabase", client=FakeSupabase())
+
+    def test_missing_method_fails_on_construction(self):
+        class Partial(base.CommentsRepo):
+            def list_for_article(self, article_id):
+                return []
+
+        with self.assertRaises(TypeError):
+            Partial()
+
+
+@override_settings(COMPRESSION_MIN_SIZE=100, COMPRESSION_STREAM_SIZE=10_000)
+class CompressionTests(SimpleTestCase):
+    def respond(self, response, accept="gzip"):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept)
+        return middleware.CompressionMiddleware(lambda request: response)(request)
+
+    def test_negotiate_encoding_honours_q_values(self):
+        negotiate = middleware.negotiate_encoding
+        self.assertEqual(negotiate("gzip, br"), "br")
+        self.assertEqual(negotiate("br;q=0.5, gzip"), "gzip")
+        self.assertEqual(negotiate("br;q=0, *"), "gzip")
+        self.assertEqual(negotiate("gzip;q=0, br;q=0"), None)
+        self.assertEqual(negotiate("*;q=0.1"), "br")
+        self.assertEqual(negotiate("br, gzip;q=0.2", brotli_available=False), "gzip")
+        self.assertEqual(negotiate("identity"), None)
+
+    def test_small_bodies_go_out_as_is(self):
+        response = self.respond(HttpResponse(b"x" * 99, content_type="application/json"))
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response.content, b"x" * 99)
+
+    def test_mid_sized_body_is_compressed_whole_with_weak_etag(self):
+        original = HttpResponse(b"x" * 5000, content_type="application/json")
+        original["ETag"] = '"v1"'
+        response = self.respond(original)
+        self.assertEqual((response["Content-Encoding"], response["ETag"]), ("gzip", 'W/"v1"'))
+        self.assertFalse(response.streaming)
+        self.assertEqual(gzip.decompress(response.content), b"x" * 5000)
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+
+    def test_large_body_is_streamed(self):
+        body = b"0123456789" * 20_000
+        response = self.respond(HttpResponse(body, content_type="text/plain"))
+        self.assertTrue(response.streaming)
+        self.assertFalse(response.has_header("Content-Length"))
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), body)
+
+    def test_only_event_streams_flush_every_chunk(self):
+        chunks = [b"data: %d\n\n" % n for n in range(50)]
+        events = list(self.respond(StreamingHttpResponse(iter(chunks), content_type="text/event-stream"))
+                      .streaming_content)
+        self.assertEqual(len(events), len(chunks) + 1)
+        decompressor = zlib.decompressobj(31)
+        self.assertEqual(decompressor.decompress(events[0]), chunks[0])
+
+        download = list(self.respond(StreamingHttpResponse(iter(chunks), content_type="text/plain"))
+                        .streaming_content)
+        self.assertLess(len(download), 3)
+        self.assertEqual(gzip.decompress(b"".join(download)), b"".join(chunks))
+
+
+class BulkImportTests(ORMTestCase):
+    def setUp(self):
+        super().setUp()
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.source = folder.name
+        self.storage = FakeStorage("http://storage.test")
+        self.write("cover.png", b"\x89PNG cover")
+        self.write("users.ndjson", "\n".join(json.dumps(row) for row in [
+            {"email": "Ada@Example.com", "username": "ada"},
+            {"email": "not-an-email", "username": "nobody"},
+            {"email": "bob@example.com", "username": "bob", "password": "hunter2"},
+        ]))
+        self.write("articles.ndjson", "\n".join(json.dumps(row) for row in [
+            {"author_email": "ada@example.com", "title": "One", "content": "<p>1</p>", "images": ["cover.png"]},
+            {"author_email": "ada@example.com", "title": "Two", "content": "<p>2</p>", "status": "pending_review",
+             "images": ["cover.png"]},
+            {"author_email": "ada@example.com", "title": "Bad", "content": "<p>3</p>", "status": "archived"},
+            {"author_email": "ada@example.com", "title": "Lost", "content": "<p>4</p>", "images": ["missing.png"]},
+            {"author_email": "carol@example.com", "title": "Orphan", "content": "<p>5</p>"},
+        ]) + "\nnot json\n")
+
+    def write(self, name, data):
+        with open(f"{self.source}/{name}", "wb" if isinstance(data, bytes) else "w") as handle:
+            handle.write(data)
+
+    def run_import(self, dry_run=False):
+        return bulk_import.run_import(self.source, dry_run=dry_run, repos=self.repos, storage=self.storage)
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        report = self.run_import()
+        self.assertEqual((report["users"]["inserted"], report["users"]["invalid"]), (1, 2))
+        self.assertEqual((report["articles"]["inserted"], report["articles"]["invalid"]), (2, 4))
+        self.assertEqual(len(report["errors"]), 6)
+        self.assertTrue(any("users.ndjson:3: plain-text password" in error for error in report["errors"]))
+        self.assertEqual(sorted(Article.objects.values_list("title", "status")),
+                         [("One", "draft"), ("Two", "pending_review")])
+        # Both articles reference the one stored copy of the cover.
+        self.assertEqual((report["images"]["uploaded"], report["images"]["deduplicated"]), (1, 1))
+        self.assertEqual(ArticlePhoto.objects.values("path").distinct().count(), 1)
+
+    def test_rerun_inserts_nothing(self):
+        self.run_import()
+        uploaded = self.storage.bytes_uploaded
+        report = self.run_import()
+        self.assertEqual((report["users"]["inserted"], report["users"]["existing"]), (0, 1))
+        self.assertEqual((report["articles"]["inserted"], report["articles"]["existing"]), (0, 2))
+        self.assertEqual((report["images"]["uploaded"], report["images"]["existing"]), (0, 2))
+        self.assertEqual(self.storage.bytes_uploaded, uploaded)
+        self.assertEqual((User.objects.count(), Article.objects.count(), ArticlePhoto.objects.count()), (1, 2, 2))
+
+    def test_dry_run_writes_nothing(self):
+        report = self.run_import(dry_run=True)
+        self.assertEqual((report["users"]["inserted"], report["articles"]["inserted"]), (1, 2))
+        self.assertEqual(report["images"]["uploaded"], 1)
+        self.assertEqual((User.objects.count(), Article.objects.count(), ArticlePhoto.objects.count()), (0, 0, 0))
+        self.assertEqual(self.storage.bytes_uploaded, 0)
+
+
+class ImageStoreTests(ORMTestCase):
+    def setUp(self):
+        super().setUp()
+        self.storage = FakeStorage("http://storage.test")
+        self.bucket = self.storage.from_(images.PHOTO_BUCKET)
+        author = self.make_user()
+        self.first, self.second = (self.make_article(author).id for _ in range(2))
+
+    def store(self, article_id, data=b"cover bytes"):
+        return images.store_image(article_id, data, "cover.PNG", repos=self.repos, storage=self.storage)
+
+    def collect(self, **options):
+        return images.collect_garbage(repos=self.repos, storage=self.storage, **options)
+
+    def test_same_bytes_are_stored_once(self):
+        first = self.store(self.first)
+        self.assertEqual((first["uploaded"], first["linked"]), (True, True))
+        self.assertRegex(first["path"], r"^blobs/[0-9a-f]{64}\.png$")
+        self.assertEqual(self.store(self.second), dict(first, uploaded=False))
+        self.assertEqual(self.store(self.second), dict(first, uploaded=False, linked=False))
+        self.assertEqual(list(self.bucket.objects), [first["path"]])
+        self.assertEqual(self.repos.photos.articles_for_paths([first["path"]]), {first["path"]: {self.first, self.second}})
+
+    def test_gc_removes_only_old_unreferenced_blobs(self):
+        path = self.store(self.first)["path"]
+        self.store(self.second)
+        images.unlink_images(self.first, repos=self.repos, storage=self.storage)
+        self.assertEqual(self.collect(grace=timedelta(0)), {"scanned": 1, "unreferenced": 0, "removed": 0})
+
+        images.unlink_images(self.second, repos=self.repos, storage=self.storage)
+        self.assertEqual(self.collect()["unreferenced"], 0)  # younger than the grace period
+        self.assertEqual(self.collect(grace=timedelta(0), dry_run=True)["unreferenced"], 1)
+        self.assertIn(path, self.bucket.objects)
+        self.assertEqual(self.collect(grace=timedelta(0)), {"scanned": 1, "unreferenced": 1, "removed": 1})
+        self.assertEqual(self.bucket.objects, {})
+
+    def test_blob_collected_while_linking_is_uploaded_again(self):
+        path = self.store(self.first)["path"]
+        add = self.repos.photos.add
+
+        def swept_first(article_id, blob):
+            # The only owner unlinks and gc_images runs between the lookup and our row.
+            images.unlink_images(self.first, repos=self.repos, storage=self.storage)
+            self.collect(grace=timedelta(0))
+            return add(article_id, blob)
+
+        with mock.patch.object(self.repos.photos, "add", side_effect=swept_first):
+            result = self.store(self.second)
+        self.assertEqual((result["uploaded"], result["linked"]), (True, True))
+        self.assertEqual(self.bucket.objects[path], b"cover bytes")
+
+
+class SingleFlightTests(SimpleTestCase):
+    key = singleflight.query_key("comments", [("select", ("*",), {}), ("eq", ("article_id", 1), {})])
+
+    def lead_slowly(self, flight, result):
+        """Start a read of `key` that blocks until the returned event is set."""
+        release, started = threading.Event(), threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(5)
+            return result
+
+        thread = threading.Thread(target=flight.do, args=(self.key, slow))
+        thread.start()
+        started.wait(5)
+        self.addCleanup(thread.join)
+        self.addCleanup(release.set)
+        return release
+
+    def test_identical_reads_share_a_flight(self):
+        flight = singleflight.SingleFlight()
+        release = self.lead_slowly(flight, SimpleNamespace(data=[{"id": 1}]))
+        joined = []
+        follower = threading.Thread(target=lambda: joined.append(flight.do(self.key, lambda: None)))
+        follower.start()
+        while not flight.coalesced:
+            time.sleep(0.001)
+        release.set()
+        follower.join()
+        self.assertEqual((flight.executed, joined[0].data), (1, [{"id": 1}]))
+
+    def test_read_after_write_starts_its_own_flight(self):
+        flight = singleflight.SingleFlight()
+        self.lead_slowly(flight, SimpleNamespace(data=[]))
+        flight.forget("comments")
+        fresh = SimpleNamespace(data=[{"id": 1}])
+        self.assertIs(flight.do(self.key, lambda: fresh), fresh)
+        self.assertEqual((flight.executed, flight.coalesced), (2, 0))
+
+    def test_swr_keeps_only_public_catalog_reads(self):
+        flight = singleflight.SingleFlight(swr_seconds=60)
+        users = singleflight.query_key("users", [("select", ("*",), {}), ("eq", ("id", 1), {})])
+        user_reads = []
+
+        def read_user():
+            user_reads.append(1)
+            return SimpleNamespace(data=[{"id": 1, "password_hash": "x"}])
+
+        for _ in range(2):
+            flight.do(users, read_user)
+            flight.do(self.key, lambda: SimpleNamespace(data=[{"id": 1}]))
+        self.assertEqual(len(user_reads), 2)
+        self.assertEqual(flight.stale_served, 1)
+        self.assertEqual([key[0] for key in flight._kept], ["comments"])
+
+
+@override_settings(FEED_SIZE=2, SITEMAP_SHARD_SIZE=10)
+class FeedUpdateTests(ORMTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.author = self.make_user(first_name="Ada", last_name="L")
+        for article_id in (1, 2, 3, 15):
+            self.make_article(self.author, id=article_id, title=f"Article {article_id}", status="published")
+        feeds.rebuild(self.repos)
+
+    def set_status(self, article_id, status):
+        feeds.article_changed(self.repos.articles.update(article_id, {"status": status}), self.repos)
+
+    def feed_ids(self, name=feeds.RSS):
+        return [entry["id"] for entry in self.repos.feeds.get(name)["entries"]]
+
+    def entries(self, name):
+        return self.repos.feeds.get(name)["entries"]
+
+    def test_unpublishing_refills_a_full_feed(self):
+        self.assertEqual(self.feed_ids(), [15, 3])
+        self.set_status(15, "draft")
+        self.assertEqual(self.feed_ids(), [3, 2])
+        self.assertEqual(self.feed_ids(feeds.ATOM), [3, 2])
+        self.assertNotIn("Article 15", feeds.get_document(feeds.RSS, self.repos)["body"])
+
+    def test_sitemap_shards_and_index_follow_the_article(self):
+        self.assertEqual(set(self.entries(feeds.SITEMAP_INDEX)), {"0", "1"})
+        self.set_status(15, "draft")
+        self.assertEqual(self.entries("sitemap-1"), {})
+        self.assertEqual(set(self.entries(feeds.SITEMAP_INDEX)), {"0"})
+
+        self.make_article(self.author, id=25, status="review")
+        self.set_status(25, "published")
+        self.assertEqual(set(self.entries("sitemap-2")), {"25"})
+        self.assertEqual(set(self.entries(feeds.SITEMAP_INDEX)), {"0", "2"})
+        self.assertIn("sitemap-2.xml", feeds.get_document(feeds.SITEMAP_INDEX, self.repos)["body"])
+        self.assertEqual(self.feed_ids(), [25, 3])
+
+    def test_conflicting_save_is_retried(self):
+        for article_id in (30, 31):
+            self.make_article(self.author, id=article_id, status="review")
+        save = self.repos.feeds.save
+        raced, saved = [], []
+
+        def racing(name, *args):
+            if name == feeds.SITEMAP_INDEX and not raced:
+                # Another publish lands between this one's read and its write.
+                raced.append(name)
+                self.set_status(31, "published")
+            saved.append((name, save(name, *args)))
+            return saved[-1][1]
+
+        with mock.patch.object(self.repos.feeds, "save", side_effect=racing):
+            self.set_status(30, "published")
+        self.assertEqual(raced, [feeds.SITEMAP_INDEX])
+        # The racing publish saves first; ours then loses and re-reads (and may find nothing left to change).
+        self.assertEqual([ok for name, ok in saved if name == feeds.SITEMAP_INDEX][:2], [True, False])
+        self.assertEqual(set(self.entries(feeds.SITEMAP_INDEX)), {"0", "1", "3"})
+        self.assertEqual(set(self.entries("sitemap-3")), {"30", "31"})
+        self.assertEqual(sorted(self.feed_ids()), [30, 31])
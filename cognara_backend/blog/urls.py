@@ -3,11 +3,30 @@ from . import views
 
 urlpatterns = [
     path('get_csrf_token', views.get_csrf_token, name="get_csrf_token"),
+    path('metrics', views.metrics, name="metrics"),
+    path('feeds/rss.xml', views.rss_feed, name="rss_feed"),
+    path('feeds/atom.xml', views.atom_feed, name="atom_feed"),
+    path('sitemap.xml', views.sitemap_index, name="sitemap_index"),
+    path('sitemap-<int:shard>.xml', views.sitemap_shard, name="sitemap_shard"),
+    path('export/<str:table>', views.export_table, name="export_table"),
+    path('moderation/articles', views.moderation_articles, name="moderation_articles"),
+    path('moderation/counts', views.moderation_counts, name="moderation_counts"),
+    path('moderation/moderate', views.moderate_articles, name="moderate_articles"),
     path('articles', views.get_articles, name='get_articles'),
+    path('articles/trending', views.trending_articles, name='trending_articles'),
+    path('articles/recommended', views.recommended_articles, name='recommended_articles'),
     path('userarticles', views.user_articles, name='user_articles'),
+    path('userarticles/stats', views.author_stats, name='author_stats'),
+    # Before articles/<article_id>, which would otherwise take (and 405) the POST.
+    path('articles/add-comment', views.post_comment, name='post_comment'),
     path('articles/<article_id>', views.get_article, name='get_article'),
+    path('articles/<int:article_id>/page', views.article_page, name='article_page'),
     path('articles/<article_id>/comments', views.get_comments, name='get_comments'),
-    path('articles/add-comment', views.post_comment, name='post_comment'),
+    path('articles/<int:article_id>/comments/live', views.comment_stream, name='comment_stream'),
+    path('articles/<int:article_id>/related', views.related_articles, name='related_articles'),
+    path('articles/<int:article_id>/revisions', views.article_revisions, name='article_revisions'),
+    path('articles/<int:article_id>/revisions/<int:version>', views.article_revision, name='article_revision'),
+    path('articles/<int:article_id>/revisions/<int:version>/restore', views.restore_revision, name='restore_revision'),
     path('usercheck', views.check_user, name='check_user'),
     path('emailcheck', views.check_email, name='check_email'),
     path('signup', views.signup, name='signup'),
@@ -20,8 +39,10 @@ urlpatterns = [
     path('forgetpass', views.forgetpass, name="forgetpass"),
     path('newsletter/subscribe', views.newsletter_subscription, name="newsletter_subscription"),
     path("get-article-images", views.get_article_images ,name="get_article_images"),
+    path("images/<str:name>", views.article_image, name="article_image"),
     path("upload-article-image/<int:article_id>", views.upload_article_image, name="upload_article_image"),
     path("submit", views.submit ,name="submit"),
+    path("autosave", views.autosave, name="autosave"),
     path('delete-article-image/<int:article_id>', views.delete_article_image, name='delete_article_image'),
     path('change_status', views.change_status, name='change_status'),
     path('log_read', views.log_article_read, name='log_article_read'),
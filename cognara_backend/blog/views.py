@@ -1,19 +1,25 @@
-from django.http import JsonResponse
-from supabase import create_client
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from rest_framework.response import Response
 
 from rest_framework import status
 from rest_framework.permissions import AllowAny
-from datetime import datetime, timezone
+from datetime import datetime
 from .helper import *
+from .encoding import JsonResponse
+from .middleware import admin_required, compression_exempt, frontend_token_exempt, session_login_required
+from .codes import get_code_store, CODE_TTL_SECONDS, VERIFIED, EXPIRED, LOCKED
+from .instrumentation import render_metrics
+from .log import SampledLogger
+from .repositories import get_repos
+from . import drafts, export, feeds, images, prerender, live, ranking, recommendations, revisions, stats
 from django.contrib.auth.hashers import make_password, check_password
 from django.conf import settings
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
+from .google_tokens import verify_google_token
 from django.views.decorators.csrf import ensure_csrf_cookie
-from rest_framework.decorators import api_view, authentication_classes, permission_classes
-import time
-from django.views.decorators.csrf import csrf_exempt
+from rest_framework.decorators import api_view, permission_classes
+import mimetypes
+import logging
 
 
 
@@ -22,99 +28,424 @@ SUPABASE_URL = settings.SUPABASE_URL
 SUPABASE_KEY = settings.SUPABASE_KEY
 SUPABASE_BUCKET = settings.SUPABASE_BUCKET
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+logger = logging.getLogger(__name__)
+# Heartbeat-volume events, sampled at LOG_READS_SAMPLE_RATE
+read_logger = SampledLogger(logging.getLogger("blog.reads"), settings.LOG_READS_SAMPLE_RATE)
 
+repos = get_repos()
 
+
+@compression_exempt
+@frontend_token_exempt
 @ensure_csrf_cookie
 def get_csrf_token(request):
     return JsonResponse({'message': 'CSRF cookie set'})
 
 
-@require_frontend_token
+@frontend_token_exempt
+def metrics(request):
+    if not settings.METRICS_ENABLED or request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return JsonResponse({'error': 'Not found'}, status=404)
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4')
+
+
+@frontend_token_exempt
+def article_image(request, name):
+    """
+    Bytes of a published article's image blob. The name is the content hash, so
+    browsers and CDNs may keep the response forever.
+    """
+    if request.method not in ('GET', 'HEAD') or not images.BLOB_NAME_RE.match(name):
+        return JsonResponse({'error': 'Not found'}, status=404)
+    path = f"{images.BLOB_PREFIX}/{name}"
+    etag = f'"{name.split(".")[0]}"'
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponse(status=304)
+    else:
+        try:
+            if not images.is_published_blob(path):
+                return JsonResponse({'error': 'Not found'}, status=404)
+            data = images.photo_bucket().download(path)
+        except Exception as e:
+            logger.warning("Serving image %s failed: %s", path, e)
+            return JsonResponse({'error': 'Not found'}, status=404)
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        response = HttpResponse(data, content_type=content_type)
+    response['ETag'] = etag
+    response['Cache-Control'] = images.IMMUTABLE_CACHE_CONTROL
+    return response
+
+
+def _feed_response(request, name, content_type):
+    """A stored document from blog.feeds; 304 when the client has its ETag."""
+    if request.method not in ('GET', 'HEAD'):
+        return JsonResponse({'error': 'Not found'}, status=404)
+    try:
+        document = feeds.get_document(name)
+    except DependencyUnavailable as e:
+        return unavailable(e)
+    except Exception as e:
+        logger.exception("Loading feed document %s failed", name)
+        return JsonResponse({'error': str(e)}, status=500)
+    if document is None:
+        return JsonResponse({'error': 'Not found'}, status=404)
+    etag = f'"{document["etag"]}"'
+    if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        response = HttpResponse(status=304)
+    else:
+        response = HttpResponse(document['body'], content_type=f'{content_type}; charset=utf-8')
+    response['ETag'] = etag
+    response['Cache-Control'] = f'public, max-age={settings.FEEDS_CACHE_SECONDS}'
+    return response
+
+
+@frontend_token_exempt
+def rss_feed(request):
+    return _feed_response(request, feeds.RSS, 'application/rss+xml')
+
+
+@frontend_token_exempt
+def atom_feed(request):
+    return _feed_response(request, feeds.ATOM, 'application/atom+xml')
+
+
+@frontend_token_exempt
+def sitemap_index(request):
+    return _feed_response(request, feeds.SITEMAP_INDEX, 'application/xml')
+
+
+@frontend_token_exempt
+def sitemap_shard(request, shard):
+    return _feed_response(request, feeds.shard_name(shard), 'application/xml')
+
+
 @api_view(['GET'])
 def get_articles(request):
     try:
-        # This will raise an exception if Supabase fails
-        response = supabase.table('articles').select('*').eq('status', 'published').execute()
+        # This will raise an exception if the backend fails
+        articles = repos.articles.list_published()
+        return JsonResponse(articles, safe=False)
+    except DependencyUnavailable as e:
+        return unavailable(e)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
 
-        for res in range(len(response.data)):
-            user = get_user(response.data[res]['author_id'])
-            response.data[res]['author_first_name'] = user['first_name']
-            response.data[res]['author_last_name'] = user['last_name']
 
-        return JsonResponse(response.data, safe=False)
+@api_view(['GET'])
+def trending_articles(request):
+    """Precomputed leaderboard: ?board=trending|most_read_week|deeply_read&limit=N"""
+    board = request.GET.get('board', ranking.TRENDING)
+    if board not in ranking.BOARDS:
+        return JsonResponse({'error': f'board must be one of {list(ranking.BOARDS)}'}, status=400)
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), settings.RANKING_TOP_N)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer'}, status=400)
+
+    try:
+        leaderboard = ranking.get_leaderboard(board)
+    except DependencyUnavailable as e:
+        return unavailable(e)
     except Exception as e:
+        logger.exception("Loading leaderboard %s failed", board)
         return JsonResponse({'error': str(e)}, status=500)
 
+    response = JsonResponse({
+        'board': board,
+        'computed_at': leaderboard['computed_at'],
+        'articles': leaderboard['entries'][:limit],
+    })
+    response['Cache-Control'] = f'max-age={settings.RANKING_CACHE_SECONDS}'
+    return response
+
+
+def _limit(request, default=10, maximum=50):
+    return min(max(int(request.GET.get('limit', default)), 1), maximum)
+
 
-@require_frontend_token
 @api_view(['GET'])
-def user_articles(request):
+def related_articles(request, article_id):
+    """"Read next" for an article, straight from the precomputed index."""
+    try:
+        limit = _limit(request)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer'}, status=400)
     try:
-        # This will raise an exception if Supabase fails
-        response = supabase.table('articles').select('*').eq('author_id', request.session['id']).execute()
+        index = recommendations.get_index()
+        articles = index.related(article_id, limit) if index else []
+    except Exception:
+        # A missing or unreadable index only costs the "read next" strip.
+        logger.exception("related_articles failed")
+        articles = []
+    return JsonResponse({'articles': articles})
 
-        for res in range(len(response.data)):
-            user = get_user(response.data[res]['author_id'])
-            response.data[res]['author_first_name'] = user['first_name']
-            response.data[res]['author_last_name'] = user['last_name']
 
-        return JsonResponse(response.data, safe=False)
+@session_login_required
+@api_view(['GET'])
+def recommended_articles(request):
+    """Personal "read next" from the reader's history; trending for readers without one."""
+    try:
+        limit = _limit(request)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer'}, status=400)
+    try:
+        index = recommendations.get_index()
+        history = repos.reads.history_for_user(request.principal.id, settings.RECOMMENDATIONS_HISTORY)
+        articles = index.for_history(history, limit) if index and history else []
+        if not articles:
+            read = {entry['article_id'] for entry in history}
+            articles = [entry for entry in ranking.get_leaderboard(ranking.TRENDING)['entries']
+                        if entry['id'] not in read][:limit]
+        return JsonResponse({'articles': articles})
     except Exception as e:
+        logger.exception("recommended_articles failed")
         return JsonResponse({'error': str(e)}, status=500)
 
-@require_frontend_token
+
+@admin_required
 @api_view(['GET'])
-def get_article(request, article_id):
+def export_table(request, table):
+    """
+    Stream a table as NDJSON or CSV: ?format=ndjson|csv&since=<ISO updated_at>&after_id=<id>&gzip=1
+    Rows come in id order, so an interrupted download resumes with after_id = last id received.
+    """
+    fmt = request.GET.get('format', 'ndjson')
+    if table not in export.EXPORT_TABLES or fmt not in export.FORMATS:
+        return JsonResponse({'error': f'table must be one of {list(export.EXPORT_TABLES)}, '
+                                      f'format one of {list(export.FORMATS)}'}, status=400)
     try:
-        response = supabase.table('articles').select('*').eq('id', article_id).execute()
-        if not response.data:
-            return JsonResponse({'error': 'Article not found'}, status=404)
+        after_id = int(request.GET.get('after_id', 0))
+        since = request.GET.get('since')
+        since = datetime.fromisoformat(since.replace('Z', '+00:00')) if since else None
+    except ValueError as e:
+        return JsonResponse({'error': f'Invalid after_id/since: {e}'}, status=400)
+
+    chunks = export.encode_pages(export.export_pages(table, since, after_id), fmt, header=after_id == 0)
+    filename = f"{table}.{fmt}"
+    content_type = 'application/x-ndjson' if fmt == 'ndjson' else 'text/csv'
+    if request.GET.get('gzip') == '1':
+        chunks = export.gzip_chunks(chunks)
+        filename += '.gz'
+        content_type = 'application/gzip'
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    logger.info("export started", extra={"table": table, "format": fmt, "after_id": after_id,
+                                         "since": since.isoformat() if since else None, "admin_id": request.principal.id})
+    return response
+
+
+MODERATION_STATUSES = ["review", "pending_review", "published", "rejected", "draft"]
+# What the editor's "submit for review" sets; the queue approve/reject act on.
+QUEUE_STATUSES = ["review", "pending_review"]
+MODERATION_ACTIONS = {"approve": "published", "reject": "rejected"}
+MODERATION_BULK_MAX = 200
+
+
+@admin_required
+@api_view(['GET'])
+def moderation_articles(request):
+    """Article summaries in one status, oldest first: ?status=review&after=<last id seen>&limit=N"""
+    status_filter = request.GET.get('status', 'review')
+    if status_filter not in MODERATION_STATUSES:
+        return JsonResponse({'error': f'status must be one of {MODERATION_STATUSES}'}, status=400)
+    try:
+        limit = _limit(request, default=50, maximum=200)
+        after = int(request.GET.get('after', 0))
+    except ValueError:
+        return JsonResponse({'error': 'after and limit must be integers'}, status=400)
+    try:
+        articles = repos.articles.moderation_page(status_filter, after, limit)
+    except DependencyUnavailable as e:
+        return unavailable(e)
+    except Exception as e:
+        logger.exception("moderation_articles failed")
+        return JsonResponse({'error': str(e)}, status=500)
+    return JsonResponse({
+        'status': status_filter,
+        'articles': articles,
+        'next': articles[-1]['id'] if len(articles) == limit else None,
+    })
 
-        user = get_user(response.data[0]['author_id'])
-        response.data[0]['author_first_name'] = user['first_name']
-        response.data[0]['author_last_name'] = user['last_name']
 
-        return JsonResponse(response.data[0])
+@admin_required
+@api_view(['GET'])
+def moderation_counts(request):
+    """Number of articles in each status."""
+    try:
+        counts = repos.articles.status_counts()
+    except DependencyUnavailable as e:
+        return unavailable(e)
     except Exception as e:
+        logger.exception("moderation_counts failed")
         return JsonResponse({'error': str(e)}, status=500)
+    return JsonResponse({'counts': dict({name: 0 for name in MODERATION_STATUSES},
+                                        **{name: count for name, count in counts.items() if name})})
+
 
+@admin_required
+@api_view(['POST'])
+def moderate_articles(request):
+    """Approve or reject articles waiting for review: {"action": "approve"|"reject", "article_ids": [...]}"""
+    action = request.data.get('action')
+    if action not in MODERATION_ACTIONS:
+        return JsonResponse({'error': f'action must be one of {list(MODERATION_ACTIONS)}'}, status=400)
+    try:
+        article_ids = sorted({int(article_id) for article_id in request.data.get('article_ids') or []})
+    except (TypeError, ValueError):
+        return JsonResponse({'error': 'article_ids must be a list of integers'}, status=400)
+    if not 0 < len(article_ids) <= MODERATION_BULK_MAX:
+        return JsonResponse({'error': f'Send between 1 and {MODERATION_BULK_MAX} article_ids'}, status=400)
 
-@require_frontend_token
+    try:
+        updated = repos.articles.set_status_many(article_ids, QUEUE_STATUSES, MODERATION_ACTIONS[action])
+    except DependencyUnavailable as e:
+        return unavailable(e)
+    except Exception as e:
+        logger.exception("moderate_articles failed")
+        return JsonResponse({'error': str(e)}, status=500)
+
+    if action == 'approve' and updated:
+        try:
+            feeds.articles_changed(updated)
+        except Exception:
+            logger.exception("Updating feeds failed for %s approved articles", len(updated))
+        try:
+            prerender.articles_changed([article['id'] for article in updated])
+        except Exception:
+            logger.exception("Pre-rendering %s approved articles failed", len(updated))
+
+    moderated = sorted(article['id'] for article in updated)
+    logger.info("articles moderated", extra={"action": action, "articles": len(moderated),
+                                             "admin_id": request.principal.id})
+    return JsonResponse({
+        'success': True,
+        'status': MODERATION_ACTIONS[action],
+        'updated': moderated,
+        # Missing or no longer waiting for review (e.g. another admin got there first).
+        'skipped': sorted(set(article_ids) - set(moderated)),
+    })
+
+
+@session_login_required
 @api_view(['GET'])
-def get_comments(request, article_id):
+def user_articles(request):
+    try:
+        # This will raise an exception if the backend fails
+        articles = repos.articles.list_by_author(request.principal.id)
+        return JsonResponse(articles, safe=False)
+    except DependencyUnavailable as e:
+        return unavailable(e)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+@session_login_required
+@api_view(['GET'])
+def author_stats(request):
+    """
+    The signed-in author's articles with reads, completion/deep-read rates,
+    comments and average active time, newest first: ?before=<last id seen>&limit=N
+    """
+    try:
+        limit = _limit(request, default=50, maximum=200)
+        before = int(request.GET['before']) if request.GET.get('before') else None
+    except ValueError:
+        return JsonResponse({'error': 'before and limit must be integers'}, status=400)
     try:
-        # First get all comments for the article
-        comments_response = supabase.table('comments').select('*').eq('article_id', article_id).execute()
+        # Read from the article_stats rollups in one call, never from the reads themselves.
+        rollups = repos.articles.author_stats(request.principal.id, limit, before)
+    except DependencyUnavailable as e:
+        return unavailable(e)
+    except Exception as e:
+        logger.exception("author_stats failed")
+        return JsonResponse({'error': str(e)}, status=500)
+    articles = [stats.summary(article) for article in rollups['articles']]
+    return JsonResponse({
+        'totals': stats.summary(rollups['totals']),
+        'articles': articles,
+        'next': articles[-1]['id'] if len(articles) == limit else None,
+    })
+
+@api_view(['GET'])
+def get_article(request, article_id):
+    static = prerender.open_file(article_id, 'json')
+    if static is not None:
+        return FileResponse(static, content_type='application/json')
+    try:
+        article = repos.articles.get(article_id)
+        if not article:
+            return JsonResponse({'error': 'Article not found'}, status=404)
+
+        # Same bytes as the pre-rendered file.
+        return HttpResponse(prerender.render_json(article), content_type='application/json')
+    except DependencyUnavailable as e:
+        return unavailable(e)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
 
-        if not comments_response.data:
-            return JsonResponse({'comments': [], 'count': 0}, status=200)
+ARTICLE_PAGE_CSP = ("default-src 'none'; img-src https: http:; style-src 'unsafe-inline'; "
+                    "base-uri 'none'; form-action 'none'; frame-ancestors 'none'; sandbox")
 
-        # Get all unique user_ids from comments
-        user_ids = list({comment['user_id'] for comment in comments_response.data if comment['user_id']})
 
-        # Fetch usernames in a single query if there are any user_ids
-        users = {}
-        if user_ids:
-            users_response = supabase.table('users').select('id,username').in_('id', user_ids).execute()
-            users = {user['id']: user['username'] for user in users_response.data}
+@frontend_token_exempt
+def article_page(request, article_id):
+    """Pre-rendered HTML of a published article, for crawlers and link previews."""
+    page = prerender.open_file(article_id, 'html') if request.method in ('GET', 'HEAD') else None
+    if page is None:
+        return JsonResponse({'error': 'Not found'}, status=404)
+    response = FileResponse(page, content_type='text/html; charset=utf-8')
+    response['Cache-Control'] = f'public, max-age={settings.FEEDS_CACHE_SECONDS}'
+    # Second line behind blog.sanitize: no scripts, and a sandboxed (opaque) origin without our cookies.
+    response['Content-Security-Policy'] = ARTICLE_PAGE_CSP
+    return response
 
-        # Enhance comments with usernames
-        enhanced_comments = []
-        for comment in comments_response.data:
-            enhanced_comment = dict(comment)  # Create a copy
-            enhanced_comment['username'] = users.get(comment['user_id']) if comment['user_id'] else None
-            enhanced_comments.append(enhanced_comment)
+
+@api_view(['GET'])
+def get_comments(request, article_id):
+    try:
+        # Comments come back with the commenter's username attached
+        comments = repos.comments.list_for_article(article_id)
 
         return JsonResponse({
-            'comments': enhanced_comments,
-            'count': len(enhanced_comments)
+            'comments': comments,
+            'count': len(comments)
         })
 
+    except DependencyUnavailable as e:
+        return unavailable(e)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
 
+@frontend_token_exempt
+@compression_exempt
+def comment_stream(request, article_id):
+    """
+    Server-Sent Events with the comments posted to an article from now on (blog.live).
+    EventSource resends Last-Event-ID on reconnect; ?last_event_id= covers a page that
+    already loaded the list.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+    broker = live.get_broker()
+    if getattr(broker, 'subscriber_count', 0) >= settings.LIVE_MAX_SUBSCRIBERS:
+        response = JsonResponse({'error': 'Too many live connections'}, status=503)
+        response['Retry-After'] = '30'
+        return response
+
+    topic = live.comments_topic(article_id)
+    last_event_id = live.parse_last_event_id(
+        request.headers.get('Last-Event-ID') or request.GET.get('last_event_id'))
+    if isinstance(request, ASGIRequest):
+        frames = live.stream_async(topic, last_event_id, broker)
+    else:
+        frames = live.stream_sync(topic, last_event_id, broker)
+    response = StreamingHttpResponse(frames, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 
 
 
@@ -122,7 +453,6 @@ def get_comments(request, article_id):
 
 
 
-@require_frontend_token
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def check_user(request):
@@ -135,7 +465,6 @@ def check_user(request):
         return JsonResponse({'error': str(e)}, status=500)
 
 
-@require_frontend_token
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def check_email(request):
@@ -149,23 +478,12 @@ def check_email(request):
 
 
 def user_unique(username):
-    user = supabase.table('users').select('username').eq('username', username.lower()).execute()
-
-    if not user.data:
-        return True
-    else:
-        return False
+    return not repos.users.username_exists(username)
 
 def email_unique(email):
-    email = supabase.table('users').select('username').eq('email', email.lower()).execute()
-
-    if not email.data:
-        return True
-    else:
-        return False
+    return not repos.users.email_exists(email)
 
 
-@require_frontend_token
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def signup(request):
@@ -197,8 +515,7 @@ def signup(request):
             "bio": "Learner at Cognara"
         }
 
-        # Insert into Supabase
-        response = supabase.table("users").insert(data).execute()
+        repos.users.create(data)
 
         return JsonResponse({'message': 'Signup successful'}, status=200)
 
@@ -208,71 +525,36 @@ def signup(request):
 
 def emailtoID(email):
     try:
-        response = supabase.table('users').select('id').eq('email', email.lower()).execute()
-        user_data = response.data
-
-        if not user_data:
-            return False
-
-        id = user_data[0]['id']
-        return id
-    except:
+        return repos.users.id_for_email(email) or False
+    except DependencyUnavailable:
+        raise
+    except Exception:
         return None
 
 
-@require_frontend_token
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def request_code(request):
     try:
-        print(request)
         email = request.data.get('email')
 
         id = emailtoID(email)
         if not id:
             return JsonResponse({'error': 'User not found'}, status=404)
 
-        code, _ = find_code(id)
-        if code != -1:
-            response = supabase.table("authtoken_token").delete().eq("user_id", id).execute()
-
-        code = generate_code()
+        # Re-requesting within the 10 minute window resends the live code
+        code = get_code_store().issue(id, generate_code())
         if send_confirmation(code, email):
-            data = {
-                "user_id": id,
-                "key": code,
-                "created": datetime.now(timezone.utc).isoformat()
-            }
-
-            response = supabase.table("authtoken_token").insert(data).execute()
             return JsonResponse({'message': 'Code was sent successfully'}, status=200)
         else:
             return JsonResponse({'error': "Failed to send Email"}, status=500)
 
+    except DependencyUnavailable as e:
+        return unavailable(e)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
 
-def find_code(id):
-    try:
-        response = supabase.table('authtoken_token').select('key, created').eq('user_id', id).execute()
-        data = response.data
-
-        if not data:
-            return -1, 0
-
-        code = data[0]['key']
-        created = data[0]['created']
-
-        created = datetime.fromisoformat(created)
-        difference = (datetime.now(timezone.utc) - created).total_seconds() / 60.0
-        return code, difference
-    except Exception as e:
-        print(e)
-        return -1, -1
-
-
-@require_frontend_token
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def verify_code(request):
@@ -283,20 +565,26 @@ def verify_code(request):
         if not id:
             return JsonResponse({'error': 'User not found'}, status=400)
 
-        code, diff = find_code(int(id))
-        if diff > 10:
+        result = get_code_store().verify(int(id), str(recieved_code).strip())
+        if result == EXPIRED:
             return JsonResponse({'error': 'The Code has Expired'}, status=200)
-        if int(recieved_code) == int(code):
-            response = supabase.table("users").update({"email_verified": "True"}).eq("id", id).execute()
+        if result == LOCKED:
+            # Locked until the code expires; requesting again re-sends the same code.
+            response = JsonResponse({'error': 'Too many attempts, try again once the code expires'}, status=429)
+            response['Retry-After'] = str(CODE_TTL_SECONDS)
+            return response
+        if result == VERIFIED:
+            repos.users.update(id, {"email_verified": "True"})
             return JsonResponse({'status': '1'}, status=200)
         else:
-            return JsonResponse({'status': '0', "recieved_code": recieved_code, "code":code}, status=200)
+            return JsonResponse({'status': '0'}, status=200)
 
+    except DependencyUnavailable as e:
+        return unavailable(e)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
 
-@require_frontend_token
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def google_auth(request):
@@ -305,47 +593,24 @@ def google_auth(request):
         return Response({'detail': 'Missing credential'}, status=status.HTTP_400_BAD_REQUEST)
 
     try:
-        # Verify the token
-        idinfo = id_token.verify_oauth2_token(credential, google_requests.Request(), settings.GOOGLE_CLIENT_ID)
+        # Signature checked locally against Google's cached keys (blog.google_tokens)
+        idinfo = verify_google_token(credential)
 
         # Get user info
         email = idinfo['email']
         first_name = idinfo.get('given_name', '')
         last_name = idinfo.get('family_name', '')
-        picture = idinfo.get('picture', '')
-
-        # Check if user exists
-        if email_unique(email):
-            # Build user data
-            data = {
-                "email": email,
-                "first_name": first_name,
-                "last_name": last_name,
-                "bio": "Learner at Cognara",
-                "email_verified": "True",
-                "auth_provider": "Google",
-            }
-
-            # Insert into Supabase
-            response = supabase.table("users").insert(data).execute()
-
-            return JsonResponse({'status': 'success', "is_new": '1', "email": email}, status=200)
-        else:
-            data = {
-                "first_name": first_name,
-                "last_name": last_name,
-                "email_verified": "True",
-                "auth_provider": "Goolge",
-            }
-
-            response = supabase.table("users").update(data).eq("email", email).execute()
-            return JsonResponse({'status': 'success', "is_new": '0', "email": email}, 200)
-    except ValueError as e:
+
+        # Creates the account on first sign-in, refreshes the name otherwise
+        user = repos.users.upsert_google(email, first_name, last_name)
+        return JsonResponse({'status': 'success', "is_new": '1' if user['is_new'] else '0', "email": email}, status=200)
+    except DependencyUnavailable as e:
+        return unavailable(e)
+    except (ValueError, KeyError) as e:
         # Invalid token
         return Response({'detail': 'Invalid token'}, status=400)
 
 
-@require_frontend_token
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def login(request):
@@ -353,20 +618,19 @@ def login(request):
         email = request.data.get('email').lower()
         password = request.data.get('password_hash')
 
-        response = supabase.table('users').select('*').eq('email', email).execute()
-        user_data = response.data
-        if not user_data:
+        user = repos.users.get_by_email(email)
+        if not user:
             return JsonResponse({'status': '0'}, status=200)
-        hashed_password = user_data[0]['password_hash']
+        hashed_password = user['password_hash']
         if check_password(password, hashed_password):
             
-            request.session['id'] = user_data[0]['id']
-            request.session['email'] = user_data[0]['email']
-            request.session['username'] = user_data[0]['username']
-            request.session['first_name'] = user_data[0]['first_name']
-            request.session['last_name'] = user_data[0]['last_name']
-            request.session['bio'] = user_data[0]['bio']
-            request.session['email_verified'] = user_data[0]['email_verified']
+            request.session['id'] = user['id']
+            request.session['email'] = user['email']
+            request.session['username'] = user['username']
+            request.session['first_name'] = user['first_name']
+            request.session['last_name'] = user['last_name']
+            request.session['bio'] = user['bio']
+            request.session['email_verified'] = user['email_verified']
             return JsonResponse({'status': '1'}, status=200)
         else:
             return JsonResponse({'status': '0'}, status=200)
@@ -374,7 +638,6 @@ def login(request):
         return JsonResponse({'error': str(e)}, status=500)
 
 
-@require_frontend_token
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def submit(request):
@@ -384,52 +647,190 @@ def submit(request):
         content = request.data.get('content')
         status = request.data.get('status')  # This should be a string
 
-        if user_unique(request.session.get('username')):
+        if user_unique(request.principal.username):
             return JsonResponse({'error': 'User not found'}, status=400)
 
         data = {
             "title": title,
             "content": content,
-            "author_id": request.session.get('id'),
+            "author_id": request.principal.id,
             "status": status,
         }
 
-        if article_id:
-            response = supabase.table('articles').select('*').eq('id', article_id).execute()
-            if not response.data:
-                response = supabase.table('articles').insert(data).execute()
-                message = 'Article created successfully'
-            else:
-                response = supabase.table('articles').update(data).eq('id', article_id).execute()
-                message = 'Article updated successfully'
+        previous = repos.articles.get_meta(article_id) if article_id else None
+        if previous:
+            article = repos.articles.update(article_id, data)
+            message = 'Article updated successfully'
         else:
-            response = supabase.table('articles').insert(data).execute()
+            article = repos.articles.create(data)
             message = 'Article created successfully'
 
 
-        if not response.data:
+        if not article:
             return JsonResponse({'error': 'Database operation failed'}, status=500)
 
-            
+        drafts.record_save(article)
+
+        try:
+            recommendations.article_changed(article)
+        except Exception:
+            logger.exception("Updating recommendation index failed for article %s", article['id'])
+
+        _publication_changed(article, previous)
 
         return JsonResponse({
             'success': True,
             'message': message,
-            'article_id': response.data[0]['id'],
-            'data': response.data[0]
+            'article_id': article['id'],
+            'data': article
         }, status=201)
         
     except Exception as e:
-        print(e)
+        logger.exception("submit failed")
         return JsonResponse({'error': str(e)}, status=500)
 
 
+@session_login_required
+@api_view(['POST'])
+def autosave(request):
+    """
+    Save a draft as a patch against the version the editor has (see blog.drafts).
+    Without article_id the draft is created from `title` and `content`.
+    """
+    try:
+        article_id = request.data.get('article_id')
+        if not article_id:
+            draft = drafts.create_draft(request.principal.id, request.data.get('title'), request.data.get('content'))
+            return JsonResponse({'success': True, 'article_id': draft['id'], 'version': draft['version']}, status=201)
+
+        try:
+            article_id = int(article_id)
+            base_version = int(request.data.get('base_version'))
+        except (TypeError, ValueError):
+            return JsonResponse({'error': 'article_id and base_version must be integers'}, status=400)
+
+        version = drafts.save_draft(
+            article_id,
+            request.principal.id,
+            base_version,
+            request.data.get('ops', []),
+            title=request.data.get('title'),
+            length=request.data.get('length'),
+        )
+        if prerender.exists(article_id):
+            # Autosave on a published article changes what readers see.
+            _prerender(article_id)
+        return JsonResponse({'success': True, 'article_id': article_id, 'version': version})
+
+    except drafts.VersionConflict as e:
+        return JsonResponse({'error': 'Article changed since base_version', 'version': e.version}, status=409)
+    except drafts.PatchError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except LookupError:
+        return JsonResponse({'error': 'Article not found'}, status=404)
+    except DependencyUnavailable as e:
+        return unavailable(e)
+    except Exception as e:
+        logger.exception("autosave failed")
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+def _publication_changed(article, previous=None):
+    """Feeds, sitemap and pre-rendered files only change when the article is, or was, published."""
+    if article.get('status') != 'published' and not (previous and previous.get('status') == 'published'):
+        return
+    try:
+        feeds.article_changed(article)
+    except Exception:
+        logger.exception("Updating feeds failed for article %s", article['id'])
+    _prerender(article['id'])
+
+
+def _prerender(article_id):
+    try:
+        prerender.article_changed(article_id)
+    except Exception:
+        logger.exception("Pre-rendering article %s failed", article_id)
+
+
+def _own_article(request, article_id):
+    """None if the signed-in user wrote the article, else the error response."""
+    author_id = repos.articles.get_author_id(article_id)
+    if author_id is None or author_id != request.principal.id:
+        return JsonResponse({'error': 'Article not found'}, status=404)
+    return None
+
+
+@session_login_required
+@api_view(['GET'])
+def article_revisions(request, article_id):
+    """Saved versions of the author's article, newest first: ?before=<version>&limit=N"""
+    try:
+        limit = _limit(request, default=50, maximum=200)
+        before = request.GET.get('before')
+        before = int(before) if before else None
+    except ValueError:
+        return JsonResponse({'error': 'before and limit must be integers'}, status=400)
+    try:
+        denied = _own_article(request, article_id)
+        if denied:
+            return denied
+        return JsonResponse({'revisions': repos.revisions.list(article_id, before, limit)})
+    except DependencyUnavailable as e:
+        return unavailable(e)
+    except Exception as e:
+        logger.exception("article_revisions failed")
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@session_login_required
+@api_view(['GET'])
+def article_revision(request, article_id, version):
+    """Title and content of one saved version."""
+    try:
+        denied = _own_article(request, article_id)
+        if denied:
+            return denied
+        revision = revisions.content_at(article_id, version)
+        if revision is None:
+            return JsonResponse({'error': 'Revision not found'}, status=404)
+        return JsonResponse(revision)
+    except DependencyUnavailable as e:
+        return unavailable(e)
+    except Exception as e:
+        logger.exception("article_revision failed")
+        return JsonResponse({'error': str(e)}, status=500)
+
 
+@session_login_required
+@api_view(['POST'])
+def restore_revision(request, article_id, version):
+    """Save an old version's title and content as the article's newest version."""
+    try:
+        denied = _own_article(request, article_id)
+        if denied:
+            return denied
+        revision = revisions.content_at(article_id, version)
+        if revision is None:
+            return JsonResponse({'error': 'Revision not found'}, status=404)
+        article = repos.articles.update(article_id, {'title': revision['title'], 'content': revision['content']})
+        if not article:
+            return JsonResponse({'error': 'Article not found'}, status=404)
+        drafts.record_save(article)
+        _publication_changed(article)
+        return JsonResponse({'success': True, 'article_id': article_id, 'restored': version,
+                             'version': article['version']})
+    except DependencyUnavailable as e:
+        return unavailable(e)
+    except Exception as e:
+        logger.exception("restore_revision failed")
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+
+@session_login_required
 @api_view(['POST'])
-@authentication_classes([])
 @permission_classes([AllowAny])
-@require_session_login
-@require_frontend_token
 def logout(request):
     try:
         request.session.flush()
@@ -438,25 +839,23 @@ def logout(request):
         return JsonResponse({'error': str(e)}, status=500)
 
 
-@require_frontend_token
 @api_view(['GET'])
 def auth_status(request):
-    if 'id' in request.session:
-        print("True")
+    principal = request.principal
+    if principal.is_authenticated:
         return Response({
             'authenticated': True,
-            'id': request.session['id'],
-            'email': request.session['email'],
-            'first_name': request.session['first_name'],
-            'last_name' : request.session['last_name'],
-            'bio': request.session['bio'],
-            'email_verified': request.session['email_verified']
+            'id': principal.id,
+            'email': principal.email,
+            'first_name': principal.first_name,
+            'last_name' : principal.last_name,
+            'bio': principal.bio,
+            'email_verified': principal.email_verified
         })
     else:
         return Response({'authenticated': False})
 
 
-@require_frontend_token
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def forgetpass(request):
@@ -465,8 +864,7 @@ def forgetpass(request):
         email = request.data.get('email').lower()
 
         data = {"password_hash": make_password(password)}
-        response = supabase.table('users').update(data).eq('email', email).execute()
-        user_data = response.data
+        user_data = repos.users.update_by_email(email, data)
         if not user_data:
             return JsonResponse({'status': '0'}, status=200)
         return JsonResponse({'status': '1'}, status=200)
@@ -475,7 +873,6 @@ def forgetpass(request):
         return JsonResponse({'error': str(e)}, status=500)
 
 
-@require_frontend_token
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def newsletter_subscription(request):
@@ -492,22 +889,19 @@ def newsletter_subscription(request):
             "is_active": "True",
             "source": "website"
                 }
-        response = supabase.table('newsletter_subscribers').select("*").eq('email', email).execute()
-        if response.data:
+        if repos.subscribers.exists(email):
             return JsonResponse({'status': 'already registered'}, status=200)
 
-        response = supabase.table('newsletter_subscribers').insert(data).execute()
-        print(response.data)
+        repos.subscribers.create(data)
         return JsonResponse({'status': 'success'}, status=200)
 
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
 
-@require_frontend_token
+@session_login_required
 @api_view(['POST'])
 @permission_classes([AllowAny])
-@require_session_login
 def upload_article_photo(request):
     try:
         article_id = request.data.get("article_id")
@@ -522,24 +916,11 @@ def upload_article_photo(request):
             return JsonResponse({'error': 'Invalid article_id'}, status=400)
 
         # Check if article exists
-        response = supabase.table("articles").select("id").eq("id", article_id).execute()
-        if not response.data:
+        if not repos.articles.exists(article_id):
             return JsonResponse({'error': 'Article not found'}, status=404)
 
-        # Upload image to Supabase Storage
-        filename = f"{int(time.time())}_{file.name}"
-        storage_path = upload_article_image(article_id, file, filename)
-
-        data = {
-            "article_id": article_id,
-            "path": storage_path,
-        }
-
-        # Insert image record into article_photos table
-        insert_response = supabase.table("article_photos").insert(data).execute()
-
-        # Get public URL
-        public_url = supabase.storage.from_("article-photos").get_public_url(storage_path).get("publicURL")
+        # Stored once per distinct content; re-uploads only add the reference
+        images.store_image(article_id, file.read(), file.name, file.content_type)
 
         return JsonResponse({'status': '1'}, status=200)
 
@@ -547,7 +928,6 @@ def upload_article_photo(request):
         return JsonResponse({'error': str(e)}, status=500)
 
 
-@require_frontend_token
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def get_article_images(request):
@@ -562,38 +942,23 @@ def get_article_images(request):
         except ValueError:
             return JsonResponse({"error": "Invalid article_id"}, status=400)
 
-        # ✅ Get all photo paths for the article
-        response = supabase.table("article_photos").select("path").eq("article_id", article_id).execute()
-
-        images = []
-        for item in response.data:
-            path = item["path"]
-
-            signed_url_data = supabase.storage.from_("article-photos").create_signed_url(path, 3600)  # 3600 seconds = 1 hour
-            signed_url = signed_url_data.get("signedURL")
+        # Published blobs get stable immutable URLs, the rest signed URLs reused per window
+        paths = repos.photos.paths_for_article(article_id)
+        urls = images.delivery_urls(article_id, paths, request) if paths else []
 
-            images.append({
-                "path": path,
-                "url": signed_url
-            })
-
-        return JsonResponse({"images": images}, status=200)
+        return JsonResponse({"images": urls}, status=200)
 
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
 
 
-@require_frontend_token
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def post_comment(request):
-    print("POST COMMENT VIEW CALLED")
     try:
         comment = request.data.get('comment')
         article_id = request.data.get('article_id')
-        user_id = request.session.get('id')
-        
-        print(f"Comment: {comment}, Article ID: {article_id}, User ID: {user_id}")
+        user_id = request.principal.id
         
         if not comment or not article_id:
             return Response({'error': 'Comment and Article ID are required'}, status=status.HTTP_400_BAD_REQUEST)
@@ -608,16 +973,21 @@ def post_comment(request):
             'article_id': article_id
         }
 
-        response = supabase.table('comments').insert(data).execute()
-        
+        created = repos.comments.create(data)
+        if created:
+            created['username'] = request.principal.username
+            try:
+                live.publish_comment(created)
+            except Exception:
+                logger.exception("Publishing comment %s failed", created.get('id'))
+
         return Response({'status': 'success'}, status=status.HTTP_201_CREATED)
 
     except Exception as e:
-        print(f"Error in post_comment: {e}")
+        logger.exception("post_comment failed")
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-@require_frontend_token
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def upload_article_image(request, article_id):
@@ -630,71 +1000,27 @@ def upload_article_image(request, article_id):
         if not file_obj.name:
             return Response({"error": "File has no name"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # First, check if there are existing images for this article
-        try:
-            existing_images_response = supabase.table("article_photos").select("path").eq("article_id", article_id).execute()
-            existing_images = existing_images_response.data
-            
-            # Delete existing images from storage and database
-            if existing_images:
-                print(f"Found {len(existing_images)} existing images for article {article_id}")
-                
-                # Delete from storage
-                for image in existing_images:
-                    try:
-                        delete_res = supabase.storage.from_('article-photos').remove([image['path']])
-                        print(f"Deleted image from storage: {image['path']}")
-                    except Exception as delete_error:
-                        print(f"Warning: Failed to delete image from storage {image['path']}: {delete_error}")
-                        # Continue even if storage deletion fails
-                
-                # Delete from database
-                try:
-                    delete_db_res = supabase.table("article_photos").delete().eq("article_id", article_id).execute()
-                    print(f"Deleted {len(existing_images)} records from article_photos table")
-                except Exception as db_delete_error:
-                    print(f"Warning: Failed to delete from database: {db_delete_error}")
-                    # Continue even if database deletion fails
-                    
-        except Exception as cleanup_error:
-            print(f"Warning: Error during cleanup: {cleanup_error}")
-            # Continue with upload even if cleanup fails
-
-        # Now upload the new image
-        storage_path = f"{article_id}/{file_obj.name}"
-        file_content = file_obj.read()
-
-        # Upload to storage bucket - handle Supabase response properly
+        # Link the new image first, so re-uploading the same bytes finds the blob
+        # still referenced and skips the transfer
         try:
-            # This is the corrected upload call
-            res = supabase.storage.from_('article-photos').upload(
-                path=storage_path,
-                file=file_content,
-                file_options={"content-type": file_obj.content_type}
-            )
-
-            public_url = supabase.storage.from_('article-photos').get_public_url(storage_path)
-
-            # Check for errors in the Supabase response
-            if hasattr(res, 'error') and res.error:
-                raise Exception(f"Upload failed: {res.error.message}")
-                
+            stored = images.store_image(article_id, file_obj.read(), file_obj.name, file_obj.content_type)
         except Exception as upload_error:
             raise Exception(f"Supabase upload error: {str(upload_error)}")
 
-        # Insert new record into article_photos table
-        data = {
-            "article_id": article_id,
-            "path": storage_path,
-        }
+        # Then drop the article's other images (shared blobs are garbage-collected by gc_images)
+        try:
+            existing_images = images.unlink_images(article_id, keep=[stored["path"]])
+            if existing_images:
+                logger.debug("Unlinked %s existing images for article %s", len(existing_images), article_id)
+        except Exception as cleanup_error:
+            logger.warning("Error during cleanup: %s", cleanup_error)
+            existing_images = []
 
-        insert_res = supabase.table("article_photos").insert(data).execute()
-        
-        # Check for insert errors
-        if hasattr(insert_res, 'error') and insert_res.error:
-            raise Exception(f"Database insert failed: {insert_res.error}")
+        storage_path = stored["path"]
+        public_url = supabase.storage.from_('article-photos').get_public_url(storage_path)
 
-        print(f"Successfully uploaded new image for article {article_id}: {storage_path}")
+        logger.info("Stored image for article %s: %s (uploaded=%s)", article_id, storage_path, stored["uploaded"])
+        _prerender(article_id)
 
         return Response({
             "url": public_url,  # Return URL instead of path
@@ -703,31 +1029,26 @@ def upload_article_image(request, article_id):
         }, status=status.HTTP_200_OK)
     
     except Exception as e:
-        print(f"Error in upload_article_image: {e}")
+        logger.exception("upload_article_image failed")
         return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-@require_frontend_token
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def delete_article_image(request, article_id):
     try:
         # First check if the article exists
-        article_response = supabase.table("articles").select("id").eq("id", article_id).execute()
-        if not article_response.data:
+        if not repos.articles.exists(article_id):
             return Response({"error": "Article not found"}, status=status.HTTP_404_NOT_FOUND)
 
         # Get all images for this article
-        images_response = supabase.table("article_photos").select("path").eq("article_id", article_id).execute()
-        if not images_response.data:
+        paths_to_delete = repos.photos.paths_for_article(article_id)
+        if not paths_to_delete:
             return Response({"error": "No images found for this article"}, status=status.HTTP_404_NOT_FOUND)
 
-        # Delete all images from storage
-        paths_to_delete = [img['path'] for img in images_response.data]
-        delete_res = supabase.storage.from_('article-photos').remove(paths_to_delete)
-        
-        # Delete records from article_photos table
-        supabase.table("article_photos").delete().eq("article_id", article_id).execute()
+        # Drop the references; blobs no other article uses are removed by gc_images
+        images.unlink_images(article_id)
+        _prerender(article_id)
 
         return Response({
             "message": f"Deleted {len(paths_to_delete)} images successfully",
@@ -738,19 +1059,18 @@ def delete_article_image(request, article_id):
         return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-@require_frontend_token
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def change_status(request):
     try:
         article_id = request.data.get('article_id')
         status = request.data.get('status')
-        user_id = request.session.get('id')
+        user_id = request.principal.id
 
-        response = supabase.table('articles').select("*").eq('id', article_id).execute()
-        if not response.data:
+        previous = repos.articles.get_meta(article_id)
+        if previous is None:
             return JsonResponse({'status': 'Article Not Found'}, status=404)
-        if response.data[0]['author_id'] != user_id:
+        if previous['author_id'] != user_id:
             return JsonResponse({'status': 'Unauthorized'}, status=403)
 
         if status in ['published', 'rejected']:
@@ -760,10 +1080,10 @@ def change_status(request):
         update_data = {
             "status": status,
         }
-        response = supabase.table('articles').update(update_data).eq('id', article_id).execute()
-
-        if not response.data:
+        article = repos.articles.update(article_id, update_data)
+        if not article:
             return JsonResponse({'error': 'Failed to update article status'}, status=500)
+        _publication_changed(article, previous)
 
         return JsonResponse({'status': 'success', 'message': 'Article published for review'}, status=200)
 
@@ -780,20 +1100,11 @@ OPEN_SESSION_WINDOW_MIN = 180
 def find_latest_open_session(user_id, article_id):
     try:
         # Get the latest session for this user and article
-        response = (supabase.table("article_reads")
-                   .select("*")
-                   .eq("user_id", user_id)
-                   .eq("article_id", article_id)
-                   .order("created_at", desc=True)
-                   .limit(1)
-                   .execute())
-        
-        return response.data[0] if response.data else None
+        return repos.reads.latest(user_id, article_id)
     except Exception as e:
-        print(f"Error finding latest session: {e}")
+        logger.warning("Error finding latest session: %s", e)
         return None
 
-@require_frontend_token
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def log_article_read(request):
@@ -802,7 +1113,8 @@ def log_article_read(request):
 
     try:
         data = parse_request_data(request)
-        print("Parsed data:", data)
+        if read_logger.isEnabledFor(logging.DEBUG):
+            read_logger.debug("log_read payload", extra={"payload": data})
 
         user_id = data.get("user_id")
         article_id = data.get("article_id")
@@ -837,35 +1149,14 @@ def log_article_read(request):
         # -------------------------
         # 1) Update by session_id (only if not forcing new session)
         # -------------------------
+        # The merge (max depth/time, status escalation, classification) runs in
+        # one atomic write, so concurrent beacons from two tabs can't lose progress.
+        rts_hint = required_time_seconds if (isinstance(required_time_seconds, int) and required_time_seconds > 0) else None
         if session_id and not force_new_session:
-            existing = (supabase.table("article_reads")
-                        .select("id, session_id, status, scroll_depth, active_time_seconds, required_time_seconds")
-                        .eq("session_id", session_id)
-                        .limit(1).execute())
-            if existing.data:
-                row = existing.data[0]
-                db_rts = int(row.get("required_time_seconds") or 0)
-                if db_rts <= 0:
-                    db_rts = required_time_seconds if (isinstance(required_time_seconds, int) and required_time_seconds > 0) else estimate_required_time_seconds(article_id)
-                new_status, new_depth, new_time = merge_progress(row, status, scroll_depth, active_time_seconds)
-
-                upd = {
-                    "status": new_status,
-                    "scroll_depth": new_depth,
-                    "active_time_seconds": new_time,
-                    "required_time_seconds": db_rts
-                }
-
-                if new_status == "completed":
-                    classification = classify_read(new_depth, new_time, db_rts)
-                    if classification:
-                        upd["status"] = classification
-
-                resp = (supabase.table("article_reads")
-                        .update(upd)
-                        .eq("session_id", session_id)
-                        .execute())
-                return JsonResponse({"success": True, "session_id": session_id, "data": resp.data[0] if resp.data else upd})
+            updated = repos.reads.record_heartbeat(session_id, status, scroll_depth, active_time_seconds, rts_hint)
+            if updated:
+                read_logger.info("read heartbeat", extra={"session_id": session_id, "article_id": article_id, "read_status": updated["status"]})
+                return JsonResponse({"success": True, "session_id": session_id, "data": updated})
 
         # -------------------------
         # 2) Only recover recent sessions (page refresh scenario)
@@ -874,33 +1165,15 @@ def log_article_read(request):
             latest = find_latest_open_session(user_id, article_id)
             # Only recover if very recent (5 minutes) - likely a page refresh
             if latest and is_recent(latest.get("updated_at") or latest.get("created_at") or "", minutes=5):
-                db_rts = int(latest.get("required_time_seconds") or 0)
-                if db_rts <= 0:
-                    db_rts = required_time_seconds if (isinstance(required_time_seconds, int) and required_time_seconds > 0) else estimate_required_time_seconds(article_id)
-                new_status, new_depth, new_time = merge_progress(latest, status, scroll_depth, active_time_seconds)
-
-                upd = {
-                    "status": new_status,
-                    "scroll_depth": new_depth,
-                    "active_time_seconds": new_time,
-                    "required_time_seconds": db_rts
-                }
-
-                if new_status == "completed":
-                    classification = classify_read(new_depth, new_time, db_rts)
-                    if classification:
-                        upd["status"] = classification
-
-                resp = (supabase.table("article_reads")
-                        .update(upd)
-                        .eq("session_id", latest["session_id"])
-                        .execute())
-                return JsonResponse({"success": True, "session_id": latest["session_id"], "data": resp.data[0] if resp.data else upd})
+                updated = repos.reads.record_heartbeat(latest["session_id"], status, scroll_depth, active_time_seconds, rts_hint)
+                if updated:
+                    read_logger.info("read session recovered", extra={"session_id": latest["session_id"], "article_id": article_id, "read_status": updated["status"]})
+                    return JsonResponse({"success": True, "session_id": latest["session_id"], "data": updated})
 
         # -------------------------
         # 3) Create fresh session
         # -------------------------
-        rts = required_time_seconds if (isinstance(required_time_seconds, int) and required_time_seconds > 0) else estimate_required_time_seconds(article_id)
+        rts = rts_hint or estimate_required_time_seconds(article_id)
         ins = {
             "user_id": user_id,
             "article_id": article_id,
@@ -909,14 +1182,12 @@ def log_article_read(request):
             "active_time_seconds": int(active_time_seconds or 0),
             "required_time_seconds": rts
         }
-        resp = supabase.table("article_reads").insert(ins).execute()
-        if not resp.data:
+        row = repos.reads.create(ins)
+        if not row:
             return JsonResponse({"success": False, "error": "Insert failed"}, status=500)
-        row = resp.data[0]
+        read_logger.info("read session started", extra={"session_id": row["session_id"], "article_id": article_id})
         return JsonResponse({"success": True, "session_id": row["session_id"], "data": row})
 
     except Exception as e:
-        import traceback
-        print("Exception in log_article_read:", e)
-        print(traceback.format_exc())
+        logger.exception("log_article_read failed")
         return JsonResponse({"success": False, "error": str(e)}, status=400)
\ No newline at end of file
@@ -50,9 +50,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'blog.middleware.RequestTracingMiddleware',
+    'blog.middleware.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'blog.middleware.AppAuthMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -85,6 +88,57 @@ CORS_ALLOW_HEADERS = list(default_headers) + [
 CORS_ALLOW_CREDENTIALS = True
 
 
+# Request tracing: Server-Timing headers, per-request dependency logs and /metrics histograms.
+REQUEST_TRACING = True
+# Estimating the size of decoded query results means re-serialising them; off
+# unless you are chasing payload sizes.
+REQUEST_TRACING_PAYLOAD_SIZES = config('REQUEST_TRACING_PAYLOAD_SIZES', default=False, cast=bool)
+METRICS_ENABLED = True
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', default='127.0.0.1', cast=Csv())
+
+# Opt-in profiling: send `X-Profile: 1` or set a sample rate; reports go to REQUEST_PROFILING_DIR.
+REQUEST_PROFILING = config('REQUEST_PROFILING', default=False, cast=bool)
+REQUEST_PROFILING_SAMPLE_RATE = config('REQUEST_PROFILING_SAMPLE_RATE', default=0.0, cast=float)
+REQUEST_PROFILER = config('REQUEST_PROFILER', default='cprofile')  # or 'pyinstrument'
+REQUEST_PROFILING_DIR = BASE_DIR / 'profiles'
+
+# Logging: records are queued on the request thread and written as JSON by a
+# background QueueListener (blog.log). blog.reads carries per-heartbeat events
+# and only LOG_READS_SAMPLE_RATE of them are emitted; warnings and errors always pass.
+LOG_LEVEL = config('LOG_LEVEL', default='INFO')
+LOG_READS_SAMPLE_RATE = config('LOG_READS_SAMPLE_RATE', default=0.01, cast=float)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'queue_json': {
+            '()': 'blog.log.NonBlockingJsonHandler',
+            'stream': 'ext://sys.stderr',
+        },
+    },
+    'root': {'handlers': ['queue_json'], 'level': 'WARNING'},
+    'loggers': {
+        'django': {'handlers': ['queue_json'], 'level': 'INFO', 'propagate': False},
+        'blog': {'handlers': ['queue_json'], 'level': LOG_LEVEL, 'propagate': False},
+        'blog.reads': {'level': LOG_LEVEL},
+        'cognara.requests': {'handlers': ['queue_json'], 'level': LOG_LEVEL, 'propagate': False},
+    },
+}
+
+# Point CACHE_BACKEND/CACHE_LOCATION at Redis or Memcached when running more than one worker;
+# the default local-memory cache is per-process.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='cognara'),
+    }
+}
+
+# 'cache' keeps verification codes in CACHES['default'] with a native TTL,
+# 'db' in the Supabase verification_codes table; 'auto' picks the cache when
+# it is shared between processes (not locmem) and the table otherwise.
+VERIFICATION_CODE_STORE = config('VERIFICATION_CODE_STORE', default='auto')
+
 SESSION_ENGINE = 'django.contrib.sessions.backends.db'
 SESSION_COOKIE_SAMESITE = None
 CSRF_COOKIE_SAMESITE = None
@@ -96,13 +150,17 @@ CSRF_COOKIE_HTTPONLY = False  # Allow JavaScript to access CSRF token
 
 
 # REST Framework settings
+# App-Token and session identity are resolved once by blog.middleware.AppAuthMiddleware,
+# so DRF does not run its own authentication classes on top of it.
 REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
-    ],
+    'DEFAULT_AUTHENTICATION_CLASSES': [],
     'DEFAULT_PERMISSION_CLASSES': [
-        'rest_framework.permissions.IsAuthenticatedOrReadOnly',
+        'rest_framework.permissions.AllowAny',
+    ],
+    'UNAUTHENTICATED_USER': None,
+    'DEFAULT_RENDERER_CLASSES': [
+        'blog.encoding.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
@@ -120,12 +178,98 @@ DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 # Frontend URL for email links
 FRONTEND_URL = os.environ.get('FRONTEND_URL', 'https://cognara.com')
 FRONTEND_API_TOKEN = config('FRONTEND_API_TOKEN')
+APP_TOKEN_EXEMPT_PATHS = ('/admin/',)
+# Users (ids from the users table) allowed into @admin_required views, e.g. data export.
+ADMIN_USER_IDS = config('ADMIN_USER_IDS', default='', cast=Csv(int))
 
 SUPABASE_URL = config('SUPABASE_URL')
 SUPABASE_KEY = config('SUPABASE_KEY')
 SUPABASE_BUCKET = config('SUPABASE_BUCKET')
+# Data-access backend for blog.repositories: 'supabase' or 'django' (ORM over DATABASES).
+DATA_BACKEND = config('DATA_BACKEND', default='supabase')
+# Dotted path to a zero-argument callable returning a client; empty means supabase.create_client.
+SUPABASE_CLIENT_FACTORY = config('SUPABASE_CLIENT_FACTORY', default='')
+# Identical concurrent table reads share one request (blog.singleflight); a
+# positive SWR window also serves finished reads that long while refreshing.
+SINGLE_FLIGHT = config('SINGLE_FLIGHT', default=True, cast=bool)
+SINGLE_FLIGHT_SWR_SECONDS = config('SINGLE_FLIGHT_SWR_SECONDS', default=0.0, cast=float)
+# Outbound resilience (blog.resilience): one deadline per Supabase/SMTP call,
+# jittered retries for idempotent reads, per-dependency circuit breakers and
+# the last good copy of a read served while Supabase is failing.
+RESILIENCE = config('RESILIENCE', default=True, cast=bool)
+SUPABASE_TIMEOUT_SECONDS = config('SUPABASE_TIMEOUT_SECONDS', default=5.0, cast=float)
+SUPABASE_READ_ATTEMPTS = config('SUPABASE_READ_ATTEMPTS', default=3, cast=int)
+SMTP_TIMEOUT_SECONDS = config('SMTP_TIMEOUT_SECONDS', default=10.0, cast=float)
+RETRY_BASE_SECONDS = config('RETRY_BASE_SECONDS', default=0.05, cast=float)
+RETRY_MAX_SECONDS = config('RETRY_MAX_SECONDS', default=1.0, cast=float)
+BREAKER_FAILURE_THRESHOLD = config('BREAKER_FAILURE_THRESHOLD', default=5, cast=int)
+BREAKER_RESET_SECONDS = config('BREAKER_RESET_SECONDS', default=30.0, cast=float)
+OUTBOUND_MAX_IN_FLIGHT = config('OUTBOUND_MAX_IN_FLIGHT', default=64, cast=int)
+# Stale copies of published articles/comments per worker, and how often a hot one is re-copied.
+STALE_READS_MAX_BYTES = config('STALE_READS_MAX_BYTES', default=8 * 2**20, cast=int)
+STALE_READS_REFRESH_SECONDS = config('STALE_READS_REFRESH_SECONDS', default=5.0, cast=float)
 
 GOOGLE_CLIENT_ID = config('GOOGLE_CLIENT_ID')
+# Google's ID-token signing keys (JWKS), cached per Cache-Control by blog.google_tokens.
+GOOGLE_JWKS_URL = config('GOOGLE_JWKS_URL', default='https://www.googleapis.com/oauth2/v3/certs')
+
+# Article image delivery (blog.images): published images are served from
+# IMAGE_PUBLIC_BASE_URL/images/<hash> (empty: this host) with immutable caching;
+# drafts get signed URLs that are reused for a window and valid for two.
+IMAGE_PUBLIC_BASE_URL = config('IMAGE_PUBLIC_BASE_URL', default='')
+SIGNED_URL_WINDOW_SECONDS = config('SIGNED_URL_WINDOW_SECONDS', default=3600, cast=int)
+
+# Live comments over SSE (blog.live). LIVE_BROKER: dotted path to a broker
+# factory; empty means the in-process broker (one worker process only).
+LIVE_BROKER = config('LIVE_BROKER', default='')
+LIVE_BUFFER_SIZE = config('LIVE_BUFFER_SIZE', default=64, cast=int)
+LIVE_HISTORY = config('LIVE_HISTORY', default=200, cast=int)
+LIVE_KEEPALIVE_SECONDS = config('LIVE_KEEPALIVE_SECONDS', default=15, cast=float)
+LIVE_MAX_SUBSCRIBERS = config('LIVE_MAX_SUBSCRIBERS', default=10000, cast=int)
+
+# Patch-based draft autosave (blog.drafts). The last saved version of each
+# open draft stays in CACHES['default'] this long so saves need not read it back.
+AUTOSAVE_CACHE_SECONDS = config('AUTOSAVE_CACHE_SECONDS', default=3600, cast=int)
+AUTOSAVE_MAX_CONTENT_CHARS = config('AUTOSAVE_MAX_CONTENT_CHARS', default=2000000, cast=int)
+
+# Revision history (blog.revisions): a full snapshot after this many deltas,
+# which bounds how many deltas rebuilding one version applies.
+REVISION_SNAPSHOT_EVERY = config('REVISION_SNAPSHOT_EVERY', default=50, cast=int)
+
+# RSS/Atom feeds and sitemap.xml (blog.feeds), kept current on publish and
+# rebuilt in full by `manage.py build_feeds`. FEEDS_BASE_URL is where this API
+# serves them, for the self links and the sitemap index. A shard is rewritten
+# whole when one of its articles changes, so shards stay well under the
+# 50,000-URL sitemap limit.
+FEED_SIZE = config('FEED_SIZE', default=50, cast=int)
+SITEMAP_SHARD_SIZE = config('SITEMAP_SHARD_SIZE', default=10000, cast=int)
+FEEDS_CACHE_SECONDS = config('FEEDS_CACHE_SECONDS', default=300, cast=int)
+FEEDS_BASE_URL = config('FEEDS_BASE_URL', default=FRONTEND_URL)
+FEEDS_TITLE = config('FEEDS_TITLE', default='Cognara')
+FEEDS_DESCRIPTION = config('FEEDS_DESCRIPTION', default='New articles on Cognara')
+
+# Pre-rendered published articles (blog.prerender): <id>.json and <id>.html
+# under PRERENDER_ROOT/articles, rebuilt in full by `manage.py prerender_articles`.
+# Shared storage when more than one web server writes and serves them.
+PRERENDER_ROOT = config('PRERENDER_ROOT', default=str(BASE_DIR / 'prerendered'))
+PRERENDER_WORKERS = config('PRERENDER_WORKERS', default=0, cast=int) or None
+
+# Response compression (blog.middleware.CompressionMiddleware).
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=1024, cast=int)
+COMPRESSION_STREAM_SIZE = config('COMPRESSION_STREAM_SIZE', default=1024 * 1024, cast=int)
+COMPRESSION_GZIP_LEVEL = config('COMPRESSION_GZIP_LEVEL', default=5, cast=int)
+COMPRESSION_BROTLI_QUALITY = config('COMPRESSION_BROTLI_QUALITY', default=5, cast=int)
+
+# Leaderboards (blog.ranking), rebuilt by `manage.py compute_rankings`.
+RANKING_HALF_LIFE_HOURS = config('RANKING_HALF_LIFE_HOURS', default=48, cast=float)
+RANKING_WINDOW_DAYS = config('RANKING_WINDOW_DAYS', default=30, cast=int)
+RANKING_TOP_N = config('RANKING_TOP_N', default=50, cast=int)
+RANKING_CACHE_SECONDS = config('RANKING_CACHE_SECONDS', default=300, cast=int)
+
+# "Read next" index (blog.recommendations), built by `manage.py build_recommendations`.
+RECOMMENDATIONS_INDEX_PATH = config('RECOMMENDATIONS_INDEX_PATH', default=str(BASE_DIR / 'recommendations.idx'))
+RECOMMENDATIONS_NEIGHBOURS = config('RECOMMENDATIONS_NEIGHBOURS', default=20, cast=int)
+RECOMMENDATIONS_HISTORY = config('RECOMMENDATIONS_HISTORY', default=30, cast=int)
 
 ROOT_URLCONF = 'cognara_backend.urls'
 
@@ -0,0 +1,68 @@
+-- Baseline of the tables the backend reads and writes, as they exist in the
+-- Supabase project. Everything is "if not exists" so this is a no-op there and
+-- builds the same schema on a fresh local Postgres.
+
+create table if not exists public.users (
+    id              bigint generated by default as identity primary key,
+    username        text,
+    email           text not null,
+    password_hash   text,
+    first_name      text,
+    last_name       text,
+    bio             text default 'Learner at Cognara',
+    email_verified  text not null default 'False',
+    auth_provider   text,
+    created_at      timestamptz not null default now()
+);
+
+create table if not exists public.articles (
+    id          bigint generated by default as identity primary key,
+    title       text,
+    content     text,
+    excerpt     text,
+    author_id   bigint not null references public.users (id) on delete cascade,
+    status      text not null default 'draft',
+    created_at  timestamptz not null default now(),
+    updated_at  timestamptz not null default now()
+);
+
+create table if not exists public.comments (
+    id           bigint generated by default as identity primary key,
+    article_id   bigint not null references public.articles (id) on delete cascade,
+    user_id      bigint references public.users (id) on delete set null,
+    parent_id    bigint references public.comments (id) on delete cascade,
+    content      text not null,
+    is_approved  boolean not null default true,
+    like_count   integer not null default 0,
+    created_at   timestamptz not null default now(),
+    updated_at   timestamptz not null default now()
+);
+
+create table if not exists public.article_reads (
+    id                     bigint generated by default as identity primary key,
+    session_id             uuid not null default gen_random_uuid(),
+    user_id                bigint not null references public.users (id) on delete cascade,
+    article_id             bigint not null references public.articles (id) on delete cascade,
+    status                 text not null default 'started',
+    scroll_depth           double precision not null default 0,
+    active_time_seconds    integer not null default 0,
+    required_time_seconds  integer not null default 0,
+    created_at             timestamptz not null default now(),
+    updated_at             timestamptz not null default now()
+);
+
+create table if not exists public.article_photos (
+    id          bigint generated by default as identity primary key,
+    article_id  bigint not null references public.articles (id) on delete cascade,
+    path        text not null,
+    created_at  timestamptz not null default now()
+);
+
+create table if not exists public.newsletter_subscribers (
+    id          bigint generated by default as identity primary key,
+    email       text not null,
+    is_active   boolean not null default true,
+    confirmed   boolean not null default false,
+    source      text default 'website',
+    created_at  timestamptz not null default now()
+);
@@ -0,0 +1,44 @@
+-- Email verification codes (fallback store for blog.codes.SupabaseCodeStore).
+-- One live code per user; rows past expires_at are ignored by the lookup,
+-- so no cleanup job is needed on the request path.
+
+create table if not exists public.verification_codes (
+    user_id     bigint primary key references public.users (id) on delete cascade,
+    code        text not null,
+    attempts    smallint not null default 0,
+    expires_at  timestamptz not null,
+    created_at  timestamptz not null default now()
+);
+
+create index if not exists verification_codes_expires_at_idx
+    on public.verification_codes (expires_at);
+
+-- One verification guess in one statement: counts the attempt and compares in
+-- the same row update, so parallel guesses each see their own count and the
+-- lockout cannot be raced. Returns 'verified', 'mismatch', 'locked' or
+-- 'expired' (blog.codes); a verified code is consumed.
+create or replace function public.verify_code_attempt(p_user_id bigint, p_code text, p_max_attempts integer)
+returns text
+language plpgsql
+as $$
+declare
+    v_attempts integer;
+    v_code text;
+begin
+    update public.verification_codes
+       set attempts = attempts + 1
+     where user_id = p_user_id and expires_at > now()
+    returning attempts, code into v_attempts, v_code;
+    if not found then
+        return 'expired';
+    end if;
+    if v_attempts > p_max_attempts then
+        return 'locked';
+    end if;
+    if v_code = p_code then
+        delete from public.verification_codes where user_id = p_user_id;
+        return 'verified';
+    end if;
+    return 'mismatch';
+end;
+$$;
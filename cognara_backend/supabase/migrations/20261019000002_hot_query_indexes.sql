@@ -0,0 +1,44 @@
+-- Indexes for the query shapes on the request path (see blog/repositories).
+-- Verify with: python -m benchmarks.explain_indexes
+
+-- articles: list_published (status = 'published') and list_by_author.
+create index if not exists articles_published_created_idx
+    on public.articles (created_at desc) where status = 'published';
+create index if not exists articles_author_id_idx
+    on public.articles (author_id, created_at desc);
+
+-- comments: list_for_article.
+create index if not exists comments_article_id_idx
+    on public.comments (article_id, created_at);
+
+-- article_reads: every heartbeat from log_read looks up its session_id, and
+-- opening an article looks for the latest open session of (user, article).
+create unique index if not exists article_reads_session_id_key
+    on public.article_reads (session_id);
+create index if not exists article_reads_open_idx
+    on public.article_reads (user_id, article_id, updated_at desc)
+    where status in ('started', 'in_progress');
+create index if not exists article_reads_user_article_idx
+    on public.article_reads (user_id, article_id, created_at desc);
+
+-- users: one account per address/handle regardless of case. The views
+-- lowercase before writing and querying, so the plain indexes serve the
+-- equality lookups (email_exists, get_by_email, username_exists).
+create unique index if not exists users_email_lower_key
+    on public.users (lower(email));
+create unique index if not exists users_username_lower_key
+    on public.users (lower(username));
+create index if not exists users_email_idx
+    on public.users (email);
+create index if not exists users_username_idx
+    on public.users (username);
+
+-- article_photos: paths_for_article / delete_for_article.
+create index if not exists article_photos_article_id_idx
+    on public.article_photos (article_id);
+
+-- newsletter_subscribers: subscribe checks for an existing address.
+create unique index if not exists newsletter_subscribers_email_lower_key
+    on public.newsletter_subscribers (lower(email));
+create index if not exists newsletter_subscribers_email_idx
+    on public.newsletter_subscribers (email);
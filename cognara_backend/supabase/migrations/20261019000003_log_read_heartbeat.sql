@@ -0,0 +1,75 @@
+-- One round trip per log_read heartbeat. The row lock serialises concurrent
+-- beacons for the same session (e.g. two tabs), and GREATEST keeps the max
+-- depth/time whichever arrives last. Mirrors blog.helper.apply_heartbeat.
+
+create or replace function public.classify_read(
+    p_scroll_depth double precision,
+    p_active_time integer,
+    p_required_time integer
+) returns text
+language sql immutable as $$
+    select case
+        when p_scroll_depth < 30 then 'abandoned'
+        when p_active_time < 0.5 * p_required_time then 'skimmed'
+        when p_scroll_depth >= 80 and p_active_time >= 0.8 * p_required_time then 'deep_read'
+    end
+$$;
+
+-- Same estimate as blog.helper.estimate_required_time_seconds: ~200 wpm, 30s floor.
+create or replace function public.estimate_required_time_seconds(p_article_id bigint)
+returns integer
+language sql stable as $$
+    select greatest(30, ceil(count(*) / 200.0 * 60))::integer
+    from public.articles a,
+         regexp_matches(regexp_replace(coalesce(a.content, ''), '<[^>]+>', ' ', 'g'), '\w+', 'g')
+    where a.id = p_article_id
+$$;
+
+create or replace function public.log_read_heartbeat(
+    p_session_id uuid,
+    p_status text,
+    p_scroll_depth double precision,
+    p_active_time_seconds integer,
+    p_required_time_seconds integer default null
+) returns setof public.article_reads
+language plpgsql as $$
+declare
+    r public.article_reads;
+    v_depth double precision;
+    v_time integer;
+    v_required integer;
+    v_status text;
+begin
+    select * into r from public.article_reads where session_id = p_session_id for update;
+    if not found then
+        return;
+    end if;
+
+    v_depth := greatest(r.scroll_depth, coalesce(p_scroll_depth, 0));
+    v_time := greatest(r.active_time_seconds, coalesce(p_active_time_seconds, 0));
+    v_required := case
+        when r.required_time_seconds > 0 then r.required_time_seconds
+        when p_required_time_seconds > 0 then p_required_time_seconds
+        else public.estimate_required_time_seconds(r.article_id)
+    end;
+
+    if p_status = 'completed' then
+        v_status := coalesce(public.classify_read(v_depth, v_time, v_required), 'completed');
+    elsif r.status in ('started', 'in_progress') then
+        v_status := case when v_depth > 0 or v_time > 0 then 'in_progress' else r.status end;
+    else
+        -- Already classified; a late heartbeat from another tab must not reopen it.
+        v_status := r.status;
+    end if;
+
+    return query
+    update public.article_reads
+       set scroll_depth = v_depth,
+           active_time_seconds = v_time,
+           required_time_seconds = v_required,
+           status = v_status,
+           updated_at = now()
+     where id = r.id
+    returning *;
+end;
+$$;
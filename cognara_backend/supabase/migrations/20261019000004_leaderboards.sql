@@ -0,0 +1,12 @@
+-- Precomputed top-N article lists, one row per board (blog.ranking).
+create table if not exists public.leaderboards (
+    board        text primary key,
+    entries      jsonb not null default '[]'::jsonb,
+    computed_at  timestamptz not null
+);
+
+-- events_since() scans recent activity by time.
+create index if not exists article_reads_updated_at_idx
+    on public.article_reads (updated_at);
+create index if not exists comments_created_at_idx
+    on public.comments (created_at);
@@ -0,0 +1,8 @@
+-- Idempotent bulk imports (blog.bulk_import): an imported article carries the
+-- SHA-256 of (author email, title, content), and image rows are looked up by path.
+alter table public.articles add column if not exists import_hash text;
+
+create unique index if not exists articles_import_hash_key
+    on public.articles (import_hash);
+create index if not exists article_photos_path_idx
+    on public.article_photos (path);
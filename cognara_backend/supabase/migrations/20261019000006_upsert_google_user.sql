@@ -0,0 +1,19 @@
+-- One round trip per Google sign-in: create the account or refresh the name
+-- and provider of an existing one, keyed on users_email_lower_key. xmax = 0
+-- only for a freshly inserted row, which is what google_auth reports as is_new.
+
+create or replace function public.upsert_google_user(
+    p_email text,
+    p_first_name text,
+    p_last_name text
+) returns table (id bigint, is_new boolean)
+language sql as $$
+    insert into public.users as u (email, first_name, last_name, bio, email_verified, auth_provider)
+    values (lower(p_email), p_first_name, p_last_name, 'Learner at Cognara', 'True', 'Google')
+    on conflict (lower(email)) do update
+       set first_name = excluded.first_name,
+           last_name = excluded.last_name,
+           email_verified = 'True',
+           auth_provider = 'Google'
+    returning u.id, (u.xmax = 0) as is_new
+$$;
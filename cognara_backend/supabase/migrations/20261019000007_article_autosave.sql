@@ -0,0 +1,43 @@
+-- Patch-based draft autosave (blog.drafts). articles.version moves on every
+-- title/content write, so an autosave made against an older version is refused
+-- instead of overwriting what another tab or `submit` saved.
+
+alter table public.articles add column if not exists version integer not null default 1;
+
+-- Writes that do not set the version themselves (submit, admin edits) still bump it.
+create or replace function public.articles_bump_version() returns trigger
+language plpgsql as $$
+begin
+    if new.version = old.version
+       and (new.title is distinct from old.title or new.content is distinct from old.content) then
+        new.version := old.version + 1;
+    end if;
+    return new;
+end;
+$$;
+
+drop trigger if exists articles_bump_version on public.articles;
+create trigger articles_bump_version
+    before update on public.articles
+    for each row execute function public.articles_bump_version();
+
+-- One round trip per autosave: the conditional write is the concurrency check.
+-- Returns no row if the article is not the author's or has moved past p_base_version.
+create or replace function public.autosave_article(
+    p_article_id bigint,
+    p_author_id bigint,
+    p_base_version integer,
+    p_title text,
+    p_content text
+) returns table (id bigint, version integer)
+language sql as $$
+    update public.articles a
+       set title = coalesce(p_title, a.title),
+           content = p_content,
+           version = p_base_version + 1,
+           updated_at = now()
+     where a.id = p_article_id
+       and a.author_id = p_author_id
+       and a.version = p_base_version
+    returning a.id, a.version
+$$;
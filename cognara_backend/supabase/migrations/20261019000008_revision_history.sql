@@ -0,0 +1,54 @@
+-- Revision history (blog.revisions): every saved version of an article is a
+-- row, either a snapshot of the whole content or a delta from base_version,
+-- both zlib-compressed and base64-encoded by the app.
+create table if not exists public.article_revisions (
+    id            bigint generated by default as identity primary key,
+    article_id    bigint not null references public.articles (id) on delete cascade,
+    version       integer not null,
+    base_version  integer,
+    kind          text not null check (kind in ('snapshot', 'delta')),
+    data          text not null,
+    title         text not null default '',
+    length        integer not null default 0,
+    created_at    timestamptz not null default now(),
+    constraint article_revisions_article_version_key unique (article_id, version)
+);
+
+-- autosave_article now logs the revision row built by blog.revisions.build with
+-- the write; the old signature goes so no caller can skip the history.
+drop function if exists public.autosave_article(bigint, bigint, integer, text, text);
+
+-- One round trip per autosave: the conditional write is the concurrency check,
+-- and the revision row built by blog.revisions.build is logged with it.
+-- Returns no row if the article is not the author's or has moved past p_base_version.
+create or replace function public.autosave_article(
+    p_article_id bigint,
+    p_author_id bigint,
+    p_base_version integer,
+    p_title text,
+    p_content text,
+    p_revision jsonb
+) returns table (id bigint, version integer)
+language sql as $$
+    with saved as (
+        update public.articles a
+           set title = coalesce(p_title, a.title),
+               content = p_content,
+               version = p_base_version + 1,
+               updated_at = now()
+         where a.id = p_article_id
+           and a.author_id = p_author_id
+           and a.version = p_base_version
+        returning a.id, a.version
+    ), logged as (
+        insert into public.article_revisions (article_id, version, base_version, kind, data, title, length)
+        select saved.id, saved.version,
+               (p_revision ->> 'base_version')::integer,
+               p_revision ->> 'kind',
+               p_revision ->> 'data',
+               coalesce(p_revision ->> 'title', ''),
+               coalesce((p_revision ->> 'length')::integer, 0)
+          from saved
+    )
+    select saved.id, saved.version from saved
+$$;
@@ -0,0 +1,25 @@
+-- Pre-rendered RSS/Atom feeds and sitemap files (blog.feeds): rss, atom,
+-- sitemap (the index) and sitemap-<n>, one per SITEMAP_SHARD_SIZE article ids.
+-- entries is what the body was rendered from; writes are conditional on etag.
+create table if not exists public.feed_documents (
+    name        text primary key,
+    entries     jsonb not null default '[]'::jsonb,
+    body        text not null,
+    etag        text not null,
+    updated_at  timestamptz not null default now()
+);
+
+create or replace function public.feed_documents_touch()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at := now();
+    return new;
+end;
+$$;
+
+drop trigger if exists feed_documents_touch on public.feed_documents;
+create trigger feed_documents_touch
+    before update on public.feed_documents
+    for each row execute function public.feed_documents_touch();
@@ -0,0 +1,44 @@
+-- Moderation queue (see the moderation_* views): keyset pages of one status
+-- in id order, and per-status counts kept by a trigger so the dashboard's
+-- tab badges are one small read however many articles wait.
+create index if not exists articles_status_id_idx
+    on public.articles (status, id);
+
+create table if not exists public.article_status_counts (
+    status    text primary key,
+    articles  bigint not null default 0
+);
+
+create or replace function public.articles_count_status()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        update public.article_status_counts set articles = articles - 1 where status = old.status;
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        insert into public.article_status_counts (status, articles) values (new.status, 1)
+        on conflict (status) do update set articles = public.article_status_counts.articles + 1;
+    end if;
+    return null;
+end;
+$$;
+
+-- No status changes between the count below and the triggers taking over.
+lock table public.articles in share row exclusive mode;
+
+drop trigger if exists articles_count_status on public.articles;
+create trigger articles_count_status
+    after insert or delete on public.articles
+    for each row execute function public.articles_count_status();
+
+drop trigger if exists articles_count_status_update on public.articles;
+create trigger articles_count_status_update
+    after update of status on public.articles
+    for each row when (old.status is distinct from new.status)
+    execute function public.articles_count_status();
+
+insert into public.article_status_counts (status, articles)
+select status, count(*) from public.articles group by status
+on conflict (status) do update set articles = excluded.articles;
@@ -0,0 +1,214 @@
+-- Author dashboard (the author_stats view): per-article read and comment
+-- totals kept by triggers as log_read/post_comment write, so an author's
+-- stats are one indexed read of their articles however many reads those have.
+-- Mirrors blog.stats.read_rollup and the ORM backend's ArticleStats upkeep.
+--
+-- A session's active time counts once it is finished (out of started /
+-- in_progress), so the heartbeats of open sessions leave the per-article row
+-- alone: it is written when a session starts, finishes or changes status, not
+-- once per heartbeat of every reader of a popular article. finished_reads counts
+-- those sessions, so the dashboard's average active time is over them alone.
+
+create table if not exists public.article_stats (
+    article_id       bigint primary key references public.articles (id) on delete cascade,
+    reads            integer not null default 0,
+    completed_reads  integer not null default 0,
+    deep_reads       integer not null default 0,
+    finished_reads   integer not null default 0,
+    active_seconds   bigint not null default 0,
+    comments         integer not null default 0,
+    updated_at       timestamptz not null default now()
+);
+
+-- Sessions that reached the end of the article, however they were classified.
+create or replace function public.read_is_completed(p_status text)
+returns integer
+language sql immutable as $$
+    select (p_status in ('completed', 'skimmed', 'deep_read', 'read', 'read_deeply'))::integer
+$$;
+
+create or replace function public.read_is_deep(p_status text)
+returns integer
+language sql immutable as $$
+    select (p_status in ('deep_read', 'read_deeply'))::integer
+$$;
+
+create or replace function public.read_is_finished(p_status text)
+returns integer
+language sql immutable as $$
+    select (coalesce(p_status, 'started') not in ('started', 'in_progress'))::integer
+$$;
+
+-- Active time a session contributes: none while it is still open.
+create or replace function public.read_active_seconds(p_status text, p_active_time_seconds integer)
+returns bigint
+language sql immutable as $$
+    select case when coalesce(p_status, 'started') in ('started', 'in_progress') then 0
+                else coalesce(p_active_time_seconds, 0) end::bigint
+$$;
+
+create or replace function public.article_stats_add(
+    p_article_id bigint,
+    p_reads integer,
+    p_completed_reads integer,
+    p_deep_reads integer,
+    p_finished_reads integer,
+    p_active_seconds bigint,
+    p_comments integer
+) returns void
+language sql as $$
+    -- The exists() skips events of an article being deleted (its row goes with it).
+    insert into public.article_stats as s (article_id, reads, completed_reads, deep_reads, finished_reads,
+                                           active_seconds, comments)
+    select p_article_id, p_reads, p_completed_reads, p_deep_reads, p_finished_reads, p_active_seconds, p_comments
+     where exists (select 1 from public.articles where id = p_article_id)
+    on conflict (article_id) do update
+       set reads = s.reads + excluded.reads,
+           completed_reads = s.completed_reads + excluded.completed_reads,
+           deep_reads = s.deep_reads + excluded.deep_reads,
+           finished_reads = s.finished_reads + excluded.finished_reads,
+           active_seconds = s.active_seconds + excluded.active_seconds,
+           comments = s.comments + excluded.comments,
+           updated_at = now()
+$$;
+
+create or replace function public.article_reads_rollup()
+returns trigger
+language plpgsql
+as $$
+declare
+    v_completed integer;
+    v_deep integer;
+    v_finished integer;
+    v_active bigint;
+begin
+    if tg_op = 'UPDATE' and old.article_id = new.article_id then
+        -- A status change (or a late heartbeat of a finished session): one upsert with the
+        -- difference, none when it is zero (started -> in_progress).
+        v_completed := public.read_is_completed(new.status) - public.read_is_completed(old.status);
+        v_deep := public.read_is_deep(new.status) - public.read_is_deep(old.status);
+        v_finished := public.read_is_finished(new.status) - public.read_is_finished(old.status);
+        v_active := public.read_active_seconds(new.status, new.active_time_seconds)
+                    - public.read_active_seconds(old.status, old.active_time_seconds);
+        if v_completed <> 0 or v_deep <> 0 or v_finished <> 0 or v_active <> 0 then
+            perform public.article_stats_add(new.article_id, 0, v_completed, v_deep, v_finished, v_active, 0);
+        end if;
+        return null;
+    end if;
+    if tg_op in ('UPDATE', 'DELETE') then
+        perform public.article_stats_add(old.article_id, -1, -public.read_is_completed(old.status),
+            -public.read_is_deep(old.status), -public.read_is_finished(old.status),
+            -public.read_active_seconds(old.status, old.active_time_seconds), 0);
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        perform public.article_stats_add(new.article_id, 1, public.read_is_completed(new.status),
+            public.read_is_deep(new.status), public.read_is_finished(new.status),
+            public.read_active_seconds(new.status, new.active_time_seconds), 0);
+    end if;
+    return null;
+end;
+$$;
+
+create or replace function public.comments_rollup()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op = 'DELETE' then
+        perform public.article_stats_add(old.article_id, 0, 0, 0, 0, 0, -1);
+    else
+        perform public.article_stats_add(new.article_id, 0, 0, 0, 0, 0, 1);
+    end if;
+    return null;
+end;
+$$;
+
+-- No reads or comments land between the counts below and the triggers taking over.
+lock table public.article_reads, public.comments in share row exclusive mode;
+
+drop trigger if exists article_reads_rollup on public.article_reads;
+create trigger article_reads_rollup
+    after insert or delete on public.article_reads
+    for each row execute function public.article_reads_rollup();
+
+-- Heartbeats of open sessions leave the stats row unlocked; only a status change
+-- or more active time on a finished session (which counts it) reaches it.
+drop trigger if exists article_reads_rollup_update on public.article_reads;
+create trigger article_reads_rollup_update
+    after update of status, active_time_seconds, article_id on public.article_reads
+    for each row when (old.status is distinct from new.status
+                       or old.article_id is distinct from new.article_id
+                       or (old.active_time_seconds is distinct from new.active_time_seconds
+                           and new.status not in ('started', 'in_progress')))
+    execute function public.article_reads_rollup();
+
+drop trigger if exists comments_rollup on public.comments;
+create trigger comments_rollup
+    after insert or delete on public.comments
+    for each row execute function public.comments_rollup();
+
+insert into public.article_stats (article_id, reads, completed_reads, deep_reads, finished_reads, active_seconds,
+                                  comments)
+select a.id, coalesce(r.reads, 0), coalesce(r.completed_reads, 0), coalesce(r.deep_reads, 0),
+       coalesce(r.finished_reads, 0), coalesce(r.active_seconds, 0), coalesce(c.comments, 0)
+  from public.articles a
+  left join (select article_id, count(*) as reads,
+                    sum(public.read_is_completed(status)) as completed_reads,
+                    sum(public.read_is_deep(status)) as deep_reads,
+                    sum(public.read_is_finished(status)) as finished_reads,
+                    sum(public.read_active_seconds(status, active_time_seconds)) as active_seconds
+               from public.article_reads group by article_id) r on r.article_id = a.id
+  left join (select article_id, count(*) as comments
+               from public.comments group by article_id) c on c.article_id = a.id
+ where r.article_id is not null or c.article_id is not null
+on conflict (article_id) do update
+   set reads = excluded.reads,
+       completed_reads = excluded.completed_reads,
+       deep_reads = excluded.deep_reads,
+       finished_reads = excluded.finished_reads,
+       active_seconds = excluded.active_seconds,
+       comments = excluded.comments,
+       updated_at = now();
+
+-- Totals over all of an author's articles plus one page of them, newest first
+-- (articles_author_id_idx), as a single jsonb value: one round trip.
+create or replace function public.author_article_stats(
+    p_author_id bigint,
+    p_limit integer default 50,
+    p_before bigint default null
+) returns jsonb
+language sql stable as $$
+    with mine as (
+        select a.id, a.title, a.status, a.created_at, a.updated_at,
+               coalesce(s.reads, 0) as reads,
+               coalesce(s.completed_reads, 0) as completed_reads,
+               coalesce(s.deep_reads, 0) as deep_reads,
+               coalesce(s.finished_reads, 0) as finished_reads,
+               coalesce(s.active_seconds, 0) as active_seconds,
+               coalesce(s.comments, 0) as comments
+          from public.articles a
+          left join public.article_stats s on s.article_id = a.id
+         where a.author_id = p_author_id
+    ), page as (
+        select *
+          from mine
+         where p_before is null
+            or (created_at, id) < (select b.created_at, b.id from public.articles b
+                                    where b.id = p_before and b.author_id = p_author_id)
+         order by created_at desc, id desc
+         limit p_limit
+    )
+    select jsonb_build_object(
+        'totals', (select jsonb_build_object(
+                       'articles', count(*),
+                       'reads', coalesce(sum(reads), 0),
+                       'completed_reads', coalesce(sum(completed_reads), 0),
+                       'deep_reads', coalesce(sum(deep_reads), 0),
+                       'finished_reads', coalesce(sum(finished_reads), 0),
+                       'active_seconds', coalesce(sum(active_seconds), 0),
+                       'comments', coalesce(sum(comments), 0))
+                     from mine),
+        'articles', coalesce((select jsonb_agg(to_jsonb(page) order by created_at desc, id desc) from page),
+                             '[]'::jsonb)
+    )
+$$;